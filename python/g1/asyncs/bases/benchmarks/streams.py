@@ -0,0 +1,96 @@
+"""Benchmark reading a large stream in small pieces.
+
+It writes data to a ``BytesStream`` in 64 KiB pieces and reads it back
+in 4 KiB pieces (with ``read`` and with ``readinto``), and reports the
+throughput.  For the bounded mode, a writer task and a reader task run
+concurrently, with the writer blocked whenever the buffer is full.
+"""
+
+import sys
+import time
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import streams
+from g1.asyncs.bases import tasks
+
+WRITE_SIZE = 65536
+
+
+def bench_unbounded(total_size, read_size, use_readinto):
+    stream = streams.BytesStream()
+    piece = b'x' * WRITE_SIZE
+    start = time.perf_counter()
+    for _ in range(total_size // WRITE_SIZE):
+        stream.write_nonblocking(piece)
+    stream.close()
+    num_read = read_all(stream, read_size, use_readinto)
+    elapsed = time.perf_counter() - start
+    expect = total_size // WRITE_SIZE * WRITE_SIZE
+    if num_read != expect:
+        raise AssertionError('expect %d bytes, not %d' % (expect, num_read))
+    return num_read / elapsed
+
+
+def read_all(stream, read_size, use_readinto):
+    num_read = 0
+    if use_readinto:
+        buffer = bytearray(read_size)
+        while True:
+            n = stream.readinto_nonblocking(buffer)
+            if not n:
+                return num_read
+            num_read += n
+    else:
+        while True:
+            data = stream.read_nonblocking(read_size)
+            if not data:
+                return num_read
+            num_read += len(data)
+
+
+async def write_all(stream, total_size):
+    piece = b'x' * WRITE_SIZE
+    for _ in range(total_size // WRITE_SIZE):
+        await stream.write(piece)
+    stream.close()
+
+
+async def read_all_async(stream, read_size):
+    num_read = 0
+    while True:
+        data = await stream.read(read_size)
+        if not data:
+            return num_read
+        num_read += len(data)
+
+
+@kernels.with_kernel
+def bench_bounded(total_size, read_size, capacity):
+    stream = streams.BytesStream(capacity=capacity)
+    start = time.perf_counter()
+    writer = tasks.spawn(write_all(stream, total_size))
+    reader = tasks.spawn(read_all_async(stream, read_size))
+    kernels.run()
+    writer.get_result_nonblocking()
+    num_read = reader.get_result_nonblocking()
+    return num_read / (time.perf_counter() - start)
+
+
+def main(argv):
+    total_size = int(argv[1]) if len(argv) > 1 else 100 * 1024 * 1024
+    read_size = int(argv[2]) if len(argv) > 2 else 4096
+    mib = 1024 * 1024
+    for use_readinto in (False, True):
+        rate = bench_unbounded(total_size, read_size, use_readinto)
+        print(
+            'unbounded: %s: %.0f MiB/s' %
+            ('readinto' if use_readinto else 'read', rate / mib)
+        )
+    for capacity in (WRITE_SIZE, 16 * WRITE_SIZE):
+        rate = bench_bounded(total_size, read_size, capacity)
+        print('bounded: capacity=%d: %.0f MiB/s' % (capacity, rate / mib))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -6,7 +6,6 @@ __all__ = [
 ]
 
 import collections
-import io
 
 from g1.bases import classes
 from g1.bases.assertions import ASSERT
@@ -14,39 +13,144 @@ from g1.bases.assertions import ASSERT
 from . import locks
 
 
+class _Buffer:
+    """Buffer of a deque of chunks.
+
+    Unlike ``io.BytesIO``, whose ``getvalue`` copies the entire buffer,
+    reading from this buffer only copies the data being read (chunks are
+    consumed in place with an offset into the first chunk), and so
+    reading the buffer in small pieces takes linear time in total.
+    """
+
+    def __init__(self, data_type, newline):
+        ASSERT.equal(len(newline), 1)
+        self._empty = data_type()
+        self._newline = newline
+        self._chunks = collections.deque()
+        # Offset into the first chunk.
+        self._offset = 0
+        self._size = 0
+        # Size of the prefix of the buffer that is known to not contain
+        # newline, so that repeated ``find_newline`` calls do not scan
+        # the same data again.
+        self._num_scanned = 0
+
+    def __len__(self):
+        return self._size
+
+    def getvalue(self):
+        return self.peek(self._size)
+
+    def append(self, data):
+        if data:
+            self._chunks.append(data)
+            self._size += len(data)
+
+    def find_newline(self):
+        """Return position of the first newline, or -1 if not found."""
+        pos = 0
+        offset = self._offset
+        for chunk in self._chunks:
+            end = pos + len(chunk) - offset
+            if end > self._num_scanned:
+                i = chunk.find(
+                    self._newline,
+                    offset + max(self._num_scanned - pos, 0),
+                )
+                if i >= 0:
+                    self._num_scanned = pos + i - offset
+                    return self._num_scanned
+            pos = end
+            offset = 0
+        self._num_scanned = self._size
+        return -1
+
+    def peek(self, size):
+        """Return the first ``size`` items without consuming them."""
+        size = min(size, self._size)
+        if not size:
+            return self._empty
+        first = self._chunks[0]
+        if self._offset + size <= len(first):
+            if self._offset == 0 and size == len(first):
+                return first
+            return first[self._offset:self._offset + size]
+        pieces = []
+        offset = self._offset
+        for chunk in self._chunks:
+            piece = chunk[offset:offset + size] if offset else chunk[:size]
+            pieces.append(piece)
+            size -= len(piece)
+            if not size:
+                break
+            offset = 0
+        return self._empty.join(pieces)
+
+    def read(self, size):
+        data = self.peek(size)
+        self.consume(len(data))
+        return data
+
+    def readinto(self, buffer):
+        """Read into a writable bytes-like object."""
+        with memoryview(buffer) as view, view.cast('B') as output:
+            size = min(len(output), self._size)
+            pos = 0
+            offset = self._offset
+            for chunk in self._chunks:
+                if pos == size:
+                    break
+                end = min(len(chunk), offset + size - pos)
+                with memoryview(chunk) as input_:
+                    output[pos:pos + end - offset] = input_[offset:end]
+                pos += end - offset
+                offset = 0
+        self.consume(size)
+        return size
+
+    def consume(self, size):
+        ASSERT.less_or_equal(size, self._size)
+        self._size -= size
+        self._num_scanned = max(self._num_scanned - size, 0)
+        size += self._offset
+        while size and size >= len(self._chunks[0]):
+            size -= len(self._chunks.popleft())
+        self._offset = size
+
+
 class StreamBase:
     """In-memory stream base class.
 
     The semantics that this class implements is similar to a pipe, not a
     regular file (and ``close`` only closes the write-end of stream).
 
-    Compared to a pipe, this class employs an unbounded buffer, and thus
-    a writer is never blocked.
+    By default, this class employs an unbounded buffer, and thus a
+    writer is never blocked.  If ``capacity`` is greater than 0, the
+    buffer is bounded, and a writer is blocked when the buffer is full
+    (as in a pipe).
 
     This class provides both blocking and non-blocking interface.
     """
 
-    def __init__(self, buffer_type, data_type, newline):
-        self._buffer_type = buffer_type
+    def __init__(self, data_type, newline, capacity):
         self._data_type = data_type
         self._newline = newline
-        self._buffer = self._buffer_type()
+        self._capacity = ASSERT.greater_or_equal(capacity, 0)
+        self._buffer = _Buffer(data_type, newline)
         self._closed = False
         self._gate = locks.Gate()
-
-    def _make_buffer(self, data):
-        if data:
-            buffer = self._buffer_type(data)
-            buffer.seek(len(data))
-        else:
-            buffer = self._buffer_type()
-        return buffer
+        self._writer_gate = locks.Gate()
 
     __repr__ = classes.make_repr(
-        '{state}',
+        '{state}, capacity={self._capacity}, size={size}',
         state=lambda self: 'closed' if self._closed else 'open',
+        size=lambda self: len(self._buffer),
     )
 
+    def _to_data(self, data):
+        """Check (and copy if needed) data being written."""
+        raise NotImplementedError
+
     def __aiter__(self):
         return self
 
@@ -84,8 +188,41 @@ class StreamBase:
                 break
         return lines
 
+    async def peek(self, size=-1):
+        while True:
+            data = self.peek_nonblocking(size)
+            if data is None:
+                await self._gate.wait()
+            else:
+                return data
+
     async def write(self, data):
-        return self.write_nonblocking(data)
+        """Write all data, blocking while the buffer is full.
+
+        It raises ``BrokenPipeError`` if the stream is closed while it
+        is blocked.
+        """
+        data = self._to_data(data)
+        if self._capacity == 0:
+            return self.write_nonblocking(data)
+        num_written = 0
+        while True:
+            # Slice data to capacity so that we do not copy the rest of
+            # data again and again.
+            num_written_piece = self.write_nonblocking(
+                data[num_written:num_written + self._capacity]
+            )
+            if num_written_piece is None:
+                await self._writer_gate.wait()
+                if self._closed:
+                    raise BrokenPipeError(
+                        'stream is closed after writing %d bytes' %
+                        num_written
+                    )
+                continue
+            num_written += num_written_piece
+            if num_written >= len(data):
+                return num_written
 
     #
     # Non-blocking counterparts.
@@ -99,6 +236,7 @@ class StreamBase:
         'NonblockingMethods',
         (
             'close',
+            'peek',
             'read',
             'readline',
             'write',
@@ -110,6 +248,7 @@ class StreamBase:
         """Expose non-blocking interface via a file-like interface."""
         return self.NonblockingMethods(
             close=self.close,
+            peek=self.peek_nonblocking,
             read=self.read_nonblocking,
             readline=self.readline_nonblocking,
             write=self.write_nonblocking,
@@ -118,40 +257,49 @@ class StreamBase:
     def close(self):
         self._closed = True
         self._gate.unblock()
+        self._writer_gate.unblock()
+
+    def _check_readable(self):
+        """Return true if readable, false if at EOF, or None."""
+        if self._buffer:
+            return True
+        elif self._closed:
+            return False
+        else:
+            return None
 
-    def read_nonblocking(self, size=-1):
-        data = self._buffer.getvalue()
-        if not data:
-            if self._closed:
-                return data
-            else:
-                return None
+    def _consume(self, size):
+        data = self._buffer.read(size)
+        if self._capacity > 0 and data:
+            self._writer_gate.unblock()
+        return data
 
+    def peek_nonblocking(self, size=-1):
+        """Return data without consuming it."""
+        readable = self._check_readable()
+        if not readable:
+            return None if readable is None else self._data_type()
         if size < 0:
-            size = len(data)
+            size = len(self._buffer)
+        return self._buffer.peek(size)
 
-        if size == 0:
-            data = self._data_type()
-        elif size >= len(data):
-            self._buffer = self._buffer_type()
-        else:
-            self._buffer = self._make_buffer(data[size:])
-            data = data[:size]
-
-        return data
+    def read_nonblocking(self, size=-1):
+        readable = self._check_readable()
+        if not readable:
+            return None if readable is None else self._data_type()
+        if size < 0:
+            size = len(self._buffer)
+        return self._consume(size)
 
     def readline_nonblocking(self, size=-1):
-        data = self._buffer.getvalue()
-        if not data:
-            if self._closed:
-                return data
-            else:
-                return None
+        readable = self._check_readable()
+        if not readable:
+            return None if readable is None else self._data_type()
 
-        pos = data.find(self._newline)
+        pos = self._buffer.find_newline()
         if pos < 0 and size < 0:
             if self._closed:
-                size = len(data)
+                size = len(self._buffer)
             else:
                 return None
         elif size < 0 <= pos:
@@ -162,31 +310,73 @@ class StreamBase:
             # pos >= 0 and size >= 0.
             size = min(size, pos + len(self._newline))
 
-        if size == 0:
-            data = self._data_type()
-        elif size >= len(data):
-            self._buffer = self._buffer_type()
-        else:
-            self._buffer = self._make_buffer(data[size:])
-            data = data[:size]
-
-        return data
+        return self._consume(size)
 
     def write_nonblocking(self, data):
+        """Write data, and return the number of items written.
+
+        If the buffer is bounded, it might only write part of data, and
+        it returns None if the buffer is full.
+        """
         ASSERT.false(self._closed)
+        data = self._to_data(data)
+        if self._capacity > 0:
+            room = self._capacity - len(self._buffer)
+            if room <= 0 and data:
+                return None
+            if room < len(data):
+                data = data[:room]
         self._gate.unblock()
-        return self._buffer.write(data)
+        self._buffer.append(data)
+        return len(data)
 
 
 class BytesStream(StreamBase):
 
-    def __init__(self):
-        super().__init__(io.BytesIO, bytes, b'\n')
+    def __init__(self, capacity=0):
+        super().__init__(bytes, b'\n', capacity)
+
+    def _to_data(self, data):
+        if isinstance(data, bytes):
+            return data
+        # Copy bytes-like objects because they might be mutable, and
+        # raise ``TypeError`` on anything else (like ``io.BytesIO``).
+        with memoryview(data) as view:
+            return view.tobytes()
+
+    async def readinto(self, buffer):
+        while True:
+            num_read = self.readinto_nonblocking(buffer)
+            if num_read is None:
+                await self._gate.wait()
+            else:
+                return num_read
+
+    def readinto_nonblocking(self, buffer):
+        """Read into a writable bytes-like object, such as memoryview.
+
+        It returns the number of bytes read, 0 at EOF, or None if no
+        data is available.
+        """
+        readable = self._check_readable()
+        if not readable:
+            return None if readable is None else 0
+        num_read = self._buffer.readinto(buffer)
+        if self._capacity > 0 and num_read:
+            self._writer_gate.unblock()
+        return num_read
 
 
 class StringStream(StreamBase):
 
-    def __init__(self):
+    def __init__(self, capacity=0):
         # TODO: Handle all corner cases of newline characters (for now
         # it is fixed to '\n').
-        super().__init__(io.StringIO, str, '\n')
+        super().__init__(str, '\n', capacity)
+
+    def _to_data(self, data):
+        if not isinstance(data, str):
+            raise TypeError(
+                'string argument expected, got %r' % type(data).__name__
+            )
+        return data
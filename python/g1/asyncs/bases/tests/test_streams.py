@@ -265,9 +265,119 @@ class BytesStreamTest(unittest.TestCase):
             [b'hello\n', b'world\n', b'foo'],
         )
 
+    def test_readline_across_chunks(self):
+        stream = self.s.nonblocking
+        for piece in (b'hel', b'lo', b'', b' wor', b'ld\nfoo', b'\nbar'):
+            stream.write(piece)
+        self.assertEqual(stream.readline(), b'hello world\n')
+        self.assertEqual(stream.readline(), b'foo\n')
+        self.assertIsNone(stream.readline())
+        self.assertEqual(stream.write(b'\n'), 1)
+        self.assertEqual(stream.readline(), b'bar\n')
+        self.assert_stream(b'')
+
+    def test_mutable_data(self):
+        stream = self.s.nonblocking
+        data = bytearray(b'hello')
+        self.assertEqual(stream.write(data), 5)
+        self.assertEqual(stream.write(memoryview(data)[1:3]), 2)
+        data[0] = ord('j')
+        self.assert_stream(b'helloel')
+
+    def test_peek(self):
+        stream = self.s.nonblocking
+        self.assertIsNone(stream.peek())
+        stream.write(b'hello')
+        stream.write(b'world')
+        self.assertEqual(stream.peek(), b'helloworld')
+        self.assertEqual(stream.peek(3), b'hel')
+        self.assertEqual(stream.read(4), b'hell')
+        self.assertEqual(stream.peek(3), b'owo')
+        self.assertEqual(stream.peek(0), b'')
+        self.assert_stream(b'oworld')
+        stream.close()
+        self.assertEqual(stream.read(), b'oworld')
+        self.assertEqual(stream.peek(), b'')
+
+    def test_readinto(self):
+        buffer = bytearray(4)
+        self.assertIsNone(self.s.readinto_nonblocking(buffer))
+        self.s.write_nonblocking(b'hel')
+        self.s.write_nonblocking(b'lo world')
+        self.assertEqual(self.s.readinto_nonblocking(buffer), 4)
+        self.assertEqual(buffer, b'hell')
+        with memoryview(buffer) as view:
+            self.assertEqual(self.s.readinto_nonblocking(view[1:]), 3)
+        self.assertEqual(buffer, b'ho w')
+        self.assert_stream(b'orld')
+        self.s.close()
+        self.assertEqual(self.k.run(self.s.readinto(buffer)), 4)
+        self.assertEqual(buffer, b'orld')
+        self.assertEqual(self.s.readinto_nonblocking(buffer), 0)
+
+    def test_capacity(self):
+        self.s = streams.BytesStream(capacity=4)
+        stream = self.s.nonblocking
+        self.assertEqual(stream.write(b'hel'), 3)
+        self.assertEqual(stream.write(b'lo'), 1)
+        self.assertIsNone(stream.write(b'o'))
+        self.assertEqual(stream.write(b''), 0)
+        self.assert_stream(b'hell')
+
+        t = self.k.spawn(self.s.write(b'o world'))
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.assertFalse(t.is_completed())
+
+        self.assertEqual(stream.read(3), b'hel')
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.assert_stream(b'lo w')
+        self.assertEqual(stream.read(3), b'lo ')
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.assert_stream(b'worl')
+        self.assertEqual(stream.read(3), b'wor')
+        self.k.run(timeout=1)
+        self.assertEqual(t.get_result_nonblocking(), 7)
+        self.assert_stream(b'ld')
+
+    def test_capacity_close(self):
+        self.s = streams.BytesStream(capacity=1)
+        self.s.write_nonblocking(b'x')
+        t = self.k.spawn(self.s.write(b'y'))
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.s.close()
+        self.k.run(timeout=1)
+        with self.assertRaisesRegex(
+            BrokenPipeError, r'stream is closed after writing 0 bytes'
+        ):
+            t.get_result_nonblocking()
+
+    def test_capacity_close_partially_written(self):
+        self.s = streams.BytesStream(capacity=4)
+        t = self.k.spawn(self.s.write(b'hello world'))
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.assert_stream(b'hell')
+        self.assertEqual(self.s.read_nonblocking(2), b'he')
+        with self.assertRaises(errors.KernelTimeout):
+            self.k.run(timeout=0)
+        self.assert_stream(b'llo ')
+        self.s.close()
+        self.k.run(timeout=1)
+        with self.assertRaisesRegex(
+            BrokenPipeError, r'stream is closed after writing 6 bytes'
+        ):
+            t.get_result_nonblocking()
+        # Readers may still read what has been written.
+        self.assertEqual(self.s.read_nonblocking(), b'llo ')
+        self.assertEqual(self.s.read_nonblocking(), b'')
+
     def assert_stream(self, expect):
         self.assertEqual(self.s._buffer.getvalue(), expect)
-        self.assertEqual(self.s._buffer.tell(), len(expect))
+        self.assertEqual(len(self.s._buffer), len(expect))
 
 
 class StringStreamTest(unittest.TestCase):
@@ -285,6 +395,15 @@ class StringStreamTest(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.s.nonblocking.write(b'')
 
+    def test_readline(self):
+        stream = self.s.nonblocking
+        for piece in ('hello', '\nwor', 'ld\n'):
+            stream.write(piece)
+        self.assertEqual(stream.readline(), 'hello\n')
+        self.assertEqual(stream.peek(), 'world\n')
+        self.assertEqual(stream.readline(3), 'wor')
+        self.assertEqual(stream.read(), 'ld\n')
+
 
 if __name__ == '__main__':
     unittest.main()
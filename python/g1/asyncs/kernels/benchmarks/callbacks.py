@@ -0,0 +1,77 @@
+"""Benchmark cross-thread ``post_callback`` throughput.
+
+It starts a number of threads that post callbacks to the kernel as fast
+as possible, and reports the number of callbacks per second, along with
+the number of nudger syscalls.
+"""
+
+import sys
+import threading
+import time
+
+from g1.asyncs import kernels
+from g1.asyncs.kernels import traps
+
+
+def bench(kernel, num_threads, num_callbacks):
+
+    total = num_threads * num_callbacks
+    num_fired = 0
+    done = object()
+
+    def callback():
+        nonlocal num_fired
+        num_fired += 1
+        if num_fired == total:
+            kernel.unblock(done)
+
+    def post():
+        for _ in range(num_callbacks):
+            kernel.post_callback(callback)
+
+    num_writes = 0
+    write = kernel._nudger._write
+
+    def counting_write():
+        nonlocal num_writes
+        num_writes += 1
+        write()
+
+    kernel._nudger._write = counting_write
+
+    async def wait():
+        # The kernel is woken up only by nudges.
+        if num_fired < total:
+            await traps.block(done)
+
+    threads = [threading.Thread(target=post) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    kernel.run(wait)
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+
+    return total / elapsed, num_writes
+
+
+@kernels.with_kernel
+def main(argv):
+    if len(argv) < 3:
+        print(
+            'usage: %s num_threads num_callbacks' % argv[0],
+            file=sys.stderr,
+        )
+        return 1
+    kernel = kernels.get_kernel()
+    rate, num_writes = bench(kernel, int(argv[1]), int(argv[2]))
+    print(
+        '%s: %.0f callbacks per second, %d nudge syscalls' %
+        (type(kernel._nudger).__name__, rate, num_writes)
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,105 @@
+"""Benchmark task switches through ``locks.Event`` and ``queues.Queue``.
+
+It spawns pairs of tasks that ping-pong with each other, and reports
+the number of task switches per second.
+"""
+
+import contextvars
+import sys
+import time
+
+from g1.asyncs.bases import locks
+from g1.asyncs.bases import queues
+from g1.asyncs.bases import tasks
+from g1.asyncs.kernels import contexts
+from g1.asyncs.kernels import kernels
+
+
+async def event_ping(ping, pong, num_rounds):
+    for _ in range(num_rounds):
+        ping.set()
+        await pong.wait()
+        pong.clear()
+
+
+async def event_pong(ping, pong, num_rounds):
+    for _ in range(num_rounds):
+        await ping.wait()
+        ping.clear()
+        pong.set()
+
+
+def make_event_pair(num_rounds):
+    ping = locks.Event()
+    pong = locks.Event()
+    return (
+        event_ping(ping, pong, num_rounds),
+        event_pong(ping, pong, num_rounds),
+    )
+
+
+async def queue_ping(ping, pong, num_rounds):
+    for i in range(num_rounds):
+        await ping.put(i)
+        await pong.get()
+
+
+async def queue_pong(ping, pong, num_rounds):
+    for _ in range(num_rounds):
+        await pong.put(await ping.get())
+
+
+def make_queue_pair(num_rounds):
+    ping = queues.Queue()
+    pong = queues.Queue()
+    return (
+        queue_ping(ping, pong, num_rounds),
+        queue_pong(ping, pong, num_rounds),
+    )
+
+
+async def run_pairs(make_pair, num_pairs, num_rounds):
+    async with tasks.CompletionQueue() as queue:
+        for _ in range(num_pairs):
+            for coro in make_pair(num_rounds):
+                queue.spawn(coro)
+        queue.close()
+        async for task in queue:
+            task.get_result_nonblocking()
+
+
+def bench(kernel, make_pair, num_pairs, num_rounds):
+    contexts.set_kernel(kernel)
+    start = time.perf_counter()
+    kernel.run(run_pairs(make_pair, num_pairs, num_rounds))
+    elapsed = time.perf_counter() - start
+    # Each round is two switches (ping to pong and back).
+    return 2 * num_pairs * num_rounds / elapsed
+
+
+def main(argv):
+    if len(argv) < 3:
+        print('usage: %s num_pairs num_rounds' % argv[0], file=sys.stderr)
+        return 1
+    num_pairs = int(argv[1])
+    num_rounds = int(argv[2])
+    for name, make_pair in (
+        ('event', make_event_pair),
+        ('queue', make_queue_pair),
+    ):
+        for sanity_check_frequency in (100, None):
+            with kernels.Kernel(
+                sanity_check_frequency=sanity_check_frequency,
+            ) as kernel:
+                rate = contextvars.copy_context().run(
+                    bench, kernel, make_pair, num_pairs, num_rounds
+                )
+            print(
+                '%s: sanity_check_frequency=%s: %.0f switches per second' %
+                (name, sanity_check_frequency, rate)
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,69 @@
+"""Benchmark arming and cancelling timeouts.
+
+This simulates what ``timeout_after`` does under heavy keep-alive load:
+every operation arms a timeout and then cancels it before it expires.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import timers
+from g1.asyncs.kernels import blockers
+
+
+def bench_blocker(blocker, num_timeouts):
+    tasks = [object() for _ in range(1024)]
+    now = time.monotonic()
+    start = time.perf_counter()
+    for i in range(num_timeouts):
+        task = tasks[i % len(tasks)]
+        blocker.block(now + 60 + i * 1e-6, task)
+        blocker.cancel(task)
+        if i % 64 == 0:
+            blocker.get_min_timeout(now)
+    elapsed = time.perf_counter() - start
+    return num_timeouts / elapsed, len(blocker._queue)
+
+
+async def churn(num_timeouts):
+    for _ in range(num_timeouts):
+        with timers.timeout_after(60):
+            await timers.sleep(0)
+
+
+def bench_kernel(num_timeouts):
+    start = time.perf_counter()
+    kernels.run(churn(num_timeouts))
+    return num_timeouts / (time.perf_counter() - start)
+
+
+@kernels.with_kernel
+def main(argv):
+    if len(argv) < 2:
+        print('usage: %s num_timeouts' % argv[0], file=sys.stderr)
+        return 1
+    num_timeouts = int(argv[1])
+    for blocker_type in (
+        blockers.TimeoutBlocker,
+        blockers.CompactingTimeoutBlocker,
+    ):
+        tracemalloc.start()
+        rate, queue_size = bench_blocker(blocker_type(), num_timeouts)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            '%s: %.0f arm/cancel per second, '
+            'final queue size %d, peak memory %d KiB' %
+            (blocker_type.__name__, rate, queue_size, peak // 1024)
+        )
+    print(
+        'kernel timeout_after: %.0f arm/cancel per second' %
+        bench_kernel(num_timeouts)
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,4 +1,5 @@
 __all__ = [
+    'CompactingTimeoutBlocker',
     'DictBlocker',
     'ForeverBlocker',
     'TaskCompletionBlocker',
@@ -11,6 +12,10 @@ from g1.bases.assertions import ASSERT
 
 from . import tasks
 
+# Bound once since ``block`` is called on every blocking trap.
+_assert_not_in = ASSERT.not_in
+_assert_not_none = ASSERT.not_none
+
 
 class BlockerBase:
     """Abstract blocker interface.
@@ -97,8 +102,8 @@ class DictBlocker(BlockerBase):
         return iter(self._task_to_source)
 
     def block(self, source, task):
-        ASSERT.not_none(source)
-        ASSERT.not_in(task, self._task_to_source)
+        _assert_not_none(source)
+        _assert_not_in(task, self._task_to_source)
         self._task_to_source[task] = source
         # Update reverse look-up table.
         lookup = self._source_to_tasks.get(source)
@@ -186,3 +191,76 @@ class TimeoutBlocker(BlockerBase):
             return self._queue[0].source - now
         else:
             return None
+
+
+class CompactingTimeoutBlocker(BlockerBase):
+    """Timeout blocker that does not accumulate cancelled entries.
+
+    ``TimeoutBlocker.cancel`` leaves the queue item in place until it
+    expires, and so under heavy timer churn (like ``timeout_after``
+    wrapping every socket operation) its queue is mostly garbage.  This
+    blocker clears the item on ``cancel``, drops cancelled items from
+    the top of the queue eagerly, and rebuilds the queue when cancelled
+    items outnumber live ones.  Thus ``cancel`` is amortized O(1), and
+    the queue size is bounded by O(number of live items).
+    """
+
+    Item = TimeoutBlocker.Item
+
+    def __init__(self, *, min_compaction_size=64):
+        self._items = {}
+        self._queue = []
+        self._min_compaction_size = min_compaction_size
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def block(self, source, task):
+        ASSERT.isinstance(source, (int, float))
+        ASSERT.not_in(task, self._items)
+        item = self._items[task] = self.Item(source, task)
+        heapq.heappush(self._queue, item)
+
+    def unblock(self, source):
+        unblocked = []
+        queue = self._queue
+        while queue and queue[0].source <= source:
+            task = heapq.heappop(queue).task
+            if task is not None:
+                unblocked.append(task)
+                self._items.pop(task)
+        return unblocked
+
+    def cancel(self, task):
+        item = self._items.pop(task, None)
+        if item is None:
+            return False
+        # Mark the item as cancelled; it is removed from the queue
+        # either lazily or by compaction.
+        item.task = None
+        num_items = len(self._queue)
+        if (
+            num_items >= self._min_compaction_size
+            and num_items > 2 * len(self._items)
+        ):
+            self._compact()
+        return True
+
+    def _compact(self):
+        self._queue = [item for item in self._queue if item.task is not None]
+        heapq.heapify(self._queue)
+
+    def get_min_timeout(self, now):
+        queue = self._queue
+        while queue and queue[0].task is None:
+            heapq.heappop(queue)
+        if queue:
+            return queue[0].source - now
+        else:
+            return None
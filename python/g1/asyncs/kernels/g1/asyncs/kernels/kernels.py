@@ -26,10 +26,12 @@ from . import traps
 
 LOG = logging.getLogger(__name__)
 
-TaskReady = collections.namedtuple(
-    'TaskReady',
-    'task trap_result trap_exception',
-)
+# ``ASSERT.xxx`` creates a new partial object on every access, which is
+# not cheap in the blocking trap handlers; so bind them here.
+_assert_equal = ASSERT.equal
+_assert_false = ASSERT.false
+_assert_is = ASSERT.is_
+_assert_is_not = ASSERT.is_not
 
 KernelStats = collections.namedtuple(
     'KernelStats',
@@ -53,7 +55,21 @@ KernelStats = collections.namedtuple(
 
 class Kernel:
 
-    def __init__(self, *, owner=None, sanity_check_frequency=100):
+    def __init__(
+        self,
+        *,
+        owner=None,
+        sanity_check_frequency=100,
+        poller=None,
+    ):
+        """Create a kernel.
+
+        Set ``sanity_check_frequency`` to ``None`` to disable the sanity
+        check (which is not cheap for kernels with many tasks).
+
+        ``poller`` defaults to ``pollers.Epoll()``; the kernel takes the
+        ownership of it.
+        """
 
         self._owner = owner or threading.get_ident()
 
@@ -63,13 +79,17 @@ class Kernel:
         self._sanity_check_frequency = sanity_check_frequency
 
         # Tasks are juggled among these collections.
+        #
+        # NOTE: ``_ready_tasks`` holds only tasks; the exception (if
+        # any) that a ready task should raise is stored in ``_to_raise``
+        # so that we do not allocate a tuple on every wakeup.
         self._num_tasks = 0
         self._current_task = None
         self._ready_tasks = collections.deque()
         self._task_completion_blocker = blockers.TaskCompletionBlocker()
         self._read_blocker = blockers.DictBlocker()
         self._write_blocker = blockers.DictBlocker()
-        self._sleep_blocker = blockers.TimeoutBlocker()
+        self._sleep_blocker = blockers.CompactingTimeoutBlocker()
         self._generic_blocker = blockers.DictBlocker()
         self._forever_blocker = blockers.ForeverBlocker()
 
@@ -77,23 +97,30 @@ class Kernel:
 
         # Track tasks that are going to raise at the next trap point
         # due to ``cancel``, ``timeout_after``, etc.  I call them
-        # **disrupter** because they "disrupt" blocking traps.
+        # **disrupter** because they "disrupt" blocking traps.  (Errors
+        # raised by blocking trap handlers are stored here, too.)
         self._to_raise = {}
-        self._timeout_after_blocker = blockers.TimeoutBlocker()
+        self._timeout_after_blocker = blockers.CompactingTimeoutBlocker()
 
-        self._poller = pollers.Epoll()
+        self._poller = poller or pollers.Epoll()
 
         self._callbacks_lock = threading.Lock()
         self._callbacks = collections.deque()
-        self._nudger = Nudger()
+        self._nudger = (
+            EventfdNudger() if EventfdNudger.SUPPORTED else Nudger()
+        )
         self._nudger.register_to(self._poller)
 
-        self._blocking_trap_handlers = {
-            traps.Traps.BLOCK: self._block,
-            traps.Traps.JOIN: self._join,
-            traps.Traps.POLL: self._poll,
-            traps.Traps.SLEEP: self._sleep,
-        }
+        # Indexed by ``traps.Traps`` (which is an ``IntEnum``) so that
+        # we do not have to hash the trap kind on every dispatch.
+        self._blocking_trap_handlers = [None] * (max(traps.Traps) + 1)
+        for kind, handler in (
+            (traps.Traps.BLOCK, self._block),
+            (traps.Traps.JOIN, self._join),
+            (traps.Traps.POLL, self._poll),
+            (traps.Traps.SLEEP, self._sleep),
+        ):
+            self._blocking_trap_handlers[kind] = handler
 
     def get_stats(self):
         """Return internal stats."""
@@ -146,7 +173,7 @@ class Kernel:
 
     def _assert_owner(self):
         """Assert that the calling thread is the owner."""
-        ASSERT.equal(threading.get_ident(), self._owner)
+        _assert_equal(threading.get_ident(), self._owner)
 
     def _is_owner(self):
         return threading.get_ident() == self._owner
@@ -194,7 +221,10 @@ class Kernel:
         while self._num_tasks > 0:
 
             # Do sanity check every ``_sanity_check_frequency`` ticks.
-            if self._num_ticks % self._sanity_check_frequency == 0:
+            if (
+                self._sanity_check_frequency
+                and self._num_ticks % self._sanity_check_frequency == 0
+            ):
                 self._sanity_check()
             self._num_ticks += 1
 
@@ -208,13 +238,11 @@ class Kernel:
 
             # Run all ready tasks.
             with self._managing_async_generators():
-                while self._ready_tasks:
-                    completed_task = self._run_one_ready_task()
-                    if completed_task and completed_task is main_task:
-                        # Return the result eagerly.  If you want to run
-                        # all remaining tasks through completion, just
-                        # call ``run`` again with no arguments.
-                        return completed_task.get_result_nonblocking()
+                if self._run_ready_tasks(main_task):
+                    # Return the result eagerly.  If you want to run all
+                    # remaining tasks through completion, just call
+                    # ``run`` again with no arguments.
+                    return main_task.get_result_nonblocking()
 
             if self._num_tasks > 0:
                 # Poll I/O.
@@ -243,42 +271,52 @@ class Kernel:
             if run_timer.is_expired():
                 raise errors.KernelTimeout
 
-    def _run_one_ready_task(self):
+    def _run_ready_tasks(self, main_task):
+        """Run ready tasks until the ready queue is empty.
 
-        task, trap_result, trap_exception = self._ready_tasks.popleft()
+        Return true if ``main_task`` is completed.
 
-        override = self._to_raise.pop(task, None)
-        if override is not None:
-            trap_result = None
-            trap_exception = override
+        This is the hottest loop of the kernel; so it binds everything
+        to local variables and avoids per-task allocations.
+        """
+        ready_tasks = self._ready_tasks
+        popleft = ready_tasks.popleft
+        append = ready_tasks.append
+        to_raise = self._to_raise
+        handlers = self._blocking_trap_handlers
+        while ready_tasks:
 
-        self._current_task = task
-        try:
-            trap = task.tick(trap_result, trap_exception)
-        finally:
-            self._current_task = None
-
-        if trap is None:
-            ASSERT.true(task.is_completed())
-            self._trap_return(self._task_completion_blocker, task)
-            # Clear disrupter.
-            self._to_raise.pop(task, None)
-            self._timeout_after_blocker.cancel(task)
-            self._num_tasks -= 1
-            return task
-
-        ASSERT.false(task.is_completed())
-        override = self._to_raise.pop(task, None)
-        if override:
-            self._ready_tasks.append(TaskReady(task, None, override))
-        else:
-            handler = self._blocking_trap_handlers[trap.kind]
+            task = popleft()
+            override = to_raise.pop(task, None) if to_raise else None
+
+            self._current_task = task
             try:
-                handler(task, trap)
-            except Exception as exc:
-                self._ready_tasks.append(TaskReady(task, None, exc))
+                trap = task.tick(None, override)
+            finally:
+                self._current_task = None
+
+            if trap is None:
+                self._trap_return(self._task_completion_blocker, task)
+                # Clear disrupter.
+                if to_raise:
+                    to_raise.pop(task, None)
+                self._timeout_after_blocker.cancel(task)
+                self._num_tasks -= 1
+                if task is main_task:
+                    return True
+
+            elif to_raise and task in to_raise:
+                # The task was disrupted while it was running.
+                append(task)
 
-        return None
+            else:
+                try:
+                    handlers[trap.kind](task, trap)
+                except Exception as exc:
+                    to_raise[task] = exc
+                    append(task)
+
+        return False
 
     #
     # Async generator management.
@@ -320,34 +358,34 @@ class Kernel:
     #
 
     def _block(self, task, trap):
-        ASSERT.is_(trap.kind, traps.Traps.BLOCK)
+        _assert_is(trap.kind, traps.Traps.BLOCK)
         self._generic_blocker.block(trap.source, task)
         if trap.post_block_callback:
             trap.post_block_callback()
 
     def _join(self, task, trap):
-        ASSERT.is_(trap.kind, traps.Traps.JOIN)
-        ASSERT.is_(trap.task._kernel, self)
-        ASSERT.is_not(trap.task, task)  # You can't join yourself.
+        _assert_is(trap.kind, traps.Traps.JOIN)
+        _assert_is(trap.task._kernel, self)
+        _assert_is_not(trap.task, task)  # You can't join yourself.
         if trap.task.is_completed():
-            self._ready_tasks.append(TaskReady(task, None, None))
+            self._ready_tasks.append(task)
         else:
             self._task_completion_blocker.block(trap.task, task)
 
     def _poll(self, task, trap):
-        ASSERT.is_(trap.kind, traps.Traps.POLL)
+        _assert_is(trap.kind, traps.Traps.POLL)
         if trap.events is pollers.Polls.READ:
             self._read_blocker.block(trap.fd, task)
         else:
-            ASSERT.is_(trap.events, pollers.Polls.WRITE)
+            _assert_is(trap.events, pollers.Polls.WRITE)
             self._write_blocker.block(trap.fd, task)
 
     def _sleep(self, task, trap):
-        ASSERT.is_(trap.kind, traps.Traps.SLEEP)
+        _assert_is(trap.kind, traps.Traps.SLEEP)
         if trap.duration is None:
             self._forever_blocker.block(None, task)
         elif trap.duration <= 0:
-            self._ready_tasks.append(TaskReady(task, None, None))
+            self._ready_tasks.append(task)
         else:
             self._sleep_blocker.block(time.monotonic() + trap.duration, task)
 
@@ -364,7 +402,7 @@ class Kernel:
         all_tasks = []
         if self._current_task:
             all_tasks.append(self._current_task)
-        all_tasks.extend(task_ready.task for task_ready in self._ready_tasks)
+        all_tasks.extend(self._ready_tasks)
         for task_collection in (
             self._task_completion_blocker,
             self._read_blocker,
@@ -388,7 +426,7 @@ class Kernel:
         else:
             coroutine = awaitable()
         task = tasks.Task(self, coroutine)
-        self._ready_tasks.append(TaskReady(task, None, None))
+        self._ready_tasks.append(task)
         self._num_tasks += 1
         return task
 
@@ -399,7 +437,7 @@ class Kernel:
 
     def unblock(self, source):
         """Unblock tasks blocked by ``source``."""
-        ASSERT.false(self._closed)
+        _assert_false(self._closed)
         self._assert_owner()
         self._trap_return(self._generic_blocker, source)
 
@@ -476,7 +514,7 @@ class Kernel:
             if fd is not None:
                 # We do not have to unregister fd here because we are
                 # using edge-trigger.
-                self._ready_tasks.append(TaskReady(task, None, None))
+                self._ready_tasks.append(task)
                 return
 
         is_unblocked = (
@@ -486,21 +524,28 @@ class Kernel:
             or self._forever_blocker.cancel(task)
         )
         if is_unblocked:
-            self._ready_tasks.append(TaskReady(task, None, None))
+            self._ready_tasks.append(task)
             return
 
     def _trap_return(self, blocker, source):
-        for task in blocker.unblock(source):
-            self._ready_tasks.append(TaskReady(task, None, None))
+        self._ready_tasks.extend(blocker.unblock(source))
 
 
 class Nudger:
+    """Wake up the kernel from another thread.
+
+    Nudges are coalesced: Only the first nudge since the last ``ack``
+    writes to the pipe; subsequent nudges are no-op until the kernel
+    wakes up and acknowledges.  This is safe because the kernel always
+    fires all posted callbacks (and checks closed file descriptors)
+    after ``ack`` and before it polls again.
+    """
 
     def __init__(self):
-        # Or should we use (Linux-specific) eventfd?
         self._r, self._w = os.pipe()
         os.set_blocking(self._r, False)
         os.set_blocking(self._w, False)
+        self._nudged = False
 
     def register_to(self, poller):
         poller.notify_open(self._r)
@@ -508,8 +553,13 @@ class Nudger:
         # is closed when the Kernel is closing.
 
     def nudge(self):
+        # Reading and writing a bool is atomic (under the GIL); at worst
+        # two threads race and both write, which is harmless.
+        if self._nudged:
+            return
+        self._nudged = True
         try:
-            os.write(self._w, b'\x00')
+            self._write()
         except BlockingIOError:
             pass
         except OSError as exc:
@@ -521,17 +571,52 @@ class Nudger:
             else:
                 raise
 
+    def _write(self):
+        os.write(self._w, b'\x00')
+
     def is_nudged(self, fd):
         return self._r == fd
 
     def ack(self):
         try:
-            # Drain the pipe.
-            while os.read(self._r, 4096):
-                pass
+            self._drain()
         except BlockingIOError:
             pass
+        # NOTE: Clear the flag **after** draining; otherwise a nudge in
+        # between would be drained but the flag would stay set, and all
+        # subsequent nudges would be skipped.
+        self._nudged = False
+
+    def _drain(self):
+        while os.read(self._r, 4096):
+            pass
 
     def close(self):
         os.close(self._r)
         os.close(self._w)
+
+
+class EventfdNudger(Nudger):
+    """Nudger implemented by (Linux-specific) eventfd.
+
+    Compared to a pipe, it takes one file descriptor, and ``ack`` takes
+    exactly one ``read`` syscall.
+    """
+
+    SUPPORTED = hasattr(os, 'eventfd')
+
+    def __init__(self):
+        # pylint: disable=super-init-not-called
+        ASSERT.true(self.SUPPORTED)
+        self._r = self._w = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        self._nudged = False
+
+    def _write(self):
+        os.eventfd_write(self._w, 1)
+
+    def _drain(self):
+        # Reading an eventfd resets its counter to zero.
+        os.eventfd_read(self._r)
+
+    def close(self):
+        os.close(self._r)
@@ -14,6 +14,9 @@ from . import traps
 
 LOG = logging.getLogger(__name__)
 
+# Bound once since ``tick`` is called on every task switch.
+_assert_false = ASSERT.false
+
 # Python 3.4 implements PEP 442 for safe ``__del__``.
 ASSERT.greater_or_equal(sys.version_info, (3, 4))
 
@@ -133,7 +136,7 @@ class Task:
         effective, you have to call ``Task.get_result_nonblocking`` in
         the main thread (or implicitly through ``Kernel.run``).
         """
-        ASSERT.false(self._completed)
+        _assert_false(self._completed)
         if trap_exception:
             trap = self._tick(self._coroutine.throw, trap_exception)
         else:
@@ -22,8 +22,12 @@ import types
 from . import pollers
 
 
-class Traps(enum.Enum):
-    """Enumerate blocking traps."""
+class Traps(enum.IntEnum):
+    """Enumerate blocking traps.
+
+    This is an ``IntEnum`` so that the kernel may dispatch traps by
+    indexing into a list.
+    """
     BLOCK = enum.auto()
     JOIN = enum.auto()
     POLL = enum.auto()
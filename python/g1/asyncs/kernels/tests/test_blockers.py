@@ -252,5 +252,100 @@ class TimeoutBlockerTest(unittest.TestCase):
         self.assertIsNone(b.get_min_timeout(0))
 
 
+class CompactingTimeoutBlockerTest(unittest.TestCase):
+
+    def assert_blocker(self, blocker, num_tasks, num_queue_items):
+        self.assertEqual(bool(blocker), num_tasks > 0)
+        self.assertEqual(len(blocker), num_tasks)
+        self.assertEqual(len(blocker._items), num_tasks)
+        self.assertEqual(len(blocker._queue), num_queue_items)
+
+    def test_blocker(self):
+
+        t1 = frozenset([1])
+        t2 = frozenset([2])
+        t3 = frozenset([3])
+        t4 = frozenset([4])
+        t5 = frozenset([5])
+
+        b = blockers.CompactingTimeoutBlocker()
+        self.assert_blocker(b, 0, 0)
+
+        for s, t in [(1, t1), (5, t2), (2, t3), (4, t4), (3, t5)]:
+            b.block(s, t)
+        self.assert_blocker(b, 5, 5)
+
+        with self.assertRaises(AssertionError):
+            b.block(6, t1)
+        self.assert_blocker(b, 5, 5)
+
+        self.assertEqual(b.unblock(0), [])
+        self.assertEqual(b.get_min_timeout(0), 1)
+
+        self.assertEqual(b.unblock(2.5), [t1, t3])
+        self.assert_blocker(b, 3, 3)
+        self.assertEqual(b.get_min_timeout(0), 3)
+
+        self.assertEqual(b.unblock(5), [t5, t4, t2])
+        self.assert_blocker(b, 0, 0)
+        self.assertIsNone(b.get_min_timeout(0))
+
+    def test_cancel(self):
+
+        t1 = frozenset([1])
+        t2 = frozenset([2])
+        t3 = frozenset([3])
+
+        b = blockers.CompactingTimeoutBlocker()
+        for s, t in [(1, t1), (2, t2), (3, t3)]:
+            b.block(s, t)
+        self.assert_blocker(b, 3, 3)
+
+        self.assertTrue(b.cancel(t2))
+        self.assertFalse(b.cancel(t2))
+        self.assert_blocker(b, 2, 3)
+        self.assertEqual(b.get_min_timeout(0), 1)
+
+        self.assertTrue(b.cancel(t1))
+        self.assert_blocker(b, 1, 3)
+        # Cancelled items are dropped from the top of the queue.
+        self.assertEqual(b.get_min_timeout(0), 3)
+        self.assert_blocker(b, 1, 1)
+
+        # A cancelled task may block again.
+        b.block(4, t1)
+        self.assert_blocker(b, 2, 2)
+        self.assertEqual(b.unblock(9), [t3, t1])
+        self.assert_blocker(b, 0, 0)
+
+    def test_compaction(self):
+        b = blockers.CompactingTimeoutBlocker(min_compaction_size=4)
+        ts = [frozenset([i]) for i in range(8)]
+        for i, t in enumerate(ts):
+            b.block(i, t)
+        self.assert_blocker(b, 8, 8)
+
+        for t in ts[:4]:
+            self.assertTrue(b.cancel(t))
+        self.assert_blocker(b, 4, 8)
+        self.assertTrue(b.cancel(ts[4]))
+        self.assert_blocker(b, 3, 3)
+
+        self.assertEqual(b.get_min_timeout(0), 5)
+        self.assertEqual(b.unblock(9), ts[5:])
+        self.assert_blocker(b, 0, 0)
+
+    def test_churn(self):
+        b = blockers.CompactingTimeoutBlocker()
+        t = frozenset([1])
+        for i in range(10000):
+            b.block(i, t)
+            self.assertTrue(b.cancel(t))
+            self.assertLess(len(b._queue), 64)
+        self.assertFalse(b)
+        self.assertIsNone(b.get_min_timeout(0))
+        self.assert_blocker(b, 0, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,7 @@ import unittest
 
 import contextlib
 import os
+import threading
 
 from g1.asyncs.kernels import errors
 from g1.asyncs.kernels import kernels
@@ -63,6 +64,16 @@ class KernelTest(unittest.TestCase):
 
         self.k.run(f)
 
+    def test_sanity_check_disabled(self):
+
+        async def f():
+            await traps.sleep(0)
+            return 42
+
+        with kernels.Kernel(sanity_check_frequency=None) as k:
+            k._sanity_check = None  # Crash if it is ever called.
+            self.assertEqual(k.run(f, timeout=1), 42)
+
     def test_check_closed(self):
         self.k.close()
         for method, args in (
@@ -589,6 +600,71 @@ class NudgerTest(unittest.TestCase):
         poller.close()
         nudger.close()
 
+    def test_coalesce(self):
+        for nudger_type in (
+            kernels.Nudger,
+            kernels.EventfdNudger,
+        ):
+            if not getattr(nudger_type, 'SUPPORTED', True):
+                continue
+            with self.subTest(nudger_type):
+                poller = pollers.Epoll()
+                nudger = nudger_type()
+                nudger.register_to(poller)
+
+                num_writes = 0
+                write = nudger._write
+
+                def counting_write():
+                    nonlocal num_writes
+                    num_writes += 1
+                    write()
+
+                nudger._write = counting_write
+
+                # NOTE: eventfd is also writeable; so we only check the
+                # readable file descriptors.
+                poller.poll(0)
+
+                for _ in range(8):
+                    nudger.nudge()
+                self.assertEqual(num_writes, 1)
+                self.assertEqual(list(poller.poll(0)[0]), [nudger._r])
+
+                nudger.ack()
+                self.assertEqual(list(poller.poll(0)[0]), [])
+
+                nudger.nudge()
+                self.assertEqual(num_writes, 2)
+                self.assertEqual(list(poller.poll(0)[0]), [nudger._r])
+                nudger.ack()
+
+                # Nudging a closed nudger should not raise.
+                nudger.close()
+                nudger.nudge()
+                self.assertEqual(num_writes, 3)
+
+                poller.close()
+
+    @unittest.skipUnless(kernels.EventfdNudger.SUPPORTED, 'need eventfd')
+    def test_eventfd_kernel(self):
+        with kernels.Kernel(sanity_check_frequency=1) as k:
+            self.assertIsInstance(k._nudger, kernels.EventfdNudger)
+            results = []
+            thread = threading.Thread(
+                target=lambda: [k.post_callback(lambda: results.append(i))
+                                for i in range(100)],
+            )
+
+            async def wait():
+                while len(results) < 100:
+                    await traps.sleep(0.01)
+
+            thread.start()
+            k.run(wait, timeout=5)
+            thread.join()
+            self.assertEqual(len(results), 100)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -262,6 +262,87 @@ class EpollTest(TestCaseBase):
         self.assert_poll(epoll.poll(-1), [fd1], [fd1])
 
 
+class BatchingEpollTest(TestCaseBase):
+
+    def assert_poll(self, pair, expect_can_read, expect_can_write):
+        self.assertCountEqual(pair[0], expect_can_read)
+        self.assertCountEqual(pair[1], expect_can_write)
+
+    def make_epoll(self):
+        epoll = pollers.BatchingEpoll()
+        self.exit_stack.callback(epoll.close)
+        return epoll
+
+    def test_socket(self):
+        epoll = self.make_epoll()
+        s0, s1 = self.open_socket()
+        fd0 = s0.fileno()
+        fd1 = s1.fileno()
+        epoll.notify_open(fd0)
+        epoll.notify_open(fd1)
+        self.assertEqual(
+            epoll._changes,
+            {fd0: epoll._REGISTER, fd1: epoll._REGISTER},
+        )
+
+        self.assert_poll(epoll.poll(-1), [], [fd0, fd1])
+        self.assertEqual(epoll._changes, {})
+
+        s1.send(b'hello world')
+        self.assert_poll(epoll.poll(-1), [fd0], [fd0])
+
+        epoll.notify_close(fd0)
+        epoll.notify_close(fd1)
+        self.assertEqual(
+            epoll._changes,
+            {fd0: epoll._UNREGISTER, fd1: epoll._UNREGISTER},
+        )
+        self.assert_poll(epoll.poll(-1), [fd0, fd1], [fd0, fd1])
+        self.assertEqual(epoll._changes, {})
+        self.assert_poll(epoll.poll(-1), [], [])
+
+    def test_cancel_out(self):
+        epoll = self.make_epoll()
+        s0, _ = self.open_socket()
+        fd0 = s0.fileno()
+
+        epoll.notify_open(fd0)
+        epoll.notify_close(fd0)
+        self.assertEqual(epoll._changes, {})
+        # Closed file descriptors are still reported.
+        self.assert_poll(epoll.poll(-1), [fd0], [fd0])
+        with self.assertRaises(FileNotFoundError):
+            epoll._epoll.unregister(fd0)
+
+    def test_reregister(self):
+        epoll = self.make_epoll()
+        s0, s1 = self.open_socket()
+        fd0 = s0.fileno()
+
+        epoll.notify_open(fd0)
+        self.assert_poll(epoll.poll(-1), [], [fd0])
+
+        epoll.notify_close(fd0)
+        epoll.notify_open(fd0)
+        self.assertEqual(epoll._changes, {fd0: epoll._REREGISTER})
+        self.assert_poll(epoll.poll(-1), [fd0], [fd0])
+        self.assertEqual(epoll._changes, {})
+        self.assert_poll(epoll.poll(-1), [], [fd0])
+
+        s1.send(b'hello world')
+        self.assert_poll(epoll.poll(-1), [fd0], [fd0])
+
+    def test_file(self):
+        epoll = self.make_epoll()
+        r, w = self.open_file()
+        # Unlike ``Epoll``, errors are deferred to ``poll``, which
+        # reports the file descriptors as ready.
+        epoll.notify_open(r)
+        epoll.notify_open(w)
+        self.assert_poll(epoll.poll(-1), [r, w], [r, w])
+        self.assert_poll(epoll.poll(-1), [], [])
+
+
 class SelectEpollTest(TestCaseBase):
     """Ensure that our assumptions about ``select.epoll`` is correct."""
 
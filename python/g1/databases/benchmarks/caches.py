@@ -0,0 +1,73 @@
+"""Benchmark cache operations.
+
+It fills a cache with entries, and then reads random entries, and
+reports the number of operations per second for ``Cache`` with and
+without the recency buffer and the hot tier.
+"""
+
+import random
+import sys
+import time
+
+from g1.databases import caches
+
+
+def bench(func, num_ops):
+    start = time.perf_counter()
+    func()
+    return num_ops / (time.perf_counter() - start)
+
+
+def main(argv):
+    num_entries = int(argv[1]) if len(argv) > 1 else 4096
+    value_size = int(argv[2]) if len(argv) > 2 else 1024
+    num_reads = int(argv[3]) if len(argv) > 3 else 16384
+    batch_size = 64
+    keys = ['%d' % i for i in range(num_entries)]
+    value = b'x' * value_size
+    rng = random.Random(0)
+    read_keys = [rng.choice(keys[:num_entries // 8]) for _ in range(num_reads)]
+    for name, kwargs in [
+        ('default', {}),
+        ('buffered', {'recency_buffer_size': 1024}),
+        ('buffered+hot', {
+            'recency_buffer_size': 1024,
+            'hot_capacity': num_entries // 4,
+        }),
+    ]:
+        cache = caches.Cache(num_entries * 2, **kwargs)
+
+        def set_all(cache=cache):
+            for key in keys:
+                cache.set(key, value)
+
+        def set_many_all(cache=cache):
+            for i in range(0, num_entries, batch_size):
+                cache.set_many(
+                    (key, value) for key in keys[i:i + batch_size]
+                )
+
+        def get_all(cache=cache):
+            for key in read_keys:
+                if cache.get(key) is None:
+                    raise AssertionError('expect cache hit')
+
+        def get_many_all(cache=cache):
+            for i in range(0, num_reads, batch_size):
+                cache.get_many(read_keys[i:i + batch_size])
+
+        for op, func, num_ops in [
+            ('set', set_all, num_entries),
+            ('set_many', set_many_all, num_entries),
+            ('get', get_all, num_reads),
+            ('get_many', get_many_all, num_reads),
+        ]:
+            print(
+                '%s: %s: %.0f ops per second' %
+                (name, op, bench(func, num_ops))
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -14,10 +14,12 @@ from sqlalchemy import (
     MetaData,
     String,
     Table,
+    bindparam,
     func,
     select,
 )
 
+from g1.bases import collections as g1_collections
 from g1.bases import timers
 from g1.bases import times
 from g1.bases.assertions import ASSERT
@@ -56,7 +58,21 @@ class Cache:
     To record used-at time, it writes time.monotonic_ns to a database,
     whose reference point is undefined.  This is safe as long as the
     database is temporary.  Therefore when you provide a database to a
-    cache, you must make sure that database is temporary.
+    cache, you must make sure that database is temporary.  Also, the
+    cache keeps the row count in memory; so the database table must not
+    be modified by others.
+
+    For read-heavy workloads, there are two optional features:
+
+    * If ``recency_buffer_size`` is positive, used-at time of cache hits
+      is buffered in memory, and is written to the database in batches
+      (or when ``flush`` is called, or before an eviction).
+
+    * If ``hot_capacity`` is positive, an in-process LRU table of that
+      many entries is put in front of the database.  Hits of the hot
+      table update used-at time only through the recency buffer; so
+      without the buffer, they do not write to the database at all
+      (and hot entries age in the database as if they were not used).
     """
 
     @dataclasses.dataclass(frozen=True)
@@ -74,6 +90,8 @@ class Cache:
         metadata=None,
         post_eviction_size=None,
         expire_after_write=None,
+        recency_buffer_size=0,
+        hot_capacity=0,
     ):
         self._lock = threading.Lock()
 
@@ -104,17 +122,37 @@ class Cache:
             metadata = MetaData()
         self._table = make_table(metadata)
 
+        self._recency_buffer_size = ASSERT.greater_or_equal(
+            recency_buffer_size, 0
+        )
+        # Map keys to used-at time not yet written to the database.
+        self._recency_buffer = {}
+        self._update_used_at = (
+            self._table.update()\
+            .where(self._table.c.key == bindparam('_key'))
+            .values(used_at=bindparam('_used_at'))
+        )
+
+        # Map keys to (value, written_at) pairs.
+        self._hot = (
+            g1_collections.LruCache(hot_capacity) if hot_capacity > 0 else
+            None
+        )
+
         self._num_hits = 0
         self._num_misses = 0
 
         # Or should we move this out of __init__?
         metadata.create_all(self._engine)
 
+        with self._engine.begin() as conn:
+            self._size = self._count_rows(conn)
+
     def get_size(self):
-        with self._lock, self._engine.begin() as conn:
-            return self._get_size_require_lock_by_caller(conn)
+        with self._lock:
+            return self._size
 
-    def _get_size_require_lock_by_caller(self, conn):
+    def _count_rows(self, conn):
         return (
             conn.execute(select([func.count()]).select_from(self._table))\
             .scalar_one()
@@ -127,13 +165,49 @@ class Cache:
             num_misses=self._num_misses,
         )
 
+    def flush(self):
+        """Write buffered used-at time to the database."""
+        with self._lock, self._engine.begin() as conn:
+            self._flush_require_lock_by_caller(conn)
+
+    def _flush_require_lock_by_caller(self, conn):
+        if not self._recency_buffer:
+            return
+        conn.execute(
+            self._update_used_at,
+            [
+                {'_key': key, '_used_at': used_at}
+                for key, used_at in self._recency_buffer.items()
+            ],
+        )
+        self._recency_buffer.clear()
+
+    def _touch_require_lock_by_caller(self, conn, key, now):
+        if self._recency_buffer_size == 0:
+            # Hot hits (where conn is None) are not tracked.
+            if conn is not None:
+                conn.execute(
+                    self._update_used_at,
+                    {'_key': key, '_used_at': now},
+                )
+            return
+        self._recency_buffer[key] = now
+        if len(self._recency_buffer) > self._recency_buffer_size:
+            if conn is None:
+                with self._engine.begin() as conn:
+                    self._flush_require_lock_by_caller(conn)
+            else:
+                self._flush_require_lock_by_caller(conn)
+
     def evict(self):
         with self._lock, self._engine.begin() as conn:
             return self._evict_require_lock_by_caller(conn, None)
 
-    def _evict_require_lock_by_caller(self, conn, keys):
+    def _evict_require_lock_by_caller(self, conn, keep_used_at):
         with timers.measuring_duration() as get_duration:
-            num_evicted = self._do_evict_require_lock_by_caller(conn, keys)
+            num_evicted = self._do_evict_require_lock_by_caller(
+                conn, keep_used_at
+            )
         LOG.info(
             'evict %d entries in %f seconds',
             num_evicted,
@@ -141,7 +215,15 @@ class Cache:
         )
         return num_evicted
 
-    def _do_evict_require_lock_by_caller(self, conn, keys):
+    def _do_evict_require_lock_by_caller(self, conn, keep_used_at):
+        """Evict least recently used rows.
+
+        Rows used at or after ``keep_used_at`` (if not None) are not
+        evicted; this is cheaper than excluding rows by keys, which
+        could result in an arbitrarily long ``NOT IN`` list.
+        """
+        # Eviction is based on used-at time; so write them first.
+        self._flush_require_lock_by_caller(conn)
         # SQLite supports non-standard LIMIT and ORDER BY clause in a
         # DELETE statement, but SQLAlchemy does not.  So here we might
         # "over evict" rows if time.monotonic_ns is not strictly
@@ -155,10 +237,10 @@ class Cache:
         ).scalar()
         if used_at is None:
             return 0
-        stmt = self._table.delete().where(self._table.c.used_at <= used_at)
-        if keys is not None:
-            stmt = stmt.where(self._table.c.key.not_in(keys))
-        return conn.execute(stmt).rowcount
+        condition = self._table.c.used_at <= used_at
+        if keep_used_at is not None:
+            condition = condition & (self._table.c.used_at < keep_used_at)
+        return self._delete_require_lock_by_caller(conn, condition)
 
     def _expire_require_lock_by_caller(self, conn, now):
         with timers.measuring_duration() as get_duration:
@@ -171,60 +253,163 @@ class Cache:
         return num_expired
 
     def _do_expire_require_lock_by_caller(self, conn, now):
-        return conn.execute(
-            self._table.delete().where(\
-                self._table.c.written_at <=
-                now - ASSERT.not_none(self._expire_after_write)
-            )
-        ).rowcount
+        return self._delete_require_lock_by_caller(
+            conn,
+            self._table.c.written_at <=
+            now - ASSERT.not_none(self._expire_after_write),
+        )
 
-    def get(self, key: str, default=None):
-        with self._lock, self._engine.begin() as conn:
-            row = conn.execute(
-                select([self._table.c.value, self._table.c.written_at])\
-                .where(self._table.c.key == key)
-            ).one_or_none()
-            if row is None:
-                self._num_misses += 1
-                return default
-            value, written_at = row
-            now = time.monotonic_ns()
-            if (
-                self._expire_after_write is not None
-                and written_at + self._expire_after_write <= now
+    def _delete_require_lock_by_caller(self, conn, condition):
+        if self._hot:
+            for (key, ) in conn.execute(
+                select([self._table.c.key]).where(condition)
             ):
-                self._expire_require_lock_by_caller(conn, now)
-                self._num_misses += 1
-                return default
-            conn.execute(
-                self._table.update()\
-                .where(self._table.c.key == key)
-                .values(used_at=now)
-            )
-            self._num_hits += 1
-            return value
+                self._hot.pop(key, None)
+        num_deleted = conn.execute(self._table.delete().where(condition))\
+            .rowcount
+        self._size -= num_deleted
+        return num_deleted
+
+    def _is_expired(self, written_at, now):
+        return (
+            self._expire_after_write is not None
+            and written_at + self._expire_after_write <= now
+        )
+
+    def _get_hot_require_lock_by_caller(self, key):
+        if self._hot is None:
+            return None
+        entry = self._hot.get(key)
+        if entry is None:
+            return None
+        value, written_at = entry
+        now = time.monotonic_ns()
+        if self._is_expired(written_at, now):
+            # Let the caller look up the database, where the expired
+            # entries will be deleted.
+            return None
+        return value, now
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            hot = self._get_hot_require_lock_by_caller(key)
+            if hot is not None:
+                value, now = hot
+                self._touch_require_lock_by_caller(None, key, now)
+                self._num_hits += 1
+                return value
+            with self._engine.begin() as conn:
+                row = conn.execute(
+                    select([self._table.c.value, self._table.c.written_at])\
+                    .where(self._table.c.key == key)
+                ).one_or_none()
+                if row is None:
+                    self._num_misses += 1
+                    return default
+                value, written_at = row
+                now = time.monotonic_ns()
+                if self._is_expired(written_at, now):
+                    self._expire_require_lock_by_caller(conn, now)
+                    self._num_misses += 1
+                    return default
+                self._touch_require_lock_by_caller(conn, key, now)
+                if self._hot is not None:
+                    self._hot[key] = (value, written_at)
+                self._num_hits += 1
+                return value
+
+    def get_many(self, keys):
+        """Get entries in one transaction.
+
+        This returns a dict of entries that are found.
+        """
+        with self._lock:
+            results = {}
+            db_keys = []
+            for key in dict.fromkeys(keys):
+                hot = self._get_hot_require_lock_by_caller(key)
+                if hot is None:
+                    db_keys.append(key)
+                    continue
+                results[key], now = hot
+                self._touch_require_lock_by_caller(None, key, now)
+                self._num_hits += 1
+            if not db_keys:
+                return results
+            with self._engine.begin() as conn:
+                rows = []
+                for chunk in _chunk(db_keys):
+                    rows.extend(
+                        conn.execute(
+                            select([
+                                self._table.c.key,
+                                self._table.c.value,
+                                self._table.c.written_at,
+                            ])\
+                            .where(self._table.c.key.in_(chunk))
+                        )
+                    )
+                now = time.monotonic_ns()
+                has_expired = False
+                self._num_misses += len(db_keys) - len(rows)
+                for key, value, written_at in rows:
+                    if self._is_expired(written_at, now):
+                        has_expired = True
+                        self._num_misses += 1
+                        continue
+                    results[key] = value
+                    self._touch_require_lock_by_caller(conn, key, now)
+                    if self._hot is not None:
+                        self._hot[key] = (value, written_at)
+                    self._num_hits += 1
+                if has_expired:
+                    self._expire_require_lock_by_caller(conn, now)
+            return results
 
     def set(self, key: str, value: bytes):
-        with self._lock, self._engine.begin() as conn:
-            self._set_require_lock_by_caller(
-                conn, key, value, time.monotonic_ns()
-            )
-            if self._get_size_require_lock_by_caller(conn) > self._capacity:
-                self._evict_require_lock_by_caller(conn, [key])
+        self.set_many(((key, value), ))
 
-    def _set_require_lock_by_caller(self, conn, key, value, now):
-        conn.execute(
-            sqlite.upsert(self._table)\
-            .values(
-                key=key,
-                value=value,
-                used_at=now,
-                written_at=now,
+    def set_many(self, items):
+        """Set entries in one transaction."""
+        items = dict(items)
+        if not items:
+            return
+        with self._lock, self._engine.begin() as conn:
+            now = time.monotonic_ns()
+            keys = list(items)
+            num_existing = 0
+            for chunk in _chunk(keys):
+                num_existing += conn.execute(
+                    select([func.count()])\
+                    .select_from(self._table)
+                    .where(self._table.c.key.in_(chunk))
+                ).scalar_one()
+            conn.execute(
+                sqlite.upsert(self._table),
+                [
+                    {
+                        'key': key,
+                        'value': value,
+                        'used_at': now,
+                        'written_at': now,
+                    } for key, value in items.items()
+                ],
             )
-        )
+            self._size += len(keys) - num_existing
+            for key, value in items.items():
+                # Buffered used-at time is older than now.
+                self._recency_buffer.pop(key, None)
+                if self._hot is not None:
+                    self._hot[key] = (value, now)
+            if self._size > self._capacity:
+                # Do not evict the rows that we have just written.
+                self._evict_require_lock_by_caller(conn, now)
 
     def pop(self, key: str, default=_SENTINEL):
         with self._lock, self._engine.begin() as conn:
+            self._recency_buffer.pop(key, None)
+            if self._hot is not None:
+                self._hot.pop(key, None)
             value = conn.execute(
                 select([self._table.c.value])\
                 .where(self._table.c.key == key)
@@ -237,22 +422,26 @@ class Cache:
                 self._table.delete()\
                 .where(self._table.c.key == key)
             )
+            self._size -= 1
             return value
 
     def update(self, iterable=None, /, **kwargs):
-        with self._lock, self._engine.begin() as conn:
-            if iterable is not None:
-                iterkeys = getattr(iterable, 'keys', None)
-                if iterkeys is not None:
-                    items = ((key, iterable[key]) for key in iterkeys())
-                else:
-                    items = iterable
+        if iterable is not None:
+            iterkeys = getattr(iterable, 'keys', None)
+            if iterkeys is not None:
+                items = ((key, iterable[key]) for key in iterkeys())
             else:
-                items = kwargs.items()
-            keys = []
-            now = time.monotonic_ns()
-            for key, value in items:
-                self._set_require_lock_by_caller(conn, key, value, now)
-                keys.append(key)
-            if self._get_size_require_lock_by_caller(conn) > self._capacity:
-                self._evict_require_lock_by_caller(conn, keys)
+                items = iterable
+        else:
+            items = kwargs.items()
+        self.set_many(items)
+
+
+# SQLite limits the number of host parameters of a statement (999 in
+# older versions).
+_CHUNK_SIZE = 512
+
+
+def _chunk(keys):
+    for i in range(0, len(keys), _CHUNK_SIZE):
+        yield keys[i:i + _CHUNK_SIZE]
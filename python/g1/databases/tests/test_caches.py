@@ -227,6 +227,157 @@ class CacheTest(unittest.TestCase):
         self.assert_rows(cache, [('2', b'2', 1001, 1001)])
         self.assert_stats(cache, 8, 1)
 
+    @unittest.mock.patch.object(caches, 'time')
+    def test_many(self, mock_time):
+        mock_time.monotonic_ns.side_effect = itertools.count(1000)
+
+        cache = caches.Cache(10, post_eviction_size=8)
+        cache.set_many([('0', b'0'), ('1', b'1'), ('0', b'x')])
+        self.assert_rows(
+            cache,
+            [('0', b'x', 1000, 1000), ('1', b'1', 1000, 1000)],
+        )
+        self.assertEqual(cache.get_size(), 2)
+
+        self.assertEqual(
+            cache.get_many(['0', '2', '1', '0']),
+            {'0': b'x', '1': b'1'},
+        )
+        self.assert_rows(
+            cache,
+            [('0', b'x', 1001, 1000), ('1', b'1', 1001, 1000)],
+        )
+        self.assert_stats(cache, 2, 1)
+        self.assertEqual(cache.get_many([]), {})
+
+        cache.set_many([])
+        # The newly set rows are not evicted.
+        cache.set_many({'%d' % i: b'%d' % i for i in range(1, 12)})
+        self.assertEqual(cache.get_size(), 11)
+        self.assert_rows(
+            cache,
+            [('%d' % i, b'%d' % i, 1002, 1002) for i in range(1, 12)],
+        )
+
+    def test_get_many_chunked(self):
+        cache = caches.Cache(4096)
+        items = {'%d' % i: b'%d' % i for i in range(caches._CHUNK_SIZE * 2 + 1)}
+        cache.set_many(items)
+        self.assertEqual(cache.get_size(), len(items))
+        self.assertEqual(cache.get_many(items), items)
+        cache.set_many(items)
+        self.assertEqual(cache.get_size(), len(items))
+
+    def test_size(self):
+        engine = caches.create_engine()
+        cache = caches.Cache(10, engine=engine)
+        cache.update([('0', b'0'), ('1', b'1')])
+        self.assertEqual(caches.Cache(10, engine=engine).get_size(), 2)
+
+    @unittest.mock.patch.object(caches, 'time')
+    def test_recency_buffer(self, mock_time):
+        mock_time.monotonic_ns.side_effect = itertools.count(1000)
+
+        cache = caches.Cache(10, post_eviction_size=1, recency_buffer_size=2)
+        cache.update([('0', b'0'), ('1', b'1'), ('2', b'2')])
+        self.assertEqual(cache.get('0'), b'0')
+        self.assertEqual(cache.get('1'), b'1')
+        self.assert_rows(
+            cache,
+            [('%d' % i, b'%d' % i, 1000, 1000) for i in range(3)],
+        )
+
+        # The buffer is flushed when it is full.
+        self.assertEqual(cache.get('0'), b'0')
+        self.assertEqual(cache.get('2'), b'2')
+        self.assert_rows(
+            cache,
+            [
+                ('0', b'0', 1003, 1000),
+                ('1', b'1', 1002, 1000),
+                ('2', b'2', 1004, 1000),
+            ],
+        )
+
+        # Buffered used-at time of a set or popped entry is discarded.
+        self.assertEqual(cache.get('0'), b'0')
+        self.assertEqual(cache.get('1'), b'1')
+        cache.set('0', b'x')
+        self.assertEqual(cache.pop('1'), b'1')
+        cache.flush()
+        self.assert_rows(
+            cache,
+            [('2', b'2', 1004, 1000), ('0', b'x', 1007, 1007)],
+        )
+
+        # The buffer is flushed before an eviction.
+        self.assertEqual(cache.get('2'), b'2')
+        self.assertEqual(cache.evict(), 1)
+        self.assert_rows(cache, [('2', b'2', 1008, 1000)])
+
+    @unittest.mock.patch.object(caches, 'time')
+    def test_hot(self, mock_time):
+        mock_time.monotonic_ns.side_effect = itertools.count(1000)
+
+        cache = caches.Cache(
+            10,
+            post_eviction_size=0,
+            expire_after_write=1e-8,
+            hot_capacity=1,
+        )
+        cache.update([('0', b'0'), ('1', b'1')])
+        self.assertEqual(cache.get('0'), b'0')
+        self.assertEqual(list(cache._hot), ['0'])
+        self.assertEqual(cache.get_many(['0', '1']), {'0': b'0', '1': b'1'})
+        self.assertEqual(list(cache._hot), ['1'])
+        self.assert_stats(cache, 3, 0)
+
+        # Hot entries are still subject to expiration.
+        mock_time.monotonic_ns.side_effect = itertools.count(1010)
+        self.assertIsNone(cache.get('1'))
+        self.assert_stats(cache, 3, 1)
+        self.assertEqual(list(cache._hot), [])
+        self.assert_rows(cache, [])
+
+        cache.set('2', b'2')
+        self.assertEqual(list(cache._hot), ['2'])
+        self.assertEqual(cache.pop('2'), b'2')
+        self.assertEqual(list(cache._hot), [])
+        self.assertIsNone(cache.get('2'))
+
+        cache.set('3', b'3')
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(list(cache._hot), [])
+
+    @unittest.mock.patch.object(caches, 'time')
+    def test_hot_without_recency_buffer(self, mock_time):
+        mock_time.monotonic_ns.side_effect = itertools.count(1000)
+        cache = caches.Cache(10, hot_capacity=1)
+        cache.update([('0', b'0'), ('1', b'1')])
+        cache._hot.pop('1')
+        # A database hit updates used-at time directly.
+        self.assertEqual(cache.get('1'), b'1')
+        self.assert_rows(
+            cache,
+            [('0', b'0', 1000, 1000), ('1', b'1', 1001, 1000)],
+        )
+        # A hot hit does not write to the database.
+        self.assertEqual(cache.get('1'), b'1')
+        self.assertEqual(cache.get('1'), b'1')
+        self.assertEqual(cache._recency_buffer, {})
+        self.assert_rows(
+            cache,
+            [('0', b'0', 1000, 1000), ('1', b'1', 1001, 1000)],
+        )
+
+    def test_evict_many_new_rows(self):
+        cache = caches.Cache(10, post_eviction_size=8)
+        cache.update([('%d' % i, b'x') for i in range(5)])
+        # The newly added rows are not evicted, no matter how many.
+        cache.update([('new-%d' % i, b'x') for i in range(4000)])
+        self.assertEqual(cache.get_size(), 4000)
+        self.assertIsNone(cache.get('0'))
+        self.assertEqual(cache.get('new-0'), b'x')
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,64 @@
+"""Benchmark concurrent cache reads.
+
+It fills a cache with entries, and then reads random entries from a
+growing number of threads, and reports the number of reads per second
+for ``Cache`` and ``ShardedCache``.
+"""
+
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from g1.files import caches
+
+
+def read_entries(cache, keys, num_reads):
+    rng = random.Random(id(keys))
+    for _ in range(num_reads):
+        if cache.get(rng.choice(keys)) is None:
+            raise AssertionError('expect cache hit')
+
+
+def bench(cache, keys, num_threads, num_reads):
+    threads = [
+        threading.Thread(
+            target=read_entries,
+            args=(cache, keys, num_reads),
+        ) for _ in range(num_threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return num_threads * num_reads / (time.perf_counter() - start)
+
+
+def main(argv):
+    num_entries = int(argv[1]) if len(argv) > 1 else 4096
+    value_size = int(argv[2]) if len(argv) > 2 else 16384
+    num_reads = int(argv[3]) if len(argv) > 3 else 4096
+    keys = [b'%d' % i for i in range(num_entries)]
+    value = b'x' * value_size
+    for cache_type, capacity in [
+        (caches.Cache, num_entries),
+        (caches.ShardedCache, num_entries * value_size),
+    ]:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = cache_type(Path(temp_dir), capacity)
+            for key in keys:
+                cache.set(key, value)
+            for num_threads in (1, 2, 4, 8, 16):
+                rate = bench(cache, keys, num_threads, num_reads)
+                print(
+                    '%s: num_threads=%d: %.0f reads per second' %
+                    (cache_type.__name__, num_threads, rate)
+                )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
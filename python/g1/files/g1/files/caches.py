@@ -1,13 +1,16 @@
 __all__ = [
     'Cache',
     'NULL_CACHE',
+    'ShardedCache',
 ]
 
 import collections
 import contextlib
 import dataclasses
 import hashlib
+import heapq
 import io
+import itertools
 import logging
 import os
 import random
@@ -27,6 +30,11 @@ LOG = logging.getLogger(__name__)
 # By default we keep 80% of entries post eviction.
 POST_EVICTION_SIZE_RATIO = 0.8
 
+# By default we checkpoint the index every this many accesses.
+CHECKPOINT_INTERVAL = 4096
+
+INDEX_NAME = '.index'
+
 
 class CacheInterface:
 
@@ -129,6 +137,10 @@ class Cache(CacheInterface):
     hexadecimal digits as the directory name, and the rest as the file
     name.  This two-level structure should prevent any directory grown
     too big.
+
+    If ``persist_index`` is true, the access log is checkpointed to an
+    index file in the cache directory (see ``save_index``), and is
+    loaded at startup so that recency survives restarts.
     """
 
     @staticmethod
@@ -145,6 +157,8 @@ class Cache(CacheInterface):
         *,
         post_eviction_size=None,
         executor=None,  # Use this to evict in the background.
+        persist_index=False,
+        checkpoint_interval=CHECKPOINT_INTERVAL,
     ):
         self._lock = threading.Lock()
 
@@ -164,10 +178,15 @@ class Cache(CacheInterface):
 
         self._executor = executor
 
-        # By the way, if cache cold start is an issue, we could store
-        # and load this table from a file.
         self._access_log = collections.OrderedDict()
 
+        self._persist_index = persist_index
+        self._checkpoint_interval = ASSERT.greater(checkpoint_interval, 0)
+        self._num_unsaved_accesses = 0
+        # This lock serializes index writes, which are done outside the
+        # cache lock.
+        self._index_lock = threading.Lock()
+
         # getting_path may "lease" paths to the user, and we should not
         # evict these paths.
         self._active_paths = g1_collections.Multiset()
@@ -176,7 +195,9 @@ class Cache(CacheInterface):
         self._num_misses = 0
 
         # It's safe to call these methods after this point.
-        self._eviction_countdown = self._estimate_eviction_countdown()
+        _remove_index_tmp_files(self._cache_dir_path)
+        if not (persist_index and self._load_index()):
+            self._eviction_countdown = self._estimate_eviction_countdown()
         self._maybe_evict()
 
     def get_stats(self):
@@ -185,11 +206,60 @@ class Cache(CacheInterface):
             num_misses=self._num_misses,
         )
 
+    def _load_index(self):
+        records = _load_index(self._cache_dir_path, type(self).__name__)
+        if records is None:
+            return False
+        relpaths = set(_list_files(self._cache_dir_path))
+        # Records are ordered from the least recently used.
+        for relpath, count in records:
+            if relpath in relpaths:
+                path = self._cache_dir_path / relpath
+                self._access_log[path] = count
+                self._access_log.move_to_end(path, last=False)
+        self._eviction_countdown = self._capacity - len(relpaths)
+        return True
+
+    def save_index(self):
+        """Checkpoint the access log to the index file."""
+        self._checkpoint_index(True)
+
+    def _maybe_save_index(self):
+        # Check without the lock first since this is on the hot path.
+        if (
+            self._persist_index
+            and self._num_unsaved_accesses >= self._checkpoint_interval
+        ):
+            self._checkpoint_index(False)
+
+    def _checkpoint_index(self, force):
+        with self._index_lock:
+            # Snapshot the access log under the lock, but serialize and
+            # write it outside the lock.
+            with self._lock:
+                if (
+                    not force
+                    and self._num_unsaved_accesses < self._checkpoint_interval
+                ):
+                    return
+                snapshot = list(self._access_log.items())
+                self._num_unsaved_accesses = 0
+            _save_index(
+                self._cache_dir_path,
+                type(self).__name__,
+                (
+                    (_to_relpath(self._cache_dir_path, path), count)
+                    for path, count in reversed(snapshot)
+                ),
+            )
+
     def _log_access(self, path):
         # Although this is a LRU cache, let's keep access counts, which
         # could be useful in understanding cache performance.
         self._access_log[path] = self._access_log.get(path, 0) + 1
         self._access_log.move_to_end(path, last=False)
+        if self._persist_index:
+            self._num_unsaved_accesses += 1
 
     def _make_get_recency(self):
         recency_table = dict((p, r) for r, p in enumerate(self._access_log))
@@ -205,6 +275,11 @@ class Cache(CacheInterface):
         return len(dir_paths) * _count_files(random.choice(dir_paths))
 
     def _estimate_eviction_countdown(self):
+        if self._persist_index:
+            # Listing (without stat-ing) files is cheap enough.
+            return self._capacity - sum(
+                1 for _ in _list_files(self._cache_dir_path)
+            )
         # Just a guess of how far away we are from the next eviction.
         return self._capacity - self.estimate_size()
 
@@ -218,10 +293,13 @@ class Cache(CacheInterface):
         with self._lock:
             if self._should_evict():
                 self._evict_require_lock_by_caller()
+        self._maybe_save_index()
 
     def evict(self):
         with self._lock:
-            return self._evict_require_lock_by_caller()
+            num_evicted = self._evict_require_lock_by_caller()
+        self._maybe_save_index()
+        return num_evicted
 
     def _evict_require_lock_by_caller(self):
         stopwatch = timers.Stopwatch()
@@ -234,6 +312,10 @@ class Cache(CacheInterface):
             stopwatch.get_duration(),
             self._cache_dir_path,
         )
+        if self._persist_index:
+            # Request a checkpoint, which the caller makes after it
+            # releases the lock.
+            self._num_unsaved_accesses = self._checkpoint_interval
         return num_evicted
 
     def _evict(self):
@@ -273,9 +355,11 @@ class Cache(CacheInterface):
 
     def get(self, key, default=None):
         with self._lock:
-            return self._get_require_lock_by_caller(
+            value = self._get_require_lock_by_caller(
                 key, default, Path.read_bytes
             )
+        self._maybe_save_index()
+        return value
 
     def get_file(self, key, default=None):
         """Get cache entry as a pair of file object and it size.
@@ -285,11 +369,13 @@ class Cache(CacheInterface):
         the file system when the file is closed.
         """
         with self._lock:
-            return self._get_require_lock_by_caller(
+            value = self._get_require_lock_by_caller(
                 key,
                 default,
                 lambda path: (path.open('rb'), path.stat().st_size),
             )
+        self._maybe_save_index()
+        return value
 
     @contextlib.contextmanager
     def getting_path(self, key, default=None):
@@ -299,6 +385,7 @@ class Cache(CacheInterface):
             )
             if path is not default:
                 self._active_paths.add(path)
+        self._maybe_save_index()
         try:
             yield path
         finally:
@@ -318,9 +405,10 @@ class Cache(CacheInterface):
 
     def set(self, key, value):
         with self._lock:
-            return self._set_require_lock_by_caller(
+            self._set_require_lock_by_caller(
                 key, lambda path: path.write_bytes(value)
             )
+        self._maybe_save_index()
 
     @contextlib.contextmanager
     def setting_file(self, key):
@@ -347,6 +435,7 @@ class Cache(CacheInterface):
                     key,
                     lambda path: shutil.move(value_tmp_path, path),
                 )
+            self._maybe_save_index()
         finally:
             value_tmp_path.unlink(missing_ok=True)
 
@@ -381,6 +470,513 @@ class Cache(CacheInterface):
         return value
 
 
+class ShardedCache(CacheInterface):
+    """File-based LRU cache bounded by total bytes.
+
+    This uses the same two-level directory layout as ``Cache``, but its
+    ``capacity`` is a byte budget, and it is designed to be accessed by
+    many threads concurrently:
+
+    * Each top-level directory is a shard with its own lock, and the
+      lock is only held while updating in-memory bookkeeping and doing
+      metadata operations (rename and unlink).  File content is read and
+      written outside the lock.
+
+    * Values are written to a temporary file in the cache directory,
+      and then renamed into place; so readers never see a partially
+      written value.
+
+    * Eviction removes least recently used entries (across shards) one
+      at a time, holding one shard lock at a time.  If you provide an
+      executor, eviction is run in the background.
+
+    If ``persist_index`` is true, recency and sizes of entries are
+    checkpointed to an index file, from which they are loaded at
+    startup without stat-ing every file.
+    """
+
+    def __init__(
+        self,
+        cache_dir_path,
+        capacity,
+        *,
+        post_eviction_size=None,
+        executor=None,  # Use this to evict in the background.
+        persist_index=False,
+        checkpoint_interval=CHECKPOINT_INTERVAL,
+    ):
+        self._cache_dir_path = ASSERT.predicate(cache_dir_path, Path.is_dir)
+
+        self._capacity = ASSERT.greater(capacity, 0)
+        self._post_eviction_size = (
+            post_eviction_size if post_eviction_size is not None else
+            int(self._capacity * POST_EVICTION_SIZE_RATIO)
+        )
+        ASSERT(
+            0 <= self._post_eviction_size <= self._capacity,
+            'expect 0 <= post_eviction_size <= {}, not {}',
+            self._capacity,
+            self._post_eviction_size,
+        )
+
+        self._executor = executor
+
+        self._shards = [
+            _Shard(self._cache_dir_path / ('%02x' % i)) for i in range(256)
+        ]
+        # Access ticks; ``next`` on ``itertools.count`` is thread-safe.
+        self._ticks = itertools.count()
+
+        self._persist_index = persist_index
+        self._checkpoint_interval = ASSERT.greater(checkpoint_interval, 0)
+
+        # This lock protects _num_bytes, _evicting, _saving, and
+        # _next_checkpoint_tick.
+        self._lock = threading.Lock()
+        # This lock serializes index writes, so that an older snapshot
+        # never overwrites a newer one.
+        self._index_lock = threading.Lock()
+        self._num_bytes = 0
+        self._evicting = False
+        self._saving = False
+
+        self._load()
+        self._next_checkpoint_tick = (
+            next(self._ticks) + self._checkpoint_interval
+        )
+        if self._num_bytes > self._capacity:
+            self.evict()
+
+    def _load(self):
+        for path in self._cache_dir_path.glob(_TMP_PREFIX + '*'):
+            LOG.debug('remove temporary file: %s', path)
+            path.unlink(missing_ok=True)
+        _remove_index_tmp_files(self._cache_dir_path)
+        records = (
+            _load_index(self._cache_dir_path, type(self).__name__)
+            if self._persist_index else None
+        )
+        relpaths = set(_list_files(self._cache_dir_path))
+        if records is None:
+            records = ()
+            unknown_relpaths = relpaths
+        else:
+            records = [record for record in records if record[0] in relpaths]
+            unknown_relpaths = relpaths.difference(r for r, _ in records)
+        # Without a better source of recency, order entries that are
+        # not in the index by modification time, and treat them as the
+        # least recently used.
+        entries = []
+        for relpath in unknown_relpaths:
+            stat = (self._cache_dir_path / relpath).stat()
+            entries.append((stat.st_mtime_ns, relpath, stat.st_size))
+        entries.sort()
+        for _, relpath, size in entries:
+            self._load_entry(relpath, size)
+        for relpath, size in records:
+            self._load_entry(relpath, size)
+        LOG.info(
+            'load %d entries (%d from index): %s',
+            self.estimate_size(),
+            self.estimate_size() - len(entries),
+            self._cache_dir_path,
+        )
+
+    def _load_entry(self, relpath, size):
+        shard = self._shards[int(relpath[:2], 16)]
+        path = shard.dir_prefix + relpath[3:]
+        shard.entries[path] = (size, next(self._ticks))
+        self._num_bytes += size
+
+    def _get_shard_and_path(self, key):
+        # For speed, we use str rather than Path internally.
+        digest = hashlib.md5(key).hexdigest()
+        shard = self._shards[int(digest[:2], 16)]
+        return shard, shard.dir_prefix + digest[2:]
+
+    def get_stats(self):
+        num_hits = 0
+        num_misses = 0
+        for shard in self._shards:
+            with shard.lock:
+                num_hits += shard.num_hits
+                num_misses += shard.num_misses
+        return self.Stats(num_hits=num_hits, num_misses=num_misses)
+
+    def estimate_size(self):
+        """Return the number of entries.
+
+        Unlike ``Cache.estimate_size``, this is not an estimate.
+        """
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def get_num_bytes(self):
+        return self._num_bytes
+
+    def get(self, key, default=None):
+        shard, path = self._get_shard_and_path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = file.read()
+        except FileNotFoundError:
+            return self._miss(shard, default)
+        self._hit(shard, path)
+        return value
+
+    def get_file(self, key, default=None):
+        """Get cache entry as a pair of file object and it size.
+
+        The caller has to close the file object.  Note that even if this
+        cache entry is removed or evicted, the file will only removed by
+        the file system when the file is closed.
+        """
+        shard, path = self._get_shard_and_path(key)
+        try:
+            file = open(path, 'rb')  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            return self._miss(shard, default)
+        self._hit(shard, path)
+        return file, os.fstat(file.fileno()).st_size
+
+    @contextlib.contextmanager
+    def getting_path(self, key, default=None):
+        shard, path = self._get_shard_and_path(key)
+        with shard.lock:
+            if path not in shard.entries:
+                shard.num_misses += 1
+                path = None
+            else:
+                tick = self._touch_require_lock_by_caller(shard, path)
+                shard.num_hits += 1
+                shard.active_paths.add(path)
+        if path is None:
+            yield default
+            return
+        self._maybe_save_index(tick)
+        try:
+            yield Path(path)
+        finally:
+            with shard.lock:
+                shard.active_paths.remove(path)
+
+    def _hit(self, shard, path):
+        with shard.lock:
+            # The entry might have been removed after we opened the file.
+            if path in shard.entries:
+                tick = self._touch_require_lock_by_caller(shard, path)
+            else:
+                tick = None
+            shard.num_hits += 1
+        if tick is not None:
+            self._maybe_save_index(tick)
+
+    @staticmethod
+    def _miss(shard, default):
+        with shard.lock:
+            shard.num_misses += 1
+        return default
+
+    def _touch_require_lock_by_caller(self, shard, path):
+        size, _ = shard.entries[path]
+        tick = next(self._ticks)
+        shard.entries[path] = (size, tick)
+        shard.entries.move_to_end(path)
+        return tick
+
+    def set(self, key, value):
+        with self.setting_path(key) as path:
+            path.write_bytes(value)
+
+    @contextlib.contextmanager
+    def setting_file(self, key):
+        """Set a cache entry via a file-like object."""
+        with self.setting_path(key) as p, p.open('wb') as f:
+            yield f
+
+    @contextlib.contextmanager
+    def setting_path(self, key):
+        """Set a cache entry via a temporary file path.
+
+        The temporary file is in the cache directory so that we may
+        rename it into place.
+        """
+        fd, value_tmp_path = tempfile.mkstemp(
+            prefix=_TMP_PREFIX, dir=self._cache_dir_path
+        )
+        os.close(fd)
+        value_tmp_path = Path(value_tmp_path)
+        try:
+            yield value_tmp_path
+            self._commit(key, value_tmp_path)
+        finally:
+            value_tmp_path.unlink(missing_ok=True)
+
+    def _commit(self, key, value_tmp_path):
+        size = value_tmp_path.stat().st_size
+        shard, path = self._get_shard_and_path(key)
+        with shard.lock:
+            shard.dir_path.mkdir(exist_ok=True)
+            os.replace(value_tmp_path, path)
+            old_size, _ = shard.entries.pop(path, (0, None))
+            tick = next(self._ticks)
+            shard.entries[path] = (size, tick)
+        self._add_num_bytes(size - old_size)
+        self._maybe_evict()
+        self._maybe_save_index(tick)
+
+    def pop(self, key, default=CacheInterface._SENTINEL):
+        shard, path = self._get_shard_and_path(key)
+        fd, value_tmp_path = tempfile.mkstemp(
+            prefix=_TMP_PREFIX, dir=self._cache_dir_path
+        )
+        os.close(fd)
+        value_tmp_path = Path(value_tmp_path)
+        try:
+            with shard.lock:
+                entry = shard.entries.pop(path, None)
+                if entry is not None:
+                    # Move the file out of the way, and read it outside
+                    # the lock.
+                    os.replace(path, value_tmp_path)
+            if entry is None:
+                if default is self._SENTINEL:
+                    raise KeyError(key)
+                return default
+            self._add_num_bytes(-entry[0])
+            return value_tmp_path.read_bytes()
+        finally:
+            value_tmp_path.unlink(missing_ok=True)
+
+    def _add_num_bytes(self, delta):
+        with self._lock:
+            self._num_bytes += delta
+
+    def _maybe_evict(self):
+        with self._lock:
+            if self._evicting or self._num_bytes <= self._capacity:
+                return
+            self._evicting = True
+        if self._executor:
+            self._executor.submit(self._evict_and_log)
+        else:
+            self._evict_and_log()
+
+    def evict(self):
+        with self._lock:
+            # Let the eviction in progress do the work.
+            if self._evicting:
+                return 0
+            self._evicting = True
+        return self._evict_and_log()
+
+    def _evict_and_log(self):
+        try:
+            stopwatch = timers.Stopwatch()
+            stopwatch.start()
+            num_evicted = self._evict()
+            stopwatch.stop()
+        finally:
+            with self._lock:
+                self._evicting = False
+        LOG.info(
+            'evict %d entries in %f seconds: %s',
+            num_evicted,
+            stopwatch.get_duration(),
+            self._cache_dir_path,
+        )
+        if self._persist_index:
+            self.save_index()
+        return num_evicted
+
+    def _evict(self):
+        # Merge the per-shard LRU lists with a heap of (tick, shard).
+        heap = []
+        for index, shard in enumerate(self._shards):
+            with shard.lock:
+                tick = shard.get_oldest_tick()
+            if tick is not None:
+                heap.append((tick, index))
+        heapq.heapify(heap)
+        num_evicted = 0
+        while heap and self._num_bytes > self._post_eviction_size:
+            expect_tick, index = heapq.heappop(heap)
+            shard = self._shards[index]
+            with shard.lock:
+                tick = shard.get_oldest_tick()
+                # Re-queue the shard if its oldest entry was accessed
+                # after we looked at it.
+                if tick is not None and tick != expect_tick and heap \
+                    and tick > heap[0][0]:
+                    size = None
+                else:
+                    size = shard.evict_oldest()
+                    tick = shard.get_oldest_tick()
+            if size is not None:
+                self._add_num_bytes(-size)
+                num_evicted += 1
+            if tick is not None:
+                heapq.heappush(heap, (tick, index))
+        return num_evicted
+
+    def _maybe_save_index(self, tick):
+        # Check without the lock first since this is on the hot path.
+        if not self._persist_index or tick < self._next_checkpoint_tick:
+            return
+        with self._lock:
+            if self._saving or tick < self._next_checkpoint_tick:
+                return
+            self._saving = True
+            self._next_checkpoint_tick = tick + self._checkpoint_interval
+        if self._executor:
+            self._executor.submit(self._save_index_and_clear)
+        else:
+            self._save_index_and_clear()
+
+    def _save_index_and_clear(self):
+        try:
+            self.save_index()
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def save_index(self):
+        """Checkpoint recency and sizes of entries to the index file."""
+        with self._index_lock:
+            snapshots = []
+            for shard in self._shards:
+                prefix = shard.dir_path.name + '/'
+                start = len(shard.dir_prefix)
+                with shard.lock:
+                    # Entries of a shard are already ordered by tick.
+                    snapshots.append([
+                        (tick, prefix + path[start:], size)
+                        for path, (size, tick) in shard.entries.items()
+                    ])
+            _save_index(
+                self._cache_dir_path,
+                type(self).__name__,
+                (
+                    (relpath, size)
+                    for _, relpath, size in heapq.merge(*snapshots)
+                ),
+            )
+
+
+_TMP_PREFIX = '.tmp-'
+
+
+class _Shard:
+
+    def __init__(self, dir_path):
+        self.lock = threading.Lock()
+        self.dir_path = dir_path
+        self.dir_prefix = str(dir_path) + os.sep
+        # Map path to (size, tick), ordered from least recently used.
+        self.entries = collections.OrderedDict()
+        # getting_path may "lease" paths to the user, and we should not
+        # evict these paths.
+        self.active_paths = g1_collections.Multiset()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get_oldest_tick(self):
+        for path, (_, tick) in self.entries.items():
+            if path not in self.active_paths:
+                return tick
+        return None
+
+    def evict_oldest(self):
+        for path in self.entries:
+            if path not in self.active_paths:
+                break
+        else:
+            return None
+        size, _ = self.entries.pop(path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        LOG.debug('evict: %d %s', size, path)
+        return size
+
+
+#
+# Index file.
+#
+# The index file is a snapshot of entries, one per line, ordered from
+# the least recently used.  Each line is the entry's path relative to
+# the cache directory and an integer, whose meaning is defined by the
+# cache type that writes the file.
+#
+
+_INDEX_VERSION = 1
+
+
+def _make_index_header(cache_type_name):
+    return '# %s %d\n' % (cache_type_name, _INDEX_VERSION)
+
+
+def _load_index(cache_dir_path, cache_type_name):
+    """Load index, or return None if it is missing or invalid."""
+    index_path = cache_dir_path / INDEX_NAME
+    try:
+        with index_path.open('r', encoding='ascii') as index_file:
+            if index_file.readline() != _make_index_header(cache_type_name):
+                LOG.warning('ignore index of another version: %s', index_path)
+                return None
+            records = []
+            for line in index_file:
+                relpath, value = line.split()
+                records.append((relpath, int(value)))
+            return records
+    except FileNotFoundError:
+        return None
+    except (UnicodeDecodeError, ValueError) as exc:
+        LOG.warning('ignore invalid index: %s: %r', index_path, exc)
+        return None
+
+
+def _remove_index_tmp_files(cache_dir_path):
+    """Remove temporary index files left by a crash."""
+    for path in cache_dir_path.glob(INDEX_NAME + '-*'):
+        LOG.debug('remove temporary index file: %s', path)
+        path.unlink(missing_ok=True)
+
+
+def _save_index(cache_dir_path, cache_type_name, records):
+    fd, index_tmp_path = tempfile.mkstemp(
+        prefix=INDEX_NAME + '-', dir=cache_dir_path
+    )
+    try:
+        with open(fd, 'w', encoding='ascii') as index_file:
+            index_file.write(_make_index_header(cache_type_name))
+            index_file.writelines(
+                '%s %d\n' % (relpath, value) for relpath, value in records
+            )
+        os.replace(index_tmp_path, cache_dir_path / INDEX_NAME)
+    finally:
+        Path(index_tmp_path).unlink(missing_ok=True)
+
+
+def _list_files(cache_dir_path):
+    """List relative paths of entries without stat-ing them."""
+    with os.scandir(cache_dir_path) as dir_entries:
+        for dir_entry in dir_entries:
+            if not (
+                len(dir_entry.name) == 2
+                and dir_entry.is_dir(follow_symlinks=False)
+            ):
+                continue
+            with os.scandir(dir_entry.path) as file_entries:
+                for file_entry in file_entries:
+                    if file_entry.is_file(follow_symlinks=False):
+                        yield '%s/%s' % (dir_entry.name, file_entry.name)
+
+
+def _to_relpath(cache_dir_path, path):
+    return str(path.relative_to(cache_dir_path))
+
+
 def _iter_dirs(dir_path):
     return filter(Path.is_dir, dir_path.iterdir())
 
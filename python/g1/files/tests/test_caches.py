@@ -1,6 +1,9 @@
 import unittest
+import unittest.mock
 
+import os
 import tempfile
+import threading
 from pathlib import Path
 
 from g1.bases import collections as g1_collections
@@ -301,6 +304,297 @@ class CacheTest(unittest.TestCase):
         self.assertEqual(cache._eviction_countdown, 10)
         self.assertEqual(len(list(self.test_dir_path.iterdir())), 0)
 
+    def test_persist_index(self):
+        cache = caches.Cache(self.test_dir_path, 10, persist_index=True)
+        cache.set(b'0', b'0')
+        cache.set(b'1', b'1')
+        cache.set(b'2', b'2')
+        self.assertEqual(cache.get(b'0'), b'0')
+        cache.save_index()
+
+        cache = caches.Cache(self.test_dir_path, 10, persist_index=True)
+        self.assert_access_log(cache, [(b'0', 2), (b'2', 1), (b'1', 1)])
+        self.assertEqual(cache._eviction_countdown, 7)
+
+        # Entries that no longer exist are dropped.
+        (self.test_dir_path / caches.Cache._get_relpath(b'2')).unlink()
+        cache = caches.Cache(self.test_dir_path, 10, persist_index=True)
+        self.assert_access_log(cache, [(b'0', 2), (b'1', 1)])
+        self.assertEqual(cache._eviction_countdown, 8)
+
+    def test_persist_index_checkpoint(self):
+        cache = caches.Cache(
+            self.test_dir_path,
+            10,
+            persist_index=True,
+            checkpoint_interval=2,
+        )
+        index_path = self.test_dir_path / caches.INDEX_NAME
+        cache.set(b'0', b'0')
+        self.assertFalse(index_path.exists())
+        cache.set(b'1', b'1')
+        self.assertTrue(index_path.exists())
+        self.assertEqual(
+            index_path.read_text().splitlines()[1:],
+            [
+                '%s 1' % caches.Cache._get_relpath(b'0'),
+                '%s 1' % caches.Cache._get_relpath(b'1'),
+            ],
+        )
+
+    def test_persist_index_remove_tmp_files(self):
+        tmp_path = self.test_dir_path / (caches.INDEX_NAME + '-xyz')
+        tmp_path.write_text('garbage')
+        caches.Cache(self.test_dir_path, 10, persist_index=True)
+        self.assertFalse(tmp_path.exists())
+
+    def test_persist_index_invalid(self):
+        index_path = self.test_dir_path / caches.INDEX_NAME
+        for content in (
+            'garbage',
+            '# ShardedCache 1\n',
+            '# Cache 1\n00/xyz\n',
+            '# Cache 1\n00/xyz 1 2\n',
+        ):
+            with self.subTest(content):
+                index_path.write_text(content)
+                self.assertIsNone(
+                    caches._load_index(self.test_dir_path, 'Cache')
+                )
+                cache = caches.Cache(
+                    self.test_dir_path, 10, persist_index=True
+                )
+                self.assert_access_log(cache, [])
+
+
+class ShardedCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._test_dir_tempdir = tempfile.TemporaryDirectory()
+        self.test_dir_path = Path(self._test_dir_tempdir.name)
+
+    def tearDown(self):
+        self._test_dir_tempdir.cleanup()
+        super().tearDown()
+
+    def assert_cache_dir(self, entries):
+        self.assertEqual(
+            {
+                path.relative_to(self.test_dir_path): path.read_bytes()
+                for path in self.test_dir_path.glob('*/*')
+            },
+            {
+                caches.Cache._get_relpath(key): value
+                for key, value in entries.items()
+            },
+        )
+
+    def assert_size(self, cache, num_entries, num_bytes):
+        self.assertEqual(cache.estimate_size(), num_entries)
+        self.assertEqual(cache.get_num_bytes(), num_bytes)
+
+    def test_init(self):
+        for i in range(3):
+            path = self.test_dir_path / caches.Cache._get_relpath(b'%d' % i)
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(b'x' * (i + 1))
+            os.utime(path, ns=(i, i))
+        tmp_path = self.test_dir_path / (caches._TMP_PREFIX + 'foo')
+        tmp_path.touch()
+
+        cache = caches.ShardedCache(self.test_dir_path, 100)
+        self.assert_size(cache, 3, 6)
+        self.assertFalse(tmp_path.exists())
+
+        # Existing entries are ordered by modification time.
+        cache = caches.ShardedCache(
+            self.test_dir_path, 5, post_eviction_size=3
+        )
+        self.assert_size(cache, 1, 3)
+        self.assert_cache_dir({b'2': b'xxx'})
+
+    def test_init_invalid_args(self):
+        with self.assertRaisesRegex(AssertionError, r'expect.*is_dir'):
+            caches.ShardedCache(self.test_dir_path / 'foo', 100)
+        with self.assertRaisesRegex(AssertionError, r'expect x > 0, not -1'):
+            caches.ShardedCache(self.test_dir_path, -1)
+        with self.assertRaisesRegex(
+            AssertionError, r'expect 0 <= post_eviction_size <= 1, not 2'
+        ):
+            caches.ShardedCache(self.test_dir_path, 1, post_eviction_size=2)
+
+    def test_get_and_set(self):
+        cache = caches.ShardedCache(self.test_dir_path, 100)
+        self.assertIsNone(cache.get(b'0'))
+        cache.set(b'0', b'hello')
+        cache.set(b'1', b'world!')
+        self.assert_size(cache, 2, 11)
+        self.assertEqual(cache.get(b'0'), b'hello')
+        cache.set(b'0', b'hi')
+        self.assert_size(cache, 2, 8)
+        self.assertEqual(cache.get(b'0'), b'hi')
+        self.assert_cache_dir({b'0': b'hi', b'1': b'world!'})
+        self.assertEqual(
+            cache.get_stats(),
+            caches.ShardedCache.Stats(num_hits=2, num_misses=1),
+        )
+        self.assertEqual(list(self.test_dir_path.glob('.tmp-*')), [])
+
+    def test_evict(self):
+        cache = caches.ShardedCache(
+            self.test_dir_path, 10, post_eviction_size=6
+        )
+        for i in range(5):
+            cache.set(b'%d' % i, b'xx')
+        self.assert_size(cache, 5, 10)
+        # Make 0 and 1 the most recently used.
+        self.assertEqual(cache.get(b'0'), b'xx')
+        f, size = cache.get_file(b'1')
+        f.close()
+        self.assertEqual(size, 2)
+
+        cache.set(b'5', b'xx')
+        self.assert_size(cache, 3, 6)
+        self.assert_cache_dir({b'0': b'xx', b'1': b'xx', b'5': b'xx'})
+
+        self.assertEqual(cache.evict(), 0)
+
+    def test_evict_background(self):
+        executor = unittest.mock.Mock()
+        cache = caches.ShardedCache(
+            self.test_dir_path,
+            4,
+            post_eviction_size=0,
+            executor=executor,
+        )
+        cache.set(b'0', b'xxxxx')
+        executor.submit.assert_called_once()
+        # Do not submit another while one is pending.
+        cache.set(b'1', b'xxxxx')
+        executor.submit.assert_called_once()
+        self.assert_size(cache, 2, 10)
+        self.assertEqual(executor.submit.call_args.args[0](), 2)
+        self.assert_size(cache, 0, 0)
+
+    def test_getting_path(self):
+        cache = caches.ShardedCache(
+            self.test_dir_path, 100, post_eviction_size=0
+        )
+        cache.set(b'some key', b'some value')
+        with cache.getting_path(b'some key') as path:
+            self.assertEqual(path.read_bytes(), b'some value')
+            self.assertEqual(cache.evict(), 0)
+        self.assertEqual(cache.evict(), 1)
+        with cache.getting_path(b'some key') as path:
+            self.assertIsNone(path)
+
+    def test_setting_file_error(self):
+        cache = caches.ShardedCache(self.test_dir_path, 100)
+        with self.assertRaisesRegex(Exception, r'expected'):
+            with cache.setting_file(b'some key') as value_file:
+                value_file.write(b'some value')
+                raise Exception('expected')
+        self.assertIsNone(cache.get(b'some key'))
+        self.assert_size(cache, 0, 0)
+        self.assertEqual(list(self.test_dir_path.iterdir()), [])
+
+    def test_pop(self):
+        cache = caches.ShardedCache(self.test_dir_path, 100)
+        with self.assertRaises(KeyError):
+            cache.pop(b'0')
+        self.assertIsNone(cache.pop(b'0', None))
+        cache.set(b'0', b'some value')
+        self.assertEqual(cache.pop(b'0'), b'some value')
+        self.assert_size(cache, 0, 0)
+        self.assertIsNone(cache.get(b'0'))
+        self.assertEqual(list(self.test_dir_path.glob('*/*')), [])
+        self.assertEqual(list(self.test_dir_path.glob('.tmp-*')), [])
+
+    def test_persist_index(self):
+        cache = caches.ShardedCache(
+            self.test_dir_path, 100, persist_index=True
+        )
+        for i in range(4):
+            cache.set(b'%d' % i, b'x' * (i + 1))
+        self.assertEqual(cache.get(b'0'), b'x')
+        cache.save_index()
+        # Written after the checkpoint.
+        cache.set(b'4', b'xxxxx')
+
+        with unittest.mock.patch.object(
+            caches.Path, 'stat', autospec=True, side_effect=caches.Path.stat
+        ) as mock_stat:
+            cache = caches.ShardedCache(
+                self.test_dir_path,
+                11,
+                post_eviction_size=8,
+                persist_index=True,
+            )
+        # Only the entry not in the index is stat-ed.
+        self.assertEqual(
+            [
+                call.args[0] for call in mock_stat.call_args_list
+                if call.args[0].parent.parent == self.test_dir_path
+            ],
+            [self.test_dir_path / caches.Cache._get_relpath(b'4')],
+        )
+        # Recency is 4 (not indexed), 1, 2, 3, 0; so 4 and 1 are
+        # evicted.
+        self.assert_size(cache, 3, 8)
+        self.assert_cache_dir({b'0': b'x', b'2': b'xxx', b'3': b'xxxx'})
+
+    def test_persist_index_checkpoint(self):
+        cache = caches.ShardedCache(
+            self.test_dir_path,
+            100,
+            persist_index=True,
+            checkpoint_interval=3,
+        )
+        index_path = self.test_dir_path / caches.INDEX_NAME
+        cache.set(b'0', b'xx')
+        cache.set(b'1', b'x')
+        self.assertFalse(index_path.exists())
+        self.assertEqual(cache.get(b'0'), b'xx')
+        self.assertTrue(index_path.exists())
+        self.assertEqual(
+            index_path.read_text().splitlines(),
+            [
+                '# ShardedCache 1',
+                '%s 1' % caches.Cache._get_relpath(b'1'),
+                '%s 2' % caches.Cache._get_relpath(b'0'),
+            ],
+        )
+
+    def test_persist_index_remove_tmp_files(self):
+        tmp_path = self.test_dir_path / (caches.INDEX_NAME + '-xyz')
+        tmp_path.write_text('garbage')
+        caches.ShardedCache(self.test_dir_path, 100, persist_index=True)
+        self.assertFalse(tmp_path.exists())
+
+    def test_concurrent_access(self):
+        cache = caches.ShardedCache(self.test_dir_path, 64 * 16)
+
+        def run(n):
+            for i in range(200):
+                key = b'%d' % ((n * 7 + i) % 100)
+                value = cache.get(key)
+                if value is None:
+                    cache.set(key, key * 16)
+                else:
+                    self.assertEqual(value, key * 16)
+
+        threads = [threading.Thread(target=run, args=(n, )) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(cache.get_num_bytes(), 64 * 16)
+        self.assertEqual(
+            cache.get_num_bytes(),
+            sum(p.stat().st_size for p in self.test_dir_path.glob('*/*')),
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
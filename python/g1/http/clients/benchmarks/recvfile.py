@@ -0,0 +1,138 @@
+"""Benchmark recvfile throughput.
+
+A server process runs ``g1.http.servers`` and responds a large body in
+one of these forms:
+
+* fixed: With Content-Length.
+* chunked: Without Content-Length (and so the server chunks it).
+* gzip: Gzip-compressed, with Content-Length.
+
+The benchmark downloads the body with ``recvfile`` into a temporary
+file, and then again with ``preallocate`` set to true.
+"""
+
+import contextvars
+import gzip
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
+from g1.http import servers
+from g1.http.clients import bases
+from g1.http.clients import clients
+from g1.networks.servers import SocketServer
+
+PIECE_SIZE = 65536
+
+
+def make_application(body, gzip_body):
+
+    async def application(environ, start_response):
+        path = environ['PATH_INFO']
+        if path == '/fixed':
+            start_response('200 OK', [('Content-Length', str(len(body)))])
+            return [body]
+        if path == '/chunked':
+            start_response('200 OK', [])
+            return [
+                body[i:i + PIECE_SIZE]
+                for i in range(0, len(body), PIECE_SIZE)
+            ]
+        if path == '/gzip':
+            start_response(
+                '200 OK',
+                [
+                    ('Content-Encoding', 'gzip'),
+                    ('Content-Length', str(len(gzip_body))),
+                ],
+            )
+            return [gzip_body]
+        start_response('404 Not Found', [('Content-Length', '0')])
+        return []
+
+    return application
+
+
+def run_server(server_socket, body_size):
+    # Make the body compressible, but not trivially so.
+    body = (os.urandom(256).hex().encode('ascii') *
+            (body_size // 512 + 1))[:body_size]
+    server_socket = adapters.SocketAdapter(server_socket)
+    kernels.run(
+        SocketServer(
+            server_socket,
+            servers.HttpServer(
+                server_socket,
+                make_application(body, gzip.compress(body, 1)),
+            ),
+        ).serve
+    )
+
+
+def download(session, url, num_repeats, preallocate):
+    request = bases.Request('GET', url)
+    kwargs = {'preallocate': True} if preallocate else {}
+    num_bytes = 0
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        with tempfile.TemporaryFile() as output:
+            with kernels.run(session.send(request, stream=True)) as response:
+                kernels.run(response.recvfile(output, **kwargs))
+            num_bytes += output.tell()
+    return num_bytes / (time.perf_counter() - start)
+
+
+def main(argv):
+    body_size = int(argv[1]) if len(argv) > 1 else 64 * 1024 * 1024
+    num_repeats = int(argv[2]) if len(argv) > 2 else 4
+
+    # Create a plain socket since we are not in a kernel context here.
+    with socket.create_server(('127.0.0.1', 0)) as server_socket:
+        base_url = 'http://127.0.0.1:%d' % server_socket.getsockname()[1]
+        server = multiprocessing.get_context('fork').Process(
+            target=lambda: contextvars.Context().run(
+                kernels.call_with_kernel,
+                run_server,
+                server_socket,
+                body_size,
+            ),
+            daemon=True,
+        )
+        server.start()
+
+    try:
+        session = clients.Session()
+        for path, preallocate in [
+            ('/fixed', False),
+            ('/fixed', True),
+            ('/chunked', False),
+            ('/gzip', False),
+        ]:
+            bytes_per_second = kernels.call_with_kernel(
+                download,
+                session,
+                base_url + path,
+                num_repeats,
+                preallocate,
+            )
+            print(
+                'path=%s preallocate=%s body_size=%d: %.1f MB/s' % (
+                    path,
+                    preallocate,
+                    body_size,
+                    bytes_per_second / 1e6,
+                )
+            )
+    finally:
+        server.kill()
+        server.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,129 @@
+"""Benchmark requests per second of the executor and native sessions.
+
+A server process runs ``g1.http.servers`` and responds a small JSON body
+(gzip-compressed and chunked if requested), and the benchmark sends
+requests through ``clients.Session`` with a number of concurrent tasks,
+first with the executor-backed base session and then with the native
+one.
+"""
+
+import contextvars
+import gzip
+import multiprocessing
+import socket
+import sys
+import time
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import tasks
+from g1.http import servers
+from g1.http.clients import bases
+from g1.http.clients import clients
+from g1.networks.servers import SocketServer
+
+BODY = b'{"status": "ok", "items": [1, 2, 3]}'
+GZIP_BODY = gzip.compress(BODY)
+
+
+async def application(environ, start_response):
+    if environ['PATH_INFO'] == '/gzip':
+        # Without Content-Length, the response is chunked.
+        start_response(
+            '200 OK',
+            [
+                ('Content-Type', 'application/json'),
+                ('Content-Encoding', 'gzip'),
+            ],
+        )
+        return [GZIP_BODY[:8], GZIP_BODY[8:]]
+    start_response(
+        '200 OK',
+        [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(BODY))),
+        ],
+    )
+    return [BODY]
+
+
+def run_server(server_socket):
+    server_socket = adapters.SocketAdapter(server_socket)
+    kernels.run(
+        SocketServer(
+            server_socket,
+            servers.HttpServer(server_socket, application),
+        ).serve
+    )
+
+
+async def send_requests(session, request, deadline):
+    num_requests = 0
+    while time.perf_counter() < deadline:
+        response = await session.send(request)
+        assert response.content == BODY
+        num_requests += 1
+    return num_requests
+
+
+def run_client(url, native, concurrency, duration):
+    session = clients.Session(native=native)
+    request = bases.Request('GET', url)
+    # Warm up connections.
+    kernels.run(send_requests(session, request, time.perf_counter() + 0.1))
+    start = time.perf_counter()
+    deadline = start + duration
+    client_tasks = [
+        tasks.spawn(send_requests(session, request, deadline))
+        for _ in range(concurrency)
+    ]
+    num_requests = sum(
+        kernels.run(task.get_result) for task in client_tasks
+    )
+    return num_requests / (time.perf_counter() - start)
+
+
+def main(argv):
+    concurrency = int(argv[1]) if len(argv) > 1 else 16
+    duration = float(argv[2]) if len(argv) > 2 else 5
+    path = argv[3] if len(argv) > 3 else '/'
+
+    # Create a plain socket since we are not in a kernel context here.
+    with socket.create_server(('127.0.0.1', 0)) as server_socket:
+        url = 'http://127.0.0.1:%d%s' % (
+            server_socket.getsockname()[1],
+            path,
+        )
+        server = multiprocessing.get_context('fork').Process(
+            target=lambda: contextvars.Context().run(
+                kernels.call_with_kernel,
+                run_server,
+                server_socket,
+            ),
+            daemon=True,
+        )
+        server.start()
+
+    try:
+        for native in (False, True):
+            requests_per_second = kernels.call_with_kernel(
+                run_client, url, native, concurrency, duration
+            )
+            print(
+                'native=%s concurrency=%d duration=%.1fs path=%s: '
+                '%.0f requests/s' % (
+                    native,
+                    concurrency,
+                    duration,
+                    path,
+                    requests_per_second,
+                )
+            )
+    finally:
+        server.kill()
+        server.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -7,6 +7,7 @@ the ease of programmatic use cases.
 
 __all__ = [
     'Request',
+    'ResponseCache',
     'Session',
     'Unavailable',
 ]
@@ -15,6 +16,7 @@ import logging
 
 # Re-export these.
 from .bases import Request
+from .caches import ResponseCache
 from .clients import Session
 from .policies import Unavailable
 
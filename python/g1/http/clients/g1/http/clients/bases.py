@@ -20,14 +20,12 @@ import urllib3.exceptions
 import urllib3.util.ssl_
 
 from g1.asyncs.bases import adapters
-from g1.asyncs.bases import tasks
 from g1.asyncs.bases import timers
 from g1.bases import classes
-from g1.bases import collections as g1_collections
-from g1.bases import loggings
 from g1.bases.assertions import ASSERT
 from g1.threads import executors
 
+from . import caches
 from . import policies
 from . import recvfiles
 
@@ -35,33 +33,51 @@ LOG = logging.getLogger(__name__)
 
 
 class Sender:
-    """Request sender with local cache, rate limit, and retry."""
+    """Request sender with local cache, rate limit, and retry.
 
-    # This is mutable.  Be sure to return a copy to external users.
-    @dataclasses.dataclass
-    class CacheStats:
-        num_hits: int
-        num_misses: int
-        num_revalidations: int
+    The response caches may be shared with other senders.
+    """
+
+    @dataclasses.dataclass(frozen=True)
+    class Stats:
+        cache: 'caches.ResponseCache.Stats'
+        sticky_cache: 'caches.ResponseCache.Stats'
+
+    # Kept for backward compatibility.
+    CacheStats = caches.ResponseCache.Stats
 
     def __init__(
         self,
         send,
         *,
         cache_size=8,
+        cache=None,
+        sticky_cache=None,
         circuit_breakers=None,
         rate_limit=None,
         retry=None,
     ):
         self._send = send
-        self._cache = g1_collections.LruCache(cache_size)
-        self._cache_stats = self.CacheStats(0, 0, 0)
-        self._unbounded_cache = {}
-        self._unbounded_cache_stats = self.CacheStats(0, 0, 0)
+        self._cache = (
+            cache if cache is not None else
+            caches.ResponseCache(max_num_entries=cache_size)
+        )
+        # The sticky cache ignores Cache-Control, and by default, is
+        # unbounded.
+        self._sticky_cache = (
+            sticky_cache if sticky_cache is not None else
+            caches.ResponseCache(use_cache_control=False)
+        )
         self._circuit_breakers = circuit_breakers or policies.NO_BREAK
         self._rate_limit = rate_limit or policies.unlimited
         self._retry = retry or policies.no_retry
 
+    def get_stats(self):
+        return self.Stats(
+            cache=self._cache.get_stats(),
+            sticky_cache=self._sticky_cache.get_stats(),
+        )
+
     async def __call__(self, request, **kwargs):
         """Send a request and return a response.
 
@@ -70,7 +86,7 @@ class Sender:
         setting ``cache_key`` in ``request``.
 
         ``sticky_key`` is similar to ``cache_key`` except that it refers
-        to an unbounded cache (thus the name "sticky").
+        to the sticky cache, whose entries do not expire by default.
 
         If argument ``cache_revalidate`` is evaluated to true, session
         will revalidate the cache entry.
@@ -87,20 +103,16 @@ class Sender:
                 (cache_key, sticky_key)
             )
         if cache_key is not None:
-            return await self._try_cache(
-                self._cache,
+            return await self._cache.get_or_send(
                 cache_key,
-                cache_revalidate,
-                request,
-                kwargs,
+                lambda headers: self(_add_headers(request, headers), **kwargs),
+                revalidate=cache_revalidate,
             )
         if sticky_key is not None:
-            return await self._try_cache(
-                self._unbounded_cache,
+            return await self._sticky_cache.get_or_send(
                 sticky_key,
-                cache_revalidate,
-                request,
-                kwargs,
+                lambda headers: self(_add_headers(request, headers), **kwargs),
+                revalidate=cache_revalidate,
             )
 
         circuit_breaker_key = kwargs.pop('circuit_breaker_key', None)
@@ -129,40 +141,6 @@ class Sender:
 
         ASSERT.unreachable('retry loop should not break')
 
-    async def _try_cache(self, cache, key, revalidate, request, kwargs):
-        if cache is self._cache:
-            log_prefix = ''
-            cache_stats = self._cache_stats
-        else:
-            log_prefix = 'sticky '
-            cache_stats = self._unbounded_cache_stats
-        task = cache.get(key)
-        if task is None:
-            task = cache[key] = tasks.spawn(self(request, **kwargs))
-            result = 'miss'
-            cache_stats.num_misses += 1
-        elif revalidate:
-            task = cache[key] = tasks.spawn(self(request, **kwargs))
-            result = 'revalidate'
-            cache_stats.num_revalidations += 1
-        else:
-            result = 'hit'
-            cache_stats.num_hits += 1
-        LOG.debug(
-            'send: cache %s: key=%r, %r, kwargs=%r', \
-            result, key, request, kwargs,
-        )
-        if loggings.ONCE_PER.check(1000):
-            LOG.info(
-                '%sresponse cache stats: %r',
-                log_prefix,
-                dataclasses.replace(cache_stats),  # Make a copy.
-            )
-        # Here is a risk that, if all task waiting for this task get
-        # cancelled before this task completes, this task might not
-        # be joined, but this risk is probably too small.
-        return await task.get_result()
-
     async def _loop_body(self, request, kwargs, breaker, retry_count):
         if retry_count:
             LOG.warning('retry %d times: %r', retry_count, request)
@@ -214,6 +192,14 @@ class Sender:
         return response.status_code
 
 
+def _add_headers(request, headers):
+    if not headers:
+        return request
+    request = request.copy()
+    request._kwargs['headers'] = {**request.headers, **headers}
+    return request
+
+
 class BaseSession:
     """Base session.
 
@@ -0,0 +1,437 @@
+"""Response cache.
+
+A response cache may be shared by multiple senders (for example, by all
+stubs of a cluster session).  It is bounded by total response content
+bytes and (optionally) by number of entries, and evicts entries in LRU
+order.  Concurrent misses of the same key are coalesced into one
+request.
+
+An entry expires after ``ttl`` seconds, or earlier if the response's
+``Cache-Control`` says so (``max-age``); responses with ``no-store`` are
+not stored at all, and responses with ``no-cache`` are stored but are
+revalidated before every use.  Revalidation requests are conditional
+(``If-None-Match`` and ``If-Modified-Since``), and a ``304 Not
+Modified`` response refreshes the stored response.
+
+Optionally, the cache is backed by a persistent key-value store, such
+as ``g1.files.caches.Cache`` or ``g1.databases.caches.Cache``, so that
+entries survive process restarts.  The store is accessed from a
+dedicated executor thread, in order.  Only ``get_or_send`` reads the
+store, which it waits for without blocking the kernel thread; ``get``
+looks up the in-memory entries only.  Store writes are not waited for.
+"""
+
+__all__ = [
+    'ResponseCache',
+]
+
+import collections
+import dataclasses
+import datetime
+import http
+import json
+import logging
+import time
+import typing
+
+import requests.cookies
+import requests.structures
+
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import tasks
+from g1.bases import loggings
+from g1.bases.assertions import ASSERT
+from g1.threads import executors
+
+from . import bases
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _Entry:
+    response: typing.Any
+    size: int
+    expires_at: float  # In time.monotonic; None means never.
+    must_revalidate: bool
+
+
+class ResponseCache:
+    """LRU response cache.
+
+    ``capacity`` is the maximum total bytes of response content, and
+    ``max_num_entries`` is the maximum number of entries; either one is
+    unbounded if it is 0.
+
+    Store keys are made by ``encode_key``, which by default encodes
+    ``repr(key)`` in UTF-8 as ``g1.files.caches.Cache`` expects.  For
+    ``g1.databases.caches.Cache``, pass ``encode_key=repr``.
+    """
+
+    @dataclasses.dataclass(frozen=True)
+    class Stats:
+        num_hits: int
+        num_misses: int
+        num_revalidations: int
+        num_coalesced: int
+        num_store_hits: int
+        num_evictions: int
+        num_entries: int
+        num_bytes: int
+
+    def __init__(
+        self,
+        capacity=0,
+        *,
+        max_num_entries=0,
+        ttl=None,
+        use_cache_control=True,
+        store=None,
+        encode_key=None,
+    ):
+        self._capacity = ASSERT.greater_or_equal(capacity, 0)
+        self._max_num_entries = ASSERT.greater_or_equal(max_num_entries, 0)
+        self._ttl = None if ttl is None else ASSERT.greater(ttl, 0)
+        self._use_cache_control = use_cache_control
+        self._store = store
+        self._encode_key = encode_key or _encode_key
+        # Use one thread so that store operations are done in order.
+        self._executor = (
+            None if store is None else executors.Executor(
+                max_executors=1,
+                name_prefix='response-cache',
+                daemon=True,
+            )
+        )
+
+        self._entries = collections.OrderedDict()
+        self._num_bytes = 0
+        # Tasks of requests that are being sent, keyed by cache key.
+        self._pending = {}
+
+        self._num_hits = 0
+        self._num_misses = 0
+        self._num_revalidations = 0
+        self._num_coalesced = 0
+        self._num_store_hits = 0
+        self._num_evictions = 0
+
+    def get_stats(self):
+        return self.Stats(
+            num_hits=self._num_hits,
+            num_misses=self._num_misses,
+            num_revalidations=self._num_revalidations,
+            num_coalesced=self._num_coalesced,
+            num_store_hits=self._num_store_hits,
+            num_evictions=self._num_evictions,
+            num_entries=len(self._entries),
+            num_bytes=self._num_bytes,
+        )
+
+    async def get_or_send(self, key, send, *, revalidate=False):
+        """Return the cached response, or call ``send`` on a miss.
+
+        ``send`` is a function that takes a dict of extra request
+        headers and returns an awaitable of the response.  The headers
+        are the conditional request headers made from the cached
+        response when revalidating it, and are empty otherwise.
+
+        If ``revalidate`` is true, the cached response is revalidated
+        (and replaced unless the server responds ``304 Not Modified``).
+        """
+        task = self._pending.get(key)
+        if task is not None:
+            result = 'coalesced'
+            self._num_coalesced += 1
+        else:
+            entry = self._get_entry(key)
+            if (
+                entry is not None and not revalidate
+                and not entry.must_revalidate
+            ):
+                result = 'hit'
+                self._num_hits += 1
+            else:
+                if entry is None:
+                    result = 'miss'
+                    self._num_misses += 1
+                else:
+                    result = 'revalidate'
+                    self._num_revalidations += 1
+                task = self._pending[key] = tasks.spawn(
+                    self._send_and_set(key, send, entry, revalidate)
+                )
+        LOG.debug('response cache %s: key=%r', result, key)
+        if loggings.ONCE_PER.check(1000):
+            LOG.info('response cache stats: %r', self.get_stats())
+        if task is None:
+            return entry.response
+        # Here is a risk that, if all task waiting for this task get
+        # cancelled before this task completes, this task might not
+        # be joined, but this risk is probably too small.
+        return await task.get_result()
+
+    async def _send_and_set(self, key, send, entry, revalidate):
+        try:
+            if entry is None and self._store is not None:
+                entry = self._load_data(
+                    key,
+                    await adapters.FutureAdapter(
+                        self._executor.submit(
+                            self._store.get, self._encode_key(key)
+                        )
+                    ).get_result(),
+                )
+                if (
+                    entry is not None and not revalidate
+                    and not entry.must_revalidate
+                ):
+                    return entry.response
+            response = await send(
+                {} if entry is None else
+                _make_conditional_headers(entry.response)
+            )
+            if (
+                entry is not None
+                and response.status_code == http.HTTPStatus.NOT_MODIFIED
+            ):
+                response = entry.response
+        finally:
+            self._pending.pop(key, None)
+        self.set(key, response)
+        return response
+
+    def get(self, key, default=None):
+        """Return the cached response.
+
+        This does not read the store (use ``get_or_send`` for that).  A
+        response that must be revalidated before use is treated as a
+        miss.
+        """
+        entry = self._get_entry(key)
+        if entry is None or entry.must_revalidate:
+            self._num_misses += 1
+            return default
+        self._num_hits += 1
+        return entry.response
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if (
+            entry.expires_at is not None
+            and entry.expires_at <= time.monotonic()
+        ):
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, response):
+        """Cache a response.
+
+        Responses that are not fully read (i.e., streaming responses)
+        or that ``Cache-Control`` forbids are not cached.
+        """
+        ttl, must_revalidate = self._get_policy(response)
+        if ttl == 0:
+            self.pop(key, None)
+            return
+        content = _get_content(response)
+        if content is None:
+            self.pop(key, None)
+            return
+        self._put(key, response, len(content), ttl, must_revalidate)
+        if self._store is not None:
+            self._write_store(
+                self._store.set,
+                self._encode_key(key),
+                _encode_response(
+                    response,
+                    content,
+                    None if ttl is None else time.time() + ttl,
+                ),
+            )
+
+    def pop(self, key, default=None):
+        entry = self._remove(key)
+        if self._store is not None:
+            self._write_store(self._store.pop, self._encode_key(key), None)
+        return default if entry is None else entry.response
+
+    def _get_policy(self, response):
+        """Return TTL and whether the response must be revalidated.
+
+        TTL is in seconds, 0 if uncacheable, or None if forever.
+        """
+        ttl = self._ttl
+        if not self._use_cache_control:
+            return ttl, False
+        max_age, no_cache = _parse_cache_control(
+            response.headers.get('Cache-Control')
+        )
+        if max_age is not None:
+            ttl = max_age if ttl is None else min(ttl, max_age)
+        return ttl, no_cache
+
+    def _put(self, key, response, size, ttl, must_revalidate):
+        self._remove(key)
+        if self._capacity > 0 and size > self._capacity:
+            LOG.debug(
+                'response cache: entry too large: key=%r, size=%d', key, size
+            )
+            return
+        self._entries[key] = _Entry(
+            response=response,
+            size=size,
+            expires_at=None if ttl is None else time.monotonic() + ttl,
+            must_revalidate=must_revalidate,
+        )
+        self._num_bytes += size
+        while self._entries and (
+            (self._capacity > 0 and self._num_bytes > self._capacity) or (
+                self._max_num_entries > 0
+                and len(self._entries) > self._max_num_entries
+            )
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._num_bytes -= entry.size
+            self._num_evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._num_bytes -= entry.size
+        return entry
+
+    def _load_data(self, key, data):
+        if data is None:
+            return None
+        try:
+            response, content, expires_at = _decode_response(data)
+        except (ValueError, KeyError, TypeError) as exc:
+            LOG.warning('response cache: drop corrupted entry: %r', exc)
+            self._write_store(self._store.pop, self._encode_key(key), None)
+            return None
+        if expires_at is None:
+            ttl = None
+        else:
+            ttl = expires_at - time.time()
+            if ttl <= 0:
+                self._write_store(
+                    self._store.pop, self._encode_key(key), None
+                )
+                return None
+        _, must_revalidate = self._get_policy(response)
+        self._put(key, response, len(content), ttl, must_revalidate)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._num_store_hits += 1
+        return entry
+
+    def _write_store(self, func, *args):
+        # Do not wait for store writes.
+        self._executor.submit(_call_store, func, *args)
+
+
+def _call_store(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        LOG.exception('response cache: store error: %r', func)
+
+
+def _encode_key(key):
+    return repr(key).encode('utf-8')
+
+
+def _make_conditional_headers(response):
+    headers = {}
+    etag = response.headers.get('ETag')
+    if etag:
+        headers['If-None-Match'] = etag
+    last_modified = response.headers.get('Last-Modified')
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def _get_content(response):
+    # Do not touch ``content`` of a streaming ``requests.Response``
+    # because that would read the whole body.
+    if not isinstance(response, bases.Response):
+        return None
+    content = response.content
+    return content if isinstance(content, bytes) else None
+
+
+def _parse_cache_control(header):
+    """Return max-age in seconds (0 if uncacheable) and no-cache."""
+    if not header:
+        return None, False
+    max_age = None
+    no_cache = False
+    for directive in header.split(','):
+        name, _, value = directive.strip().partition('=')
+        name = name.strip().lower()
+        if name == 'no-store':
+            return 0, False
+        if name == 'no-cache':
+            no_cache = True
+        elif name == 'max-age':
+            value = value.strip().strip('"')
+            if value.isdigit():
+                max_age = int(value)
+    return max_age, no_cache
+
+
+#
+# Store encoding: a JSON metadata line followed by the content.
+#
+
+
+def _encode_response(response, content, expires_at):
+    reason = response.reason
+    if isinstance(reason, bytes):
+        reason = reason.decode('iso-8859-1')
+    metadata = {
+        'status_code': response.status_code,
+        'url': response.url,
+        'reason': reason,
+        'encoding': response.encoding,
+        'headers': list(response.headers.items()),
+        'expires_at': expires_at,
+    }
+    return b'%s\n%s' % (json.dumps(metadata).encode('utf-8'), content)
+
+
+def _decode_response(data):
+    metadata, newline, content = data.partition(b'\n')
+    if not newline:
+        raise ValueError('expect metadata line')
+    metadata = json.loads(metadata)
+    source = _StoredSource(
+        status_code=metadata['status_code'],
+        headers=requests.structures.CaseInsensitiveDict(metadata['headers']),
+        url=metadata['url'],
+        history=[],
+        encoding=metadata['encoding'],
+        reason=metadata['reason'],
+        cookies=requests.cookies.RequestsCookieJar(),
+        elapsed=datetime.timedelta(0),
+    )
+    return bases.Response(source, content), content, metadata['expires_at']
+
+
+@dataclasses.dataclass
+class _StoredSource:
+    """Stand-in of ``requests.Response`` for ``bases.Response``."""
+    status_code: int
+    headers: requests.structures.CaseInsensitiveDict
+    url: str
+    history: list
+    encoding: str
+    reason: str
+    cookies: requests.cookies.RequestsCookieJar
+    elapsed: datetime.timedelta
@@ -3,6 +3,7 @@ __all__ = [
 ]
 
 from . import bases
+from . import natives
 
 
 class Session:
@@ -11,6 +12,9 @@ class Session:
     For most use cases, this is your go-to choice.  It supports local
     cache, rate limit, retry, and priority (when given a priority
     executor).
+
+    If ``native`` is true, requests are sent by ``NativeBaseSession``
+    from the kernel thread, rather than from executor threads.
     """
 
     def __init__(
@@ -19,9 +23,13 @@ class Session:
         executor=None,
         num_pools=0,
         num_connections_per_pool=0,
+        native=False,
         **kwargs,
     ):
-        self._base_session = bases.BaseSession(
+        base_session_type = (
+            natives.NativeBaseSession if native else bases.BaseSession
+        )
+        self._base_session = base_session_type(
             executor=executor,
             num_pools=num_pools,
             num_connections_per_pool=num_connections_per_pool,
@@ -39,6 +47,9 @@ class Session:
     def update_cookies(self, cookie_dict):
         return self._base_session.update_cookies(cookie_dict)
 
+    def get_stats(self):
+        return self._sender.get_stats()
+
     async def send(self, request, **kwargs):
         return await self._sender(request, **kwargs)
 
@@ -31,12 +31,16 @@ from g1.asyncs.bases import tasks
 from g1.bases.assertions import ASSERT
 
 from . import bases
+from . import natives
 
 
 class ClusterSession:
     """Cluster session.
 
     This multiplexes request queues of cluster stubs.
+
+    If ``cache`` or ``sticky_cache`` is given, it replaces the stubs'
+    own cache so that all stubs share one cache.
     """
 
     def __init__(
@@ -45,9 +49,15 @@ class ClusterSession:
         executor=None,
         num_pools=0,
         num_connections_per_pool=0,
+        native=False,
+        cache=None,
+        sticky_cache=None,
     ):
         ASSERT.not_empty(cluster_stubs)
-        self._base_session = bases.BaseSession(
+        base_session_type = (
+            natives.NativeBaseSession if native else bases.BaseSession
+        )
+        self._base_session = base_session_type(
             executor=executor,
             num_pools=num_pools,
             num_connections_per_pool=num_connections_per_pool,
@@ -56,6 +66,10 @@ class ClusterSession:
         for cluster_stub in self._cluster_stubs:
             ASSERT.none(cluster_stub._base_session)
             cluster_stub._base_session = self._base_session
+            if cache is not None:
+                cluster_stub._sender._cache = cache
+            if sticky_cache is not None:
+                cluster_stub._sender._sticky_cache = sticky_cache
 
     async def serve(self):
         async for tagged_item in more_queues.select(
@@ -81,6 +95,11 @@ class ClusterSession:
     def update_cookies(self, cookie_dict):
         return self._base_session.update_cookies(cookie_dict)
 
+    def get_stats(self):
+        return [
+            cluster_stub.get_stats() for cluster_stub in self._cluster_stubs
+        ]
+
     async def send(self, request, **kwargs):
         return await self._base_session.send(request, **kwargs)
 
@@ -94,8 +113,8 @@ class ClusterStub:
     All cluster stub share one cluster session.  Each cluster stub has
     its own request queue.
 
-    NOTE: Each stub has its own local cache.  If this turns out to be
-    undesirable, we could move the local cache to the cluster session.
+    NOTE: Each stub has its own local cache, unless the cluster session
+    is given a cache to share among all stubs.
 
     NOTE: On the other hand, all stubs share the cluster session's
     headers and cookies.  If this turns out to be undesirable, we could
@@ -134,6 +153,9 @@ class ClusterStub:
     def update_cookies(self, cookie_dict):
         return self._get_base_session().update_cookies(cookie_dict)
 
+    def get_stats(self):
+        return self._sender.get_stats()
+
     # Make priority a required argument.
     async def send(self, request, *, priority, **kwargs):
         return await self._sender(request, priority=priority, **kwargs)
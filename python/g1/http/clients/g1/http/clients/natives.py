@@ -0,0 +1,713 @@
+"""Native HTTP/1.1 session.
+
+``NativeBaseSession`` is a drop-in replacement of ``BaseSession`` that
+sends requests from the kernel thread over non-blocking sockets, rather
+than from executor threads through ``requests``.  It keeps a pool of
+keep-alive connections per (scheme, host, port) and decodes chunked and
+compressed response bodies by itself.
+
+We still use ``requests`` for everything that is not I/O: preparing
+requests (headers, cookies, params, body encoding), redirect handling
+rules, and the response objects; so the responses (and exceptions) look
+the same as those of ``BaseSession``, and ``Sender`` policies work
+unchanged.
+
+NOTE: The executor is only used for resolving host names.  Proxies and
+streaming responses are not supported; ``send_blocking`` is inherited
+from ``BaseSession`` and still goes through ``requests``.
+"""
+
+__all__ = [
+    'NativeBaseSession',
+]
+
+import collections
+import datetime
+import email.parser
+import http.client
+import io
+import logging
+import select
+import socket
+import ssl
+import time
+import types
+import urllib.parse
+
+import requests
+import requests.cookies
+import requests.structures
+import requests.utils
+import urllib3.exceptions
+import urllib3.response
+
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import tasks
+from g1.asyncs.bases import timers
+from g1.bases import classes
+from g1.bases.assertions import ASSERT
+
+from . import bases
+from . import recvfiles
+
+LOG = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+_RECV_SIZE = 65536
+_MAX_HEAD_SIZE = 65536
+
+# Requests of these methods may be retried on a new connection even when
+# a stale connection might have delivered them to the server (RFC 7231
+# section 4.2.2).
+_IDEMPOTENT_METHODS = frozenset([
+    'DELETE',
+    'GET',
+    'HEAD',
+    'OPTIONS',
+    'PUT',
+    'TRACE',
+])
+
+
+class NativeBaseSession(bases.BaseSession):
+
+    _SUPPORTED_KWARGS = frozenset([
+        'allow_redirects',
+        'auth',
+        'cookies',
+        'data',
+        'files',
+        'headers',
+        'json',
+        'params',
+        'timeout',
+        'verify',
+    ])
+
+    _UNVERIFIED_SSL_CONTEXT = ssl.create_default_context()
+    _UNVERIFIED_SSL_CONTEXT.check_hostname = False
+    _UNVERIFIED_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+    def __init__(
+        self,
+        *,
+        executor=None,
+        num_pools=0,
+        num_connections_per_pool=0,
+    ):
+        super().__init__(
+            executor=executor,
+            num_pools=num_pools,
+            num_connections_per_pool=num_connections_per_pool,
+        )
+        # Use the same defaults as requests.
+        self._pools = _ConnectionPools(
+            num_pools or 10,
+            num_connections_per_pool or 10,
+        )
+
+    def close(self):
+        """Close idle connections."""
+        self._pools.close()
+
+    async def send(self, request, **kwargs):
+        """Send an HTTP request and return a response.
+
+        Argument ``priority`` is accepted for interface compatibility,
+        but is ignored.  Argument ``stream`` is not supported.
+        """
+        kwargs.pop('priority', None)
+        LOG.debug('send: %r, kwargs=%r', request, kwargs)
+
+        # ``kwargs`` may overwrite ``request._kwargs``.
+        final_kwargs = request._kwargs.copy()
+        final_kwargs.update(kwargs)
+        unsupported_kwargs = final_kwargs.keys() - self._SUPPORTED_KWARGS
+        if unsupported_kwargs:
+            raise TypeError(
+                'unsupported keyword arguments: %s' %
+                ', '.join(sorted(unsupported_kwargs))
+            )
+        timeout = final_kwargs.pop('timeout', None)
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+        else:
+            connect_timeout = read_timeout = timeout
+        verify = ASSERT.isinstance(final_kwargs.pop('verify', True), bool)
+        allow_redirects = final_kwargs.pop(
+            'allow_redirects',
+            # Mimic ``requests.Session.head``.
+            request.method.upper() != 'HEAD',
+        )
+
+        prepared = self._session.prepare_request(
+            requests.Request(
+                method=request.method.upper(),
+                url=request.url,
+                **final_kwargs,
+            )
+        )
+        ASSERT.isinstance(prepared.body, (bytes, str, type(None)))
+
+        history = []
+        while True:
+            source = await self._send_prepared(
+                prepared, connect_timeout, read_timeout, verify
+            )
+            url = self._session.get_redirect_target(source)
+            if not allow_redirects or not url:
+                break
+            if len(history) >= self._session.max_redirects:
+                raise requests.TooManyRedirects(
+                    'exceeded %d redirects' % self._session.max_redirects,
+                    response=source,
+                )
+            history.append(source)
+            prepared = self._rebuild_request(prepared, source, url)
+        source.history = history
+
+        response = bases.Response(source, source.content)
+        response.raise_for_status()
+        return response
+
+    def _rebuild_request(self, prepared, source, url):
+        """Make the next request of a redirect.
+
+        This is a simpler version of ``requests.Session.resolve_redirects``.
+        """
+        if url.startswith('//'):
+            url = '%s:%s' % (urllib.parse.urlsplit(source.url).scheme, url)
+        url = urllib.parse.urljoin(source.url, url)
+        # Drop the fragment, like browsers and requests do.
+        url = urllib.parse.urldefrag(url).url
+
+        new_prepared = prepared.copy()
+        new_prepared.url = url
+        self._session.rebuild_method(new_prepared, source)
+        if source.status_code not in (
+            requests.codes.temporary_redirect,
+            requests.codes.permanent_redirect,
+        ):
+            for name in ('Content-Length', 'Content-Type', 'Transfer-Encoding'):
+                new_prepared.headers.pop(name, None)
+            new_prepared.body = None
+
+        new_prepared.headers.pop('Cookie', None)
+        new_prepared.prepare_cookies(self._session.cookies)
+        self._session.rebuild_auth(new_prepared, source)
+        return new_prepared
+
+    async def _send_prepared(
+        self, prepared, connect_timeout, read_timeout, verify
+    ):
+        url = urllib.parse.urlsplit(prepared.url)
+        if url.scheme not in _DEFAULT_PORTS:
+            raise requests.exceptions.InvalidSchema(
+                'unsupported url scheme: %r' % prepared.url,
+                request=prepared,
+            )
+        if not url.hostname:
+            raise requests.exceptions.InvalidURL(
+                'no host: %r' % prepared.url,
+                request=prepared,
+            )
+        key = (
+            url.scheme,
+            url.hostname,
+            url.port or _DEFAULT_PORTS[url.scheme],
+            verify,
+        )
+        head = _encode_head(prepared, url)
+        body = prepared.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        start = time.perf_counter()
+
+        conn = self._pools.get(key)
+        if conn is not None:
+            try:
+                return await self._exchange(
+                    conn, key, prepared, head, body, read_timeout, start
+                )
+            except _StaleConnectionError:
+                # The server has closed the idle connection before our
+                # request arrives; retry on a new connection.
+                LOG.debug('retry on a new connection: %r', prepared)
+
+        conn = await _call_with_timeout(
+            self._connect(key, prepared),
+            connect_timeout,
+            lambda: requests.ConnectTimeout(
+                'connect timeout: %r' % prepared.url,
+                request=prepared,
+            ),
+        )
+        return await self._exchange(
+            conn, key, prepared, head, body, read_timeout, start
+        )
+
+    async def _connect(self, key, prepared):
+        scheme, host, port, verify = key
+        try:
+            infos = await adapters.FutureAdapter(
+                self._executor.submit(
+                    socket.getaddrinfo,
+                    host,
+                    port,
+                    type=socket.SOCK_STREAM,
+                )
+            ).get_result()
+            sock = await _connect_any(infos)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if scheme == 'https':
+                sock = await _wrap_ssl(
+                    sock,
+                    host,
+                    self._SSL_CONTEXT
+                    if verify else self._UNVERIFIED_SSL_CONTEXT,
+                )
+        except ssl.SSLError as exc:
+            raise requests.exceptions.SSLError(exc, request=prepared)
+        except OSError as exc:
+            raise requests.ConnectionError(exc, request=prepared)
+        return _Connection(sock)
+
+    async def _exchange(
+        self, conn, key, prepared, head, body, read_timeout, start
+    ):
+        try:
+            source = await _call_with_timeout(
+                conn.exchange(prepared, head, body),
+                read_timeout,
+                lambda: requests.ReadTimeout(
+                    'read timeout: %r' % prepared.url,
+                    request=prepared,
+                ),
+            )
+        except BaseException:
+            conn.close()
+            raise
+        source.elapsed = datetime.timedelta(seconds=time.perf_counter() - start)
+        if conn.keep_alive:
+            self._pools.put(key, conn)
+        else:
+            conn.close()
+        if 'set-cookie' in source.headers:
+            self._extract_cookies(prepared, source)
+        return source
+
+    def _extract_cookies(self, prepared, source):
+        # ``extract_cookies_to_jar`` expects an urllib3 response that
+        # wraps an ``http.client.HTTPResponse``.
+        message = email.parser.Parser(_class=http.client.HTTPMessage)\
+            .parsestr(source._raw_head, headersonly=True)
+        raw = types.SimpleNamespace(
+            _original_response=types.SimpleNamespace(msg=message),
+        )
+        requests.cookies.extract_cookies_to_jar(source.cookies, prepared, raw)
+        requests.cookies.extract_cookies_to_jar(
+            self._session.cookies, prepared, raw
+        )
+
+
+class _StaleConnectionError(Exception):
+    pass
+
+
+class _ConnectionPools:
+    """Idle keep-alive connections, keyed by (scheme, host, port)."""
+
+    def __init__(self, num_pools, num_connections_per_pool):
+        self._num_pools = num_pools
+        self._num_connections_per_pool = num_connections_per_pool
+        # Pools are kept in least-recently-used order.
+        self._pools = collections.OrderedDict()
+
+    def get(self, key):
+        pool = self._pools.get(key)
+        while pool:
+            # Prefer the most-recently-used connection, which is the
+            # least likely to be closed by the server.
+            conn = pool.pop()
+            if conn.is_usable():
+                self._pools.move_to_end(key)
+                return conn
+            conn.close()
+        return None
+
+    def put(self, key, conn):
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = []
+            while len(self._pools) > self._num_pools:
+                _, evicted = self._pools.popitem(last=False)
+                for c in evicted:
+                    c.close()
+        else:
+            self._pools.move_to_end(key)
+        if len(pool) >= self._num_connections_per_pool:
+            conn.close()
+        else:
+            pool.append(conn)
+
+    def close(self):
+        for pool in self._pools.values():
+            for conn in pool:
+                conn.close()
+        self._pools.clear()
+
+
+class _Connection:
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._buffer = bytearray()
+        self._num_responses = 0
+        self.keep_alive = False
+
+    __repr__ = classes.make_repr(
+        '{self._sock!r} num_responses={self._num_responses}'
+    )
+
+    def close(self):
+        self._sock.close()
+
+    def is_usable(self):
+        """True if the connection is neither closed nor dirty."""
+        if self._buffer:
+            return False
+        # Like urllib3, consider the connection dropped if it is
+        # readable (either EOF or unexpected data).
+        poller = select.poll()
+        poller.register(self._sock.fileno(), select.POLLIN)
+        return not poller.poll(0)
+
+    async def exchange(self, prepared, head, body):
+        self.keep_alive = False
+        # NOTE: We cannot use ``sendmsg`` here since ``SSLSocket`` does
+        # not support it.
+        data = memoryview(head + body if body else head)
+        num_sent = 0
+        try:
+            while num_sent < len(data):
+                num_sent += await self._sock.send(data[num_sent:])
+            while True:
+                source = await self._recv_head(prepared)
+                # Skip interim responses (but not 101 Switching Protocols).
+                if not 100 <= source.status_code < 200:
+                    break
+                if source.status_code == requests.codes.switching_protocols:
+                    self.keep_alive = False
+                    break
+        except requests.RequestException:
+            raise
+        except (ConnectionError, _EofError) as exc:
+            # Retry a request only when the server cannot have received
+            # it, or when processing it twice is harmless.
+            if (
+                self._num_responses > 0 and not self._buffer and (
+                    num_sent == 0
+                    or prepared.method in _IDEMPOTENT_METHODS
+                )
+            ):
+                raise _StaleConnectionError from exc
+            raise requests.ConnectionError(exc, request=prepared)
+        except OSError as exc:
+            raise requests.ConnectionError(exc, request=prepared)
+        source._content = await self._recv_body(prepared, source)
+        self._num_responses += 1
+        return source
+
+    async def _recv(self):
+        data = await self._sock.recv(_RECV_SIZE)
+        if not data:
+            raise _EofError
+        return data
+
+    async def _recv_head(self, prepared):
+        start = 0
+        while True:
+            end = self._buffer.find(b'\r\n\r\n', start)
+            if end >= 0:
+                break
+            if len(self._buffer) > _MAX_HEAD_SIZE:
+                raise requests.ConnectionError(
+                    'response head size exceeds %d' % _MAX_HEAD_SIZE,
+                    request=prepared,
+                )
+            start = max(len(self._buffer) - 3, 0)
+            self._buffer += await self._recv()
+        head = bytes(self._buffer[:end])
+        del self._buffer[:end + 4]
+
+        lines = head.split(b'\r\n')
+        status_line = lines[0].split(b' ', 2)
+        if (
+            len(status_line) < 2 or \
+            not status_line[0].startswith(b'HTTP/') or
+            len(status_line[1]) != 3 or
+            not status_line[1].isdigit()
+        ):
+            raise requests.ConnectionError(
+                'invalid status line: %r' % lines[0][:64],
+                request=prepared,
+            )
+
+        source = requests.Response()
+        source.status_code = int(status_line[1])
+        source.reason = (
+            status_line[2].decode('iso-8859-1')
+            if len(status_line) > 2 else ''
+        )
+        source.url = prepared.url
+        source.request = prepared
+        source._content_consumed = True
+
+        fields = []
+        for line in lines[1:]:
+            if line[:1] in (b' ', b'\t') and fields:
+                # Obsolete line folding.
+                fields[-1][1] += b' ' + line.strip()
+                continue
+            name, sep, value = line.partition(b':')
+            if not sep or not name or name != name.strip():
+                raise requests.ConnectionError(
+                    'invalid header line: %r' % line[:64],
+                    request=prepared,
+                )
+            fields.append([name, value.strip()])
+        headers = source.headers = requests.structures.CaseInsensitiveDict()
+        for name, value in fields:
+            name = name.decode('iso-8859-1')
+            value = value.decode('iso-8859-1')
+            old_value = headers.get(name)
+            headers[name] = (
+                value if old_value is None else '%s, %s' % (old_value, value)
+            )
+        source.encoding = requests.utils.get_encoding_from_headers(headers)
+        # Keep the raw head for cookie extraction.
+        source._raw_head = head.partition(b'\r\n')[2].decode('iso-8859-1')
+
+        connection = headers.get('Connection', '').lower()
+        if status_line[0] == b'HTTP/1.0':
+            self.keep_alive = 'keep-alive' in connection
+        else:
+            self.keep_alive = 'close' not in connection
+
+        return source
+
+    async def _recv_body(self, prepared, source):
+        headers = source.headers
+        if (
+            prepared.method == 'HEAD' or
+            source.status_code in (
+                requests.codes.no_content,
+                requests.codes.not_modified,
+            ) or
+            100 <= source.status_code < 200
+        ):
+            return b''
+
+        output = io.BytesIO()
+        transfer_encoding = headers.get('Transfer-Encoding', '').lower()
+        chunked = transfer_encoding.endswith('chunked')
+        content_length = None
+        if not chunked:
+            content_length = headers.get('Content-Length')
+            if content_length is not None:
+                try:
+                    content_length = int(content_length)
+                except ValueError:
+                    content_length = -1
+                if content_length < 0:
+                    raise requests.ConnectionError(
+                        'invalid content-length: %r' %
+                        headers['Content-Length'],
+                        request=prepared,
+                    )
+        decoder = _get_content_decoder(headers)
+        if content_length is not None and decoder is None:
+            return await self._recv_exact(prepared, content_length)
+
+        chain = recvfiles.DecoderChain(output)
+        chunk_decoder = None
+        if chunked:
+            chunk_decoder = recvfiles.ChunkDecoder()
+            chain.add(chunk_decoder)
+        if decoder is not None:
+            chain.add(recvfiles.ContentDecoder(decoder))
+        try:
+            if chunked:
+                await self._recv_chunked(chain, chunk_decoder)
+            elif content_length is not None:
+                chain.write(await self._recv_exact(prepared, content_length))
+            else:
+                await self._recv_until_eof(chain)
+            chain.flush()
+        except requests.RequestException:
+            raise
+        except (
+            AssertionError,
+            ValueError,
+            urllib3.exceptions.ProtocolError,
+        ) as exc:
+            if chunked:
+                raise requests.exceptions.ChunkedEncodingError(
+                    exc, request=prepared
+                )
+            raise requests.exceptions.ContentDecodingError(
+                exc, request=prepared
+            )
+        except (OSError, _EofError) as exc:
+            raise requests.ConnectionError(exc, request=prepared)
+        except Exception as exc:
+            # Decompressors may raise their own error types.
+            raise requests.exceptions.ContentDecodingError(
+                exc, request=prepared
+            )
+        return output.getvalue()
+
+    async def _recv_exact(self, prepared, size):
+        if len(self._buffer) >= size:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+        data = bytearray(size)
+        view = memoryview(data)
+        num_received = len(self._buffer)
+        view[:num_received] = self._buffer
+        self._buffer.clear()
+        try:
+            while num_received < size:
+                n = await self._sock.recv_into(view[num_received:])
+                if n == 0:
+                    raise _EofError
+                num_received += n
+        except (OSError, _EofError) as exc:
+            raise requests.ConnectionError(
+                'incomplete read: %d of %d bytes' % (num_received, size),
+                request=prepared,
+            ) from exc
+        return bytes(data)
+
+    async def _recv_chunked(self, chain, chunk_decoder):
+        data, self._buffer = self._buffer, bytearray()
+        while True:
+            if data:
+                # NOTE: If the server sends data after the end, it is
+                # discarded, and so we cannot reuse this connection.
+                chain.write(memoryview(data))
+            if chunk_decoder.eof:
+                break
+            data = await self._sock.recv(_RECV_SIZE)
+            if not data:
+                # Some servers do not send the last CRLF.
+                self.keep_alive = False
+                break
+
+    async def _recv_until_eof(self, chain):
+        self.keep_alive = False
+        data, self._buffer = self._buffer, bytearray()
+        while data:
+            chain.write(data)
+            data = await self._sock.recv(_RECV_SIZE)
+
+
+class _EofError(Exception):
+    pass
+
+
+def _get_content_decoder(headers):
+    """Return urllib3's content decoder, as what requests does."""
+    content_encoding = headers.get('Content-Encoding', '').lower()
+    if not content_encoding:
+        return None
+    encodings = [e.strip() for e in content_encoding.split(',')]
+    decoders = urllib3.response.HTTPResponse.CONTENT_DECODERS
+    if not all(e in decoders for e in encodings if e):
+        return None
+    return urllib3.response._get_decoder(content_encoding)
+
+
+def _encode_head(prepared, url):
+    host = url.hostname
+    if ':' in host:
+        host = '[%s]' % host
+    if url.port and url.port != _DEFAULT_PORTS[url.scheme]:
+        host = '%s:%d' % (host, url.port)
+    lines = [
+        b'%s %s HTTP/1.1' % (
+            prepared.method.encode('ascii'),
+            prepared.path_url.encode('ascii'),
+        ),
+    ]
+    if 'Host' not in prepared.headers:
+        lines.append(b'Host: %s' % host.encode('idna'))
+    for name, value in prepared.headers.items():
+        if isinstance(name, str):
+            name = name.encode('iso-8859-1')
+        if isinstance(value, str):
+            value = value.encode('iso-8859-1')
+        lines.append(b'%s: %s' % (name, value))
+    lines.append(b'\r\n')
+    return b'\r\n'.join(lines)
+
+
+async def _call_with_timeout(awaitable, timeout, make_error):
+    """Await ``awaitable`` with an optional timeout.
+
+    We run it in a separate task so that this does not conflict with
+    the caller's own ``timeout_after``.
+    """
+    if timeout is None:
+        return await awaitable
+    task = tasks.spawn(awaitable)
+    async with tasks.joining(task, log_error=False):
+        timers.timeout_after(timeout, task=task)
+        await task.join()
+    try:
+        return task.get_result_nonblocking()
+    except timers.Timeout:
+        raise make_error() from None
+
+
+async def _connect_any(infos):
+    error = None
+    for family, type_, proto, _, address in infos:
+        sock = adapters.SocketAdapter(socket.socket(family, type_, proto))
+        try:
+            await sock.connect(address)
+        except OSError as exc:
+            sock.close()
+            error = exc
+            continue
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+    raise error or OSError('no address to connect to')
+
+
+async def _wrap_ssl(sock, host, ssl_context):
+    # We cannot call ``SSLSocket.connect`` since, in non-blocking mode,
+    # it resets the SSL object.  Instead, we connect the plain socket
+    # first, and then wrap it.
+    raw_sock = sock.disown()
+    try:
+        ssl_sock = ssl_context.wrap_socket(
+            raw_sock,
+            server_hostname=host,
+            do_handshake_on_connect=False,
+        )
+    except BaseException:
+        raw_sock.close()
+        raise
+    sock = adapters.SocketAdapter(ssl_sock)
+    try:
+        await sock.do_handshake()
+    except BaseException:
+        sock.close()
+        raise
+    return sock
@@ -48,6 +48,7 @@ def make_session_params(
     block_all_cookies=True,
     num_pools=0,
     num_connections_per_pool=0,
+    native=False,
     **kwargs,
 ):
     return parameters.Namespace(
@@ -58,6 +59,7 @@ def make_session_params(
         **bases.make_connection_pool_params_dict(
             num_pools=num_pools,
             num_connections_per_pool=num_connections_per_pool,
+            native=native,
         ),
     )
 
@@ -65,12 +67,13 @@ def make_session_params(
 def make_session(params, executor):
     session = clients.Session(
         executor=executor,
-        cache_size=params.cache_size.get(),
+        cache=bases.make_cache(params),
         circuit_breakers=bases.make_circuit_breakers(params),
         rate_limit=bases.make_rate_limit(params),
         retry=bases.make_retry(params),
         num_pools=params.num_pools.get(),
         num_connections_per_pool=params.num_connections_per_pool.get(),
+        native=params.native.get(),
     )
     session.headers.update(params.headers.get())
     if params.block_all_cookies.get():
@@ -1,5 +1,7 @@
 __all__ = [
     'DEFAULT_HEADERS',
+    'make_cache',
+    'make_cache_params_dict',
     'make_connection_pool_params_dict',
     'make_params_dict',
     'make_rate_limit',
@@ -8,6 +10,7 @@ __all__ = [
 
 from g1.apps import parameters
 
+from .. import caches
 from .. import policies
 
 DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
@@ -16,6 +19,8 @@ DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
 def make_params_dict(
     # Cache.
     cache_size=8,
+    cache_capacity=0,
+    cache_ttl=0,
     # Circuit breaker.
     failure_threshold=0,
     failure_period=8,
@@ -30,10 +35,10 @@ def make_params_dict(
     backoff_base=1,
 ):
     return dict(
-        cache_size=parameters.Parameter(
-            cache_size,
-            type=int,
-            validate=(0).__lt__,
+        **make_cache_params_dict(
+            cache_size=cache_size,
+            cache_capacity=cache_capacity,
+            cache_ttl=cache_ttl,
         ),
         failure_threshold=parameters.Parameter(
             failure_threshold,
@@ -81,11 +86,45 @@ def make_params_dict(
     )
 
 
+def make_cache_params_dict(
+    cache_size=8,
+    cache_capacity=0,
+    cache_ttl=0,
+):
+    return dict(
+        cache_size=parameters.Parameter(
+            cache_size,
+            type=int,
+            validate=(0).__lt__,
+        ),
+        cache_capacity=parameters.Parameter(
+            cache_capacity,
+            doc='maximum total bytes of cached responses (0 = unbounded)',
+            type=int,
+            validate=(0).__le__,
+            unit='bytes',
+        ),
+        cache_ttl=parameters.Parameter(
+            cache_ttl,
+            doc='expire cached responses after this (0 = never)',
+            type=(int, float),
+            validate=(0).__le__,
+            unit='seconds',
+        ),
+    )
+
+
 def make_connection_pool_params_dict(
     num_pools=0,
     num_connections_per_pool=0,
+    native=False,
 ):
     return dict(
+        native=parameters.Parameter(
+            native,
+            doc='send requests from the kernel thread, not executor threads',
+            type=bool,
+        ),
         num_pools=parameters.Parameter(
             num_pools,
             type=int,
@@ -99,6 +138,15 @@ def make_connection_pool_params_dict(
     )
 
 
+def make_cache(params):
+    cache_ttl = params.cache_ttl.get()
+    return caches.ResponseCache(
+        params.cache_capacity.get(),
+        max_num_entries=params.cache_size.get(),
+        ttl=cache_ttl if cache_ttl > 0 else None,
+    )
+
+
 def make_circuit_breakers(params):
     failure_threshold = params.failure_threshold.get()
     if failure_threshold <= 0:
@@ -53,14 +53,24 @@ def make_session_params(
     block_all_cookies=True,
     num_pools=0,
     num_connections_per_pool=0,
+    native=False,
+    share_cache=False,
+    **kwargs,
 ):
     return parameters.Namespace(
         'make HTTP cluster session',
         headers=parameters.Parameter(headers, type=dict),
         block_all_cookies=parameters.Parameter(block_all_cookies, type=bool),
+        share_cache=parameters.Parameter(
+            share_cache,
+            doc='share one response cache among stubs',
+            type=bool,
+        ),
+        **bases.make_cache_params_dict(**kwargs),
         **bases.make_connection_pool_params_dict(
             num_pools=num_pools,
             num_connections_per_pool=num_connections_per_pool,
+            native=native,
         ),
     )
 
@@ -78,6 +88,8 @@ def make_session(params, stubs, executor):
         executor=executor,
         num_pools=params.num_pools.get(),
         num_connections_per_pool=params.num_connections_per_pool.get(),
+        native=params.native.get(),
+        cache=bases.make_cache(params) if params.share_cache.get() else None,
     )
     session.headers.update(params.headers.get())
     if params.block_all_cookies.get():
@@ -87,7 +99,7 @@ def make_session(params, stubs, executor):
 
 def make_stub(params):
     return clusters.ClusterStub(
-        cache_size=params.cache_size.get(),
+        cache=bases.make_cache(params),
         circuit_breakers=bases.make_circuit_breakers(params),
         rate_limit=bases.make_rate_limit(params),
         retry=bases.make_retry(params),
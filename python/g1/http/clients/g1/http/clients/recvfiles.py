@@ -6,8 +6,13 @@ import contextlib
 import enum
 import http.client
 import logging
+import mmap
+import os
+import re
 import socket
 
+import urllib3.exceptions
+
 from g1.asyncs.bases import adapters
 from g1.bases import loggings
 from g1.bases import pools
@@ -15,19 +20,29 @@ from g1.bases.assertions import ASSERT
 
 LOG = logging.getLogger(__name__)
 
-_CHUNK_SIZE = 8192
+# Start with a small read size (most responses are small), and double it
+# whenever a read fills it up, up to the buffer size.
+_MIN_READ_SIZE = 16384
+_BUFFER_SIZE = 131072
 _BUFFER_POOL = pools.TimeoutPool(
-    pool_size=128,
-    allocate=lambda: bytearray(_CHUNK_SIZE),
+    pool_size=32,
+    allocate=lambda: bytearray(_BUFFER_SIZE),
     release=lambda _: None,
 )
 
 
-async def recvfile(response, file):
+async def recvfile(response, file, *, preallocate=False):
     """Receive response body into a file.
 
     The caller must set ``stream`` to true when make the request.
 
+    If ``preallocate`` is true and the body size is known in advance
+    (the body is neither chunked nor content-encoded), the file space is
+    allocated up front, and the body is received straight into a memory
+    map of the file, skipping the buffer copy and the write calls.  This
+    requires a regular file opened for reading and writing (like "w+b");
+    otherwise it falls back to writing to the preallocated file.
+
     DANGER! This breaks the multiple levels of encapsulation, from
     requests.Response all the way down to http.client.HTTPResponse.
     As a result, the response object is most likely unusable after a
@@ -71,22 +86,32 @@ async def recvfile(response, file):
         sock.setblocking(False)
         stack.callback(sock.setblocking, True)
 
+        if preallocate and not chunked and urllib3_response._decoder is None:
+            with _preallocate(file, num_to_read) as region:
+                if region is not None:
+                    num_read = await _recv_into(src, region)
+                    file.seek(num_read, os.SEEK_CUR)
+                    num_to_read -= num_read
+
         buffer = memoryview(stack.enter_context(_BUFFER_POOL.using()))
+        read_size = _MIN_READ_SIZE
         while not eof():
             if chunked:
                 # TODO: If server sends more data at the end, like
                 # response of the next request, for now recvfile might
                 # read them and then ignore them.  Maybe recvfile should
                 # check this, and not read more than it should instead?
-                num_read = await src.readinto1(buffer)
+                num_read = await src.readinto1(buffer[:read_size])
             else:
                 num_read = await src.readinto1(
-                    buffer[:min(num_to_read, _CHUNK_SIZE)]
+                    buffer[:min(num_to_read, read_size)]
                 )
             if num_read == 0:
                 break
             output.write(buffer[:num_read])
             num_to_read -= num_read
+            if num_read == read_size and read_size < _BUFFER_SIZE:
+                read_size *= 2
 
         output.flush()
 
@@ -109,6 +134,41 @@ async def recvfile(response, file):
         LOG.info('buffer pool stats: %r', _BUFFER_POOL.get_stats())
 
 
+@contextlib.contextmanager
+def _preallocate(file, size):
+    """Allocate file space, and yield a memory map of it (or None)."""
+    file.flush()
+    fd = file.fileno()
+    offset = file.tell()
+    try:
+        os.posix_fallocate(fd, offset, size)
+    except OSError:
+        # Some file systems do not support fallocate.
+        if os.fstat(fd).st_size < offset + size:
+            os.ftruncate(fd, offset + size)
+    # The mmap offset must be a multiple of ALLOCATIONGRANULARITY.
+    start = offset % mmap.ALLOCATIONGRANULARITY
+    try:
+        mapped = mmap.mmap(fd, start + size, offset=offset - start)
+    except (OSError, ValueError) as exc:
+        LOG.debug('fall back to writing to file: %r', exc)
+        yield None
+        return
+    with mapped, memoryview(mapped) as view, \
+        view[start:start + size] as region:
+        yield region
+
+
+async def _recv_into(src, region):
+    num_received = 0
+    while num_received < len(region):
+        num_read = await src.readinto1(region[num_received:])
+        if num_read == 0:
+            break
+        num_received += num_read
+    return num_received
+
+
 class DecoderChain:
 
     def __init__(self, file):
@@ -154,6 +214,10 @@ class ChunkDecoder:
     _CR = ord(b'\r')
     _LF = ord(b'\n')
 
+    _CHUNK_SIZE_END = re.compile(rb'[;\r]')
+    _CR_PATTERN = re.compile(rb'\r')
+    _CHUNK_SIZE_PATTERN = re.compile(rb'[0-9A-Fa-f]+')
+
     def __init__(self):
         self._state = self._States.CHUNK_SIZE
         self._buffer = memoryview(bytearray(16))
@@ -173,107 +237,119 @@ class ChunkDecoder:
         return output
 
     def _decode(self, data, output):
-        # pylint: disable=too-many-statements
-
-        def find(*values):
-            for i, b in enumerate(data):
-                if b in values:
-                    return i
-            return -1
-
-        while data:
-            if self._state is self._States.CHUNK_SIZE:
-                i = find(self._SEMICOLON, self._CR)
-                if i == -1:
-                    self._append_chunk_size_buffer(data)
+        # We scan ``data`` with an index rather than re-slicing it, and
+        # find delimiters with pre-compiled patterns, which work on any
+        # bytes-like object (including memoryview) without copying.
+        pos = 0
+        size = len(data)
+        while pos < size:
+            state = self._state
+
+            if state is self._States.CHUNK_DATA:
+                end = pos + self._chunk_remaining
+                if end > size:
+                    output.append(data[pos:])
+                    self._chunk_remaining = end - size
                     break
-                self._append_chunk_size_buffer(data[:i])
+                output.append(data[pos:end])
+                self._chunk_remaining = 0
+                pos = end
+                # Fast path: Skip the CRLF after chunk data.
+                if data[pos:pos + 2] == b'\r\n':
+                    self._state = self._States.CHUNK_SIZE
+                    pos += 2
+                else:
+                    self._state = self._States.CHUNK_DATA_CR
+
+            elif state is self._States.CHUNK_SIZE:
+                match = self._CHUNK_SIZE_END.search(data, pos)
+                if match is None:
+                    self._append_chunk_size_buffer(data[pos:])
+                    break
+                i = match.start()
+                self._append_chunk_size_buffer(data[pos:i])
                 if data[i] == self._SEMICOLON:
                     self._state = self._States.CHUNK_EXTENSION
                 else:
                     self._state = self._States.CHUNK_HEADER_LF
-                data = data[i + 1:]
+                pos = i + 1
 
-            elif self._state is self._States.CHUNK_EXTENSION:
-                i = find(self._CR)
-                if i == -1:
+            elif state is self._States.CHUNK_EXTENSION:
+                match = self._CR_PATTERN.search(data, pos)
+                if match is None:
                     break
                 self._state = self._States.CHUNK_HEADER_LF
-                data = data[i + 1:]
+                pos = match.end()
 
-            elif self._state is self._States.CHUNK_HEADER_LF:
-                ASSERT.equal(data[0], self._LF)
+            elif state is self._States.CHUNK_HEADER_LF:
+                ASSERT.equal(data[pos], self._LF)
                 self._chunk_remaining = self._parse_chunk_size()
                 if self._chunk_remaining == 0:
                     self._state = self._States.TRAILER_SECTION
                 else:
                     self._state = self._States.CHUNK_DATA
-                data = data[1:]
+                pos += 1
 
-            elif self._state is self._States.CHUNK_DATA:
-                if self._chunk_remaining > len(data):
-                    output.append(data)
-                    self._chunk_remaining -= len(data)
-                    break
-                self._state = self._States.CHUNK_DATA_CR
-                output.append(data[:self._chunk_remaining])
-                data = data[self._chunk_remaining:]
-                self._chunk_remaining = 0
-
-            elif self._state is self._States.CHUNK_DATA_CR:
-                ASSERT.equal(data[0], self._CR)
+            elif state is self._States.CHUNK_DATA_CR:
+                ASSERT.equal(data[pos], self._CR)
                 self._state = self._States.CHUNK_DATA_LF
-                data = data[1:]
+                pos += 1
 
-            elif self._state is self._States.CHUNK_DATA_LF:
-                ASSERT.equal(data[0], self._LF)
+            elif state is self._States.CHUNK_DATA_LF:
+                ASSERT.equal(data[pos], self._LF)
                 self._state = self._States.CHUNK_SIZE
-                data = data[1:]
+                pos += 1
 
-            elif self._state is self._States.TRAILER_SECTION:
-                i = find(self._CR)
-                if i == -1:
+            elif state is self._States.TRAILER_SECTION:
+                match = self._CR_PATTERN.search(data, pos)
+                if match is None:
                     # Re-use _chunk_remaining to track the length of the
                     # field line.
-                    self._chunk_remaining += len(data)
+                    self._chunk_remaining += size - pos
                     break
+                i = match.start()
                 self._state = self._States.TRAILER_SECTION_LF
-                self._chunk_remaining += i
-                data = data[i + 1:]
+                self._chunk_remaining += i - pos
+                pos = i + 1
 
-            elif self._state is self._States.TRAILER_SECTION_LF:
-                ASSERT.equal(data[0], self._LF)
+            elif state is self._States.TRAILER_SECTION_LF:
+                ASSERT.equal(data[pos], self._LF)
                 if self._chunk_remaining == 0:
                     self._state = self._States.END
                 else:
                     self._state = self._States.TRAILER_SECTION
                 self._chunk_remaining = 0
-                data = data[1:]
+                pos += 1
 
             else:
-                ASSERT.is_(self._state, self._States.END)
+                ASSERT.is_(state, self._States.END)
                 LOG.warning(
                     'data after the end: len(data)=%d data[:64]=%r',
-                    len(data),
-                    bytes(data[:64]),
+                    size - pos,
+                    bytes(data[pos:pos + 64]),
                 )
                 break
 
     def _append_chunk_size_buffer(self, data):
-        new_size = ASSERT.less_or_equal(
-            self._buffer_size + len(data),
-            len(self._buffer),
-        )
+        new_size = self._buffer_size + len(data)
+        if new_size > len(self._buffer):
+            raise urllib3.exceptions.ProtocolError(
+                'chunk size line is too long: %r' %
+                (bytes(self._buffer[:self._buffer_size]) + bytes(data))
+            )
         self._buffer[self._buffer_size:new_size] = data
         self._buffer_size = new_size
 
     def _parse_chunk_size(self):
-        chunk_size = int(
-            bytes(self._buffer[:self._buffer_size]),
-            base=16,
-        )
+        # The buffer has been cut at the chunk extension (if any); strip
+        # the "bad" whitespace that may precede it (RFC 9112 7.1.1).
+        chunk_size = bytes(self._buffer[:self._buffer_size]).rstrip(b' \t')
+        if not self._CHUNK_SIZE_PATTERN.fullmatch(chunk_size):
+            raise urllib3.exceptions.ProtocolError(
+                'invalid chunk size: %r' % chunk_size
+            )
         self._buffer_size = 0
-        return chunk_size
+        return int(chunk_size, base=16)
 
     def flush(self):
         # Allow calling flush when TRAILER_SECTION because some sites do
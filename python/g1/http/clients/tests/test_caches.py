@@ -0,0 +1,290 @@
+import unittest
+import unittest.mock
+
+import tempfile
+import types
+from pathlib import Path
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import locks
+from g1.asyncs.bases import tasks
+from g1.files import caches as g1_caches
+from g1.http.clients import bases
+from g1.http.clients import caches
+
+
+def make_response(content, headers=None, status_code=200):
+    return bases.Response(
+        types.SimpleNamespace(
+            status_code=status_code,
+            headers=headers or {},
+            url='http://localhost/',
+            history=[],
+            encoding='utf-8',
+            reason='OK',
+            cookies=None,
+            elapsed=None,
+        ),
+        content,
+    )
+
+
+def wait_store(cache):
+    """Wait for store writes, which are not waited for by the cache."""
+    cache._executor.submit(lambda: None).get_result()
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def assert_stats(self, cache, **kwargs):
+        stats = cache.get_stats()
+        self.assertEqual(
+            {name: getattr(stats, name) for name in kwargs},
+            kwargs,
+        )
+
+    def test_capacity(self):
+        cache = caches.ResponseCache(10)
+        r1 = make_response(b'x' * 4)
+        r2 = make_response(b'x' * 4)
+        r3 = make_response(b'x' * 4)
+        cache.set(1, r1)
+        cache.set(2, r2)
+        self.assert_stats(cache, num_entries=2, num_bytes=8, num_evictions=0)
+        self.assertIs(cache.get(1), r1)  # Make 2 the least recently used.
+        cache.set(3, r3)
+        self.assert_stats(cache, num_entries=2, num_bytes=8, num_evictions=1)
+        self.assertIs(cache.get(1), r1)
+        self.assertIsNone(cache.get(2))
+        self.assertIs(cache.get(3), r3)
+        self.assert_stats(cache, num_hits=3, num_misses=1)
+
+        cache.set(4, make_response(b'x' * 11))  # Too large.
+        self.assertIsNone(cache.get(4))
+        self.assert_stats(cache, num_entries=2, num_bytes=8)
+
+        self.assertIs(cache.pop(1), r1)
+        self.assert_stats(cache, num_entries=1, num_bytes=4)
+
+    def test_max_num_entries(self):
+        cache = caches.ResponseCache(max_num_entries=1)
+        cache.set(1, make_response(b'x'))
+        cache.set(2, make_response(b'y'))
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(2).content, b'y')
+        self.assert_stats(cache, num_entries=1, num_evictions=1)
+
+    @unittest.mock.patch.object(caches, 'time')
+    def test_ttl(self, mock_time):
+        mock_time.monotonic.return_value = 100
+        cache = caches.ResponseCache(ttl=10)
+        cache.set(1, make_response(b'x'))
+        cache.set(2, make_response(b'x', {'Cache-Control': 'max-age=5'}))
+        cache.set(3, make_response(b'x', {'Cache-Control': 'max-age=20'}))
+        cache.set(4, make_response(b'x', {'Cache-Control': 'no-store'}))
+        cache.set(5, make_response(b'x', {'Cache-Control': 'max-age=0'}))
+        cache.set(6, make_response(b'x', {'Cache-Control': 'no-cache'}))
+        self.assert_stats(cache, num_entries=4)
+        # Responses that must be revalidated are not returned by get.
+        self.assertIsNone(cache.get(6))
+
+        mock_time.monotonic.return_value = 105
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(3))
+
+        mock_time.monotonic.return_value = 110
+        self.assertIsNone(cache.get(1))
+        self.assertIsNone(cache.get(3))
+        self.assertIsNone(cache.get(6))
+        self.assert_stats(cache, num_entries=0, num_bytes=0)
+
+    def test_ignore_cache_control(self):
+        cache = caches.ResponseCache(use_cache_control=False)
+        cache.set(1, make_response(b'x', {'Cache-Control': 'no-cache'}))
+        self.assertIsNotNone(cache.get(1))
+
+    def test_parse_cache_control(self):
+        for header, expect in [
+            (None, (None, False)),
+            ('', (None, False)),
+            ('public', (None, False)),
+            ('public, max-age=60', (60, False)),
+            ('Max-Age="60"', (60, False)),
+            ('max-age=-1', (None, False)),
+            ('max-age=60, no-cache', (60, True)),
+            ('no-cache, no-store', (0, False)),
+            ('no-store', (0, False)),
+        ]:
+            with self.subTest(header):
+                self.assertEqual(caches._parse_cache_control(header), expect)
+
+    @kernels.with_kernel
+    def test_store(self):
+
+        async def send(_):
+            raise AssertionError('expect no send')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = g1_caches.Cache(Path(temp_dir), 16)
+            cache = caches.ResponseCache(store=store)
+            cache.set(
+                'k',
+                make_response(b'hello\nworld', {'Content-Type': 'text/plain'}),
+            )
+            wait_store(cache)
+
+            # Simulate a restart.
+            cache = caches.ResponseCache(store=store)
+            # ``get`` does not read the store.
+            self.assertIsNone(cache.get('k'))
+            self.assert_stats(cache, num_misses=1, num_store_hits=0)
+            response = kernels.run(cache.get_or_send('k', send))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.url, 'http://localhost/')
+            self.assertEqual(response.headers['content-type'], 'text/plain')
+            self.assertEqual(response.text, 'hello\nworld')
+            self.assert_stats(cache, num_store_hits=1, num_entries=1)
+            # Served from memory.
+            self.assertIs(cache.get('k'), response)
+            self.assert_stats(cache, num_hits=1, num_store_hits=1)
+
+            cache.pop('k')
+            wait_store(cache)
+            self.assertIsNone(store.get(caches._encode_key('k')))
+
+    @kernels.with_kernel
+    @unittest.mock.patch.object(caches, 'time')
+    def test_store_expired(self, mock_time):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = g1_caches.Cache(Path(temp_dir), 16)
+            mock_time.time.return_value = 1000
+            mock_time.monotonic.return_value = 0
+            cache = caches.ResponseCache(ttl=10, store=store)
+            cache.set('k', make_response(b'x'))
+            wait_store(cache)
+            mock_time.time.return_value = 1010
+            cache = caches.ResponseCache(store=store)
+            response = make_response(b'y')
+
+            async def send(_):
+                return response
+
+            self.assertIs(kernels.run(cache.get_or_send('k', send)), response)
+            self.assert_stats(cache, num_misses=1, num_store_hits=0)
+
+    @kernels.with_kernel
+    def test_get_or_send(self):
+        cache = caches.ResponseCache()
+        event = locks.Event()
+        responses = [make_response(b'x'), make_response(b'y')]
+
+        async def send(headers):
+            self.assertEqual(headers, {})
+            await event.wait()
+            return responses.pop(0)
+
+        async def get(revalidate=False):
+            return await cache.get_or_send(1, send, revalidate=revalidate)
+
+        t1 = tasks.spawn(get())
+        t2 = tasks.spawn(get())
+        with self.assertRaises(kernels.KernelTimeout):
+            kernels.run(timeout=0.01)
+        self.assert_stats(cache, num_misses=1, num_coalesced=1)
+        event.set()
+        kernels.run(timeout=0.01)
+        self.assertIs(t1.get_result_nonblocking(), t2.get_result_nonblocking())
+        self.assertEqual(t1.get_result_nonblocking().content, b'x')
+
+        self.assertEqual(kernels.run(get()).content, b'x')
+        self.assertEqual(kernels.run(get(revalidate=True)).content, b'y')
+        self.assertEqual(kernels.run(get()).content, b'y')
+        self.assert_stats(
+            cache,
+            num_hits=2,
+            num_misses=1,
+            num_revalidations=1,
+            num_coalesced=1,
+        )
+
+    @kernels.with_kernel
+    def test_get_or_send_error(self):
+        cache = caches.ResponseCache()
+
+        async def send(_):
+            raise Exception('some error')
+
+        for _ in range(2):
+            with self.assertRaisesRegex(Exception, r'some error'):
+                kernels.run(cache.get_or_send(1, send))
+        # Errors are not cached.
+        self.assert_stats(cache, num_misses=2, num_entries=0)
+        self.assertEqual(cache._pending, {})
+
+    @kernels.with_kernel
+    def test_get_or_send_no_cache(self):
+        cache = caches.ResponseCache()
+        headers = {
+            'Cache-Control': 'no-cache',
+            'ETag': '"v1"',
+            'Last-Modified': 'Thu, 01 Jan 1970 00:00:00 GMT',
+        }
+        responses = [
+            make_response(b'x', headers),
+            make_response(b'', status_code=304),
+            make_response(b'y', {'Cache-Control': 'no-cache'}),
+        ]
+        headers_per_call = []
+
+        async def send(headers):
+            headers_per_call.append(headers)
+            return responses.pop(0)
+
+        async def get():
+            return await cache.get_or_send(1, send)
+
+        r1 = kernels.run(get())
+        self.assertEqual(r1.content, b'x')
+        # The stored response is revalidated and reused.
+        self.assertIs(kernels.run(get()), r1)
+        # The stored response is replaced.
+        self.assertEqual(kernels.run(get()).content, b'y')
+        self.assertEqual(
+            headers_per_call,
+            [
+                {},
+                {
+                    'If-None-Match': '"v1"',
+                    'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT',
+                },
+                {
+                    'If-None-Match': '"v1"',
+                    'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT',
+                },
+            ],
+        )
+        self.assert_stats(
+            cache, num_hits=0, num_misses=1, num_revalidations=2
+        )
+
+    @kernels.with_kernel
+    def test_get_or_send_store(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = g1_caches.Cache(Path(temp_dir), 16)
+            cache = caches.ResponseCache(store=store)
+            cache.set('k', make_response(b'x'))
+            wait_store(cache)
+
+            async def send(_):
+                raise AssertionError('expect no send')
+
+            cache = caches.ResponseCache(store=store)
+            response = kernels.run(cache.get_or_send('k', send))
+            self.assertEqual(response.content, b'x')
+            self.assert_stats(cache, num_store_hits=1, num_entries=1)
+            self.assertIs(kernels.run(cache.get_or_send('k', send)), response)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,8 @@ class TestCaseBase(unittest.TestCase):
             spec_set=dir(requests.Response())
         )
         self.mock_response.status_code = status_code
+        self.mock_response.headers = {}
+        self.mock_response.content = b''
         if 400 <= status_code < 600:
             self.mock_response.raise_for_status.side_effect = \
                 requests.RequestException(response=self.mock_response)
@@ -184,19 +186,19 @@ class SessionTest(TestCaseBase):
         self, cache_stats, num_hits, num_misses, num_revalidations
     ):
         self.assertEqual(
-            cache_stats,
-            bases.Sender.CacheStats(
-                num_hits=num_hits,
-                num_misses=num_misses,
-                num_revalidations=num_revalidations,
+            (
+                cache_stats.num_hits,
+                cache_stats.num_misses,
+                cache_stats.num_revalidations,
             ),
+            (num_hits, num_misses, num_revalidations),
         )
 
     def assert_cache_stats(self, session, *args):
-        self._assert_cache_stats(session._sender._cache_stats, *args)
+        self._assert_cache_stats(session.get_stats().cache, *args)
 
     def assert_sticky_cache_stats(self, session, *args):
-        self._assert_cache_stats(session._sender._unbounded_cache_stats, *args)
+        self._assert_cache_stats(session.get_stats().sticky_cache, *args)
 
     @kernels.with_kernel
     def test_cache_key(self):
@@ -347,6 +349,36 @@ class RecvfileTest(unittest.TestCase):
         self.assertTrue(response.raw._fp.isclosed())
         self.assertIsNone(response.raw._fp.fp)
 
+    @kernels.with_kernel
+    def test_recvfile_preallocate(self):
+        test_path = Path(__file__)
+        session = clients.Session()
+        request = bases.Request(
+            'GET',
+            'http://127.0.0.1:%d/%s' % (self.server_port, test_path.name),
+        )
+        for mode, prefix in [
+            ('w+b', b''),
+            ('w+b', b'x' * 5000),
+            # mmap requires a readable file; fall back to writing.
+            ('wb', b'x' * 5000),
+        ]:
+            with self.subTest((mode, len(prefix))):
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    output_path = Path(temp_dir) / 'output'
+                    with output_path.open(mode) as output:
+                        output.write(prefix)
+                        with kernels.run(session.send(request, stream=True)) \
+                            as response:
+                            kernels.run(
+                                response.recvfile(output, preallocate=True)
+                            )
+                        output.write(b'y')
+                    self.assertEqual(
+                        output_path.read_bytes(),
+                        prefix + test_path.read_bytes() + b'y',
+                    )
+
 
 if __name__ == '__main__':
     unittest.main()
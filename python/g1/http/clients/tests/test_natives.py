@@ -0,0 +1,297 @@
+import unittest
+
+import contextlib
+import gzip
+import http.server
+import threading
+
+import requests
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import timers
+from g1.http.clients import bases
+from g1.http.clients import clients
+from g1.http.clients import natives
+
+
+class NativeBaseSessionTest(unittest.TestCase):
+
+    class TestHandler(http.server.BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        num_connections = 0
+
+        def setup(self):
+            super().setup()
+            type(self).num_connections += 1
+
+        def log_message(self, *_):
+            pass  # Suppress logging in test.
+
+        def send_body(self, status, body, headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_chunked(self, pieces, headers=()):
+            self.send_response(200)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for piece in pieces:
+                self.wfile.write(b'%x;ext=1\r\n%s\r\n' % (len(piece), piece))
+            self.wfile.write(b'0\r\nX-Trailer: 1\r\n\r\n')
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path == '/plain?x=1':
+                self.send_body(200, b'hello world')
+            elif self.path == '/chunked':
+                self.send_chunked([b'hello', b' ', b'world'])
+            elif self.path == '/gzip':
+                self.send_body(
+                    200,
+                    gzip.compress(b'hello world'),
+                    [('Content-Encoding', 'gzip')],
+                )
+            elif self.path == '/gzip-chunked':
+                data = gzip.compress(b'hello world')
+                self.send_chunked(
+                    [data[:5], data[5:]],
+                    [('Content-Encoding', 'gzip')],
+                )
+            elif self.path == '/close':
+                self.send_response(200)
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.wfile.write(b'hello world')
+                self.close_connection = True
+            elif self.path == '/redirect':
+                self.send_body(302, b'', [('Location', '/plain?x=1')])
+            elif self.path == '/cookie':
+                self.send_body(
+                    200,
+                    b'',
+                    [('Set-Cookie', 'x=1; Path=/'), ('Set-Cookie', 'y=2')],
+                )
+            elif self.path == '/echo-cookie':
+                self.send_body(
+                    200,
+                    self.headers.get('Cookie', '').encode('ascii'),
+                )
+            elif self.path == '/slow':
+                threading.Event().wait(0.2)
+                self.send_body(200, b'')
+            elif self.path == '/drop':
+                self.close_connection = True
+            else:
+                self.send_body(404, b'not found')
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            if self.path == '/echo':
+                self.send_body(200, body)
+            elif self.path == '/see-other':
+                self.send_body(303, b'', [('Location', '/plain?x=1')])
+            elif self.path == '/drop':
+                self.close_connection = True
+            else:
+                self.send_body(404, b'not found')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cls_exit_stack = contextlib.ExitStack()
+
+        cls.server = cls.cls_exit_stack.enter_context(
+            http.server.ThreadingHTTPServer(('127.0.0.1', 0), cls.TestHandler)
+        )
+        cls.server.daemon_threads = True
+
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.cls_exit_stack.callback(cls.server_thread.join)
+        cls.server_thread.start()
+
+        cls.cls_exit_stack.callback(cls.server.shutdown)
+
+        cls.server_port = cls.server.socket.getsockname()[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cls_exit_stack.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.TestHandler.num_connections = 0
+        self.session = natives.NativeBaseSession()
+
+    def tearDown(self):
+        self.session.close()
+        super().tearDown()
+
+    def send(self, method, path, **kwargs):
+        return kernels.run(
+            self.session.send(
+                bases.Request(
+                    method,
+                    'http://127.0.0.1:%d%s' % (self.server_port, path),
+                ),
+                **kwargs,
+            )
+        )
+
+    @kernels.with_kernel
+    def test_send(self):
+        for _ in range(3):
+            response = self.send('GET', '/plain', params={'x': 1})
+            self.assertIsInstance(response, bases.Response)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.reason, 'OK')
+            self.assertEqual(response.headers['content-length'], '11')
+            self.assertEqual(response.content, b'hello world')
+            self.assertEqual(response.history, [])
+        # Connection is reused.
+        self.assertEqual(self.TestHandler.num_connections, 1)
+
+        response = self.send('POST', '/echo', json={'x': 1})
+        self.assertEqual(response.json(), {'x': 1})
+        self.assertEqual(self.TestHandler.num_connections, 1)
+
+    @kernels.with_kernel
+    def test_body_decoding(self):
+        for path in ('/chunked', '/gzip', '/gzip-chunked', '/close'):
+            with self.subTest(path):
+                self.assertEqual(
+                    self.send('GET', path).content,
+                    b'hello world',
+                )
+        # Only the "close" response closes the connection.
+        self.assertEqual(self.TestHandler.num_connections, 1)
+        self.assertEqual(self.send('GET', '/chunked').content, b'hello world')
+        self.assertEqual(self.TestHandler.num_connections, 2)
+
+    @kernels.with_kernel
+    def test_redirect(self):
+        response = self.send('GET', '/redirect')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'hello world')
+        self.assertEqual(len(response.history), 1)
+        self.assertEqual(response.history[0].status_code, 302)
+
+        response = self.send('GET', '/redirect', allow_redirects=False)
+        self.assertEqual(response.status_code, 302)
+
+        response = self.send('POST', '/see-other', data=b'x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'hello world')
+
+    @kernels.with_kernel
+    def test_cookies(self):
+        response = self.send('GET', '/cookie')
+        self.assertEqual(response.cookies.get_dict(), {'x': '1', 'y': '2'})
+        self.assertEqual(self.session.cookies.get_dict(), {'x': '1', 'y': '2'})
+        self.assertEqual(
+            self.send('GET', '/echo-cookie').content,
+            b'x=1; y=2',
+        )
+
+    @kernels.with_kernel
+    def test_error(self):
+        with self.assertRaisesRegex(requests.HTTPError, r'404 client error'):
+            self.send('GET', '/no-such-path')
+        with self.assertRaises(requests.ReadTimeout):
+            self.send('GET', '/slow', timeout=0.05)
+        with self.assertRaises(requests.ConnectionError):
+            kernels.run(
+                self.session.send(
+                    bases.Request('GET', 'http://127.0.0.1:1/'),
+                )
+            )
+
+    @kernels.with_kernel
+    def test_unsupported_kwargs(self):
+        with self.assertRaisesRegex(
+            TypeError, r'unsupported keyword arguments: proxies, stream'
+        ):
+            self.send('GET', '/plain', stream=True, proxies={})
+        self.assertEqual(self.TestHandler.num_connections, 0)
+
+    @kernels.with_kernel
+    def test_timeout_nested(self):
+
+        async def send():
+            with timers.timeout_after(1):
+                return await self.session.send(
+                    bases.Request(
+                        'GET',
+                        'http://127.0.0.1:%d/slow' % self.server_port,
+                    ),
+                    timeout=(1, 1),
+                )
+
+        self.assertEqual(kernels.run(send()).status_code, 200)
+
+    @kernels.with_kernel
+    def test_stale_connection(self):
+        self.assertEqual(
+            self.send('GET', '/plain', params={'x': 1}).status_code,
+            200,
+        )
+        for pool in self.session._pools._pools.values():
+            for conn in pool:
+                # Simulate that the server closes the idle connection
+                # right after we check it.
+                conn.is_usable = lambda: True
+                conn._sock.target.shutdown(2)
+        self.assertEqual(
+            self.send('GET', '/plain', params={'x': 1}).status_code,
+            200,
+        )
+
+    @kernels.with_kernel
+    def test_stale_connection_no_retry(self):
+        for method, data, expect_num_connections in [
+            # Idempotent requests are retried on a new connection.
+            ('GET', None, 2),
+            # Non-idempotent requests are not retried.
+            ('POST', b'x', 1),
+        ]:
+            with self.subTest(method):
+                self.session.close()
+                self.session = natives.NativeBaseSession()
+                self.TestHandler.num_connections = 0
+                self.assertEqual(
+                    self.send('GET', '/plain', params={'x': 1}).status_code,
+                    200,
+                )
+                # The server receives the request but closes the
+                # connection without responding.
+                with self.assertRaises(requests.ConnectionError):
+                    self.send(method, '/drop', data=data)
+                self.assertEqual(
+                    self.TestHandler.num_connections,
+                    expect_num_connections,
+                )
+
+    @kernels.with_kernel
+    def test_session(self):
+        session = clients.Session(native=True)
+        self.assertIsInstance(session._base_session, natives.NativeBaseSession)
+        response = kernels.run(
+            session.send(
+                bases.Request(
+                    'GET',
+                    'http://127.0.0.1:%d/chunked' % self.server_port,
+                ),
+            )
+        )
+        self.assertEqual(response.content, b'hello world')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,11 @@
 import unittest
 import unittest.mock
 
+import random
 from pathlib import Path
 
+import urllib3.exceptions
+
 from g1.http.clients import recvfiles
 
 States = recvfiles.ChunkDecoder._States
@@ -211,6 +214,55 @@ class RecvfilesTest(unittest.TestCase):
         self.assertEqual(d.decode([b'0\r\n\r\nsome more data']), [])
         self.assert_chunk_decoder(d, States.END, b'', 0)
 
+    def test_chunk_decoder_chunk_size_bws(self):
+        for data in [b'a ;x\r\n', b'a\t;x\r\n', b'a \t; x\r\n']:
+            with self.subTest(data):
+                d = recvfiles.ChunkDecoder()
+                self.assertEqual(d.decode([data]), [])
+                self.assert_chunk_decoder(d, States.CHUNK_DATA, b'', 10)
+
+    def test_chunk_decoder_invalid_chunk_size(self):
+        for data in [
+            b'\r\n',
+            b'0x1\r\n',
+            b'1_0\r\n',
+            b' 1\r\n',
+            b'1 0\r\n',
+            b'1' + b' ' * 16 + b'\r\n',
+        ]:
+            with self.subTest(data):
+                d = recvfiles.ChunkDecoder()
+                with self.assertRaises(urllib3.exceptions.ProtocolError):
+                    d.decode([data])
+
+    def test_chunk_decoder_random_splits(self):
+        rand = random.Random(7)
+        content = bytes(rand.randrange(256) for _ in range(65536))
+        encoded = []
+        i = 0
+        while i < len(content):
+            n = min(rand.randrange(1, 8192), len(content) - i)
+            encoded.append(
+                b'%x%s\r\n%s\r\n' % (
+                    n,
+                    b';ext' if rand.random() < 0.5 else b'',
+                    content[i:i + n],
+                )
+            )
+            i += n
+        encoded.append(b'0\r\nTrailer: x\r\n\r\n')
+        encoded = memoryview(b''.join(encoded))
+        for _ in range(8):
+            d = recvfiles.ChunkDecoder()
+            output = []
+            i = 0
+            while i < len(encoded):
+                n = rand.randrange(1, 16384)
+                output.extend(d.decode([encoded[i:i + n]]))
+                i += n
+            self.assert_chunk_decoder(d, States.END, b'', 0)
+            self.assertEqual(b''.join(output), content)
+
     def test_chunk_decoder_one_byte_at_a_time(self):
         for content in [
             b'hello world',
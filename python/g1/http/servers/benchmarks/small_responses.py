@@ -0,0 +1,141 @@
+"""Benchmark requests per second of small responses.
+
+The server responds a small JSON body (with Content-Length), and a
+client process sends requests through a number of keep-alive
+connections, with a number of pipelined requests per connection (one by
+default).
+
+Since the client is written in Python, too, the numbers are only useful
+for comparing server-side changes.
+"""
+
+import multiprocessing
+import socket
+import sys
+import time
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import tasks
+from g1.http import servers
+from g1.networks.servers import SocketServer
+from g1.networks.servers import sockets
+
+REQUEST = b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n'
+BODY = b'{"status": "ok", "items": [1, 2, 3]}'
+
+
+async def application(environ, start_response):
+    del environ  # Unused.
+    start_response(
+        '200 OK',
+        [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(BODY))),
+        ],
+    )
+    return [BODY]
+
+
+def recv_responses(sock, num_responses):
+    """Receive responses.
+
+    It returns the number of responses received, and whether the server
+    closes the connection (in which case the rest of the pipelined
+    requests are dropped).
+    """
+    data = b''
+    num_received = 0
+    while num_received < num_responses:
+        i = data.find(b'\r\n\r\n')
+        if i >= 0 and len(data) >= i + 4 + len(BODY):
+            num_received += 1
+            if b'Connection: close' in data[:i]:
+                return num_received, True
+            data = data[i + 4 + len(BODY):]
+            continue
+        try:
+            chunk = sock.recv(65536)
+        except ConnectionResetError:
+            # The server closes the connection with unread requests.
+            return num_received, True
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return num_received, False
+
+
+def run_client(address, num_connections, depth, duration, result_sock):
+    socks = [
+        socket.create_connection(address) for _ in range(num_connections)
+    ]
+    requests = REQUEST * depth
+    num_responses = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        for sock in socks:
+            sock.sendall(requests)
+        for i, sock in enumerate(socks):
+            num_received, closed = recv_responses(sock, depth)
+            if closed:
+                # The server limits the number of requests per session.
+                sock.close()
+                socks[i] = socket.create_connection(address)
+            num_responses += num_received
+    elapsed = time.perf_counter() - start
+    for sock in socks:
+        sock.close()
+    result_sock.sendall(b'%f\n' % (num_responses / elapsed))
+    result_sock.close()
+
+
+@kernels.with_kernel
+def main(argv):
+    num_connections = int(argv[1]) if len(argv) > 1 else 16
+    duration = float(argv[2]) if len(argv) > 2 else 5
+    server_kwargs = {}
+    if len(argv) > 3:
+        server_kwargs['response_flush_threshold'] = int(argv[3])
+    depth = int(argv[4]) if len(argv) > 4 else 1
+
+    server_socket = sockets.make_server_socket(('127.0.0.1', 0))
+    result_r, result_w = socket.socketpair()
+    client = multiprocessing.get_context('fork').Process(
+        target=run_client,
+        args=(
+            server_socket.getsockname(),
+            num_connections,
+            depth,
+            duration,
+            result_w,
+        ),
+    )
+    client.start()
+    result_w.close()
+
+    server = SocketServer(
+        server_socket,
+        servers.HttpServer(server_socket, application, **server_kwargs),
+    )
+
+    async def wait_result():
+        with adapters.SocketAdapter(result_r) as sock:
+            result = await sock.recv(64)
+        server.shutdown()
+        return float(result)
+
+    server_task = tasks.spawn(server.serve)
+    requests_per_second = kernels.run(wait_result)
+    kernels.run(server_task.get_result)
+    client.join()
+
+    print(
+        'connections=%d depth=%d duration=%.1fs: %.0f requests/s' %
+        (num_connections, depth, duration, requests_per_second)
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -7,6 +7,8 @@ import socket
 import ssl
 import sys
 
+from g1.bases.assertions import ASSERT
+
 from . import wsgi
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -16,14 +18,37 @@ VERSION = '%s/v1' % __name__
 
 class HttpServer:
 
-    def __init__(self, server_socket, application):
+    # In the adaptive keep-alive mode, the keep-alive idle timeout
+    # starts shrinking when the number of connections exceeds this
+    # fraction of max_connections.
+    _ADAPTIVE_KEEP_ALIVE_LOAD = 0.5
+
+    def __init__(
+        self,
+        server_socket,
+        application,
+        *,
+        keep_alive_idle_timeout=8,
+        adaptive_keep_alive=False,
+        min_keep_alive_idle_timeout=1,
+        max_connections=0,
+        multiprocess=False,
+        **session_kwargs,
+    ):
+        """Make a HTTP server.
+
+        When ``adaptive_keep_alive`` is true, the keep-alive idle
+        timeout is shortened, down to ``min_keep_alive_idle_timeout``,
+        as the number of connections nears ``max_connections``, so that
+        idle connections are closed early, making room for new ones.
+        """
         address = server_socket.getsockname()
         is_ssl = isinstance(server_socket.target, ssl.SSLSocket)
         self._base_environ = {
             'wsgi.version': (1, 0),
             'wsgi.url_scheme': 'https' if is_ssl else 'http',
             'wsgi.multithread': True,
-            'wsgi.multiprocess': False,
+            'wsgi.multiprocess': multiprocess,
             'wsgi.run_once': False,
             'wsgi.file_wrapper': wsgi.FileWrapper,
             # Should we wrap sys.stderr in an async adapter?
@@ -35,10 +60,43 @@ class HttpServer:
             'SCRIPT_NAME': '',
         }
         self._application = application
+        self._session_kwargs = session_kwargs
+        self._num_sessions = 0
+        self._keep_alive_idle_timeout = keep_alive_idle_timeout
+        self._min_keep_alive_idle_timeout = min_keep_alive_idle_timeout
+        self._max_connections = max_connections
+        if adaptive_keep_alive and max_connections > 0:
+            ASSERT.less_or_equal(
+                min_keep_alive_idle_timeout, keep_alive_idle_timeout
+            )
+            session_kwargs['keep_alive_idle_timeout'] = \
+                self._get_keep_alive_idle_timeout
+        else:
+            session_kwargs['keep_alive_idle_timeout'] = keep_alive_idle_timeout
+
+    def _get_keep_alive_idle_timeout(self):
+        load = self._num_sessions / self._max_connections
+        if load <= self._ADAPTIVE_KEEP_ALIVE_LOAD:
+            return self._keep_alive_idle_timeout
+        # Shrink the timeout linearly.
+        ratio = min(
+            (load - self._ADAPTIVE_KEEP_ALIVE_LOAD) /
+            (1 - self._ADAPTIVE_KEEP_ALIVE_LOAD),
+            1,
+        )
+        return self._keep_alive_idle_timeout - ratio * (
+            self._keep_alive_idle_timeout - self._min_keep_alive_idle_timeout
+        )
 
     async def __call__(self, sock, address):
         base_environ = self._base_environ.copy()
         base_environ['REMOTE_ADDR'] = address[0]
         base_environ['REMOTE_PORT'] = address[1]
-        session = wsgi.HttpSession(sock, self._application, base_environ)
-        return await session()
+        session = wsgi.HttpSession(
+            sock, self._application, base_environ, **self._session_kwargs
+        )
+        self._num_sessions += 1
+        try:
+            return await session()
+        finally:
+            self._num_sessions -= 1
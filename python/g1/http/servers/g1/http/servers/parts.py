@@ -26,17 +26,134 @@ def define_server(module_path=None, **kwargs):
 def setup_server(module_labels, module_params):
     g1.networks.servers.parts.setup_server(module_labels.server, module_params)
     utils.define_maker(
-        # Although this is called a server, from the perspective of
-        # g1.networks.servers.SocketServer, this is a handler.
-        servers.HttpServer,
+        make_server,
         {
             'server_socket': module_labels.server.socket,
             'application': module_labels.application,
+            'params': module_labels.server.params,
             'return': module_labels.server.handler,
         },
     )
 
 
-def make_server_params(**kwargs):
+def make_server_params(
+    *,
+    max_request_body_size=16 * 1024 * 1024,
+    request_body_spill_size=-1,
+    response_flush_threshold=16384,
+    keep_alive_idle_timeout=8,
+    adaptive_keep_alive=False,
+    min_keep_alive_idle_timeout=1,
+    max_num_requests_per_session=1024,
+    max_num_headers=128,
+    strict_request_parsing=False,
+    send_timeout=2,
+    sendfile_timeout=8,
+    **kwargs,
+):
     kwargs.setdefault('protocols', ('http/1.1', ))
-    return g1.networks.servers.parts.make_server_params(**kwargs)
+    params = g1.networks.servers.parts.make_server_params(**kwargs)
+    return parameters.Namespace(
+        'make HTTP server',
+        **params._asdict(),
+        max_request_body_size=parameters.Parameter(
+            max_request_body_size,
+            'max request body size (0 means no limit)',
+            type=int,
+            validate=(0).__le__,
+            unit='bytes',
+        ),
+        request_body_spill_size=parameters.Parameter(
+            request_body_spill_size,
+            'read entire request body before calling the application, '
+            'spilling it to a temporary file beyond this size '
+            '(negative disables it and request body is read lazily)',
+            type=int,
+            unit='bytes',
+        ),
+        response_flush_threshold=parameters.Parameter(
+            response_flush_threshold,
+            'buffer response data and send it when its size exceeds this '
+            '(or when the application is not producing more data)',
+            type=int,
+            validate=(0).__le__,
+            unit='bytes',
+        ),
+        keep_alive_idle_timeout=parameters.Parameter(
+            keep_alive_idle_timeout,
+            'close a keep-alive connection when it is idle for this long',
+            type=(int, float),
+            validate=(0).__lt__,
+            unit='seconds',
+        ),
+        adaptive_keep_alive=parameters.Parameter(
+            adaptive_keep_alive,
+            'shorten keep-alive idle timeout, down to '
+            'min_keep_alive_idle_timeout, as the number of connections '
+            'nears max_connections',
+            type=bool,
+        ),
+        min_keep_alive_idle_timeout=parameters.Parameter(
+            min_keep_alive_idle_timeout,
+            type=(int, float),
+            validate=(0).__lt__,
+            unit='seconds',
+        ),
+        max_num_requests_per_session=parameters.Parameter(
+            max_num_requests_per_session,
+            'close a keep-alive connection after serving this many requests',
+            type=int,
+            validate=(0).__lt__,
+        ),
+        max_num_headers=parameters.Parameter(
+            max_num_headers,
+            'max number of request headers',
+            type=int,
+            validate=(0).__lt__,
+        ),
+        strict_request_parsing=parameters.Parameter(
+            strict_request_parsing,
+            'parse request head line by line, validating each line with '
+            'regular expressions (slower)',
+            type=bool,
+        ),
+        send_timeout=parameters.Parameter(
+            send_timeout,
+            type=(int, float),
+            validate=(0).__lt__,
+            unit='seconds',
+        ),
+        sendfile_timeout=parameters.Parameter(
+            sendfile_timeout,
+            type=(int, float),
+            validate=(0).__lt__,
+            unit='seconds',
+        ),
+    )
+
+
+def make_server(server_socket, application, params):
+    # Although this is called a server, from the perspective of
+    # g1.networks.servers.SocketServer, this is a handler.
+    request_body_spill_size = params.request_body_spill_size.get()
+    return servers.HttpServer(
+        server_socket,
+        application,
+        max_request_body_size=params.max_request_body_size.get(),
+        request_body_spill_size=(
+            request_body_spill_size if request_body_spill_size >= 0 else None
+        ),
+        response_flush_threshold=params.response_flush_threshold.get(),
+        keep_alive_idle_timeout=params.keep_alive_idle_timeout.get(),
+        adaptive_keep_alive=params.adaptive_keep_alive.get(),
+        min_keep_alive_idle_timeout=params.min_keep_alive_idle_timeout.get(),
+        max_connections=params.max_connections.get(),
+        multiprocess=params.num_workers.get() > 0,
+        max_num_requests_per_session=(
+            params.max_num_requests_per_session.get()
+        ),
+        max_num_headers=params.max_num_headers.get(),
+        strict_request_parsing=params.strict_request_parsing.get(),
+        send_timeout=params.send_timeout.get(),
+        sendfile_timeout=params.sendfile_timeout.get(),
+    )
@@ -8,16 +8,17 @@ __all__ = [
 import collections
 import enum
 import http
-import io
 import itertools
 import logging
 import os
 import re
 import socket
+import ssl
+import tempfile
+import time
 
 from g1.asyncs.bases import locks
 from g1.asyncs.bases import queues
-from g1.asyncs.bases import streams
 from g1.asyncs.bases import tasks
 from g1.asyncs.bases import timers
 from g1.bases.assertions import ASSERT
@@ -47,18 +48,21 @@ class FileWrapper:
 
 class HttpSession:
 
-    # TODO: Make these configurable.
-    _KEEP_ALIVE_IDLE_TIMEOUT = 8
+    # While a session is idle, it re-evaluates an adaptive keep-alive
+    # idle timeout at this interval (the timeout may change over time).
+    _IDLE_CHECK_INTERVAL = 1
 
-    # A session may stay longer even when the number of requests exceeds
-    # this number if the WSGI application explicitly set Keep-Alive in
-    # response headers.
-    #
-    # TODO: Make these configurable.
-    _MAX_NUM_REQUESTS_PER_SESSION = 1024
+    # When the application does not provide Content-Length, we buffer
+    # body chunks that are readily available, up to this size, hoping
+    # that the entire body fits and we may compute Content-Length.  If
+    # not, we fall back to chunked transfer coding (for HTTP/1.1 clients
+    # only; for others, we have to buffer the entire body).
+    _MAX_BUFFERED_BODY_SIZE = 65536
 
     _KEEP_ALIVE = (b'Connection', b'keep-alive')
     _NOT_KEEP_ALIVE = (b'Connection', b'close')
+    _CHUNKED = (b'Transfer-Encoding', b'chunked')
+    _LAST_CHUNK = b'0\r\n\r\n'
 
     _EXIT_EXC_TYPES = (
         _SessionExit,
@@ -67,11 +71,72 @@ class HttpSession:
         BrokenPipeError,
     )
 
-    def __init__(self, sock, application, base_environ):
+    def __init__(
+        self,
+        sock,
+        application,
+        base_environ,
+        *,
+        max_request_body_size=16 * 1024 * 1024,
+        request_body_spill_size=None,
+        response_flush_threshold=16384,
+        keep_alive_idle_timeout=8,
+        max_num_requests_per_session=1024,
+        max_num_headers=128,
+        strict_request_parsing=False,
+        send_timeout=2,
+        sendfile_timeout=8,
+    ):
+        """Make a HTTP session.
+
+        ``keep_alive_idle_timeout`` is either a number of seconds, or a
+        function that returns the current timeout (it is re-evaluated
+        periodically while the session is idle).
+
+        A session may stay longer even when the number of requests
+        exceeds ``max_num_requests_per_session`` if the application
+        explicitly sets Keep-Alive in response headers.
+
+        By default, the request head is parsed in one pass; when
+        ``strict_request_parsing`` is true, it is parsed line by line,
+        and each line is validated with regular expressions.
+
+        Request body size is limited to ``max_request_body_size`` (0
+        means no limit).
+
+        By default, the request body is read lazily, on the application's
+        demand.  If ``request_body_spill_size`` is not None, the entire
+        request body is read before the application is called, and the
+        part exceeding ``request_body_spill_size`` is spilled into a
+        temporary file.
+
+        Response data is buffered, and is sent when its size exceeds
+        ``response_flush_threshold``, or when the application is not
+        producing the next body chunk yet (0 effectively disables the
+        buffering of body chunks).
+        """
         self._sock = sock
         self._application = application
-        self._request_queue = _RequestQueue(self._sock, base_environ)
-        self._response_queue = _ResponseQueue(self._sock)
+        self._response_queue = _ResponseQueue(
+            self._sock,
+            response_flush_threshold,
+            send_timeout,
+            sendfile_timeout,
+        )
+        self._request_queue = _RequestQueue(
+            self._sock,
+            base_environ,
+            max_request_body_size,
+            max_num_headers,
+            strict_request_parsing,
+        )
+        self._request_body_spill_size = request_body_spill_size
+        self._is_keep_alive_adaptive = callable(keep_alive_idle_timeout)
+        if self._is_keep_alive_adaptive:
+            self._get_keep_alive_idle_timeout = keep_alive_idle_timeout
+        else:
+            self._get_keep_alive_idle_timeout = lambda: keep_alive_idle_timeout
+        self._max_num_requests_per_session = max_num_requests_per_session
 
     async def __call__(self):
         self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
@@ -80,15 +145,47 @@ class HttpSession:
                 for num_requests in itertools.count(1):
                     await self._handle_request(
                         await self._get_request(),
-                        num_requests < self._MAX_NUM_REQUESTS_PER_SESSION,
+                        num_requests < self._max_num_requests_per_session,
                     )
             except self._EXIT_EXC_TYPES as exc:
                 LOG.debug('exit session due to: %r', exc)
+            finally:
+                await self._response_queue.close()
 
     async def _get_request(self):
+        # Responses of keep-alive requests are not flushed immediately;
+        # we flush them here, before we block on the socket for reading
+        # the next request.  But if the client has pipelined the next
+        # request, we start flushing them in the background instead, so
+        # that they are not held back by the next application, while
+        # the next response, if it is ready before the flush task runs,
+        # is sent together with them.
+        if self._request_queue.has_pending_request():
+            self._response_queue.start_flush()
+        else:
+            try:
+                await self._response_queue.flush()
+            except timers.Timeout:
+                LOG.debug('send timeout')
+                raise _SessionExit from None
         try:
-            with timers.timeout_after(self._KEEP_ALIVE_IDLE_TIMEOUT):
+            await self._wait_request()
+            with timers.timeout_after(self._get_keep_alive_idle_timeout()):
                 environ = await self._request_queue.get()
+            if environ is None:
+                raise _SessionExit
+            # At the moment we do not check any expectations (except
+            # those already in _RequestQueue), and just return HTTP 100
+            # here (before the request body is read).
+            if environ.get('HTTP_EXPECT', '').lower() == '100-continue':
+                await self._response_queue.begin(
+                    http.HTTPStatus.CONTINUE, []
+                )
+                await self._response_queue.end()
+            if self._request_body_spill_size is not None:
+                await environ['wsgi.input'].spill(
+                    self._request_body_spill_size
+                )
         except _RequestError as exc:
             LOG.warning('invalid request: %s %s', exc.status, exc)
             await self._put_short_response(exc.status, False)
@@ -96,33 +193,93 @@ class HttpSession:
         except timers.Timeout:
             LOG.debug('keep-alive idle timeout')
             raise _SessionExit from None
-        if environ is None:
-            raise _SessionExit
         return environ
 
+    async def _wait_request(self):
+        """Wait until the client starts sending the next request.
+
+        When the keep-alive idle timeout is adaptive, this re-evaluates
+        it periodically, so that when it is shortened, the session is
+        closed early, even if it has become idle before that.
+        """
+        if not self._request_queue.is_idle():
+            return
+        if not self._is_keep_alive_adaptive:
+            with timers.timeout_after(self._get_keep_alive_idle_timeout()):
+                return await self._request_queue.wait()
+        start = time.monotonic()
+        while True:
+            timeout = (
+                start + self._get_keep_alive_idle_timeout() -
+                time.monotonic()
+            )
+            if timeout <= 0:
+                raise timers.Timeout
+            with timers.timeout_ignore(
+                min(timeout, self._IDLE_CHECK_INTERVAL)
+            ):
+                return await self._request_queue.wait()
+
     async def _handle_request(self, environ, keep_alive):
         # Check if client disables Keep-Alive explicitly.
         connection = environ.get('HTTP_CONNECTION')
         if connection is not None:
             keep_alive = 'keep-alive' in connection.lower()
 
-        # At the moment we do not check any expectations (except those
-        # already in _RequestQueue), and just return HTTP 100 here.
-        if environ.get('HTTP_EXPECT', '').lower() == '100-continue':
-            await self._put_short_response(
-                http.HTTPStatus.CONTINUE, keep_alive
+        context = _ApplicationContext()
+        send_task = None
+
+        def start_send_task():
+            nonlocal send_task
+            send_task = tasks.spawn(
+                self._send_response(context, environ, keep_alive)
             )
-            if not keep_alive:
-                raise _SessionExit
+            # Unblock the application if the sender exits early.
+            send_task.add_callback(lambda _: context.end_body_chunks())
+
+        # Call the application in this task.  If it calls ``write``
+        # before returning, we start sending the response concurrently,
+        # so that the (bounded) chunk queue is drained.
+        context._on_first_write = start_send_task
+        try:
+            body = await self._application(environ, context.start_response)
+            context._on_first_write = None
+            # Fast path: When the application has called start_response
+            # and returns a list of body chunks (or a file), we do not
+            # have to spawn tasks to iterate the body and to send the
+            # response concurrently.  The body is already in memory,
+            # and so it is fine to buffer all of it.
+            if (
+                send_task is None and context._status is not None
+                and isinstance(body, (list, tuple, FileWrapper))
+            ):
+                context._chunks.capacity = 0
+                await self._iterate_body(context, body)
+                await self._send_response(context, environ, keep_alive)
+                return
+        except self._EXIT_EXC_TYPES:
+            if send_task is not None:
+                send_task.cancel()
+            raise
+        except Exception as exc:
+            if send_task is not None:
+                send_task.cancel()
+                if isinstance(
+                    await send_task.get_exception(),
+                    self._EXIT_EXC_TYPES,
+                ):
+                    raise _SessionExit from None
+            await self._handle_error(exc, keep_alive)
             return
 
-        context = _ApplicationContext()
+        if send_task is None:
+            start_send_task()
         async with tasks.joining(
-            tasks.spawn(self._send_response(context, environ, keep_alive)),
+            send_task,
             always_cancel=True,
             log_error=False,  # We handle and log error below.
         ) as send_task, tasks.joining(
-            tasks.spawn(self._run_application(context, environ)),
+            tasks.spawn(self._iterate_body(context, body)),
             always_cancel=True,
             log_error=False,  # We handle and log error below.
         ) as run_task:
@@ -131,27 +288,40 @@ class HttpSession:
                     task.get_result_nonblocking()
                 except self._EXIT_EXC_TYPES:
                     raise
-                except Exception:
-                    if self._response_queue.has_begun():
-                        LOG.exception(
-                            'task crash after response starts sending: %r',
-                            task,
-                        )
-                        raise _SessionExit from None
-                    LOG.warning(
-                        'task crash before response starts sending: %r',
-                        task,
-                        exc_info=True,
-                    )
-                    await self._put_short_response(
-                        http.HTTPStatus.INTERNAL_SERVER_ERROR, keep_alive
-                    )
-                    if not keep_alive:
-                        raise _SessionExit from None
+                except Exception as exc:
+                    await self._handle_error(exc, keep_alive)
                     break
 
-    async def _run_application(self, context, environ):
-        body = await self._application(environ, context.start_response)
+    async def _handle_error(self, exc, keep_alive):
+        """Handle error raised by the application or the sender.
+
+        It either sends an error response, or raises ``_SessionExit``
+        when the session cannot be continued.
+        """
+        if isinstance(exc, _RequestError):
+            # The application reads an invalid request body; we cannot
+            # recover the session from it.
+            LOG.warning('invalid request body: %s %s', exc.status, exc)
+            if not self._response_queue.has_begun():
+                await self._put_short_response(exc.status, False)
+            raise _SessionExit from None
+        if self._response_queue.has_begun():
+            LOG.error(
+                'request handler crash after response starts sending',
+                exc_info=exc,
+            )
+            raise _SessionExit from None
+        LOG.warning(
+            'request handler crash before response starts sending',
+            exc_info=exc,
+        )
+        await self._put_short_response(
+            http.HTTPStatus.INTERNAL_SERVER_ERROR, keep_alive
+        )
+        if not keep_alive:
+            raise _SessionExit from None
+
+    async def _iterate_body(self, context, body):
         try:
             if isinstance(body, FileWrapper):
                 # TODO: Implement PEP 333's requirement of falling back
@@ -177,7 +347,7 @@ class HttpSession:
             #   2. self._application further spawns a handler task that
             #      will eventually call start_response.
             #
-            # * When `body` iterator errs out, or _run_application task
+            # * When `body` iterator errs out, or _iterate_body task
             #   gets cancelled, if end_body_chunks is called (which
             #   should not), then _send_response task is unblocked and
             #   calls context.commit.
@@ -192,7 +362,7 @@ class HttpSession:
             #
             # NOTE: This will NOT cause _send_response task being
             # blocked on get_body_chunk forever because _handle_request
-            # cancels _send_response when _run_application errs out.
+            # cancels _send_response when _iterate_body errs out.
             #
             context.end_body_chunks()
         finally:
@@ -230,21 +400,36 @@ class HttpSession:
                 self._KEEP_ALIVE if keep_alive else self._NOT_KEEP_ALIVE
             )
 
+        omit_body = self._should_omit_body(context.status, environ)
+
+        chunked = False
         if content_length is None:
             if context.file is None:
-                while chunks[-1]:
-                    chunks.append(await context.get_body_chunk())
+                # Chunked transfer coding is only for HTTP/1.1 clients.
+                # If the body is omitted, we buffer it anyway to compute
+                # the Content-Length.
+                can_chunk = (
+                    not omit_body
+                    and environ.get('SERVER_PROTOCOL') == 'HTTP/1.1'
+                )
+                chunked = not await self._buffer_body_chunks(
+                    context,
+                    chunks,
+                    self._MAX_BUFFERED_BODY_SIZE if can_chunk else None,
+                )
                 body_size = sum(map(len, chunks))
             else:
                 body_size = os.fstat(context.file.fileno()).st_size
-            context.headers.append((
-                b'Content-Length',
-                b'%d' % body_size,
-            ))
+            if chunked:
+                context.headers.append(self._CHUNKED)
+            else:
+                context.headers.append((
+                    b'Content-Length',
+                    b'%d' % body_size,
+                ))
         else:
             body_size = len(chunks[0])
 
-        omit_body = self._should_omit_body(context.status, environ)
         if omit_body:
             chunks.clear()
 
@@ -258,20 +443,22 @@ class HttpSession:
         if context.file is None:
             for chunk in chunks:
                 if not omit_body:
-                    await self._response_queue.put_body_chunk(chunk)
+                    await self._put_body_chunk(chunk, chunked)
             chunks.clear()
             while True:
-                chunk = await context.get_body_chunk()
+                chunk = await self._get_body_chunk(context)
                 if not chunk:
                     break
                 if not omit_body:
-                    await self._response_queue.put_body_chunk(chunk)
+                    await self._put_body_chunk(chunk, chunked)
                 body_size += len(chunk)
+            if chunked:
+                await self._response_queue.put_body_chunk(self._LAST_CHUNK)
         else:
             if not omit_body:
                 body_size = await self._response_queue.sendfile(context.file)
 
-        self._response_queue.end()
+        await self._response_queue.end(flush=not keep_alive)
 
         if (
             not omit_body and content_length is not None
@@ -288,6 +475,60 @@ class HttpSession:
         if not keep_alive:
             raise _SessionExit
 
+    @staticmethod
+    async def _buffer_body_chunks(context, chunks, limit):
+        """Buffer body chunks.
+
+        It returns true if the entire body is buffered.  If ``limit`` is
+        not None, it stops buffering when the application has not yet
+        produced the next chunk, or when the buffered size exceeds the
+        limit (and returns false).
+        """
+        size = sum(map(len, chunks))
+        while chunks[-1]:
+            if limit is None:
+                chunks.append(await context.get_body_chunk())
+                continue
+            if size > limit:
+                return False
+            # Give the application a chance to produce the next chunk.
+            await timers.sleep(0)
+            chunk = context.get_body_chunk_nonblocking()
+            if chunk is None:
+                return False
+            chunks.append(chunk)
+            size += len(chunk)
+        return True
+
+    async def _get_body_chunk(self, context):
+        """Get the next body chunk.
+
+        Before blocking on the application, it flushes the response
+        queue, so that the client receives what has been buffered.
+        """
+        chunk = context.get_body_chunk_nonblocking()
+        if chunk is None:
+            # Give the application a chance to produce the next chunk.
+            await timers.sleep(0)
+            chunk = context.get_body_chunk_nonblocking()
+        if chunk is None:
+            await self._response_queue.flush()
+            chunk = await context.get_body_chunk()
+        return chunk
+
+    async def _put_body_chunk(self, chunk, chunked):
+        if not chunk:
+            # Do not send an empty chunk, which is the last-chunk marker
+            # in chunked transfer coding.
+            return
+        if chunked:
+            # Put the chunk separately to avoid copying it.
+            await self._response_queue.put_body_chunk(b'%x\r\n' % len(chunk))
+            await self._response_queue.put_body_chunk(chunk)
+            await self._response_queue.put_body_chunk(b'\r\n')
+        else:
+            await self._response_queue.put_body_chunk(chunk)
+
     @staticmethod
     def _should_omit_body(status, environ):
         """Return true if response body should be omitted.
@@ -312,7 +553,7 @@ class HttpSession:
             status,
             [self._KEEP_ALIVE if keep_alive else self._NOT_KEEP_ALIVE],
         )
-        self._response_queue.end()
+        await self._response_queue.end()
 
 
 class _RequestError(Exception):
@@ -329,14 +570,169 @@ class _TooLong(Exception):
 
 class _RequestQueue:
 
-    def __init__(self, sock, base_environ):
+    def __init__(
+        self,
+        sock,
+        base_environ,
+        max_body_size,
+        max_num_headers=128,
+        strict=False,
+    ):
         self._request_buffer = _RequestBuffer(sock)
         self._base_environ = base_environ
+        self._max_body_size = max_body_size
+        self._max_num_headers = max_num_headers
+        self._strict = strict
+        self._request_body = None
+
+    def is_idle(self):
+        """True if nothing has been received after the last request."""
+        return (
+            self._request_buffer.is_empty() and (
+                self._request_body is None or self._request_body.is_ended()
+            )
+        )
+
+    async def wait(self):
+        """Wait until data (or EOF) is received from the client."""
+        await self._request_buffer.fill()
+
+    def has_pending_request(self):
+        """True if the head of the next request has been received."""
+        if (
+            self._request_body is not None
+            and not self._request_body.is_ended()
+        ):
+            return False
+        return self._request_buffer.has_data(b'\r\n\r\n')
 
-    _MAX_NUM_HEADERS = 128
+    # If the application does not read the entire request body, we
+    # discard the rest of it, up to this size, before reading the next
+    # request; beyond that, we simply end the session.
+    _MAX_DISCARD_SIZE = 65536
 
     async def get(self):
         """Return the next request or None at the end."""
+        if self._request_body is not None:
+            request_body, self._request_body = self._request_body, None
+            request_body.close()
+            try:
+                is_ended = await request_body.discard(self._MAX_DISCARD_SIZE)
+            except _RequestError as exc:
+                LOG.debug('invalid request body: %s %s', exc.status, exc)
+                is_ended = False
+            if not is_ended:
+                LOG.debug('request body is not entirely read')
+                return None
+
+        # WSGI requires that the environ argument must be a built-in
+        # Python dictionary.
+        environ = dict(self._base_environ)
+        if self._strict:
+            if not await self._get_head_strict(environ):
+                return None
+        else:
+            if not await self._get_head(environ):
+                return None
+
+        content_length = environ.get('CONTENT_LENGTH')
+        if content_length is not None:
+            try:
+                content_length = int(content_length, base=10)
+            except ValueError:
+                content_length = -1
+            if content_length < 0:
+                raise _RequestError(
+                    http.HTTPStatus.BAD_REQUEST,
+                    'invalid request Content-Length: %r' %
+                    environ['CONTENT_LENGTH'],
+                )
+            if self._max_body_size and content_length > self._max_body_size:
+                raise _RequestError(
+                    http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                    'Content-Length exceeds limit: %d' % content_length,
+                )
+
+        chunked = self._is_chunked(environ.get('HTTP_TRANSFER_ENCODING'))
+        if chunked:
+            # RFC 7230 allows Transfer-Encoding to override
+            # Content-Length, but a request with both is usually an
+            # attempt of request smuggling.
+            if content_length is not None:
+                raise _RequestError(
+                    http.HTTPStatus.BAD_REQUEST,
+                    'request has both Content-Length and Transfer-Encoding',
+                )
+            # The body is terminated by the last chunk (PEP 3333).
+            environ['wsgi.input_terminated'] = True
+
+        self._request_body = _RequestBody(
+            self._request_buffer,
+            content_length or 0,
+            chunked,
+            self._max_body_size,
+        )
+        environ['wsgi.input'] = self._request_body
+
+        return environ
+
+    # Limit of the request head (request line and headers) size.
+    _MAX_HEAD_SIZE = 65536
+
+    async def _get_head(self, environ):
+        """Read and parse the request head in one pass.
+
+        It finds the end of the head once, splits the head into lines
+        without decoding them, and decodes each header value once.
+        """
+        head = await self._request_buffer.read_head(self._MAX_HEAD_SIZE)
+        if not head:
+            return False
+        if not head.endswith(b'\r\n\r\n'):
+            # The client closes the connection in the middle of the head.
+            line, crlf, _ = head.partition(b'\r\n')
+            if not crlf:
+                raise _RequestError(
+                    http.HTTPStatus.BAD_REQUEST,
+                    'invalid request line: %r' % line.decode('iso-8859-1'),
+                )
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'incomplete request head: %r' % head.decode('iso-8859-1'),
+            )
+        # Reject bare CR and LF, which we cannot split lines with.
+        num_lines = head.count(b'\r\n')
+        if head.count(b'\r') != num_lines or head.count(b'\n') != num_lines:
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'invalid request head: %r' % head.decode('iso-8859-1'),
+            )
+        request_line, *header_lines = head[:-4].split(b'\r\n')
+        self._parse_request_line_bytes(request_line, environ)
+        if len(header_lines) > self._max_num_headers:
+            raise _RequestError(
+                http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                'number of request headers exceeds %d' %
+                self._max_num_headers,
+            )
+        headers = {}
+        names = self._HEADER_NAMES
+        for line in header_lines:
+            name, colon, value = line.partition(b':')
+            key = names.get(name) if colon else None
+            if key is None:
+                key = self._parse_header_name(name, colon, line)
+            value = value.strip(b' \t')
+            if key in headers:
+                headers[key] += b',' + value
+            else:
+                headers[key] = value
+        for key, value in headers.items():
+            environ[key] = value.decode('iso-8859-1')
+        return True
+
+    async def _get_head_strict(self, environ):
+        """Read and parse the request head line by line."""
         try:
             line = await self._request_buffer.readline_decoded()
         except _TooLong as exc:
@@ -345,11 +741,7 @@ class _RequestQueue:
                 str(exc),
             ) from None
         if not line:
-            return None
-
-        # WSGI requires that the environ argument must be a built-in
-        # Python dictionary.
-        environ = dict(self._base_environ)
+            return False
 
         self._parse_request_line(line, environ)
 
@@ -365,52 +757,50 @@ class _RequestQueue:
                 ) from None
             if line in ('', '\r\n'):
                 break
-            if num_headers >= self._MAX_NUM_HEADERS:
+            if num_headers >= self._max_num_headers:
                 raise _RequestError(
                     http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
                     'number of request headers exceeds %d' %
-                    self._MAX_NUM_HEADERS,
+                    self._max_num_headers,
                 )
             name, value = self._parse_request_header(line)
             headers[name].append(value)
             num_headers += 1
         for name, values in headers.items():
             environ[name] = ','.join(values)
+        return True
 
-        content_length = environ.get('CONTENT_LENGTH')
-        if content_length is not None:
-            try:
-                content_length = int(content_length, base=10)
-            except ValueError:
+    @staticmethod
+    def _is_chunked(transfer_encoding):
+        if transfer_encoding is None:
+            return False
+        codings = [
+            coding.strip().lower() for coding in transfer_encoding.split(',')
+        ]
+        if codings != ['chunked']:
+            # We do not support transfer codings other than chunked,
+            # and chunked must be the final coding (RFC 7230 3.3.1).
+            if codings[-1] != 'chunked':
                 raise _RequestError(
                     http.HTTPStatus.BAD_REQUEST,
-                    'invalid request Content-Length: %r' % content_length,
-                ) from None
-
-        request_body = streams.BytesStream()
-        if content_length is not None:
-            # TODO: Set the limit to 64K for now, but we should rewrite
-            # this to NOT load the entire request body into the memory.
-            if content_length > 65536:
-                raise _RequestError(
-                    http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
-                    'Content-Length exceeds limit: %d' % content_length,
+                    'invalid request Transfer-Encoding: %r' %
+                    transfer_encoding,
                 )
-            await self._request_buffer.read_into(request_body, content_length)
-        request_body.close()
-        environ['wsgi.input'] = request_body
-
-        return environ
+            raise _RequestError(
+                http.HTTPStatus.NOT_IMPLEMENTED,
+                'unsupported request Transfer-Encoding: %r' %
+                transfer_encoding,
+            )
+        return True
 
     # RFC 7230 token.
     _TOKEN = r'[a-zA-Z0-9!#$%&\'*+\-.^_`|~]+'
 
     # RFC 7230 request-target is quite complex; for now we just use
     # `[^\s]+` to match it.
-    _REQUEST_LINE_PATTERN = re.compile(
-        r'(%s) ([^\s]+) (HTTP/\d\.\d)\r\n' % _TOKEN,
-        re.ASCII,
-    )
+    _REQUEST_LINE = r'(%s) ([^\s]+) (HTTP/\d\.\d)' % _TOKEN
+
+    _REQUEST_LINE_PATTERN = re.compile(_REQUEST_LINE + r'\r\n', re.ASCII)
 
     def _parse_request_line(self, line, environ):
         match = self._REQUEST_LINE_PATTERN.fullmatch(line)
@@ -419,10 +809,36 @@ class _RequestQueue:
                 http.HTTPStatus.BAD_REQUEST,
                 'invalid request line: %r' % line,
             )
+        self._set_request_line(*match.groups(), environ)
+
+    # Unlike the line-by-line parser, the one-pass parser matches the
+    # request line without the trailing CRLF.
+    _REQUEST_LINE_BYTES_PATTERN = re.compile(
+        _REQUEST_LINE.encode('ascii'),
+        re.ASCII,
+    )
+
+    def _parse_request_line_bytes(self, line, environ):
+        match = self._REQUEST_LINE_BYTES_PATTERN.fullmatch(line)
+        if not match:
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'invalid request line: %r' % line.decode('iso-8859-1'),
+            )
         method, path, http_version = match.groups()
+        self._set_request_line(
+            method.decode('ascii'),
+            path.decode('iso-8859-1'),
+            http_version.decode('ascii'),
+            environ,
+        )
+
+    @staticmethod
+    def _set_request_line(method, path, http_version, environ):
         if http_version != 'HTTP/1.1':
             LOG.debug('request is not HTTP/1.1 but %s', http_version)
         environ['REQUEST_METHOD'] = method.upper()
+        environ['SERVER_PROTOCOL'] = http_version
         i = path.find('?')
         if i < 0:
             environ['PATH_INFO'] = path
@@ -447,10 +863,32 @@ class _RequestQueue:
                 'invalid request header: %r' % line,
             )
         name, value = match.groups()
+        return self._to_environ_key(name), value
+
+    @staticmethod
+    def _to_environ_key(name):
         name = name.upper().replace('-', '_')
         if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
             name = 'HTTP_' + name
-        return name, value
+        return name
+
+    _HEADER_NAME_PATTERN = re.compile(_TOKEN.encode('ascii'), re.ASCII)
+
+    # Map raw header names to environ keys.  It is shared among sessions
+    # and is bounded, as header names are chosen by clients.
+    _HEADER_NAMES = {}
+    _MAX_NUM_HEADER_NAMES = 1024
+
+    def _parse_header_name(self, name, colon, line):
+        if not colon or not self._HEADER_NAME_PATTERN.fullmatch(name):
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'invalid request header: %r' % line.decode('iso-8859-1'),
+            )
+        key = self._to_environ_key(name.decode('ascii'))
+        if len(self._HEADER_NAMES) < self._MAX_NUM_HEADER_NAMES:
+            self._HEADER_NAMES[name] = key
+        return key
 
 
 class _RequestBuffer:
@@ -461,6 +899,74 @@ class _RequestBuffer:
         self._size = 0
         self._ended = False
 
+    def is_empty(self):
+        return not self._buffer and not self._ended
+
+    async def fill(self):
+        """Receive data into the buffer if it is empty."""
+        if not self.is_empty():
+            return
+        data = await self._sock.recv(self._RECV_SIZE)
+        if not data:
+            self._ended = True
+        else:
+            self._buffer.append(data)
+            self._size += len(data)
+
+    async def read_head(self, limit):
+        """Read the request head, up to and including the empty line.
+
+        It returns an empty bytes at the end, and returns the partial
+        head if the client closes the connection in the middle of it.
+        """
+        # Resume the search where it left off.
+        start = 0
+        while True:
+            if self._buffer:
+                if len(self._buffer) > 1:
+                    self._buffer[:] = (b''.join(self._buffer), )
+                data = self._buffer[0]
+                i = data.find(b'\r\n\r\n', start, limit + 4)
+                if i >= 0:
+                    i += 4
+                    if i == len(data):
+                        self._buffer.clear()
+                    else:
+                        self._buffer[0] = data[i:]
+                        data = data[:i]
+                    self._size -= i
+                    return data
+                if len(data) >= limit + 4:
+                    if data.find(b'\r\n', 0, limit) < 0:
+                        raise _RequestError(
+                            http.HTTPStatus.REQUEST_URI_TOO_LONG,
+                            'request line length exceeds %d' % limit,
+                        )
+                    raise _RequestError(
+                        http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                        'request head size exceeds %d' % limit,
+                    )
+                start = max(len(data) - 3, 0)
+            if self._ended:
+                data = b''.join(self._buffer)
+                self._buffer.clear()
+                self._size = 0
+                return data
+            data = await self._sock.recv(self._RECV_SIZE)
+            if not data:
+                self._ended = True
+            else:
+                self._buffer.append(data)
+                self._size += len(data)
+
+    def has_data(self, data):
+        """True if ``data`` is in the buffer.
+
+        It may return false negative when ``data`` spans across the
+        boundary of two pieces of the buffer.
+        """
+        return any(data in piece for piece in self._buffer)
+
     async def readline_decoded(self, limit=65536):
         line = await self._readline(limit=limit)
         try:
@@ -528,24 +1034,235 @@ class _RequestBuffer:
         self._size -= len(line)
         return line
 
-    async def read_into(self, stream, size):
-        while size > 0:
-            if self._buffer:
-                if size < len(self._buffer[0]):
-                    data = self._buffer[0][:size]
-                    self._buffer[0] = self._buffer[0][size:]
-                else:
-                    data = self._buffer.pop(0)
-                self._size -= len(data)
-            elif self._ended:
-                break
+    _RECV_SIZE = 65536
+
+    async def read(self, size):
+        """Read at most ``size`` bytes from the socket.
+
+        It returns an empty bytes at the end.
+        """
+        if self._buffer:
+            if size < len(self._buffer[0]):
+                data = self._buffer[0][:size]
+                self._buffer[0] = self._buffer[0][size:]
             else:
-                data = await self._sock.recv(size)
+                data = self._buffer.pop(0)
+            self._size -= len(data)
+            return data
+        if self._ended:
+            return b''
+        data = await self._sock.recv(min(size, self._RECV_SIZE))
+        if not data:
+            self._ended = True
+        return data
+
+
+class _RequestBody:
+    """Request body stream (exposed as ``wsgi.input``).
+
+    It reads the request body from the socket lazily, on the
+    application's demand, and thus the client is flow-controlled by TCP
+    when the application reads slowly.  It also decodes chunked transfer
+    coding.
+
+    Like ``streams.BytesStream``, ``read(size)`` returns at most ``size``
+    bytes, but it may return fewer bytes before the end.
+    """
+
+    _READ_SIZE = 65536
+
+    # We do not expect chunk extensions, and so the limit is small.
+    _MAX_CHUNK_SIZE_LINE_LENGTH = 1024
+
+    _CHUNK_SIZE_PATTERN = re.compile(
+        rb'([0-9a-fA-F]+)[ \t]*(?:;[^\r\n]*)?\r\n'
+    )
+
+    def __init__(self, request_buffer, content_length, chunked, max_size):
+        self._request_buffer = request_buffer
+        self._chunked = chunked
+        self._max_size = max_size
+        # Number of bytes remaining in the current chunk, or in the
+        # entire body if it is not chunked.
+        self._remaining = 0 if chunked else content_length
+        # Total size of chunks (for checking against ``max_size``).
+        self._size = 0
+        # Set when the last chunk is read.
+        self._ended = False
+        # Data read from the request buffer but not yet consumed.
+        self._pending = b''
+        # Set when the body is spilled.
+        self._file = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        line = await self.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+    async def read(self, size=-1):
+        if self._file is not None:
+            return self._file.read(size)
+        if size is not None and size >= 0:
+            return await self._read(size) if size > 0 else b''
+        parts = []
+        while True:
+            data = await self._read(self._READ_SIZE)
+            if not data:
+                break
+            parts.append(data)
+        return b''.join(parts)
+
+    async def readline(self, size=-1):
+        if self._file is not None:
+            return self._file.readline(size)
+        if size is None or size < 0:
+            size = float('+inf')
+        parts = []
+        num_read = 0
+        while num_read < size:
+            data = await self._read(min(size - num_read, self._READ_SIZE))
+            if not data:
+                break
+            i = data.find(b'\n') + 1
+            if i > 0:
+                self._pending = data[i:] + self._pending
+                parts.append(data[:i])
+                break
+            parts.append(data)
+            num_read += len(data)
+        return b''.join(parts)
+
+    async def readlines(self, hint=None):
+        if hint is None or hint <= 0:
+            hint = float('+inf')
+        lines = []
+        num_read = 0
+        async for line in self:
+            lines.append(line)
+            num_read += len(line)
+            if num_read >= hint:
+                break
+        return lines
+
+    async def spill(self, max_memory_size):
+        """Read the entire body into a temporary file.
+
+        The first ``max_memory_size`` bytes are kept in memory, and the
+        rest are written to the disk (if ``max_memory_size`` is zero,
+        the entire body is written to the disk).
+        """
+        ASSERT.none(self._file)
+        if max_memory_size > 0:
+            file = tempfile.SpooledTemporaryFile(max_size=max_memory_size)
+        else:
+            file = tempfile.TemporaryFile()
+        try:
+            while True:
+                data = await self._read(self._READ_SIZE)
                 if not data:
-                    self._ended = True
                     break
-            size -= len(data)
-            stream.write_nonblocking(data)
+                # NOTE: This blocks the kernel thread, but for a
+                # temporary file, it should mostly hit the page cache.
+                file.write(data)
+            file.seek(0)
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+
+    async def discard(self, limit):
+        """Discard the rest of the body, up to ``limit`` bytes.
+
+        It returns true if it reaches the end of the body.
+        """
+        if self._file is not None:
+            return True
+        num_discarded = 0
+        while num_discarded <= limit:
+            data = await self._read(self._READ_SIZE)
+            if not data:
+                return True
+            num_discarded += len(data)
+        return False
+
+    def is_ended(self):
+        """True if the entire body has been read from the socket."""
+        if self._file is not None:
+            return True
+        return not self._pending and self._remaining == 0 and (
+            not self._chunked or self._ended
+        )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    async def _read(self, size):
+        if self._pending:
+            data = self._pending[:size]
+            self._pending = self._pending[size:]
+            return data
+        if self._remaining == 0:
+            if not self._chunked or self._ended:
+                return b''
+            await self._read_chunk_size()
+            if self._ended:
+                return b''
+        data = await self._request_buffer.read(min(size, self._remaining))
+        if not data:
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'incomplete request body',
+            )
+        self._remaining -= len(data)
+        if self._chunked and self._remaining == 0:
+            if await self._readline(2) != b'\r\n':
+                raise _RequestError(
+                    http.HTTPStatus.BAD_REQUEST,
+                    'invalid request chunk ending',
+                )
+        return data
+
+    async def _read_chunk_size(self):
+        line = await self._readline(self._MAX_CHUNK_SIZE_LINE_LENGTH)
+        match = self._CHUNK_SIZE_PATTERN.fullmatch(line)
+        if not match:
+            raise _RequestError(
+                http.HTTPStatus.BAD_REQUEST,
+                'invalid request chunk size: %r' % line,
+            )
+        chunk_size = int(match.group(1), 16)
+        if chunk_size == 0:
+            # We do not expose trailer fields to the application.
+            while True:
+                line = await self._readline(65536)
+                if line == b'\r\n':
+                    break
+                if not line.endswith(b'\n'):
+                    raise _RequestError(
+                        http.HTTPStatus.BAD_REQUEST,
+                        'incomplete request trailer: %r' % line,
+                    )
+            self._ended = True
+            return
+        self._size += chunk_size
+        if self._max_size and self._size > self._max_size:
+            raise _RequestError(
+                http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                'request body size exceeds limit: %d' % self._max_size,
+            )
+        self._remaining = chunk_size
+
+    async def _readline(self, limit):
+        try:
+            return await self._request_buffer._readline(limit=limit)
+        except _TooLong as exc:
+            raise _RequestError(http.HTTPStatus.BAD_REQUEST, str(exc)) \
+                from None
 
 
 @enum.unique
@@ -565,6 +1282,8 @@ class _ApplicationContext:
         # Set capacity to 1 to prevent excessive buffering.
         self._chunks = queues.Queue(capacity=1)
         self.file = None
+        # Called on the first ``write`` call (if it is not None).
+        self._on_first_write = None
 
     def start_response(self, status, response_headers, exc_info=None):
         if exc_info:
@@ -616,6 +1335,15 @@ class _ApplicationContext:
         except queues.Closed:
             return b''
 
+    def get_body_chunk_nonblocking(self):
+        """Return a chunk, or b'' at the end, or None if not ready."""
+        try:
+            return self._chunks.get_nonblocking()
+        except queues.Empty:
+            return None
+        except queues.Closed:
+            return b''
+
     async def put_body_chunk(self, chunk):
         ASSERT.is_not(self._send_mechanism, _SendMechanisms.SENDFILE)
         self._send_mechanism = _SendMechanisms.SEND
@@ -625,6 +1353,9 @@ class _ApplicationContext:
     # According to WSGI spec, `write` is only intended for maintaining
     # backward compatibility.
     async def write(self, data):
+        if self._on_first_write is not None:
+            on_first_write, self._on_first_write = self._on_first_write, None
+            on_first_write()
         await self.put_body_chunk(data)
         return len(data)
 
@@ -640,39 +1371,60 @@ class _ApplicationContext:
 
 
 class _ResponseQueue:
+    """Queue of response data to be sent.
+
+    To reduce the number of send syscalls (and TCP segments), it buffers
+    status line, headers, and body chunks, and sends them together in
+    one ``sendmsg`` call when ``flush`` is called or when the buffered
+    data size exceeds ``flush_threshold``.
+    """
 
-    # These timeouts are for preventing a client who refuses to receive
-    # data blocking send/sendfile forever.
-    #
-    # TODO: Make these configurable.
-    _SEND_TIMEOUT = 2
-    _SENDFILE_TIMEOUT = 8
+    # Linux's IOV_MAX.
+    _MAX_NUM_BUFFERS = 1024
 
     _ENCODED_REASONS = {
         status: status.phrase.encode('iso-8859-1')
         for status in http.HTTPStatus
     }
 
-    def __init__(self, sock):
+    def __init__(
+        self,
+        sock,
+        flush_threshold=16384,
+        send_timeout=2,
+        sendfile_timeout=8,
+    ):
         self._sock = sock
+        # These timeouts are for preventing a client who refuses to
+        # receive data blocking send/sendfile forever.
+        self._send_timeout = send_timeout
+        self._sendfile_timeout = sendfile_timeout
+        # SSLSocket does not support sendmsg.
+        self._can_sendmsg = (
+            hasattr(sock, 'sendmsg')
+            and not isinstance(getattr(sock, 'target', None), ssl.SSLSocket)
+        )
+        self._flush_threshold = flush_threshold
         self._has_begun = False
-        self._headers_sent = locks.Event()
         self._send_mechanism = _SendMechanisms.UNDECIDED
+        self._buffers = collections.deque()
+        self._buffered_size = 0
+        self._flush_lock = locks.Lock()
+        self._flush_task = None
 
     async def begin(self, status, headers):
         ASSERT.false(self._has_begun)
         self._has_begun = True
-
-        buffer = io.BytesIO()
-        buffer.write(
-            b'HTTP/1.1 %d %s\r\n' % (status, self._ENCODED_REASONS[status])
+        # Do not flush here; the status line and headers are sent along
+        # with the first body chunk.
+        self._append(
+            b''.join((
+                b'HTTP/1.1 %d %s\r\n' %
+                (status, self._ENCODED_REASONS[status]),
+                *(b'%s: %s\r\n' % header for header in headers),
+                b'\r\n',
+            ))
         )
-        for key, value in headers:
-            buffer.write(b'%s: %s\r\n' % (key, value))
-        buffer.write(b'\r\n')
-
-        await self._send_all(buffer.getvalue())
-        self._headers_sent.set()
 
     def has_begun(self):
         return self._has_begun
@@ -681,9 +1433,10 @@ class _ResponseQueue:
         ASSERT.true(self._has_begun)
         ASSERT.is_not(self._send_mechanism, _SendMechanisms.SENDFILE)
         self._send_mechanism = _SendMechanisms.SEND
-        await self._headers_sent.wait()
         if chunk:
-            await self._send_all(chunk)
+            self._append(chunk)
+            if self._buffered_size >= self._flush_threshold:
+                await self.flush()
 
     async def sendfile(self, file):
         ASSERT.true(self._has_begun)
@@ -691,20 +1444,82 @@ class _ResponseQueue:
         ASSERT.is_(self._send_mechanism, _SendMechanisms.UNDECIDED)
         ASSERT.not_none(file)
         self._send_mechanism = _SendMechanisms.SENDFILE
-        await self._headers_sent.wait()
-        with timers.timeout_after(self._SENDFILE_TIMEOUT):
+        await self.flush()
+        with timers.timeout_after(self._sendfile_timeout):
             return await self._sock.sendfile(file)
 
-    def end(self):
+    def start_flush(self):
+        """Start flushing buffered data in a background task.
+
+        The task does not run until the caller blocks, and so data that
+        is put into the queue before that is sent along with it.  Errors
+        of the task are raised by the next ``flush`` call.
+        """
+        if self._buffers and self._flush_task is None:
+            self._flush_task = tasks.spawn(self._flush())
+
+    async def flush(self):
+        if self._flush_task is not None:
+            flush_task, self._flush_task = self._flush_task, None
+            await flush_task.get_result()
+        await self._flush()
+
+    async def close(self):
+        """Cancel the background flush task, if any."""
+        if self._flush_task is not None:
+            flush_task, self._flush_task = self._flush_task, None
+            flush_task.cancel()
+            await flush_task.join()
+
+    async def _flush(self):
+        if not self._buffers:
+            return
+        async with self._flush_lock:
+            while self._buffers:
+                with timers.timeout_after(self._send_timeout):
+                    num_sent = await self._send_buffers()
+                self._consume(num_sent)
+
+    async def end(self, flush=True):
+        """End the response.
+
+        When ``flush`` is false, the response is left in the buffer
+        (unless the buffer is full) and is sent along with the next
+        response or by the next ``flush`` call.
+        """
         ASSERT.true(self._has_begun)
-        ASSERT.true(self._headers_sent.is_set())
+        if flush or self._buffered_size >= self._flush_threshold:
+            await self.flush()
         self._has_begun = False
-        self._headers_sent.clear()
         self._send_mechanism = _SendMechanisms.UNDECIDED
 
-    async def _send_all(self, data):
-        data = memoryview(data)
-        num_sent = 0
-        while num_sent < len(data):
-            with timers.timeout_after(self._SEND_TIMEOUT):
-                num_sent += await self._sock.send(data[num_sent:])
+    def _append(self, data):
+        self._buffers.append(data)
+        self._buffered_size += len(data)
+
+    async def _send_buffers(self):
+        if len(self._buffers) == 1:
+            return await self._sock.send(self._buffers[0])
+        if self._can_sendmsg:
+            # Materialize the buffers because ``sendmsg`` may be retried
+            # (when the socket is not writable yet), and an iterator would
+            # have been exhausted by the first try.
+            return await self._sock.sendmsg(
+                tuple(itertools.islice(self._buffers, self._MAX_NUM_BUFFERS))
+            )
+        # Fall back to joining buffers, which, for an SSL socket, also
+        # produces fewer TLS records.
+        data = b''.join(self._buffers)
+        self._buffers.clear()
+        self._buffers.append(data)
+        return await self._sock.send(data)
+
+    def _consume(self, num_sent):
+        self._buffered_size -= num_sent
+        while num_sent:
+            size = len(self._buffers[0])
+            if num_sent < size:
+                self._buffers[0] = memoryview(self._buffers[0])[num_sent:]
+                break
+            self._buffers.popleft()
+            num_sent -= size
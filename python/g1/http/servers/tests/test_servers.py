@@ -0,0 +1,58 @@
+import unittest
+import unittest.mock
+
+from g1.http import servers
+
+
+class HttpServerTest(unittest.TestCase):
+
+    def make_server(self, **kwargs):
+        mock_sock = unittest.mock.Mock()
+        mock_sock.getsockname.return_value = ('127.0.0.1', 8000)
+        return servers.HttpServer(mock_sock, None, **kwargs)
+
+    def test_keep_alive_idle_timeout(self):
+        server = self.make_server(
+            keep_alive_idle_timeout=8,
+            max_connections=10,
+        )
+        self.assertEqual(server._session_kwargs['keep_alive_idle_timeout'], 8)
+        # max_connections is required in the adaptive mode.
+        server = self.make_server(
+            keep_alive_idle_timeout=8,
+            adaptive_keep_alive=True,
+        )
+        self.assertEqual(server._session_kwargs['keep_alive_idle_timeout'], 8)
+
+    def test_adaptive_keep_alive(self):
+        server = self.make_server(
+            keep_alive_idle_timeout=8,
+            adaptive_keep_alive=True,
+            min_keep_alive_idle_timeout=2,
+            max_connections=10,
+        )
+        get_timeout = server._session_kwargs['keep_alive_idle_timeout']
+        for num_sessions, expect in [
+            (0, 8),
+            (5, 8),
+            (6, 6.8),
+            (8, 4.4),
+            (10, 2),
+            (11, 2),
+        ]:
+            with self.subTest(num_sessions):
+                server._num_sessions = num_sessions
+                self.assertAlmostEqual(get_timeout(), expect)
+
+    def test_adaptive_keep_alive_invalid_timeout(self):
+        with self.assertRaises(AssertionError):
+            self.make_server(
+                keep_alive_idle_timeout=1,
+                adaptive_keep_alive=True,
+                min_keep_alive_idle_timeout=2,
+                max_connections=10,
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,14 @@ import unittest.mock
 
 import contextlib
 import http
+import socket
 
 from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
 from g1.asyncs.bases import locks
 from g1.asyncs.bases import queues
-from g1.asyncs.bases import streams
 from g1.asyncs.bases import tasks
+from g1.asyncs.bases import timers
 from g1.http.servers import wsgi
 
 
@@ -58,9 +60,13 @@ class HttpSessionTest(unittest.TestCase):
             b'\r\n',
         )
 
-        session = wsgi.HttpSession(self.mock_sock, None, {})
+        # The application returns an iterator, which is not handled by
+        # the fast path.
+        mock_app = unittest.mock.AsyncMock()
+        mock_app.return_value = iter(())
+        session = wsgi.HttpSession(self.mock_sock, mock_app, {})
         session._send_response = unittest.mock.AsyncMock()
-        session._run_application = unittest.mock.AsyncMock()
+        session._iterate_body = unittest.mock.AsyncMock()
         for (
             keep_alive,
             send_response,
@@ -98,7 +104,7 @@ class HttpSessionTest(unittest.TestCase):
                     session._response_queue.has_begun(), has_begun
                 )
                 session._send_response.side_effect = send_response
-                session._run_application.side_effect = run_application
+                session._iterate_body.side_effect = run_application
 
                 if expect_keep_alive:
                     kernels.run(
@@ -114,44 +120,267 @@ class HttpSessionTest(unittest.TestCase):
                 self.assert_send(*expect_send)
 
     @kernels.with_kernel
-    def test_handle_request_100_continue(self):
+    def test_handle_request_invalid_request_body(self):
+        mock_app = unittest.mock.AsyncMock()
+        mock_app.side_effect = wsgi._RequestError(
+            http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'some error'
+        )
+        session = wsgi.HttpSession(self.mock_sock, mock_app, {})
+        session._send_response = unittest.mock.AsyncMock()
+        with self.assertRaises(wsgi._SessionExit):
+            kernels.run(session._handle_request({}, True), timeout=0.01)
+        self.assert_send(
+            b'HTTP/1.1 413 Request Entity Too Large\r\n'
+            b'Connection: close\r\n'
+            b'\r\n'
+        )
+
+    @kernels.with_kernel
+    def test_handle_request_fast_path(self):
+
+        async def app(environ, start_response):
+            del environ  # Unused.
+            start_response('200 OK', [('Content-Length', '6')])
+            return [b'hello', b'', b'\n']
+
+        session = wsgi.HttpSession(self.mock_sock, app, {})
+        with unittest.mock.patch.object(wsgi.tasks, 'spawn') as mock_spawn:
+            kernels.run(
+                session._handle_request({'REQUEST_METHOD': 'GET'}, True),
+                timeout=0.01,
+            )
+            mock_spawn.assert_not_called()
+        # Keep-alive responses are not flushed immediately.
+        self.mock_sock.send.assert_not_called()
+        kernels.run(session._response_queue.flush(), timeout=0.01)
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 6\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'hello\n'
+        )
+
+    @kernels.with_kernel
+    def test_handle_request_write(self):
+        max_queue_sizes = []
+
+        async def app(environ, start_response):
+            del environ  # Unused.
+            write = start_response('200 OK', [('Content-Length', '8')])
+            for chunk in (b'a', b'b', b'c', b'd'):
+                await write(chunk)
+                max_queue_sizes.append(len(write.__self__._chunks))
+            return [b'efgh']
+
+        session = wsgi.HttpSession(self.mock_sock, app, {})
+        with self.assertRaises(wsgi._SessionExit):
+            kernels.run(
+                session._handle_request({'REQUEST_METHOD': 'GET'}, False),
+                timeout=0.01,
+            )
+        # Body chunks written by the application are drained
+        # concurrently, rather than buffered in memory.
+        self.assertLessEqual(max(max_queue_sizes), 1)
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 8\r\n'
+            b'Connection: close\r\n'
+            b'\r\n'
+            b'abcdefgh'
+        )
+
+    @kernels.with_kernel
+    def test_handle_request_fast_path_error(self):
+        mock_app = unittest.mock.AsyncMock()
+        mock_app.side_effect = ValueError
+        session = wsgi.HttpSession(self.mock_sock, mock_app, {})
+        kernels.run(session._handle_request({}, True), timeout=0.01)
+        self.assert_send(
+            b'HTTP/1.1 500 Internal Server Error\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+        )
+
+    @kernels.with_kernel
+    def test_pipelining(self):
+
+        async def app(environ, start_response):
+            path = environ['PATH_INFO'].encode('ascii')
+            start_response('200 OK', [('Content-Length', str(len(path)))])
+            return [path]
+
+        self.mock_sock = unittest.mock.MagicMock(
+            spec_set=[
+                'recv', 'send', 'sendfile', 'setsockopt', '__enter__',
+                '__exit__'
+            ]
+        )
+        self.mock_sock.recv = unittest.mock.AsyncMock()
+        self.mock_sock.send = unittest.mock.AsyncMock()
+        self.mock_sock.send.side_effect = self.mock_send
+        self.mock_sock.recv.side_effect = [
+            b'GET /a HTTP/1.1\r\n\r\nGET /b HTTP/1.1\r\n\r\n',
+            b'GET /c HTTP/1.1\r\n\r\n',
+            b'',
+        ]
+        session = wsgi.HttpSession(self.mock_sock, app, {})
+        kernels.run(session(), timeout=0.01)
+        # Responses of pipelined requests are sent together.
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 2\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'/a'
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 2\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'/b',
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 2\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'/c',
+        )
+        self.assertEqual(self.mock_sock.send.call_count, 2)
+
+    @kernels.with_kernel
+    def test_pipelining_slow_application(self):
+        num_sends = []
+
+        async def app(environ, start_response):
+            path = environ['PATH_INFO'].encode('ascii')
+            if path == b'/b':
+                await timers.sleep(0.001)
+                num_sends.append(self.mock_sock.send.call_count)
+            start_response('200 OK', [('Content-Length', str(len(path)))])
+            return [path]
+
+        self.mock_sock = unittest.mock.MagicMock(
+            spec_set=[
+                'recv', 'send', 'sendfile', 'setsockopt', '__enter__',
+                '__exit__'
+            ]
+        )
+        self.mock_sock.recv = unittest.mock.AsyncMock()
+        self.mock_sock.send = unittest.mock.AsyncMock()
+        self.mock_sock.send.side_effect = self.mock_send
+        self.mock_sock.recv.side_effect = [
+            b'GET /a HTTP/1.1\r\n\r\nGET /b HTTP/1.1\r\n\r\n',
+            b'',
+        ]
+        session = wsgi.HttpSession(self.mock_sock, app, {})
+        kernels.run(session(), timeout=0.01)
+        # The response of the first request is not held back by the
+        # slow application of the second request.
+        self.assertEqual(num_sends, [1])
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 2\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'/a',
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Length: 2\r\n'
+            b'Connection: keep-alive\r\n'
+            b'\r\n'
+            b'/b',
+        )
+        self.assertEqual(self.mock_sock.send.call_count, 2)
+
+    @kernels.with_kernel
+    def test_wait_request(self):
+        self.mock_sock.recv.return_value = b'GET'
         session = wsgi.HttpSession(self.mock_sock, None, {})
-        for conn_header, keep_alive, expect_keep_alive in [
-            ('Keep-Alive', True, True),
-            ('Keep-Alive', False, True),
-            ('close', True, False),
-            ('close', False, False),
-            (None, True, True),
-            (None, False, False),
+        self.assertTrue(session._request_queue.is_idle())
+        kernels.run(session._wait_request(), timeout=0.01)
+        self.assertFalse(session._request_queue.is_idle())
+        # It returns immediately when the buffer is not empty.
+        kernels.run(session._wait_request(), timeout=0.01)
+        self.mock_sock.recv.assert_called_once()
+
+    @kernels.with_kernel
+    def test_wait_request_timeout_fixed(self):
+
+        async def wait():
+            await locks.Event().wait()
+
+        session = wsgi.HttpSession(
+            self.mock_sock, None, {}, keep_alive_idle_timeout=0.05
+        )
+        session._IDLE_CHECK_INTERVAL = 0.01
+        session._request_queue.wait = unittest.mock.AsyncMock()
+        session._request_queue.wait.side_effect = wait
+        with self.assertRaises(timers.Timeout):
+            kernels.run(session._wait_request(), timeout=1)
+        # A fixed timeout is not re-evaluated periodically.
+        session._request_queue.wait.assert_called_once()
+
+    @kernels.with_kernel
+    def test_wait_request_timeout_shortened(self):
+
+        async def recv(_):
+            await locks.Event().wait()
+
+        self.mock_sock.recv.side_effect = recv
+        timeouts = [10]
+        session = wsgi.HttpSession(
+            self.mock_sock,
+            None,
+            {},
+            keep_alive_idle_timeout=lambda: timeouts[0],
+        )
+        session._IDLE_CHECK_INTERVAL = 0.01
+        wait_task = tasks.spawn(session._wait_request())
+        with self.assertRaises(kernels.KernelTimeout):
+            kernels.run(timeout=0.05)
+        self.assertFalse(wait_task.is_completed())
+        # The idle session is closed after the timeout is shortened.
+        timeouts[0] = 0.01
+        kernels.run(timeout=0.1)
+        self.assertTrue(wait_task.is_completed())
+        with self.assertRaises(timers.Timeout):
+            wait_task.get_result_nonblocking()
+
+    @kernels.with_kernel
+    def test_get_request_100_continue(self):
+        for expect, spill_size, expect_send in [
+            (None, None, ()),
+            (None, 0, ()),
+            ('100-Continue', None, (b'HTTP/1.1 100 Continue\r\n\r\n', )),
+            ('100-Continue', 0, (b'HTTP/1.1 100 Continue\r\n\r\n', )),
         ]:
-            with self.subTest((conn_header, keep_alive, expect_keep_alive)):
-                environ = {'HTTP_EXPECT': '100-Continue'}
-                if conn_header is not None:
-                    environ['HTTP_CONNECTION'] = conn_header
-                if expect_keep_alive:
-                    kernels.run(
-                        session._handle_request(environ, keep_alive),
-                        timeout=0.01,
-                    )
-                    self.assert_send(
-                        b'HTTP/1.1 100 Continue\r\n'
-                        b'Connection: keep-alive\r\n'
-                        b'\r\n'
-                    )
-                else:
-                    with self.assertRaises(wsgi._SessionExit):
-                        kernels.run(
-                            session._handle_request(environ, keep_alive),
-                            timeout=0.01,
-                        )
-                    self.assert_send(
-                        b'HTTP/1.1 100 Continue\r\n'
-                        b'Connection: close\r\n'
-                        b'\r\n'
-                    )
+            with self.subTest((expect, spill_size)):
+                self.mock_sock.send.reset_mock()
+                self.mock_sock.recv.side_effect = [
+                    b'POST / HTTP/1.1\r\n'
+                    b'Content-Length: 3\r\n' +
+                    (b'Expect: %s\r\n' % expect.encode('ascii')
+                     if expect else b'') +
+                    b'\r\n',
+                    b'xyz',
+                ]
+                session = wsgi.HttpSession(
+                    self.mock_sock,
+                    None,
+                    {},
+                    request_body_spill_size=spill_size,
+                )
+                environ = kernels.run(session._get_request(), timeout=0.01)
+                self.assertEqual(environ.get('HTTP_EXPECT'), expect)
+                self.assert_send(*expect_send)
+                if not expect_send:
+                    self.mock_sock.send.assert_not_called()
+                request_body = environ['wsgi.input']
+                self.assertEqual(
+                    request_body._file is not None, spill_size is not None
+                )
+                self.assertEqual(kernels.run(request_body.read()), b'xyz')
 
     @kernels.with_kernel
-    def test_run_application_aiter(self):
+    def test_iterate_body_aiter(self):
 
         class MockBody:
 
@@ -172,13 +401,11 @@ class HttpSessionTest(unittest.TestCase):
                 self.closed = True
 
         mock_body = MockBody()
-        mock_app = unittest.mock.AsyncMock()
-        mock_app.side_effect = [mock_body]
 
-        session = wsgi.HttpSession(None, mock_app, {})
+        session = wsgi.HttpSession(None, None, {})
         context = wsgi._ApplicationContext()
 
-        run_task = tasks.spawn(session._run_application(context, {}))
+        run_task = tasks.spawn(session._iterate_body(context, mock_body))
         get_task = tasks.spawn(self.get_body_chunks(context))
 
         kernels.run(timeout=0.01)
@@ -193,14 +420,13 @@ class HttpSessionTest(unittest.TestCase):
         self.assertEqual(get_task.get_result_nonblocking(), [b'x', b'y'])
 
     @kernels.with_kernel
-    def test_run_application_non_aiter(self):
-        mock_app = unittest.mock.AsyncMock()
-        mock_app.return_value = [b'x', b'', b'', b'', b'y']
-
-        session = wsgi.HttpSession(None, mock_app, {})
+    def test_iterate_body_non_aiter(self):
+        session = wsgi.HttpSession(None, None, {})
         context = wsgi._ApplicationContext()
 
-        run_task = tasks.spawn(session._run_application(context, {}))
+        run_task = tasks.spawn(
+            session._iterate_body(context, [b'x', b'', b'', b'', b'y'])
+        )
         get_task = tasks.spawn(self.get_body_chunks(context))
 
         kernels.run(timeout=0.01)
@@ -214,16 +440,15 @@ class HttpSessionTest(unittest.TestCase):
         self.assertEqual(get_task.get_result_nonblocking(), [b'x', b'y'])
 
     @kernels.with_kernel
-    def test_run_application_sendfile(self):
+    def test_iterate_body_sendfile(self):
         mock_file = unittest.mock.Mock()
 
-        mock_app = unittest.mock.AsyncMock()
-        mock_app.return_value = wsgi.FileWrapper(mock_file)
-
-        session = wsgi.HttpSession(None, mock_app, {})
+        session = wsgi.HttpSession(None, None, {})
         context = wsgi._ApplicationContext()
 
-        run_task = tasks.spawn(session._run_application(context, {}))
+        run_task = tasks.spawn(
+            session._iterate_body(context, wsgi.FileWrapper(mock_file))
+        )
         get_task = tasks.spawn(self.get_body_chunks(context))
 
         kernels.run(timeout=0.01)
@@ -392,12 +617,113 @@ class HttpSessionTest(unittest.TestCase):
 
                 self.assertTrue(context._is_committed)
                 self.assertFalse(session._response_queue._has_begun)
-                self.assertFalse(
-                    session._response_queue._headers_sent.is_set()
-                )
-                self.assert_send(*expect_data_per_call)
+                kernels.run(session._response_queue.flush(), timeout=0.01)
+                self.assertFalse(session._response_queue._buffers)
+                # Response data is coalesced into one send call.
+                self.assert_send(b''.join(expect_data_per_call))
                 self.mock_sock.sendfile.assert_not_called()
 
+    @kernels.with_kernel
+    def test_send_response_chunked(self):
+
+        def make_context(*body_chunks):
+            context = wsgi._ApplicationContext()
+            context._status = http.HTTPStatus.OK
+            context._headers = []
+            context._chunks = queues.Queue()  # Unset capacity for test.
+            for chunk in body_chunks:
+                context._chunks.put_nonblocking(chunk)
+            return context
+
+        session = wsgi.HttpSession(self.mock_sock, None, {})
+        http_1_1 = {'SERVER_PROTOCOL': 'HTTP/1.1'}
+        http_1_0 = {'SERVER_PROTOCOL': 'HTTP/1.0'}
+
+        # The entire body is readily available.
+        context = make_context(b'spam', b'egg')
+        context.end_body_chunks()
+        kernels.run(session._send_response(context, http_1_1, True))
+        kernels.run(session._response_queue.flush())
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Connection: keep-alive\r\n'
+            b'Content-Length: 7\r\n'
+            b'\r\n'
+            b'spamegg'
+        )
+
+        # The body is not readily available.
+        self.mock_sock.send.reset_mock()
+        context = make_context(b'spam')
+        send_task = tasks.spawn(
+            session._send_response(context, http_1_1, True)
+        )
+        with self.assertRaises(kernels.KernelTimeout):
+            kernels.run(timeout=0.01)
+        # Buffered data is flushed while waiting for the application.
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Connection: keep-alive\r\n'
+            b'Transfer-Encoding: chunked\r\n'
+            b'\r\n'
+            b'4\r\nspam\r\n'
+        )
+        context._chunks.put_nonblocking(b'x' * 16)
+        context.end_body_chunks()
+        kernels.run(timeout=0.01)
+        self.assertTrue(send_task.is_completed())
+        send_task.get_result_nonblocking()
+        kernels.run(session._response_queue.flush())
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Connection: keep-alive\r\n'
+            b'Transfer-Encoding: chunked\r\n'
+            b'\r\n'
+            b'4\r\nspam\r\n',
+            b'10\r\n' + b'x' * 16 + b'\r\n'
+            b'0\r\n\r\n',
+        )
+
+        # The body exceeds the buffer limit.
+        self.mock_sock.send.reset_mock()
+        body = b'x' * (session._MAX_BUFFERED_BODY_SIZE + 1)
+        context = make_context(body, b'y')
+        context.end_body_chunks()
+        kernels.run(session._send_response(context, http_1_1, True))
+        kernels.run(session._response_queue.flush())
+        # The buffered data exceeds the flush threshold.
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Connection: keep-alive\r\n'
+            b'Transfer-Encoding: chunked\r\n'
+            b'\r\n'
+            b'%x\r\n%s' % (len(body), body),
+            b'\r\n1\r\ny\r\n0\r\n\r\n',
+        )
+
+        # HTTP/1.0 clients do not support chunked transfer coding.
+        self.mock_sock.send.reset_mock()
+        context = make_context(b'spam')
+        send_task = tasks.spawn(
+            session._send_response(context, http_1_0, True)
+        )
+        with self.assertRaises(kernels.KernelTimeout):
+            kernels.run(timeout=0.01)
+        self.mock_sock.send.assert_not_called()
+        context._chunks.put_nonblocking(b'egg')
+        context.end_body_chunks()
+        kernels.run(timeout=0.01)
+        self.assertTrue(send_task.is_completed())
+        send_task.get_result_nonblocking()
+        kernels.run(session._response_queue.flush())
+        self.assert_send(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Connection: keep-alive\r\n'
+            b'Content-Length: 7\r\n'
+            b'\r\n'
+            b'spamegg'
+        )
+
     @kernels.with_kernel
     @unittest.mock.patch.object(wsgi, 'os')
     def test_send_response_sendfile(self, mock_os):
@@ -467,9 +793,7 @@ class HttpSessionTest(unittest.TestCase):
 
                 self.assertTrue(context._is_committed)
                 self.assertFalse(session._response_queue._has_begun)
-                self.assertFalse(
-                    session._response_queue._headers_sent.is_set()
-                )
+                self.assertFalse(session._response_queue._buffers)
                 self.mock_sock.assert_has_calls([
                     unittest.mock.call.send(expect_headers),
                     unittest.mock.call.sendfile(mock_file),
@@ -520,11 +844,18 @@ class HttpSessionTest(unittest.TestCase):
 
 class RequestQueueTest(unittest.TestCase):
 
+    STRICT = False
+
     def setUp(self):
         super().setUp()
         self.mock_sock = unittest.mock.Mock(spec_set=['recv'])
         self.mock_sock.recv = unittest.mock.AsyncMock()
-        self.request_queue = wsgi._RequestQueue(self.mock_sock, {})
+        self.request_queue = self.make_request_queue()
+
+    def make_request_queue(self):
+        return wsgi._RequestQueue(
+            self.mock_sock, {}, 65536, strict=self.STRICT
+        )
 
     @contextlib.contextmanager
     def assert_http_error(self, status, pattern):
@@ -536,7 +867,7 @@ class RequestQueueTest(unittest.TestCase):
         environ = kernels.run(self.request_queue.get())
         if environ is None:
             return None, None
-        return environ, environ.pop('wsgi.input').read_nonblocking()
+        return environ, kernels.run(environ.pop('wsgi.input').read())
 
     def parse_request_line(self, line):
         environ = {}
@@ -568,6 +899,7 @@ class RequestQueueTest(unittest.TestCase):
             (
                 {
                     'REQUEST_METHOD': 'GET',
+                    'SERVER_PROTOCOL': 'HTTP/1.1',
                     'PATH_INFO': '/foo/bar',
                     'QUERY_STRING': 'x=y',
                     'HTTP_HOST': 'localhost',
@@ -611,7 +943,7 @@ class RequestQueueTest(unittest.TestCase):
         )
         with self.assert_http_error(
             http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
-            r'request line length exceeds 65536',
+            r'request (line length|head size) exceeds 65536',
         ):
             self.get_request()
 
@@ -641,11 +973,250 @@ class RequestQueueTest(unittest.TestCase):
         ):
             self.get_request()
 
+    @kernels.with_kernel
+    def test_get_request_413_request_entity_too_large_chunked(self):
+        self.mock_sock.recv.side_effect = [
+            b'POST / HTTP/1.1\r\n'
+            b'Transfer-Encoding: chunked\r\n'
+            b'\r\n'
+            b'8000\r\n',
+            bytes(0x8000),
+            b'\r\n8001\r\n',
+        ]
+        with self.assert_http_error(
+            http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            r'request body size exceeds limit: 65536',
+        ):
+            self.get_request()
+
+    @kernels.with_kernel
+    def test_get_request_invalid_body_headers(self):
+        for headers, status, pattern in [
+            (
+                b'Content-Length: -1\r\n',
+                http.HTTPStatus.BAD_REQUEST,
+                r'invalid request Content-Length: \'-1\'',
+            ),
+            (
+                b'Content-Length: 1\r\nTransfer-Encoding: chunked\r\n',
+                http.HTTPStatus.BAD_REQUEST,
+                r'request has both Content-Length and Transfer-Encoding',
+            ),
+            (
+                b'Transfer-Encoding: chunked, gzip\r\n',
+                http.HTTPStatus.BAD_REQUEST,
+                r'invalid request Transfer-Encoding: \'chunked, gzip\'',
+            ),
+            (
+                b'Transfer-Encoding: gzip, chunked\r\n',
+                http.HTTPStatus.NOT_IMPLEMENTED,
+                r'unsupported request Transfer-Encoding: ',
+            ),
+        ]:
+            with self.subTest(headers):
+                self.mock_sock.recv.side_effect = [
+                    b'POST / HTTP/1.1\r\n' + headers + b'\r\n',
+                ]
+                self.request_queue = self.make_request_queue()
+                with self.assert_http_error(status, pattern):
+                    self.get_request()
+
+    @kernels.with_kernel
+    def test_get_request_chunked(self):
+        data = (
+            b'POST / HTTP/1.1\r\n'
+            b'Transfer-Encoding: Chunked\r\n'
+            b'\r\n'
+            b'6\r\nhello\n\r\n'
+            b'7;x=y\r\nworld\nf\r\n'
+            b'3\r\noo\n\r\n'
+            b'0\r\n'
+            b'Foo: bar\r\n'
+            b'\r\n'
+            b'GET / HTTP/1.1\r\n'
+            b'\r\n'
+        )
+        self.mock_sock.recv.side_effect = (
+            [data[i:i + 1] for i in range(len(data))] + [b'']
+        )
+
+        environ = kernels.run(self.request_queue.get())
+        request_body = environ.pop('wsgi.input')
+        self.assertEqual(
+            environ,
+            {
+                'REQUEST_METHOD': 'POST',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'PATH_INFO': '/',
+                'QUERY_STRING': '',
+                'HTTP_TRANSFER_ENCODING': 'Chunked',
+                'wsgi.input_terminated': True,
+            },
+        )
+        self.assertEqual(
+            kernels.run(request_body.readlines()),
+            [b'hello\n', b'world\n', b'foo\n'],
+        )
+        self.assertEqual(kernels.run(request_body.read()), b'')
+
+        self.assertEqual(
+            self.get_request(),
+            (
+                {
+                    'REQUEST_METHOD': 'GET',
+                    'SERVER_PROTOCOL': 'HTTP/1.1',
+                    'PATH_INFO': '/',
+                    'QUERY_STRING': '',
+                },
+                b'',
+            ),
+        )
+        self.assertEqual(self.get_request(), (None, None))
+
+    @kernels.with_kernel
+    def test_get_request_invalid_chunk(self):
+        for body, pattern in [
+            (b'x\r\n', r'invalid request chunk size: b\'x\\r\\n\''),
+            (b'-1\r\n', r'invalid request chunk size: '),
+            (b'1\r\nxy', r'invalid request chunk ending'),
+            (b'2\r\nx', r'incomplete request body'),
+            (b'0\r\nFoo: bar', r'incomplete request trailer'),
+        ]:
+            with self.subTest(body):
+                self.mock_sock.recv.side_effect = [
+                    b'POST / HTTP/1.1\r\n'
+                    b'Transfer-Encoding: chunked\r\n'
+                    b'\r\n' + body,
+                    b'',
+                ]
+                self.request_queue = self.make_request_queue()
+                with self.assert_http_error(
+                    http.HTTPStatus.BAD_REQUEST, pattern
+                ):
+                    self.get_request()
+
+    @kernels.with_kernel
+    def test_get_request_discard_body(self):
+        self.mock_sock.recv.side_effect = [
+            b'POST / HTTP/1.1\r\n'
+            b'Content-Length: 11\r\n'
+            b'\r\n'
+            b'hello world'
+            b'POST / HTTP/1.1\r\n'
+            b'Content-Length: 65537\r\n'
+            b'\r\n',
+            bytes(65537),
+        ]
+        self.request_queue._max_body_size = 0
+
+        environ = kernels.run(self.request_queue.get())
+        self.assertEqual(environ['CONTENT_LENGTH'], '11')
+        self.assertEqual(kernels.run(environ['wsgi.input'].read(5)), b'hello')
+
+        # The rest of the request body is discarded.
+        environ = kernels.run(self.request_queue.get())
+        self.assertEqual(environ['CONTENT_LENGTH'], '65537')
+
+        # The request body is too large to be discarded.
+        self.assertIsNone(kernels.run(self.request_queue.get()))
+
+    @kernels.with_kernel
+    def test_get_request_spill_body(self):
+        data = bytes(range(256)) * 4
+        self.mock_sock.recv.side_effect = [
+            b'POST / HTTP/1.1\r\n'
+            b'Content-Length: 1024\r\n'
+            b'\r\n',
+            data[:512],
+            data[512:],
+            b'',
+        ]
+        environ = kernels.run(self.request_queue.get())
+        request_body = environ['wsgi.input']
+        kernels.run(request_body.spill(100))
+        self.assertTrue(request_body._file._rolled)
+        self.assertEqual(kernels.run(request_body.read(10)), data[:10])
+        self.assertEqual(kernels.run(request_body.read()), data[10:])
+        self.assertIsNone(kernels.run(self.request_queue.get()))
+        self.assertTrue(request_body._file.closed)
+
+    @kernels.with_kernel
+    def test_get_request_invalid_head(self):
+        for data, pattern in [
+            (b'GET / HTTP/1.1\nHost: x\r\n\r\n', r'invalid request '),
+            (b'GET  / HTTP/1.1\r\n\r\n', r'invalid request line: '),
+            (b'GET / HTTP/1.1\r\nHost : x\r\n\r\n', r'invalid request header'),
+            (b'GET / HTTP/1.1\r\n x: y\r\n\r\n', r'invalid request header'),
+            (b'GET / HTTP/1.1\r\nHost\r\n\r\n', r'invalid request header'),
+            (b'GET / HTTP/1.1\r\n: x\r\n\r\n', r'invalid request header'),
+        ]:
+            with self.subTest(data):
+                self.mock_sock.recv.side_effect = [data, b'']
+                self.request_queue = self.make_request_queue()
+                with self.assert_http_error(
+                    http.HTTPStatus.BAD_REQUEST, pattern
+                ):
+                    self.get_request()
+
+    @kernels.with_kernel
+    def test_get_request_bare_cr(self):
+        self.mock_sock.recv.side_effect = [
+            b'GET / HTTP/1.1\r\nHost: x\ry\r\n\r\n',
+            b'',
+        ]
+        if self.STRICT:
+            environ, _ = self.get_request()
+            self.assertEqual(environ['HTTP_HOST'], 'x\ry')
+        else:
+            with self.assert_http_error(
+                http.HTTPStatus.BAD_REQUEST, r'invalid request head: '
+            ):
+                self.get_request()
+
+    @kernels.with_kernel
+    def test_get_request_pipelined(self):
+        self.mock_sock.recv.side_effect = [
+            b'GET /a HTTP/1.1\r\nX-Foo: 1\r\n\r\n'
+            b'POST /b?c HTTP/1.0\r\ncontent-type: text/plain\r\n'
+            b'x-foo:2\r\nContent-Length: 1\r\n\r\nx',
+            b'',
+        ]
+        self.assertEqual(
+            self.get_request(),
+            (
+                {
+                    'REQUEST_METHOD': 'GET',
+                    'SERVER_PROTOCOL': 'HTTP/1.1',
+                    'PATH_INFO': '/a',
+                    'QUERY_STRING': '',
+                    'HTTP_X_FOO': '1',
+                },
+                b'',
+            ),
+        )
+        self.assertEqual(
+            self.get_request(),
+            (
+                {
+                    'REQUEST_METHOD': 'POST',
+                    'SERVER_PROTOCOL': 'HTTP/1.0',
+                    'PATH_INFO': '/b',
+                    'QUERY_STRING': 'c',
+                    'CONTENT_TYPE': 'text/plain',
+                    'CONTENT_LENGTH': '1',
+                    'HTTP_X_FOO': '2',
+                },
+                b'x',
+            ),
+        )
+        self.assertEqual(self.get_request(), (None, None))
+
     def test_parse_request_line(self):
         self.assertEqual(
             self.parse_request_line('POST /foo/bar?x=y&p=q HTTP/1.1\r\n'),
             {
                 'REQUEST_METHOD': 'POST',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
                 'PATH_INFO': '/foo/bar',
                 'QUERY_STRING': 'x=y&p=q',
             },
@@ -654,6 +1225,7 @@ class RequestQueueTest(unittest.TestCase):
             self.parse_request_line('GET XyZ HTTP/1.0\r\n'),
             {
                 'REQUEST_METHOD': 'GET',
+                'SERVER_PROTOCOL': 'HTTP/1.0',
                 'PATH_INFO': 'XyZ',
                 'QUERY_STRING': '',
             },
@@ -724,6 +1296,11 @@ class RequestQueueTest(unittest.TestCase):
                     self.parse_request_header(invalid_header)
 
 
+class StrictRequestQueueTest(RequestQueueTest):
+
+    STRICT = True
+
+
 class RequestBufferTest(unittest.TestCase):
 
     def setUp(self):
@@ -740,11 +1317,66 @@ class RequestBufferTest(unittest.TestCase):
     def readline_decoded(self, limit=65536):
         return kernels.run(self.request_buffer.readline_decoded(limit))
 
-    def read_into(self, size):
-        stream = streams.BytesStream()
-        kernels.run(self.request_buffer.read_into(stream, size))
-        stream.close()
-        return stream.read_nonblocking()
+    def read(self, size):
+        parts = []
+        while size > 0:
+            data = kernels.run(self.request_buffer.read(size))
+            if not data:
+                break
+            parts.append(data)
+            size -= len(data)
+        return b''.join(parts)
+
+    @kernels.with_kernel
+    def test_read_head(self):
+        data = b'GET / HTTP/1.1\r\nX: y\r\n\r\nbodyGET'
+        for recv_side_effect in [
+            [data, b''],
+            [data[i:i + 1] for i in range(len(data))] + [b''],
+        ]:
+            with self.subTest(len(recv_side_effect)):
+                self.mock_sock.recv.side_effect = recv_side_effect
+                self.request_buffer = wsgi._RequestBuffer(self.mock_sock)
+                self.assertEqual(
+                    kernels.run(self.request_buffer.read_head(65536)),
+                    b'GET / HTTP/1.1\r\nX: y\r\n\r\n',
+                )
+                self.assertEqual(self.read(4), b'body')
+                # Partial head at the end.
+                self.assertEqual(
+                    kernels.run(self.request_buffer.read_head(65536)),
+                    b'GET',
+                )
+                self.assert_buffer([], True)
+                self.assertEqual(
+                    kernels.run(self.request_buffer.read_head(65536)),
+                    b'',
+                )
+
+    @kernels.with_kernel
+    def test_read_head_too_long(self):
+        for data, status in [
+            (bytes(20), http.HTTPStatus.REQUEST_URI_TOO_LONG),
+            (
+                b'GET / HTTP/1.1\r\n' + bytes(20),
+                http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+            ),
+        ]:
+            with self.subTest(data):
+                self.mock_sock.recv.side_effect = [data]
+                self.request_buffer = wsgi._RequestBuffer(self.mock_sock)
+                with self.assertRaises(wsgi._RequestError) as cm:
+                    kernels.run(self.request_buffer.read_head(16))
+                self.assertIs(cm.exception.status, status)
+
+        # The limit does not include the terminating empty line.
+        data = b'GET / HTTP/1.1\r\n\r\n'
+        self.mock_sock.recv.side_effect = [data]
+        self.request_buffer = wsgi._RequestBuffer(self.mock_sock)
+        self.assertEqual(
+            kernels.run(self.request_buffer.read_head(len(data) - 4)),
+            data,
+        )
 
     @kernels.with_kernel
     def test_readline_decoded_eof(self):
@@ -833,32 +1465,32 @@ class RequestBufferTest(unittest.TestCase):
         self.assertEqual(len(self.mock_sock.recv.mock_calls), 1)
 
     @kernels.with_kernel
-    def test_read_into_one_byte_per_chunk(self):
+    def test_read_one_byte_per_chunk(self):
         data = b'hello\nworld\r\n\n\n\r\n\nfoobar'
         self.mock_sock.recv.side_effect = (
             [data[i:i + 1] for i in range(len(data))] + [b'']
         )
         self.assert_buffer([], False)
 
-        self.assertEqual(self.read_into(3), b'hel')
+        self.assertEqual(self.read(3), b'hel')
         self.assert_buffer([], False)
 
-        self.assertEqual(self.read_into(1), b'l')
+        self.assertEqual(self.read(1), b'l')
         self.assert_buffer([], False)
 
-        self.assertEqual(self.read_into(4), b'o\nwo')
+        self.assertEqual(self.read(4), b'o\nwo')
         self.assert_buffer([], False)
 
-        self.assertEqual(self.read_into(999), b'rld\r\n\n\n\r\n\nfoobar')
+        self.assertEqual(self.read(999), b'rld\r\n\n\n\r\n\nfoobar')
         self.assert_buffer([], True)
 
-        self.assertEqual(self.read_into(1), b'')
+        self.assertEqual(self.read(1), b'')
         self.assert_buffer([], True)
 
         self.assertEqual(len(self.mock_sock.recv.mock_calls), len(data) + 1)
 
     @kernels.with_kernel
-    def test_read_into_one_chunk(self):
+    def test_read_one_chunk(self):
         data = b'hello\nworld\r\n\n\n\r\n\nfoobar'
         self.mock_sock.recv.side_effect = [data, b'']
         self.assert_buffer([], False)
@@ -866,13 +1498,13 @@ class RequestBufferTest(unittest.TestCase):
         self.assertEqual(self.readline_decoded(), 'hello\n')
         self.assert_buffer([b'world\r\n\n\n\r\n\nfoobar'], False)
 
-        self.assertEqual(self.read_into(8), b'world\r\n\n')
+        self.assertEqual(self.read(8), b'world\r\n\n')
         self.assert_buffer([b'\n\r\n\nfoobar'], False)
 
-        self.assertEqual(self.read_into(11), b'\n\r\n\nfoobar')
+        self.assertEqual(self.read(11), b'\n\r\n\nfoobar')
         self.assert_buffer([], True)
 
-        self.assertEqual(self.read_into(1), b'')
+        self.assertEqual(self.read(1), b'')
         self.assert_buffer([], True)
 
         self.assertEqual(len(self.mock_sock.recv.mock_calls), 2)
@@ -1037,23 +1669,38 @@ class ResponseQueueTest(unittest.TestCase):
 
     def setUp(self):
         super().setUp()
-        self.mock_sock = unittest.mock.Mock(spec_set=['send', 'sendfile'])
+        self.mock_sock = unittest.mock.Mock(
+            spec_set=['send', 'sendmsg', 'sendfile']
+        )
         self.mock_sock.send = unittest.mock.AsyncMock()
-        self.mock_sock.send.return_value = 1
+        self.mock_sock.send.side_effect = self.mock_send
+        self.mock_sock.sendmsg = unittest.mock.AsyncMock()
+        self.mock_sock.sendmsg.side_effect = self.mock_sendmsg
         self.mock_sock.sendfile = unittest.mock.AsyncMock()
         self.response_queue = wsgi._ResponseQueue(self.mock_sock)
+        # Data of each send/sendmsg call.
+        self.data_per_call = []
+        self.block_send = None
+
+    async def mock_send(self, data):
+        return await self.mock_sendmsg([data])
+
+    async def mock_sendmsg(self, buffers):
+        if self.block_send:
+            await self.block_send.wait()
+        self.data_per_call.append(b''.join(map(bytes, buffers)))
+        # Send one byte at a time.
+        return 1
 
     def assert_begin(self, expect):
         self.assertEqual(self.response_queue.has_begun(), expect)
         self.assertEqual(self.response_queue._has_begun, expect)
-        self.assertEqual(self.response_queue._headers_sent.is_set(), expect)
 
-    def assert_send_all(self, *data_per_call):
-        self.mock_sock.send.assert_has_calls([
-            unittest.mock.call(data[n:])
-            for data in data_per_call
-            for n in range(len(data))
-        ])
+    def assert_send_all(self, *data_per_flush):
+        self.assertEqual(
+            self.data_per_call,
+            [data[n:] for data in data_per_flush for n in range(len(data))],
+        )
 
     @kernels.with_kernel
     def test_begin(self):
@@ -1064,7 +1711,8 @@ class ResponseQueueTest(unittest.TestCase):
             timeout=0.01,
         )
         self.assert_begin(True)
-        self.assert_send_all(b'HTTP/1.1 200 OK\r\nx: y\r\n\r\n')
+        # Status line and headers are buffered.
+        self.assert_send_all()
 
         with self.assertRaisesRegex(AssertionError, r'expect false'):
             kernels.run(
@@ -1072,6 +1720,11 @@ class ResponseQueueTest(unittest.TestCase):
                 timeout=0.01,
             )
 
+        kernels.run(self.response_queue.flush(), timeout=0.01)
+        self.assert_begin(True)
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\nx: y\r\n\r\n')
+        self.mock_sock.sendmsg.assert_not_called()
+
     @kernels.with_kernel
     def test_put_body_chunk(self):
         self.assert_begin(False)
@@ -1101,6 +1754,7 @@ class ResponseQueueTest(unittest.TestCase):
             timeout=0.01,
         )
         self.assert_begin(True)
+        self.assert_send_all()
 
         with self.assertRaisesRegex(
             AssertionError,
@@ -1111,10 +1765,95 @@ class ResponseQueueTest(unittest.TestCase):
                 timeout=0.01,
             )
 
-        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\n', b'bar')
+        kernels.run(self.response_queue.end(), timeout=0.01)
+        self.assert_begin(False)
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\nbar')
+        self.mock_sock.sendmsg.assert_called()
+
+    @kernels.with_kernel
+    def test_flush_threshold(self):
+        self.response_queue = wsgi._ResponseQueue(self.mock_sock, 24)
+        kernels.run(
+            self.response_queue.begin(http.HTTPStatus.OK, []),
+            timeout=0.01,
+        )
+        kernels.run(
+            self.response_queue.put_body_chunk(b'foo'),
+            timeout=0.01,
+        )
+        self.assert_send_all()
+        kernels.run(
+            self.response_queue.put_body_chunk(b'bar'),
+            timeout=0.01,
+        )
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\nfoobar')
+        self.assertEqual(self.response_queue._buffered_size, 0)
+        kernels.run(
+            self.response_queue.put_body_chunk(b'spam'),
+            timeout=0.01,
+        )
+        kernels.run(self.response_queue.end(), timeout=0.01)
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\nfoobar', b'spam')
+
+    @kernels.with_kernel
+    def test_no_sendmsg(self):
+        mock_sock = unittest.mock.Mock(spec_set=['send'])
+        mock_sock.send = unittest.mock.AsyncMock()
+        mock_sock.send.side_effect = self.mock_send
+        self.response_queue = wsgi._ResponseQueue(mock_sock)
+        kernels.run(
+            self.response_queue.begin(http.HTTPStatus.OK, []),
+            timeout=0.01,
+        )
+        for chunk in (b'x', b'y', b'z'):
+            kernels.run(
+                self.response_queue.put_body_chunk(chunk),
+                timeout=0.01,
+            )
+        kernels.run(self.response_queue.end(), timeout=0.01)
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\nxyz')
+
+    @kernels.with_kernel
+    def test_sendmsg_blocked(self):
+
+        data_per_call = []
+
+        def sendmsg(buffers):
+            data_per_call.append(b''.join(buffers))
+            if len(data_per_call) == 1:
+                raise BlockingIOError
+            return len(data_per_call[-1])
+
+        sock_0, sock_1 = socket.socketpair()
+        with sock_0, sock_1:
+            mock_sock = unittest.mock.Mock(
+                spec_set=['close', 'fileno', 'sendmsg', 'setblocking']
+            )
+            mock_sock.fileno.return_value = sock_0.fileno()
+            mock_sock.sendmsg.side_effect = sendmsg
+            self.response_queue = wsgi._ResponseQueue(
+                adapters.SocketAdapter(mock_sock)
+            )
+            kernels.run(
+                self.response_queue.begin(http.HTTPStatus.OK, []),
+                timeout=0.01,
+            )
+            for chunk in (b'x', b'y', b'z'):
+                kernels.run(
+                    self.response_queue.put_body_chunk(chunk),
+                    timeout=0.01,
+                )
+            kernels.run(self.response_queue.end(), timeout=0.01)
+        # The retry sends the same data rather than nothing.
+        self.assertEqual(
+            data_per_call,
+            [b'HTTP/1.1 200 OK\r\n\r\nxyz'] * 2,
+        )
 
     @kernels.with_kernel
     def test_sendfile(self):
+        self.mock_sock.sendfile.return_value = 99
+
         self.assert_begin(False)
         with self.assertRaisesRegex(AssertionError, r'expect true'):
             kernels.run(
@@ -1135,11 +1874,16 @@ class ResponseQueueTest(unittest.TestCase):
                 timeout=0.01,
             )
 
-        kernels.run(
-            self.response_queue.sendfile('bar'),
-            timeout=0.01,
+        self.assertEqual(
+            kernels.run(
+                self.response_queue.sendfile('bar'),
+                timeout=0.01,
+            ),
+            99,
         )
         self.assert_begin(True)
+        # Headers are flushed before sendfile.
+        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\n')
 
         with self.assertRaisesRegex(
             AssertionError,
@@ -1162,7 +1906,7 @@ class ResponseQueueTest(unittest.TestCase):
         self.mock_sock.sendfile.assert_called_once_with('bar')
 
         self.mock_sock.sendfile.reset_mock()
-        self.response_queue.end()
+        kernels.run(self.response_queue.end(), timeout=0.01)
 
         kernels.run(
             self.response_queue.begin(http.HTTPStatus.OK, []),
@@ -1176,67 +1920,48 @@ class ResponseQueueTest(unittest.TestCase):
         self.mock_sock.sendfile.assert_called_once_with('egg')
 
     @kernels.with_kernel
-    def test_headers_sent_blocking_put_body_chunk(self):
-        self.do_test_headers_sent_blocking(
-            lambda: self.response_queue.put_body_chunk(b'xyz')
-        )
-        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\n', b'xyz')
-        self.mock_sock.sendfile.assert_not_called()
-
-    @kernels.with_kernel
-    def test_headers_sent_blocking_sendfile(self):
-        self.do_test_headers_sent_blocking(
-            lambda: self.response_queue.sendfile('foo')
-        )
-        self.assert_send_all(b'HTTP/1.1 200 OK\r\n\r\n')
-        self.mock_sock.sendfile.assert_called_once_with('foo')
-
-    def do_test_headers_sent_blocking(self, make_coro):
-
-        def assert_begin_but_not_sent():
-            self.assertEqual(self.response_queue.has_begun(), True)
-            self.assertEqual(self.response_queue._has_begun, True)
-            self.assertEqual(self.response_queue._headers_sent.is_set(), False)
-
-        block_send = locks.Event()
-
-        async def mock_send(data):
-            del data  # Unused.
-            await block_send.wait()
-            return 1
-
-        self.mock_sock.send.side_effect = mock_send
-        self.mock_sock.sendfile.side_effect = mock_send
+    def test_flush_blocking(self):
+        self.block_send = locks.Event()
 
-        begin_task = tasks.spawn(
-            self.response_queue.begin(http.HTTPStatus.OK, [])
+        kernels.run(
+            self.response_queue.begin(http.HTTPStatus.OK, []),
+            timeout=0.01,
         )
+        flush_task = tasks.spawn(self.response_queue.flush())
         with self.assertRaises(kernels.KernelTimeout):
             kernels.run(timeout=0.01)
-        assert_begin_but_not_sent()
-        self.assertFalse(begin_task.is_completed())
+        self.assertFalse(flush_task.is_completed())
 
-        send_task = tasks.spawn(make_coro())
+        # Data put during a flush is sent after the buffered data.
+        kernels.run(
+            self.response_queue.put_body_chunk(b'xyz'),
+            timeout=0.01,
+        )
+        end_task = tasks.spawn(self.response_queue.end())
         with self.assertRaises(kernels.KernelTimeout):
             kernels.run(timeout=0.01)
-        assert_begin_but_not_sent()
-        self.assertFalse(begin_task.is_completed())
-        self.assertFalse(send_task.is_completed())
+        self.assert_begin(True)
+        self.assertFalse(flush_task.is_completed())
+        self.assertFalse(end_task.is_completed())
 
-        block_send.set()
+        self.block_send.set()
 
-        kernels.run(timeout=0.01)
-        self.assert_begin(True)
-        self.assertTrue(begin_task.is_completed())
-        self.assertTrue(send_task.is_completed())
-        begin_task.get_result_nonblocking()
-        send_task.get_result_nonblocking()
+        kernels.run(timeout=1)
+        self.assert_begin(False)
+        self.assertTrue(flush_task.is_completed())
+        self.assertTrue(end_task.is_completed())
+        flush_task.get_result_nonblocking()
+        end_task.get_result_nonblocking()
+        self.assertEqual(
+            b''.join(data[:1] for data in self.data_per_call),
+            b'HTTP/1.1 200 OK\r\n\r\nxyz',
+        )
 
     @kernels.with_kernel
     def test_end(self):
         self.assert_begin(False)
         with self.assertRaisesRegex(AssertionError, r'expect true'):
-            self.response_queue.end()
+            kernels.run(self.response_queue.end(), timeout=0.01)
 
         self.assert_begin(False)
         kernels.run(
@@ -1245,11 +1970,10 @@ class ResponseQueueTest(unittest.TestCase):
         )
         self.assert_begin(True)
 
-        self.response_queue.end()
+        kernels.run(self.response_queue.end(), timeout=0.01)
         self.assert_begin(False)
 
         self.assert_send_all(b'HTTP/1.1 404 Not Found\r\n\r\n')
 
-
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+"""Benchmark large-message pub-sub throughput.
+
+It publishes messages of a given size over inproc or IPC transport, and
+reports the receive throughput when the subscriber copies each message
+out (``recv``) versus when it parses messages in place (``view``).
+"""
+
+import dataclasses
+import sys
+import tempfile
+import time
+import uuid
+
+import nng
+import nng.asyncs
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import tasks
+from g1.messaging.wiredata import jsons
+
+
+@dataclasses.dataclass(frozen=True)
+class Event:
+    content: str
+
+
+WIRE_DATA = jsons.JsonWireData()
+
+
+def parse_none(wire_message):
+    return len(wire_message)
+
+
+def parse_json(wire_message):
+    return WIRE_DATA.to_upper(Event, wire_message)
+
+
+async def publish(socket, data):
+    while True:
+        await socket.send(data)
+
+
+async def receive_copy(socket, parse, num_messages):
+    for _ in range(num_messages):
+        parse(await socket.recv())
+
+
+async def receive_view(socket, parse, num_messages):
+    for _ in range(num_messages):
+        with await socket.recvmsg() as message, message.body.view() as view:
+            parse(view)
+
+
+async def bench(url, receive, parse, data, num_messages):
+    with nng.asyncs.Socket(nng.Protocols.PUB0) as publisher, \
+        nng.asyncs.Socket(nng.Protocols.SUB0) as subscriber:
+        subscriber.subscribe(b'')
+        publisher.listen(url)
+        subscriber.dial(url)
+        publisher_task = tasks.spawn(publish(publisher, data))
+        try:
+            start = time.perf_counter()
+            await receive(subscriber, parse, num_messages)
+            elapsed = time.perf_counter() - start
+        finally:
+            publisher_task.cancel()
+            await publisher_task.join()
+    return num_messages * len(data) / elapsed / 1e6
+
+
+def main(argv):
+    num_messages = int(argv[1]) if len(argv) > 1 else 1024
+    message_size = int(argv[2]) if len(argv) > 2 else 1 << 20
+    data = WIRE_DATA.to_lower(Event(content='x' * message_size))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for url in [
+            'inproc://%s' % uuid.uuid4(),
+            'ipc://%s/pubsub' % temp_dir,
+        ]:
+            for parse in (parse_none, parse_json):
+                for receive in (receive_copy, receive_view):
+                    rate = kernels.run(
+                        bench(url, receive, parse, data, num_messages)
+                    )
+                    print(
+                        '%s: %s: %s: %.1f MB per second' % (
+                            url.split(':')[0],
+                            parse.__name__,
+                            receive.__name__,
+                            rate,
+                        )
+                    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(kernels.call_with_kernel(main, sys.argv))
@@ -0,0 +1,105 @@
+"""Benchmark request-reply round trips.
+
+It starts a server and a client in one process, and reports the number
+of calls per second for sequential calls, concurrent calls, and batch
+calls, over inproc or IPC transport.
+"""
+
+import sys
+import tempfile
+import time
+import uuid
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import tasks
+from g1.messaging import reqrep
+from g1.messaging.reqrep import clients
+from g1.messaging.reqrep import servers
+from g1.messaging.wiredata import jsons
+
+
+class EchoInterface:
+
+    def echo(self, data: str) -> str:
+        raise NotImplementedError
+
+
+class Echo:
+
+    async def echo(self, data):
+        return data
+
+
+Request, Response = reqrep.generate_interface_types(EchoInterface, 'Echo')
+
+WIRE_DATA = jsons.JsonWireData()
+
+
+async def call_sequentially(client, data, num_calls):
+    for _ in range(num_calls):
+        await client.m.echo(data=data)
+
+
+async def call_concurrently(client, data, num_calls, num_tasks):
+    async with tasks.CompletionQueue() as queue:
+        for _ in range(num_tasks):
+            queue.spawn(
+                call_sequentially(client, data, num_calls // num_tasks)
+            )
+        queue.close()
+        async for task in queue:
+            task.get_result_nonblocking()
+
+
+async def call_in_batches(client, data, num_calls, batch_size):
+    calls = [(client.m.echo, {'data': data})] * batch_size
+    for _ in range(num_calls // batch_size):
+        await client.batch(calls)
+
+
+async def bench(url, data, num_calls, num_servers):
+    server = servers.Server(Echo(), Request, Response, WIRE_DATA)
+    with server, clients.Client(Request, Response, WIRE_DATA) as client:
+        server.socket.listen(url)
+        client.socket.dial(url)
+        server_tasks = [
+            tasks.spawn(server.serve()) for _ in range(num_servers)
+        ]
+        try:
+            for name, call, arg in [
+                ('sequential', call_sequentially, None),
+                ('concurrent', call_concurrently, num_servers),
+                ('batch', call_in_batches, num_servers),
+            ]:
+                args = (client, data, num_calls)
+                if arg is not None:
+                    args += (arg, )
+                start = time.perf_counter()
+                await call(*args)
+                elapsed = time.perf_counter() - start
+                print(
+                    '%s: %s: %.0f calls per second' %
+                    (url.split(':')[0], name, num_calls / elapsed)
+                )
+        finally:
+            server.shutdown()
+            for task in server_tasks:
+                await task.join()
+
+
+def main(argv):
+    num_calls = int(argv[1]) if len(argv) > 1 else 4096
+    data_size = int(argv[2]) if len(argv) > 2 else 64
+    num_servers = int(argv[3]) if len(argv) > 3 else 16
+    data = 'x' * data_size
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for url in [
+            'inproc://%s' % uuid.uuid4(),
+            'ipc://%s/reqrep' % temp_dir,
+        ]:
+            kernels.run(bench(url, data, num_calls, num_servers))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(kernels.call_with_kernel(main, sys.argv))
@@ -0,0 +1,128 @@
+"""Benchmark wire data encoding and decoding of small RPC messages.
+
+It round-trips a small, nested response message (a struct with a union
+of a list of structs and an error) through ``JsonWireData``,
+``CapnpWireData``, and ``CapnpPackedWireData``, and reports the number
+of conversions per second of each.  It requires the ``capnp`` compiler
+to compile the schema.
+"""
+
+import dataclasses
+import functools
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+from pathlib import Path
+
+import capnp
+
+from g1.messaging.wiredata import capnps
+from g1.messaging.wiredata import jsons
+
+SCHEMA = '''\
+@0xb4c5d8a6a0c3f1e7;
+
+using Cxx = import "/capnp/c++.capnp";
+$Cxx.namespace("benchmark");
+
+struct Item {
+  key @0 :Text;
+  value @1 :Data;
+  revision @2 :Int64;
+}
+
+struct Response {
+  revision @0 :Int64;
+  union {
+    items @1 :List(Item);
+    error @2 :Error;
+  }
+}
+
+struct Error {
+  code @0 :Int32;
+  reason @1 :Text;
+}
+'''
+
+
+@dataclasses.dataclass(frozen=True)
+class Item:
+    __module__ = 'benchmark'
+    key: str
+    value: bytes
+    revision: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Error:
+    __module__ = 'benchmark'
+    code: int
+    reason: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Response:
+    __module__ = 'benchmark'
+    revision: int
+    items: typing.Optional[typing.List[Item]]
+    error: typing.Optional[Error]
+
+
+def load_schema():
+    loader = capnp.SchemaLoader()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'benchmark.capnp'
+        path.write_text(SCHEMA)
+        loader.load_once(
+            subprocess.check_output(['capnp', 'compile', '-o-', str(path)])
+        )
+    return loader
+
+
+def bench(func, num_iterations):
+    start = time.perf_counter()
+    for _ in range(num_iterations):
+        func()
+    return num_iterations / (time.perf_counter() - start)
+
+
+def main(argv):
+    num_items = int(argv[1]) if len(argv) > 1 else 4
+    num_iterations = int(argv[2]) if len(argv) > 2 else 20000
+    response = Response(
+        revision=num_items,
+        items=[
+            Item(key='key-%d' % i, value=b'x' * 16, revision=i)
+            for i in range(num_items)
+        ],
+        error=None,
+    )
+    loader = load_schema()
+    for name, wire_data in [
+        ('json', jsons.JsonWireData()),
+        ('capnp', capnps.CapnpWireData(loader)),
+        ('capnp-packed', capnps.CapnpPackedWireData(loader)),
+    ]:
+        wire_message = wire_data.to_lower(response)
+        if wire_data.to_upper(Response, wire_message) != response:
+            raise AssertionError('expect round trip: %s' % name)
+        to_lower_rate = bench(
+            functools.partial(wire_data.to_lower, response),
+            num_iterations,
+        )
+        to_upper_rate = bench(
+            functools.partial(wire_data.to_upper, Response, wire_message),
+            num_iterations,
+        )
+        print(
+            '%s: %d bytes: to_lower=%.0f/s to_upper=%.0f/s' %
+            (name, len(wire_message), to_lower_rate, to_upper_rate)
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -9,16 +9,41 @@ import nng.asyncs
 
 from g1.asyncs.bases import queues
 from g1.bases import classes
+from g1.bases.assertions import ASSERT
+
+from . import utils
 
 LOG = logging.getLogger(__name__)
 
 
 class Publisher:
+    """Publisher.
+
+    By default, messages are published with no topic.  If ``get_topic``
+    is provided, messages are published with topics that it derives
+    from messages (and subscribers must be created with ``topics``).
+
+    When publishing with topics, up to ``max_batch_size`` queued
+    messages of the same topic are sent in one wire message.  This
+    does not wait for more messages to fill up a batch.
+    """
 
-    def __init__(self, queue, wiredata, *, drop_when_full=True):
+    def __init__(
+        self,
+        queue,
+        wiredata,
+        *,
+        drop_when_full=True,
+        get_topic=None,
+        max_batch_size=1,
+    ):
         self._queue = queue
         self._wiredata = wiredata
         self._drop_when_full = drop_when_full
+        self._get_topic = get_topic
+        self._max_batch_size = ASSERT.greater(max_batch_size, 0)
+        if get_topic is None:
+            ASSERT.equal(max_batch_size, 1)
         # For convenience, create socket before ``__enter__``.
         self.socket = nng.asyncs.Socket(nng.Protocols.PUB0)
 
@@ -39,22 +64,64 @@ class Publisher:
         try:
             while True:
                 message = await self._queue.get()
-                try:
-                    raw_message = self._wiredata.to_lower(message)
-                except Exception:
-                    LOG.exception('to_lower error: %r', message)
-                    continue
-                try:
-                    # For now we publish with no topic.
-                    await self.socket.send(raw_message)
-                except nng.Errors.ETIMEDOUT:
-                    LOG.warning('send timeout; drop message: %r', message)
-                    continue
+                if self._get_topic is None:
+                    await self._publish_with_no_topic(message)
+                else:
+                    await self._publish_with_topics(message)
         except (queues.Closed, nng.Errors.ECLOSED):
             pass
         self._queue.close()
         LOG.debug('stop publisher: %r', self)
 
+    async def _publish_with_no_topic(self, message):
+        try:
+            raw_message = self._wiredata.to_lower(message)
+        except Exception:
+            LOG.exception('to_lower error: %r', message)
+            return
+        try:
+            await self.socket.send(raw_message)
+        except nng.Errors.ETIMEDOUT:
+            LOG.warning('send timeout; drop message: %r', message)
+
+    async def _publish_with_topics(self, message):
+        messages = [message]
+        while len(messages) < self._max_batch_size:
+            try:
+                messages.append(self._queue.get_nonblocking())
+            except (queues.Empty, queues.Closed):
+                break
+        # Send consecutive messages of the same topic in one batch so
+        # that message order is preserved.
+        batch_topic = None
+        batch = []
+        for message in messages:
+            try:
+                topic = self._get_topic(message)
+                raw_message = self._wiredata.to_lower(message)
+            except Exception:
+                LOG.exception('to_lower error: %r', message)
+                continue
+            if batch and topic != batch_topic:
+                await self._send_batch(batch_topic, batch)
+                batch = []
+            batch_topic = topic
+            batch.append(raw_message)
+        if batch:
+            await self._send_batch(batch_topic, batch)
+
+    async def _send_batch(self, topic, raw_messages):
+        try:
+            await self.socket.send(
+                utils.encode_wire_message(topic, raw_messages)
+            )
+        except nng.Errors.ETIMEDOUT:
+            LOG.warning(
+                'send timeout; drop %d messages: topic=%r',
+                len(raw_messages),
+                topic,
+            )
+
     def shutdown(self):
         self._queue.close()
 
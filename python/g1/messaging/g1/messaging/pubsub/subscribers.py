@@ -9,21 +9,54 @@ import nng.asyncs
 
 from g1.asyncs.bases import queues
 from g1.bases import classes
+from g1.bases.assertions import ASSERT
+
+from . import utils
 
 LOG = logging.getLogger(__name__)
 
 
 class Subscriber:
+    """Subscriber.
+
+    By default, it receives all messages from publishers that publish
+    with no topic.  If ``topics`` is provided, it receives messages
+    from publishers that publish with topics, and only those messages
+    whose topic starts with one of the ``topics`` prefixes; the rest
+    are dropped by the socket before they are decoded.  To receive all
+    messages from these publishers, pass ``topics=[b'']``.
+    """
 
-    def __init__(self, message_type, queue, wiredata, *, drop_when_full=True):
+    def __init__(
+        self,
+        message_type,
+        queue,
+        wiredata,
+        *,
+        drop_when_full=True,
+        topics=None,
+    ):
         self._message_type = message_type
         self._queue = queue
         self._wiredata = wiredata
         self._drop_when_full = drop_when_full
+        self._use_topics = topics is not None
         # For convenience, create socket before ``__enter__``.
         self.socket = nng.asyncs.Socket(nng.Protocols.SUB0)
-        # For now we subscribe to empty topic.
-        self.socket.subscribe(b'')
+        if topics is None:
+            self.socket.subscribe(b'')
+        else:
+            for topic in topics:
+                self.subscribe(topic)
+
+    def subscribe(self, topic):
+        """Subscribe to messages whose topic starts with ``topic``."""
+        ASSERT.true(self._use_topics)
+        self.socket.subscribe(utils.encode_topic_prefix(topic))
+
+    def unsubscribe(self, topic):
+        ASSERT.true(self._use_topics)
+        self.socket.unsubscribe(utils.encode_topic_prefix(topic))
 
     __repr__ = classes.make_repr('{self.socket!r}')
 
@@ -42,26 +75,23 @@ class Subscriber:
         try:
             while True:
                 try:
-                    raw_message = await self.socket.recv()
+                    raw_message = await self.socket.recvmsg()
                 except nng.Errors.ETIMEDOUT:
                     LOG.warning('recv timeout')
                     continue
-                try:
-                    message = self._wiredata.to_upper(
-                        self._message_type, raw_message
-                    )
-                except Exception:
-                    LOG.warning(
-                        'to_upper error: %r', raw_message, exc_info=True
-                    )
-                    continue
-                if self._drop_when_full:
-                    try:
-                        self._queue.put_nonblocking(message)
-                    except queues.Full:
-                        LOG.warning('queue full; drop message: %r', message)
-                else:
-                    await self._queue.put(message)
+                # Parse the message in place.
+                with raw_message, raw_message.body.view() as view:
+                    messages = self._decode(view)
+                for message in messages:
+                    if self._drop_when_full:
+                        try:
+                            self._queue.put_nonblocking(message)
+                        except queues.Full:
+                            LOG.warning(
+                                'queue full; drop message: %r', message
+                            )
+                    else:
+                        await self._queue.put(message)
         except (queues.Closed, nng.Errors.ECLOSED):
             pass
         self._queue.close()
@@ -69,3 +99,29 @@ class Subscriber:
 
     def shutdown(self):
         self.socket.close()
+
+    def _decode(self, wire_message):
+        if self._use_topics:
+            raw_messages = utils.decode_wire_message(wire_message)
+        else:
+            raw_messages = (wire_message, )
+        messages = []
+        try:
+            for raw_message in raw_messages:
+                try:
+                    messages.append(
+                        self._wiredata.to_upper(
+                            self._message_type, raw_message
+                        )
+                    )
+                except Exception:
+                    LOG.warning(
+                        'to_upper error: %r',
+                        bytes(raw_message),
+                        exc_info=True,
+                    )
+        except ValueError:
+            LOG.warning(
+                'invalid wire message: %r', bytes(wire_message), exc_info=True
+            )
+        return messages
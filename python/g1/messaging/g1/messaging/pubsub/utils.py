@@ -0,0 +1,64 @@
+"""Wire format of topic-enabled pub-sub.
+
+A wire message starts with its topic, so that subscribers may filter
+messages by topic prefix with nng's SUB filter (which matches prefix of
+the wire message) before decoding them.  The topic is escaped (NUL is
+encoded as ``NUL 0xff``) and terminated by two NULs; since escaping is
+byte-wise, the escaped prefix of a topic is a prefix of the escaped
+topic.  The topic is followed by one or more raw messages, each of which
+is prefixed by its length (4-byte big-endian).
+"""
+
+__all__ = [
+    'decode_wire_message',
+    'encode_topic_prefix',
+    'encode_wire_message',
+]
+
+import re
+import struct
+
+from g1.bases.assertions import ASSERT
+
+_TOPIC_TERMINATOR = b'\x00\x00'
+_TOPIC_TERMINATOR_PATTERN = re.compile(re.escape(_TOPIC_TERMINATOR))
+
+_LENGTH = struct.Struct('>I')
+
+
+def encode_topic_prefix(prefix):
+    """Encode a topic prefix for the SUB filter."""
+    return ASSERT.isinstance(prefix, bytes).replace(b'\x00', b'\x00\xff')
+
+
+def encode_wire_message(topic, raw_messages):
+    ASSERT.not_empty(raw_messages)
+    parts = [encode_topic_prefix(topic), _TOPIC_TERMINATOR]
+    for raw_message in raw_messages:
+        parts.append(_LENGTH.pack(len(raw_message)))
+        parts.append(raw_message)
+    return b''.join(parts)
+
+
+def decode_wire_message(wire_message):
+    """Yield raw messages of a wire message.
+
+    Raw messages are yielded as memory views, which are released when
+    the generator resumes.  It raises ``ValueError`` when the wire
+    message is malformed.
+    """
+    match = _TOPIC_TERMINATOR_PATTERN.search(wire_message)
+    if not match:
+        raise ValueError('expect topic terminator')
+    with memoryview(wire_message) as view:
+        offset = match.end()
+        while offset < len(view):
+            if offset + _LENGTH.size > len(view):
+                raise ValueError('expect raw message length')
+            size = _LENGTH.unpack_from(view, offset)[0]
+            offset += _LENGTH.size
+            if offset + size > len(view):
+                raise ValueError('expect %d bytes of raw message' % size)
+            with view[offset:offset + size] as raw_message:
+                yield raw_message
+            offset += size
@@ -8,6 +8,8 @@ import logging
 import nng
 import nng.asyncs
 
+from g1.asyncs.bases import locks
+from g1.asyncs.bases import tasks
 from g1.bases import classes
 from g1.bases import collections
 from g1.bases.assertions import ASSERT
@@ -19,12 +21,36 @@ LOG = logging.getLogger(__name__)
 # This is just an alias for now.
 ServerTimeoutError = nng.errors.Errors.ETIMEDOUT
 
+# Upper bound of idle contexts kept for reuse when concurrency is not
+# bounded.
+_MAX_IDLE_CONTEXTS = 32
+
 
 class Client:
+    """Request-reply client.
+
+    A client may have many outstanding requests on its socket; each of
+    them is sent on a separate context.  Contexts (and their AIO
+    handles) are pooled and reused across requests.  If
+    ``max_concurrency`` is positive, at most that many requests are
+    outstanding at a time, and the rest wait for their turn.
+    """
 
-    def __init__(self, request_type, response_type, wiredata):
+    def __init__(
+        self,
+        request_type,
+        response_type,
+        wiredata,
+        *,
+        max_concurrency=0,
+    ):
         self.socket = nng.asyncs.Socket(nng.Protocols.REQ0)
-        self.transceive = Transceiver(self.socket, response_type, wiredata)
+        self.transceive = Transceiver(
+            self.socket,
+            response_type,
+            wiredata,
+            max_concurrency=max_concurrency,
+        )
         self.m = collections.Namespace(
             **{
                 name: Method(name, request_type, self.transceive)
@@ -39,21 +65,83 @@ class Client:
         return self
 
     def __exit__(self, *args):
+        self.transceive.close()
         return self.socket.__exit__(*args)
 
+    async def batch(self, calls):
+        """Make calls concurrently and return results in call order.
+
+        ``calls`` is an iterable of ``(method, kwargs)`` pairs, where
+        ``method`` is an entry of ``self.m`` (or what its
+        ``on_timeout_return`` returns).  If any call errs, the rest are
+        cancelled, and the error is re-raised.
+        """
+        async with tasks.CompletionQueue(
+            always_cancel=True,
+            log_error=False,
+        ) as queue:
+            call_tasks = [
+                queue.spawn(method(**kwargs)) for method, kwargs in calls
+            ]
+            queue.close()
+            async for task in queue:
+                task.get_result_nonblocking()  # Re-raise the first error.
+            return [task.get_result_nonblocking() for task in call_tasks]
+
 
 class Transceiver:
 
-    def __init__(self, socket, response_type, wiredata):
+    def __init__(self, socket, response_type, wiredata, *, max_concurrency=0):
         self._socket = socket
         self._response_type = response_type
         self._wiredata = wiredata
+        ASSERT.greater_or_equal(max_concurrency, 0)
+        self._semaphore = (
+            locks.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._max_idle_contexts = max_concurrency or _MAX_IDLE_CONTEXTS
+        self._idle_contexts = []
+        # Response messages are recycled for sending requests.
+        self._message_pool = nng.MessagePool(self._max_idle_contexts)
+
+    def close(self):
+        contexts, self._idle_contexts = self._idle_contexts, []
+        for context in contexts:
+            context.close()
+        self._message_pool.close()
 
     async def __call__(self, request):
-        with nng.asyncs.Context(ASSERT.not_none(self._socket)) as context:
-            await context.send(self._wiredata.to_lower(request))
-            wire_response = await context.recv()
-            return self._wiredata.to_upper(self._response_type, wire_response)
+        if self._semaphore is None:
+            return await self._transceive(request)
+        async with self._semaphore:
+            return await self._transceive(request)
+
+    async def _transceive(self, request):
+        if self._idle_contexts:
+            context = self._idle_contexts.pop()
+        else:
+            context = nng.asyncs.Context(ASSERT.not_none(self._socket))
+        message = self._message_pool.get(self._wiredata.to_lower(request))
+        try:
+            await context.sendmsg(message)
+            message = await context.recvmsg()
+        except BaseException:
+            # Do not reuse a context that might be in a bad state.
+            context.close()
+            self._message_pool.put(message)
+            raise
+        if len(self._idle_contexts) < self._max_idle_contexts:
+            self._idle_contexts.append(context)
+        else:
+            context.close()
+        try:
+            # Parse the response in place.
+            with message.body.view() as wire_response:
+                return self._wiredata.to_upper(
+                    self._response_type, wire_response
+                )
+        finally:
+            self._message_pool.put(message)
 
 
 class Method:
@@ -93,9 +93,15 @@ class Server:
         try:
             with nng.asyncs.Context(ASSERT.not_none(self.socket)) as context:
                 while True:
-                    response = await self._serve(await context.recv())
-                    if response is not None:
-                        await context.send(response)
+                    with await context.recvmsg() as message:
+                        # Parse the request in place, and then reuse the
+                        # request message for the response.
+                        with message.body.view() as wire_request:
+                            response = await self._serve(wire_request)
+                        if response is not None:
+                            message.body.clear()
+                            message.body.append(response)
+                            await context.sendmsg(message)
         except nng.Errors.ECLOSED:
             pass
         LOG.debug('stop server: %r', self)
@@ -105,12 +111,14 @@ class Server:
 
     async def _serve(self, request):
 
-        LOG.debug('wire request: %r', request)
+        # ``request`` may be a memory view of the received message.
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('wire request: %r', bytes(request))
 
         try:
             request = self._wiredata.to_upper(self._request_type, request)
         except Exception:
-            LOG.warning('to_upper error: %r', request, exc_info=True)
+            LOG.warning('to_upper error: %r', bytes(request), exc_info=True)
             return self._invalid_request_error_wire
 
         try:
@@ -22,6 +22,10 @@ class WireData:
 
     The data conversions are named ``to_upper`` and ``to_lower`` since
     conventionally a protocol stack diagram is drawn from top to bottom.
+
+    ``to_upper`` accepts either ``bytes`` or a ``memoryview`` of wire
+    data, such as a view of a received message that is parsed in place.
+    It should not retain references to the view after it returns.
     """
 
     def to_lower(self, message):
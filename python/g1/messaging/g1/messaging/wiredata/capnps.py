@@ -10,6 +10,8 @@ __all__ = [
     'CapnpWireData',
 ]
 
+import ctypes
+
 import capnp
 from capnp import objects
 
@@ -29,12 +31,16 @@ class _BaseWireData(wiredata.WireData):
         self._converters = {}
 
     def _get_converter(self, dataclass):
-        key = '%s:%s' % (dataclass.__module__, dataclass.__qualname__)
-        converter = self._converters.get(key)
+        # Key converters by type rather than by schema name, which is
+        # slower to compute on every call.
+        converter = self._converters.get(dataclass)
         if converter is None:
-            converter = self._converters[key] = objects.DataclassConverter(
-                self._loader.struct_schemas[key],
-                dataclass,
+            key = '%s:%s' % (dataclass.__module__, dataclass.__qualname__)
+            converter = self._converters[dataclass] = (
+                objects.DataclassConverter(
+                    self._loader.struct_schemas[key],
+                    dataclass,
+                )
             )
         return converter
 
@@ -51,10 +57,24 @@ class _BaseWireData(wiredata.WireData):
 
     def to_upper(self, message_type, wire_message):
         ASSERT.predicate(message_type, wiredata.is_message_type)
+        if (
+            isinstance(wire_message, memoryview)
+            and not _is_word_aligned(wire_message)
+        ):
+            # Cap'n Proto requires input be word-aligned; copy it
+            # (``bytes`` contents are word-aligned).
+            wire_message = wire_message.tobytes()
         with self._from_bytes(wire_message) as reader:
             return self._get_converter(message_type).from_message(reader)
 
 
+def _is_word_aligned(view):
+    if view.readonly or not view.contiguous or not view.nbytes:
+        return False  # We cannot get the address of these easily.
+    address = ctypes.addressof(ctypes.c_char.from_buffer(view))
+    return address % 8 == 0
+
+
 class CapnpWireData(_BaseWireData):
 
     _from_bytes = capnp.MessageReader.from_message_bytes
@@ -18,6 +18,7 @@ import base64
 import dataclasses
 import datetime
 import enum
+import functools
 import json
 import sys
 
@@ -56,20 +57,344 @@ class JsonWireData(wiredata.WireData):
     * The conversion is not language agnostic.  The wire data can be
       decoded more easily if the other side is also running Python.
 
-    * For now the conversion is fairly simple and unoptimized.  It does
-      not even check if a message value equals to its default and omits
-      it from output entirely.
+    * For now the conversion is fairly simple.  It does not even check
+      if a message value equals to its default and omits it from output
+      entirely.
     """
 
+    def __init__(self):
+        # Compiled codecs keyed by type.
+        self._encoders = {}
+        self._decoders = {}
+
     def to_lower(self, message):
         ASSERT.predicate(message, wiredata.is_message)
-        raw_message = self._encode_value(type(message), message)
+        raw_message = self._get_encoder(type(message))(message)
         return json.dumps(raw_message).encode('ascii')
 
     def to_upper(self, message_type, wire_message):
         ASSERT.predicate(message_type, wiredata.is_message_type)
+        if isinstance(wire_message, memoryview):
+            # ``json.loads`` does not accept memory views.
+            wire_message = str(wire_message, 'utf-8')
         raw_message = json.loads(wire_message)
-        return self._decode_raw_value(message_type, raw_message)
+        return self._get_decoder(message_type)(raw_message)
+
+    #
+    # Compiled codecs.
+    #
+    # ``_encode_value`` and ``_decode_raw_value`` rediscover the type
+    # structure on every value.  Instead, we compile a codec for each
+    # type once, which falls back to them for anything it does not
+    # specialize (such as a value of a subclass of the type), so that
+    # the outputs (and errors) are identical.
+    #
+
+    def _get_encoder(self, value_type):
+        encoder = self._encoders.get(value_type)
+        if encoder is None:
+            # Install a forwarder first in case that the type refers to
+            # itself.
+            self._encoders[value_type] = (
+                lambda value: self._encoders[value_type](value)
+            )
+            try:
+                encoder = self._compile_encoder(value_type)
+            except Exception:
+                # Let ``_encode_value`` handle (or reject) this type.
+                encoder = functools.partial(self._encode_value, value_type)
+            self._encoders[value_type] = encoder
+        return encoder
+
+    def _compile_encoder(self, value_type):
+
+        if typings.is_recursive_type(value_type):
+
+            if value_type.__origin__ in (list, set, frozenset):
+                encode_element = self._get_encoder(value_type.__args__[0])
+                return lambda value: [
+                    encode_element(element) for element in value
+                ]
+
+            elif value_type.__origin__ is tuple:
+                encoders = tuple(map(self._get_encoder, value_type.__args__))
+
+                def encode_tuple(value):
+                    ASSERT.equal(len(value), len(encoders))
+                    return tuple(
+                        encode(element)
+                        for encode, element in zip(encoders, value)
+                    )
+
+                return encode_tuple
+
+            elif value_type.__origin__ is dict:
+                ASSERT.issubclass(value_type.__args__[0], str)
+                encode_key = self._get_encoder(value_type.__args__[0])
+                encode_value = self._get_encoder(value_type.__args__[1])
+                return lambda value: {
+                    encode_key(pair[0]): encode_value(pair[1])
+                    for pair in value.items()
+                }
+
+            elif typings.is_union_type(value_type):
+                return self._compile_union_encoder(value_type)
+
+            else:
+                return functools.partial(self._encode_value, value_type)
+
+        encode_generic = functools.partial(self._encode_value, value_type)
+        if not isinstance(value_type, type):
+            return encode_generic
+
+        # Specialize for values of exactly ``value_type``, which select
+        # the same branch of ``_encode_value``.
+
+        if wiredata.is_message_type(value_type):
+            encoders = [
+                (field.name, self._get_encoder(field.type))
+                for field in dataclasses.fields(value_type)
+            ]
+            encode_exact = lambda value: {
+                name: encode(getattr(value, name))
+                for name, encode in encoders
+            }
+
+        elif issubclass(value_type, datetime.datetime):
+            encode_exact = value_type.isoformat
+
+        elif issubclass(value_type, enum.Enum):
+            encode_exact = lambda value: value.name
+
+        elif issubclass(value_type, bytes):
+            encode_exact = (
+                lambda value: base64.standard_b64encode(value).
+                decode('ascii')
+            )
+
+        elif issubclass(value_type, Exception):
+            type_name = value_type.__name__
+            encode_exact = lambda value: {
+                type_name: [
+                    ASSERT.isinstance(arg, _DIRECTLY_SERIALIZABLE_TYPES)
+                    for arg in value.args
+                ]
+            }
+
+        elif issubclass(value_type, _DIRECTLY_SERIALIZABLE_TYPES):
+            encode_exact = None
+
+        else:
+            return encode_generic
+
+        if encode_exact is None:
+
+            def encode(value):
+                if type(value) is value_type:
+                    return value
+                return encode_generic(value)
+
+        else:
+
+            def encode(value):
+                if type(value) is value_type:
+                    return encode_exact(value)
+                return encode_generic(value)
+
+        return encode
+
+    def _compile_union_encoder(self, value_type):
+
+        # Make a special case for ``Optional[T]``.
+        type_ = typings.match_optional_type(value_type)
+        if type_:
+            encode_element = self._get_encoder(type_)
+            return lambda value: (
+                None if value is None else encode_element(value)
+            )
+
+        candidates = []
+        for type_ in value_type.__args__:
+            if typings.is_recursive_type(type_):
+                candidates.append((
+                    functools.partial(_match_recursive_type, type_),
+                    str(type_),
+                    self._get_encoder(type_),
+                ))
+            else:
+                candidates.append((
+                    functools.partial(_is_instance, type_),
+                    type_.__name__,
+                    self._get_encoder(type_),
+                ))
+
+        def encode_union(value):
+
+            # Make a special case for ``None``.
+            if value is None:
+                ASSERT.in_(NoneType, value_type.__args__)
+                return None
+
+            for match, type_name, encode_element in candidates:
+                if match(value):
+                    return {type_name: encode_element(value)}
+
+            return ASSERT.unreachable(
+                'value is not any union element type: {!r} {!r}',
+                value_type,
+                value,
+            )
+
+        return encode_union
+
+    def _get_decoder(self, value_type):
+        decoder = self._decoders.get(value_type)
+        if decoder is None:
+            # Install a forwarder first in case that the type refers to
+            # itself.
+            self._decoders[value_type] = (
+                lambda raw_value: self._decoders[value_type](raw_value)
+            )
+            try:
+                decoder = self._compile_decoder(value_type)
+            except Exception:
+                # Let ``_decode_raw_value`` handle (or reject) this type.
+                decoder = functools.partial(
+                    self._decode_raw_value, value_type
+                )
+            self._decoders[value_type] = decoder
+        return decoder
+
+    def _compile_decoder(self, value_type):
+
+        if typings.is_recursive_type(value_type):
+
+            if value_type.__origin__ in (list, set, frozenset):
+                container_type = value_type.__origin__
+                decode_element = self._get_decoder(value_type.__args__[0])
+                return lambda raw_value: container_type(
+                    decode_element(raw_element) for raw_element in raw_value
+                )
+
+            elif value_type.__origin__ is tuple:
+                decoders = tuple(map(self._get_decoder, value_type.__args__))
+
+                def decode_tuple(raw_value):
+                    ASSERT.equal(len(raw_value), len(decoders))
+                    return tuple(
+                        decode(raw_element)
+                        for decode, raw_element in zip(decoders, raw_value)
+                    )
+
+                return decode_tuple
+
+            elif value_type.__origin__ is dict:
+                ASSERT.issubclass(value_type.__args__[0], str)
+                decode_key = self._get_decoder(value_type.__args__[0])
+                decode_value = self._get_decoder(value_type.__args__[1])
+                return lambda raw_value: {
+                    decode_key(pair[0]): decode_value(pair[1])
+                    for pair in raw_value.items()
+                }
+
+            elif typings.is_union_type(value_type):
+                return self._compile_union_decoder(value_type)
+
+            else:
+                return functools.partial(self._decode_raw_value, value_type)
+
+        elif wiredata.is_message_type(value_type):
+            decoders = [
+                (field.name, self._get_decoder(field.type))
+                for field in dataclasses.fields(value_type)
+            ]
+            return lambda raw_value: value_type(
+                **{
+                    name: decode(raw_value[name])
+                    for name, decode in decoders
+                    if name in raw_value
+                }
+            )
+
+        elif not isinstance(value_type, type):
+            return functools.partial(self._decode_raw_value, value_type)
+
+        elif issubclass(value_type, datetime.datetime):
+            return value_type.fromisoformat
+
+        elif issubclass(value_type, enum.Enum):
+            return lambda raw_value: value_type[raw_value]
+
+        elif issubclass(value_type, bytes):
+            return lambda raw_value: base64.standard_b64decode(
+                raw_value.encode('ascii')
+            )
+
+        elif issubclass(value_type, Exception):
+            type_name = value_type.__name__
+
+            def decode_exception(raw_value):
+                ASSERT.equal(len(raw_value), 1)
+                return value_type(
+                    *(
+                        ASSERT.isinstance(
+                            raw_arg, _DIRECTLY_SERIALIZABLE_TYPES
+                        ) for raw_arg in raw_value[type_name]
+                    )
+                )
+
+            return decode_exception
+
+        elif issubclass(value_type, _DIRECTLY_SERIALIZABLE_TYPES):
+            if value_type in _DIRECTLY_SERIALIZABLE_TYPES:
+                return lambda raw_value: ASSERT.isinstance(
+                    raw_value, value_type
+                )
+            else:
+                # Support sub-type of int, etc.
+                return value_type
+
+        else:
+            return functools.partial(self._decode_raw_value, value_type)
+
+    def _compile_union_decoder(self, value_type):
+
+        # Handle ``Optional[T]`` special case.
+        type_ = typings.match_optional_type(value_type)
+        if type_:
+            decode_element = self._get_decoder(type_)
+            return lambda raw_value: (
+                None if raw_value is None else decode_element(raw_value)
+            )
+
+        decoders = {}
+        for type_ in value_type.__args__:
+            if typings.is_recursive_type(type_):
+                type_name = str(type_)
+            else:
+                type_name = type_.__name__
+            # Like ``_decode_raw_value``, the first match wins.
+            decoders.setdefault(type_name, self._get_decoder(type_))
+
+        def decode_union(raw_value):
+
+            # Handle ``None`` special case.
+            if raw_value is None:
+                ASSERT.in_(NoneType, value_type.__args__)
+                return None
+
+            ASSERT.equal(len(raw_value), 1)
+            type_name, raw_element = next(iter(raw_value.items()))
+            decode_element = decoders.get(type_name)
+            if decode_element is None:
+                return ASSERT.unreachable(
+                    'raw value is not any union element type: {!r} {!r}',
+                    value_type,
+                    raw_value,
+                )
+            return decode_element(raw_element)
+
+        return decode_union
 
     def _encode_value(self, value_type, value):
         """Encode a value into a raw value.
@@ -290,6 +615,10 @@ class JsonWireData(wiredata.WireData):
             )
 
 
+def _is_instance(type_, value):
+    return isinstance(value, type_)
+
+
 def _match_recursive_type(type_, value):
 
     if not typings.is_recursive_type(type_):
@@ -29,6 +29,7 @@ setup(
             'nng[asyncs]',
         ],
         'reqrep': [
+            'g1.asyncs.bases',
             'nng[asyncs]',
         ],
         'wiredata.capnps': [
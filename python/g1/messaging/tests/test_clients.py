@@ -72,6 +72,119 @@ class ClientTest(unittest.TestCase):
                 self.assertTrue(task.is_completed())
                 self.assertEqual(task.get_result_nonblocking(), 'hello world')
 
+    @kernels.with_kernel
+    def test_context_reuse(self):
+        with clients.Client(Request, Response, WIRE_DATA) as client:
+            with nng.Socket(nng.Protocols.REP0) as socket:
+                url = 'inproc://%s' % uuid.uuid4()
+                socket.listen(url)
+                client.socket.dial(url)
+
+                for _ in range(2):
+                    task = tasks.spawn(client.m.greet(name='world'))
+                    with self.assertRaises(kernels.KernelTimeout):
+                        kernels.run(timeout=0)
+                    socket.recv()
+                    socket.send(
+                        WIRE_DATA.to_lower(
+                            Response(result=Response.Result(greet='hello'))
+                        )
+                    )
+                    kernels.run(timeout=1)
+                    self.assertEqual(task.get_result_nonblocking(), 'hello')
+                    self.assertEqual(len(client.transceive._idle_contexts), 1)
+
+    @kernels.with_kernel
+    def test_max_concurrency(self):
+        with clients.Client(
+            Request, Response, WIRE_DATA, max_concurrency=1
+        ) as client:
+            with nng.Socket(nng.Protocols.REP0) as socket:
+                url = 'inproc://%s' % uuid.uuid4()
+                socket.listen(url)
+                client.socket.dial(url)
+
+                t1 = tasks.spawn(client.m.greet(name='x'))
+                t2 = tasks.spawn(client.m.greet(name='y'))
+                with self.assertRaises(kernels.KernelTimeout):
+                    kernels.run(timeout=0.01)
+
+                # Only one request is outstanding.
+                socket.recv_timeout = 10  # Unit: milliseconds.
+                request = WIRE_DATA.to_upper(Request, socket.recv())
+                self.assertEqual(request.args, Request.m.greet(name='x'))
+                socket.send(
+                    WIRE_DATA.to_lower(
+                        Response(result=Response.Result(greet='hello x'))
+                    )
+                )
+                with self.assertRaises(kernels.KernelTimeout):
+                    kernels.run(timeout=0.01)
+                self.assertEqual(t1.get_result_nonblocking(), 'hello x')
+                self.assertFalse(t2.is_completed())
+
+                request = WIRE_DATA.to_upper(Request, socket.recv())
+                self.assertEqual(request.args, Request.m.greet(name='y'))
+                socket.send(
+                    WIRE_DATA.to_lower(
+                        Response(result=Response.Result(greet='hello y'))
+                    )
+                )
+                kernels.run(timeout=1)
+                self.assertEqual(t2.get_result_nonblocking(), 'hello y')
+
+    @kernels.with_kernel
+    def test_batch(self):
+        with clients.Client(Request, Response, WIRE_DATA) as client:
+            with nng.Socket(nng.Protocols.REP0) as socket:
+                url = 'inproc://%s' % uuid.uuid4()
+                socket.listen(url)
+                client.socket.dial(url)
+
+                task = tasks.spawn(
+                    client.batch([
+                        (client.m.greet, {'name': 'x'}),
+                        (client.m.greet, {'name': 'y'}),
+                    ])
+                )
+                with self.assertRaises(kernels.KernelTimeout):
+                    kernels.run(timeout=0.01)
+
+                # Reply in reverse order.
+                with nng.Context(socket) as c1, nng.Context(socket) as c2:
+                    r1 = WIRE_DATA.to_upper(Request, c1.recv())
+                    r2 = WIRE_DATA.to_upper(Request, c2.recv())
+                    for context, request in ((c2, r2), (c1, r1)):
+                        greet = 'hello %s' % request.args.greet.name
+                        response = Response(
+                            result=Response.Result(greet=greet)
+                        )
+                        context.send(WIRE_DATA.to_lower(response))
+
+                kernels.run(timeout=1)
+                self.assertEqual(
+                    task.get_result_nonblocking(),
+                    ['hello x', 'hello y'],
+                )
+
+    @kernels.with_kernel
+    def test_batch_error(self):
+        with clients.Client(Request, Response, WIRE_DATA) as client:
+            client.socket.send_timeout = 1  # Unit: milliseconds.
+            client.socket.dial('inproc://%s' % uuid.uuid4())
+
+            task = tasks.spawn(
+                client.batch([
+                    (client.m.greet, {'name': 'x'}),
+                    (client.m.greet.on_timeout_return(42), {'name': 'y'}),
+                ])
+            )
+            kernels.run(timeout=0.01)
+            self.assertTrue(task.is_completed())
+            with self.assertRaises(clients.ServerTimeoutError):
+                task.get_result_nonblocking()
+            self.assertEqual(client.transceive._idle_contexts, [])
+
     @kernels.with_kernel
     def test_timeout(self):
         with clients.Client(Request, Response, WIRE_DATA) as client:
@@ -66,6 +66,61 @@ class PubsubTest(unittest.TestCase):
             self.assertIsNone(s1_task.get_result_nonblocking())
             self.assertIsNone(s2_task.get_result_nonblocking())
 
+    @kernels.with_kernel
+    def test_topics(self):
+        with contextlib.ExitStack() as stack:
+            wiredata = jsons.JsonWireData()
+            p_queue = queues.Queue()
+            s1_queue = queues.Queue()
+            s2_queue = queues.Queue()
+            publisher = stack.enter_context(
+                publishers.Publisher(
+                    p_queue,
+                    wiredata,
+                    get_topic=lambda message: message.content.encode('ascii'),
+                    max_batch_size=4,
+                )
+            )
+            subscriber1 = stack.enter_context(
+                subscribers.Subscriber(
+                    Message, s1_queue, wiredata, topics=[b'']
+                )
+            )
+            subscriber2 = stack.enter_context(
+                subscribers.Subscriber(
+                    Message, s2_queue, wiredata, topics=[b'a', b'c']
+                )
+            )
+            publisher.socket.listen('inproc://test_topics')
+            subscriber1.socket.dial('inproc://test_topics')
+            subscriber2.socket.dial('inproc://test_topics')
+            p_task = tasks.spawn(publisher.serve())
+            s1_task = tasks.spawn(subscriber1.serve())
+            s2_task = tasks.spawn(subscriber2.serve())
+            with self.assertRaises(kernels.KernelTimeout):
+                kernels.run(timeout=0.01)
+            expect = [
+                Message(content=content)
+                for content in ('a1', 'a1', 'b1', 'a2', 'c1', 'c1')
+            ]
+            for message in expect:
+                publisher.publish_nonblocking(message)
+            with self.assertRaises(kernels.KernelTimeout):
+                kernels.run(timeout=0.01)
+            self.assertEqual(s1_queue.close(graceful=False), expect)
+            self.assertEqual(
+                s2_queue.close(graceful=False),
+                [m for m in expect if m.content[0] in 'ac'],
+            )
+
+            publisher.shutdown()
+            subscriber1.shutdown()
+            subscriber2.shutdown()
+            kernels.run(timeout=0.01)
+            self.assertIsNone(p_task.get_result_nonblocking())
+            self.assertIsNone(s1_task.get_result_nonblocking())
+            self.assertIsNone(s2_task.get_result_nonblocking())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from g1.messaging.pubsub import utils
+
+
+class UtilsTest(unittest.TestCase):
+
+    def test_wire_message(self):
+        for topic, raw_messages in [
+            (b'', [b'']),
+            (b'', [b'hello', b'world']),
+            (b'\x00', [b'\x00\x00']),
+            (b'a\x00\xffb', [b'x' * 1000, b'', b'\x00']),
+        ]:
+            with self.subTest((topic, raw_messages)):
+                wire_message = utils.encode_wire_message(topic, raw_messages)
+                self.assertTrue(
+                    wire_message.startswith(utils.encode_topic_prefix(topic))
+                )
+                for wm in (wire_message, memoryview(wire_message)):
+                    self.assertEqual(
+                        [bytes(m) for m in utils.decode_wire_message(wm)],
+                        raw_messages,
+                    )
+
+    def test_topic_prefix(self):
+        topics = [b'', b'a', b'ab', b'a\x00', b'a\x00b', b'\x00', b'b']
+        for prefix in topics:
+            for topic in topics:
+                with self.subTest((prefix, topic)):
+                    self.assertEqual(
+                        utils.encode_wire_message(topic, [b'x']).startswith(
+                            utils.encode_topic_prefix(prefix)
+                        ),
+                        topic.startswith(prefix),
+                    )
+
+    def test_decode_error(self):
+        for wire_message in [
+            b'',
+            b'a',
+            b'a\x00\x00\x00',
+            b'a\x00\x00\x00\x00\x00\x02x',
+        ]:
+            with self.subTest(wire_message):
+                with self.assertRaises(ValueError):
+                    list(utils.decode_wire_message(wire_message))
+
+
+if __name__ == '__main__':
+    unittest.main()
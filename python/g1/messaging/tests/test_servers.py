@@ -102,6 +102,13 @@ class ServerTest(unittest.TestCase):
             ),
             Response(result=Response.Result(greet='Hello, world')),
         )
+        self.assertEqual(
+            WIRE_DATA.to_upper(
+                Response,
+                kernels.run(server._serve(memoryview(wire_request))),
+            ),
+            Response(result=Response.Result(greet='Hello, world')),
+        )
 
         with self.assertLogs(servers.__name__, level='DEBUG') as cm:
             self.assertEqual(
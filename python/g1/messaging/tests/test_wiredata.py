@@ -166,6 +166,15 @@ class JsonWireDataTest(unittest.TestCase):
             self.test_obj,
         )
 
+    def test_to_upper_memory_view(self):
+        self.assertEqual(
+            self.json_wire_data.to_upper(
+                TestType,
+                memoryview(self.json_wire_data.to_lower(self.test_obj)),
+            ),
+            self.test_obj,
+        )
+
     def test_to_lower(self):
         self.assertEqual(
             json.loads(self.json_wire_data.to_lower(self.test_obj)),
@@ -299,6 +308,73 @@ class JsonWireDataTest(unittest.TestCase):
         ):
             self.json_wire_data._encode_value(typing.Dict[int, str], {1: 'x'})
 
+    def test_compiled_codecs(self):
+        wire_data = jsons.JsonWireData()
+        for type_, value in (
+            (TestType, self.test_obj),
+            (int, 1),
+            (int, True),
+            (int, IntSubType(1)),
+            (IntSubType, IntSubType(1)),
+            (SubType, SubType(y=1, s='x')),
+            (typing.Optional[int], None),
+            (typing.Union[int, str, type(None)], None),
+            (typing.Union[int, typing.List[int]], []),
+            (typing.Union[int, typing.List[int]], 1),
+            (RecursiveType, RecursiveType(next=RecursiveType(next=None))),
+        ):
+            with self.subTest((type_, value)):
+                raw_value = wire_data._encode_value(type_, value)
+                actual = wire_data._get_encoder(type_)(value)
+                self.assertEqual(actual, raw_value)
+                self.assertIs(type(actual), type(raw_value))
+                raw_value = json.loads(json.dumps(raw_value))
+                expect = wire_data._decode_raw_value(type_, raw_value)
+                actual = wire_data._get_decoder(type_)(raw_value)
+                self.assertEqual(actual, expect)
+                self.assertIs(type(actual), type(expect))
+
+        for type_, value, exc_type, pattern in (
+            (typing.List[typing.List[int]], [0], TypeError, r'not iterable'),
+            (
+                typing.Tuple[typing.Tuple[int]],
+                ((0, 1), ),
+                AssertionError,
+                r'expect x == 1, not 2',
+            ),
+            (
+                typing.Dict[int, str],
+                {1: 'x'},
+                AssertionError,
+                r'expect subclass of',
+            ),
+            (
+                typing.Union[int, str],
+                None,
+                AssertionError,
+                r'expect .* in ',
+            ),
+            (
+                typing.Union[int, str],
+                b'',
+                AssertionError,
+                r'value is not any union element type',
+            ),
+            (int, b'x', AssertionError, r'expect subclass of'),
+        ):
+            with self.subTest((type_, value)):
+                with self.assertRaisesRegex(exc_type, pattern):
+                    wire_data._get_encoder(type_)(value)
+
+
+@dataclasses.dataclass
+class RecursiveType:
+    next: typing.Optional['RecursiveType']
+
+
+# Resolve the forward reference so that the type refers to itself.
+dataclasses.fields(RecursiveType)[0].type = typing.Optional[RecursiveType]
+
 
 if __name__ == '__main__':
     unittest.main()
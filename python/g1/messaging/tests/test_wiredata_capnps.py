@@ -157,6 +157,13 @@ class CapnpWireDataTest(unittest.TestCase):
                 testdata = to_testdata()
                 self.assertEqual(wd.to_lower(obj), testdata)
                 self.assertEqual(wd.to_upper(SomeStruct, testdata), obj)
+                for view in (
+                    memoryview(testdata),
+                    memoryview(bytearray(testdata)),
+                    # Not word-aligned.
+                    memoryview(bytearray(b'x' + testdata))[1:],
+                ):
+                    self.assertEqual(wd.to_upper(SomeStruct, view), obj)
 
     def test_zero(self):
 
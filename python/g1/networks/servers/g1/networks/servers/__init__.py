@@ -1,7 +1,9 @@
 __all__ = [
+    'ServerStats',
     'SocketServer',
 ]
 
+import collections
 import errno
 import logging
 
@@ -13,6 +15,16 @@ from g1.bases.loggings import ONCE_PER
 LOG = logging.getLogger(__name__)
 LOG.addHandler(logging.NullHandler())
 
+ServerStats = collections.namedtuple(
+    'ServerStats',
+    [
+        # Total number of accepted connections.
+        'num_accepted',
+        # Number of connections being served.
+        'num_connections',
+    ],
+)
+
 
 class SocketServer:
 
@@ -20,6 +32,14 @@ class SocketServer:
         self._socket = socket
         self._handler = handler
         self._max_connections = max_connections
+        self._num_accepted = 0
+        self._num_connections = 0
+
+    def get_stats(self):
+        return ServerStats(
+            num_accepted=self._num_accepted,
+            num_connections=self._num_connections,
+        )
 
     async def serve(self):
         LOG.debug('start server: %r', self._socket)
@@ -53,7 +73,14 @@ class SocketServer:
                     break
                 raise
             LOG.debug('serve client: %r', addr)
-            queue.spawn(self._handler(sock, addr))
+            queue.spawn(self._handler(sock, addr)).add_callback(
+                self._on_handler_completion
+            )
+            self._num_accepted += 1
+            self._num_connections += 1
+
+    def _on_handler_completion(self, _):
+        self._num_connections -= 1
 
     def shutdown(self):
         self._socket.close()
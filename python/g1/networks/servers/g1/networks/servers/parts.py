@@ -1,4 +1,5 @@
 import collections.abc
+import functools
 
 import g1.asyncs.agents.parts
 from g1.apps import asyncs
@@ -7,6 +8,7 @@ from g1.apps import utils
 from g1.bases import labels
 
 from .. import servers  # pylint: disable=relative-beyond-top-level
+from . import processes
 from . import sockets
 
 SERVER_LABEL_NAMES = (
@@ -42,6 +44,7 @@ def setup_server(module_labels, module_params):
         make_socket_server,
         {
             'socket': module_labels.socket,
+            'ssl_context': module_labels.ssl_context,
             'handler': module_labels.handler,
             'params': module_labels.params,
             'return': module_labels.server,
@@ -90,13 +93,18 @@ def make_server_params(
     reuse_port=False,
     protocols=(),
     max_connections=128,
+    num_workers=0,
 ):
     return parameters.Namespace(
         'make server socket',
         host=parameters.Parameter(host, type=str),
         port=parameters.Parameter(port, type=int),
         reuse_address=parameters.Parameter(reuse_address, type=bool),
-        reuse_port=parameters.Parameter(reuse_port, type=bool),
+        reuse_port=parameters.Parameter(
+            reuse_port,
+            'set SO_REUSEPORT (always set when num_workers is positive)',
+            type=bool,
+        ),
         # SSL context.
         certificate=parameters.Parameter(''),
         private_key=parameters.Parameter(''),
@@ -111,6 +119,14 @@ def make_server_params(
             type=int,
             validate=(0).__le__,
         ),
+        num_workers=parameters.Parameter(
+            num_workers,
+            'number of worker processes, each of which has its own kernel '
+            'and SO_REUSEPORT listener (0 disables multi-process mode; '
+            'max_connections is per worker)',
+            type=int,
+            validate=(0).__le__,
+        ),
     )
 
 
@@ -123,8 +139,29 @@ def make_agent(
     shutdown_queue.put_nonblocking(server.shutdown)
 
 
-def make_socket_server(socket, handler, params):
-    return servers.SocketServer(socket, handler, params.max_connections.get())
+def make_socket_server(socket, ssl_context, handler, params):
+    num_workers = params.num_workers.get()
+    if num_workers <= 0:
+        return servers.SocketServer(
+            socket, handler, params.max_connections.get()
+        )
+    server = processes.MultiprocessServer(
+        socket,
+        functools.partial(
+            sockets.make_server_socket,
+            # Use the actual address in case port is 0.
+            socket.getsockname(),
+            reuse_address=params.reuse_address.get(),
+            reuse_port=True,
+            ssl_context=ssl_context,
+        ),
+        handler,
+        num_workers=num_workers,
+        max_connections=params.max_connections.get(),
+    )
+    # Fork workers at startup, before executors start their threads.
+    server.start()
+    return server
 
 
 def make_server_socket(
@@ -136,7 +173,10 @@ def make_server_socket(
         sockets.make_server_socket(
             (params.host.get(), params.port.get()),
             reuse_address=params.reuse_address.get(),
-            reuse_port=params.reuse_port.get(),
+            # Multi-process mode requires SO_REUSEPORT listeners.
+            reuse_port=(
+                params.reuse_port.get() or params.num_workers.get() > 0
+            ),
             ssl_context=ssl_context,
         ),
     )
@@ -0,0 +1,264 @@
+"""Serve through multiple worker processes.
+
+A kernel runs in one thread, and due to the GIL, a ``SocketServer`` can
+use at most one CPU core.  ``MultiprocessServer`` forks worker processes
+instead; each of them runs its own kernel and its own ``SocketServer``
+on its own ``SO_REUSEPORT`` listener, and the operating system load
+balances incoming connections among the workers.
+
+The parent process does not serve any connection; it supervises the
+workers with the same semantics as ``servers.supervise_server``: When
+any worker exits or errs out, all workers are asked to shut down, and
+``serve`` returns (or raises) after they exit.
+
+A worker shuts down gracefully when the parent asks it to, when the
+parent dies, or when it receives SIGTERM (for example, from a process
+manager that signals the whole process group).  It ignores SIGINT, which
+is left to the parent to handle.
+
+Workers are forked, and a forked child inherits the locks that other
+threads hold, but not those threads.  So ``start`` (which forks) must
+be called before any other thread is started, including the threads of
+executors; it asserts this precondition.  ``serve`` calls ``start`` if
+you have not.
+"""
+
+__all__ = [
+    'MultiprocessServer',
+]
+
+import contextvars
+import ctypes
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import servers
+from g1.asyncs.bases import tasks
+from g1.asyncs.bases import timers
+from g1.bases.assertions import ASSERT
+
+from . import ServerStats
+from . import SocketServer
+
+LOG = logging.getLogger(__name__)
+
+
+class MultiprocessServer:
+
+    # Interval at which workers publish their stats.
+    _STATS_INTERVAL = 1
+
+    def __init__(
+        self,
+        socket,  # pylint: disable=redefined-outer-name
+        make_socket,
+        handler,
+        *,
+        num_workers,
+        max_connections=0,
+        grace_period=8,  # Unit: seconds.
+    ):
+        """Make a multi-process server.
+
+        ``socket`` is the listener of the first worker, and
+        ``make_socket`` is called in other workers to make a listener
+        bound to the same address.  All listeners must be created with
+        ``SO_REUSEPORT``.
+
+        ``max_connections`` is per worker.
+        """
+        ASSERT.greater(num_workers, 0)
+        ASSERT(
+            _is_reuse_port(socket),
+            'expect listener with SO_REUSEPORT in multi-process mode: {!r}',
+            socket,
+        )
+        self._socket = socket
+        self._make_socket = make_socket
+        self._handler = handler
+        self._num_workers = num_workers
+        self._max_connections = max_connections
+        self._grace_period = grace_period
+        self._processes = []
+        # Parent ends of the socket pairs; a worker shuts down when its
+        # pair is closed (including when the parent dies).
+        self._shutdown_socks = []
+        # Stats are published through shared memory.
+        self._stats = multiprocessing.RawArray(
+            ctypes.c_uint64, len(ServerStats._fields) * num_workers
+        )
+
+    def get_stats(self):
+        """Return stats aggregated over all workers."""
+        return ServerStats._make(map(sum, zip(*self.get_worker_stats())))
+
+    def get_worker_stats(self):
+        n = len(ServerStats._fields)
+        return [
+            ServerStats._make(self._stats[i * n:(i + 1) * n])
+            for i in range(self._num_workers)
+        ]
+
+    def start(self):
+        """Fork the worker processes.
+
+        Call this before any other thread is started.
+        """
+        ASSERT.empty(self._processes)
+        ASSERT(
+            threading.active_count() == 1,
+            'expect no other threads when forking workers: {}',
+            threading.enumerate(),
+        )
+        LOG.info(
+            'start server: num_workers=%d %r',
+            self._num_workers,
+            self._socket,
+        )
+        # Close our copy of the first worker's listener after forking;
+        # we do not accept connections in the parent process.
+        with self._socket:
+            context = multiprocessing.get_context('fork')
+            for index in range(self._num_workers):
+                sock_r, sock_w = socket.socketpair()
+                self._shutdown_socks.append(sock_w)
+                process = context.Process(
+                    target=self._run_worker,
+                    args=(index, sock_r),
+                    name='worker-%02d' % index,
+                    daemon=True,
+                )
+                process.start()
+                sock_r.close()
+                self._processes.append(process)
+
+    async def serve(self):
+        if not self._processes:
+            self.start()
+        try:
+            async with tasks.CompletionQueue() as queue:
+                await servers.supervise_server(
+                    queue,
+                    tuple(
+                        queue.spawn(self._join_worker(process))
+                        for process in self._processes
+                    ),
+                )
+        finally:
+            self.shutdown()
+            await self._reap_workers()
+        LOG.info('stop server: %r', self._socket)
+
+    def shutdown(self):
+        for sock in self._shutdown_socks:
+            sock.close()
+
+    async def _join_worker(self, process):
+        with adapters.FileAdapter(
+            os.fdopen(os.dup(process.sentinel), 'rb')
+        ) as sentinel:
+            await sentinel.read()
+        process.join()
+        # Ask other workers to shut down, too.
+        self.shutdown()
+        if process.exitcode != 0:
+            raise servers.ServerError(
+                'worker err out: %s exitcode=%d' %
+                (process.name, process.exitcode)
+            )
+
+    async def _reap_workers(self):
+        with timers.timeout_ignore(self._grace_period):
+            for process in self._processes:
+                with adapters.FileAdapter(
+                    os.fdopen(os.dup(process.sentinel), 'rb')
+                ) as sentinel:
+                    await sentinel.read()
+        for process in self._processes:
+            if process.is_alive():
+                LOG.warning('kill worker: %s', process.name)
+                process.kill()
+            process.join()
+
+    #
+    # Worker process.
+    #
+
+    def _run_worker(self, index, shutdown_sock):
+        # Reset signal handling inherited from the parent process.
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Close the inherited file descriptors that are not ours.
+        for sock in self._shutdown_socks:
+            sock.close()
+        listener = self._socket.disown()
+        if index != 0:
+            listener.close()
+            listener = None
+        # Run in an empty context so that we get our own kernel, rather
+        # than the (forked) kernel of the parent process.
+        contextvars.Context().run(
+            kernels.call_with_kernel,
+            self._serve_worker,
+            index,
+            listener,
+            shutdown_sock,
+        )
+
+    def _serve_worker(self, index, listener, shutdown_sock):
+        if listener is None:
+            listener = self._make_socket()
+        else:
+            listener = adapters.SocketAdapter(listener)
+        server = SocketServer(listener, self._handler, self._max_connections)
+        signal_r, signal_w = socket.socketpair()
+        signal_w.setblocking(False)
+        signal.set_wakeup_fd(signal_w.fileno())
+        signal.signal(signal.SIGTERM, lambda *_: None)
+        with signal_w, \
+            adapters.SocketAdapter(signal_r) as signal_r, \
+            adapters.SocketAdapter(shutdown_sock) as shutdown_sock:
+            kernels.run(
+                self._supervise_worker(index, server, shutdown_sock, signal_r)
+            )
+
+    async def _supervise_worker(self, index, server, shutdown_sock, signal_r):
+        async with tasks.CompletionQueue(always_cancel=True) as queue:
+            queue.spawn(self._wait_shutdown(server, shutdown_sock))
+            queue.spawn(self._wait_signal(server, signal_r))
+            queue.spawn(self._publish_stats(index, server))
+            serve_task = queue.spawn(server.serve)
+            await serve_task.join()
+            self._store_stats(index, server)
+            serve_task.get_result_nonblocking()
+
+    @staticmethod
+    async def _wait_shutdown(server, shutdown_sock):
+        while await shutdown_sock.recv(64):
+            pass
+        server.shutdown()
+
+    @staticmethod
+    async def _wait_signal(server, signal_r):
+        await signal_r.recv(1)
+        LOG.info('receive SIGTERM')
+        server.shutdown()
+
+    async def _publish_stats(self, index, server):
+        while True:
+            self._store_stats(index, server)
+            await timers.sleep(self._STATS_INTERVAL)
+
+    def _store_stats(self, index, server):
+        n = len(ServerStats._fields)
+        self._stats[index * n:(index + 1) * n] = server.get_stats()
+
+
+def _is_reuse_port(sock):
+    return bool(sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT))
@@ -0,0 +1,129 @@
+import unittest
+
+import functools
+import os
+import socket
+import threading
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import adapters
+from g1.asyncs.bases import servers
+from g1.asyncs.bases import tasks
+
+from g1.networks.servers import ServerStats
+from g1.networks.servers import processes
+from g1.networks.servers import sockets
+
+
+async def send_pid(sock, _):
+    with sock:
+        await sock.send(b'%d' % os.getpid())
+
+
+async def request_pids(address, num_requests):
+    pids = []
+    for _ in range(num_requests):
+        with adapters.SocketAdapter(socket.socket()) as sock:
+            await sock.connect(address)
+            pids.append(int(await sock.recv(64)))
+    return pids
+
+
+class MultiprocessServerTest(unittest.TestCase):
+
+    def make_server(self, handler, num_workers, make_socket=None):
+        listener = sockets.make_server_socket(
+            ('127.0.0.1', 0), reuse_port=True
+        )
+        self.address = listener.getsockname()
+        return processes.MultiprocessServer(
+            listener,
+            make_socket or functools.partial(
+                sockets.make_server_socket, self.address, reuse_port=True
+            ),
+            handler,
+            num_workers=num_workers,
+            grace_period=2,
+        )
+
+    @kernels.with_kernel
+    def test_reuse_port(self):
+        with sockets.make_server_socket(('127.0.0.1', 0)) as listener:
+            with self.assertRaisesRegex(AssertionError, r'SO_REUSEPORT'):
+                processes.MultiprocessServer(
+                    listener, None, send_pid, num_workers=1
+                )
+
+    @kernels.with_kernel
+    def test_serve(self):
+        server = self.make_server(send_pid, 2)
+        self.assertEqual(server.get_stats(), ServerStats(0, 0))
+        self.assertEqual(
+            server.get_worker_stats(), [ServerStats(0, 0)] * 2
+        )
+
+        serve_task = tasks.spawn(server.serve)
+        pids = kernels.run(request_pids(self.address, 8), timeout=8)
+        self.assertEqual(len(pids), 8)
+        self.assertNotIn(os.getpid(), pids)
+        self.assertLessEqual(len(set(pids)), 2)
+
+        server.shutdown()
+        kernels.run(timeout=8)
+        self.assertTrue(serve_task.is_completed())
+        self.assertIsNone(serve_task.get_result_nonblocking())
+        # Workers store their final stats on exit.
+        self.assertEqual(server.get_stats(), ServerStats(8, 0))
+        self.assertEqual(
+            sum(stats.num_accepted for stats in server.get_worker_stats()),
+            8,
+        )
+
+    @kernels.with_kernel
+    def test_start(self):
+        server = self.make_server(send_pid, 2)
+        server.start()
+        with self.assertRaises(AssertionError):
+            server.start()
+        serve_task = tasks.spawn(server.serve)
+        pids = kernels.run(request_pids(self.address, 4), timeout=8)
+        self.assertNotIn(os.getpid(), pids)
+        server.shutdown()
+        kernels.run(timeout=8)
+        self.assertIsNone(serve_task.get_result_nonblocking())
+
+    @kernels.with_kernel
+    def test_start_with_threads(self):
+        server = self.make_server(send_pid, 1)
+        event = threading.Event()
+        thread = threading.Thread(target=event.wait)
+        thread.start()
+        try:
+            with self.assertRaisesRegex(
+                AssertionError, r'expect no other threads'
+            ):
+                server.start()
+        finally:
+            event.set()
+            thread.join()
+        self.assertEqual(server._processes, [])
+        server._socket.close()
+
+    @kernels.with_kernel
+    def test_worker_error(self):
+
+        def make_socket():
+            raise OSError('some error')
+
+        # The second worker errs out, and then the first worker is asked
+        # to shut down.
+        server = self.make_server(send_pid, 2, make_socket)
+        serve_task = tasks.spawn(server.serve)
+        kernels.run(timeout=8)
+        self.assertTrue(serve_task.is_completed())
+        with self.assertRaisesRegex(servers.ServerError, r'worker err out'):
+            serve_task.get_result_nonblocking()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import socket
+
+from g1.asyncs import kernels
+from g1.asyncs.bases import tasks
+from g1.asyncs.kernels import errors
+
+from g1.networks import servers
+from g1.networks.servers import sockets
+
+
+class SocketServerTest(unittest.TestCase):
+
+    @kernels.with_kernel
+    def test_get_stats(self):
+
+        async def handler(sock, _):
+            with sock:
+                await sock.recv(1)
+
+        listener = sockets.make_server_socket(('127.0.0.1', 0))
+        server = servers.SocketServer(listener, handler)
+        self.assertEqual(server.get_stats(), servers.ServerStats(0, 0))
+
+        serve_task = tasks.spawn(server.serve)
+        clients = [
+            socket.create_connection(listener.getsockname()) for _ in range(3)
+        ]
+        try:
+            with self.assertRaises(errors.KernelTimeout):
+                kernels.run(timeout=0.01)
+            self.assertEqual(server.get_stats(), servers.ServerStats(3, 3))
+
+            clients.pop().close()
+            with self.assertRaises(errors.KernelTimeout):
+                kernels.run(timeout=0.01)
+            self.assertEqual(server.get_stats(), servers.ServerStats(3, 2))
+        finally:
+            for client in clients:
+                client.close()
+
+        server.shutdown()
+        kernels.run(timeout=1)
+        self.assertTrue(serve_task.is_completed())
+        self.assertIsNone(serve_task.get_result_nonblocking())
+        self.assertEqual(server.get_stats(), servers.ServerStats(3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Benchmark JSON wire data of database requests and responses.
+
+It converts typical ``DatabaseRequest`` and ``DatabaseResponse`` messages
+to and from JSON, and reports the number of conversions per second with
+compiled codecs (``to_lower`` and ``to_upper``) and with the generic,
+uncompiled conversion that they replace.
+"""
+
+import json
+import sys
+import time
+
+from g1.messaging.wiredata import jsons
+from g1.operations.databases.bases import interfaces
+
+Request = interfaces.DatabaseRequest
+Response = interfaces.DatabaseResponse
+
+
+def make_messages(num_pairs):
+    pairs = [
+        interfaces.KeyValue(revision=i + 1, key=b'key-%d' % i, value=b'v')
+        for i in range(num_pairs)
+    ]
+    return [
+        (
+            'get',
+            Request(args=Request.m.get(key=b'some key')),
+            Response(result=Response.Result(get=pairs[0])),
+        ),
+        (
+            'set',
+            Request(args=Request.m.set(key=b'some key', value=b'x' * 64)),
+            Response(result=Response.Result(set=None)),
+        ),
+        (
+            'scan',
+            Request(
+                args=Request.m.scan(
+                    key_start=b'a',
+                    key_end=b'z',
+                    sorts=[
+                        interfaces.Sort(
+                            sort_by=interfaces.SortBys.KEY,
+                            ascending=True,
+                        ),
+                    ],
+                    limit=num_pairs,
+                )
+            ),
+            Response(result=Response.Result(scan=pairs)),
+        ),
+        (
+            'error',
+            Request(args=Request.m.get_revision()),
+            Response(
+                error=Response.Error(
+                    transaction_not_found_error=interfaces.
+                    TransactionNotFoundError()
+                )
+            ),
+        ),
+    ]
+
+
+def bench(func, num_rounds):
+    start = time.perf_counter()
+    for _ in range(num_rounds):
+        func()
+    return num_rounds / (time.perf_counter() - start)
+
+
+def main(argv):
+    num_rounds = int(argv[1]) if len(argv) > 1 else 10000
+    num_pairs = int(argv[2]) if len(argv) > 2 else 16
+    wire_data = jsons.JsonWireData()
+    for name, request, response in make_messages(num_pairs):
+        for message_type, message in (
+            (Request, request),
+            (Response, response),
+        ):
+            wire_message = wire_data.to_lower(message)
+            for mode, to_lower, to_upper in (
+                (
+                    'generic',
+                    lambda: json.dumps(
+                        wire_data._encode_value(message_type, message)
+                    ).encode('ascii'),
+                    lambda: wire_data._decode_raw_value(
+                        message_type, json.loads(wire_message)
+                    ),
+                ),
+                (
+                    'compiled',
+                    lambda: wire_data.to_lower(message),
+                    lambda: wire_data.to_upper(message_type, wire_message),
+                ),
+            ):
+                if to_lower() != wire_message:
+                    raise AssertionError('expect identical output')
+                # Compare wire messages because exceptions do not define
+                # equality.
+                if wire_data.to_lower(to_upper()) != wire_message:
+                    raise AssertionError('expect identical message')
+                print(
+                    '%s: %s: %s: to_lower=%.0f/s to_upper=%.0f/s' % (
+                        name,
+                        message_type.__name__,
+                        mode,
+                        bench(to_lower, num_rounds),
+                        bench(to_upper, num_rounds),
+                    )
+                )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,79 @@
+"""Benchmark ``DatabaseInterface`` operations of ``DatabaseServer``.
+
+It calls each operation sequentially against a file database, and
+reports the number of operations per second for each operation.
+"""
+
+import sys
+import tempfile
+import time
+import unittest.mock
+
+from g1.asyncs import kernels
+from g1.databases import sqlite
+from g1.operations.databases.servers import servers
+
+
+def bench(num_ops, make_call):
+    start = time.perf_counter()
+    for i in range(num_ops):
+        kernels.run(make_call(i))
+    return num_ops / (time.perf_counter() - start)
+
+
+def key(i):
+    return b'key-%08d' % i
+
+
+def make_calls(server):
+    return [
+        ('set', lambda i: server.set(key=key(i), value=b'v')),
+        ('set (update)', lambda i: server.set(key=key(i), value=b'w')),
+        ('get', lambda i: server.get(key=key(i))),
+        (
+            'get (revision)',
+            lambda i: server.get(key=key(i), revision=i + 1),
+        ),
+        ('get_revision', lambda i: server.get_revision()),
+        ('count', lambda i: server.count()),
+        (
+            'count (range)',
+            lambda i: server.count(key_start=key(i), key_end=key(i + 100)),
+        ),
+        ('scan_keys', lambda i: server.scan_keys(key_start=key(i), limit=10)),
+        ('scan', lambda i: server.scan(key_start=key(i), limit=10)),
+        (
+            'lease_grant',
+            lambda i: server.lease_grant(lease=i + 1, expiration=1e10),
+        ),
+        (
+            'lease_associate',
+            lambda i: server.lease_associate(lease=i + 1, key=key(i)),
+        ),
+        ('lease_get', lambda i: server.lease_get(lease=i + 1)),
+        ('lease_revoke', lambda i: server.lease_revoke(lease=i + 1)),
+        (
+            'delete',
+            lambda i: server.delete(key_start=key(i), key_end=key(i + 1)),
+        ),
+    ]
+
+
+@kernels.with_kernel
+def main(argv):
+    num_ops = int(argv[1]) if len(argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        server = servers.DatabaseServer(
+            sqlite.create_engine('sqlite:///%s/db' % temp_dir),
+            unittest.mock.Mock(),
+        )
+        with server:
+            for name, make_call in make_calls(server):
+                rate = bench(num_ops, make_call)
+                print('%s: %.0f ops per second' % (name, rate))
+            server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
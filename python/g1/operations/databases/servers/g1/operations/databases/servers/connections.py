@@ -1,4 +1,5 @@
 __all__ = [
+    'ConnectionExecutor',
     'ConnectionManager',
 ]
 
@@ -6,11 +7,13 @@ import collections
 import contextlib
 import logging
 
+from g1.asyncs.bases import adapters
 from g1.asyncs.bases import locks
 from g1.asyncs.bases import timers
 from g1.bases import assertions
 from g1.bases.assertions import ASSERT
 from g1.operations.databases.bases import interfaces
+from g1.threads import executors
 
 LOG = logging.getLogger(__name__)
 
@@ -24,6 +27,84 @@ _WAIT_FOR_WRITER = 4  # Unit: seconds.
 _NUM_REMEMBERED = 8
 
 
+class ConnectionExecutor:
+    """Run database operations on a dedicated thread.
+
+    The thread owns one connection (SQLite connections are bound to the
+    thread that creates them), and operations are executed in the order
+    of submission.
+
+    This also quacks like a connection object to ``ConnectionManager``:
+    ``begin``, ``commit``, ``rollback``, and ``close`` are submitted to
+    the thread without waiting for their completion, and you may call
+    ``sync`` to wait for (and check errors of) the last one of them.
+    Since the thread executes operations in order, you do not have to
+    wait for them before submitting the next operation.
+    """
+
+    def __init__(self, engine, *, name='database', init=None):
+        self._executor = executors.Executor(
+            1, name_prefix=name, daemon=True
+        )
+        self.num_pending = 0
+        self._future = None
+        self._conn = self._executor.submit(engine.connect).get_result()
+        if init is not None:
+            self.call_blocking(init)
+
+    def shutdown(self):
+        self._executor.shutdown()
+        self._executor.join()
+
+    async def call(self, func, *args, **kwargs):
+        """Call ``func(conn, *args, **kwargs)`` in the thread."""
+        self.num_pending += 1
+        try:
+            return await adapters.FutureAdapter(
+                self._executor.submit(func, self._conn, *args, **kwargs)
+            ).get_result()
+        finally:
+            self.num_pending -= 1
+
+    def call_blocking(self, func, *args, **kwargs):
+        return self._executor.submit(func, self._conn, *args, **kwargs)\
+            .get_result()
+
+    async def sync(self):
+        if self._future is not None:
+            await adapters.FutureAdapter(self._future).get_result()
+
+    def _submit(self, func, *args):
+        self._future = self._executor.submit(func, *args)
+        self._future.add_callback(_log_error)
+        return self._future
+
+    def begin(self):
+        return _Transaction(self, self._submit(self._conn.begin))
+
+    def close(self):
+        self._submit(self._conn.close)
+
+
+class _Transaction:
+
+    def __init__(self, executor, future):
+        self._executor = executor
+        self._future = future
+
+    def commit(self):
+        self._executor._submit(lambda: self._future.get_result().commit())
+
+    def rollback(self):
+        self._executor._submit(lambda: self._future.get_result().rollback())
+
+
+def _log_error(future):
+    exc = future.get_exception()
+    if exc is not None:
+        LOG.error('database operation error', exc_info=exc)
+
+
 class ConnectionManager:
     """Connection manager.
 
@@ -31,6 +112,10 @@ class ConnectionManager:
     by providing a reader-writer lock interface guarding the connection
     object.  This mimics SQLite's transaction model that is also a
     reader-writer lock (I am not sure if this is a good idea).
+
+    The connection object may be a ``ConnectionExecutor``, in which case
+    the lock is held while the operations are running in the database
+    thread.
     """
 
     def __init__(self, conn):
@@ -14,8 +14,8 @@ __all__ = [
     'lease_count',
     'lease_expire',
     'lease_get',
+    'lease_get_next_expiration',
     'lease_scan',
-    'lease_scan_expirations',
     'lease_grant',
     'lease_associate',
     'lease_dissociate',
@@ -38,6 +38,7 @@ from g1.bases.assertions import ASSERT
 from g1.operations.databases.bases import interfaces
 
 from . import queries
+from . import statements
 
 
 def get_revision(conn, tables):
@@ -45,7 +46,7 @@ def get_revision(conn, tables):
 
     This raises when the table has more than one row.
     """
-    with _executing(conn, queries.get_revision(tables)) as result:
+    with _executing_statement(conn, tables, 'get_revision') as result:
         return _scalar_or_none(result) or 0
 
 
@@ -58,10 +59,18 @@ def increment_revision(conn, tables, *, revision):
     This is idempotent in the sense that if the current revision was
     set to "plus one" already, this is a no-op.
     """
-    with _executing(
-        conn,
-        queries.increment_revision(tables, revision=revision),
-    ) as result:
+    ASSERT.greater_or_equal(revision, 0)
+    if revision == 0:
+        cm = _executing_statement(conn, tables, 'initialize_revision')
+    else:
+        cm = _executing_statement(
+            conn,
+            tables,
+            'increment_revision',
+            revision=revision,
+            next_revision=revision + 1,
+        )
+    with cm as result:
         if result.rowcount == 0:
             ASSERT.equal(get_revision(conn, tables), revision + 1)
         else:
@@ -69,8 +78,13 @@ def increment_revision(conn, tables, *, revision):
 
 
 def get(conn, tables, **kwargs):
-    with _executing(conn, queries.get(tables, **kwargs)) as result:
-        row = result.first()
+    if kwargs.get('revision', 0) == 0:
+        ASSERT.true(kwargs['key'])
+        cm = _executing_statement(conn, tables, 'get', key=kwargs['key'])
+    else:
+        cm = _executing(conn, queries.get(tables, **kwargs))
+    with cm as result:
+        row = result.fetchone()
         return None if row is None or row[2] is None else _make_pair(row)
 
 
@@ -80,8 +94,24 @@ def _get_key_id(conn, tables, **kwargs):
 
 
 def count(conn, tables, **kwargs):
-    with _executing(conn, queries.count(tables, **kwargs)) as result:
-        return ASSERT.not_none(result.scalar())
+    if kwargs.get('revision', 0) == 0:
+        key_start = kwargs.get('key_start', b'')
+        key_end = kwargs.get('key_end', b'')
+        if key_start and key_end:
+            name = 'count_between'
+        elif key_start:
+            name = 'count_from'
+        elif key_end:
+            name = 'count_to'
+        else:
+            name = 'count'
+        cm = _executing_statement(
+            conn, tables, name, key_start=key_start, key_end=key_end
+        )
+    else:
+        cm = _executing(conn, queries.count(tables, **kwargs))
+    with cm as result:
+        return ASSERT.not_none(_scalar_or_none(result))
 
 
 def scan_keys(conn, tables, **kwargs):
@@ -102,8 +132,10 @@ def set_(conn, tables, *, key, value, tx_revision=None):
     if prior is not None and prior.value == value:
         return prior  # `set_` is idempotent.
     revision = _handle_tx_revision(conn, tables, tx_revision)
-    for query in queries.set_(tables, revision=revision, key=key, value=value):
-        _execute(conn, query)
+    ASSERT.greater_or_equal(revision, 0)
+    ivs = {'revision': revision + 1, 'key': key, 'value': value}
+    statements.execute(conn, tables, 'set_keyspace', **ivs).close()
+    statements.execute(conn, tables, 'set_revisions', **ivs).close()
     return prior
 
 
@@ -163,9 +195,13 @@ def lease_scan(conn, tables, **kwargs):
         return leases
 
 
-def lease_scan_expirations(conn, tables):
-    with _executing(conn, queries.lease_scan_expirations(tables)) as result:
-        return [row[0] for row in result]
+def lease_get_next_expiration(conn, tables):
+    """Return the earliest lease expiration, or None if no lease."""
+    with _executing(
+        conn,
+        queries.lease_get_next_expiration(tables),
+    ) as result:
+        return result.scalar()
 
 
 def lease_grant(conn, tables, **kwargs):
@@ -299,6 +335,15 @@ def _executing(conn, stmt):
         result.close()
 
 
+@contextlib.contextmanager
+def _executing_statement(conn, tables, name, **params):
+    result = statements.execute(conn, tables, name, **params)
+    try:
+        yield result
+    finally:
+        result.close()
+
+
 def _execute(conn, stmt, *args):
     conn.execute(stmt, *args).close()
 
@@ -20,6 +20,7 @@ SERVER_LABEL_NAMES = (
     ('server', g1.messaging.parts.servers.SERVER_LABEL_NAMES),
     ('publisher', g1.messaging.parts.publishers.PUBLISHER_LABEL_NAMES),
     ('database', g1.databases.parts.DATABASE_LABEL_NAMES),
+    'database_server_params',
 )
 
 
@@ -34,17 +35,23 @@ def define_server(module_path=None, **kwargs):
 
 
 def setup_server(module_labels, module_params):
+    utils.depend_parameter_for(
+        module_labels.database_server_params,
+        module_params.database_server,
+    )
     utils.define_maker(
         make_server,
         {
             'create_engine': module_labels.database.create_engine,
             'publisher': module_labels.publisher.publisher,
+            'params': module_labels.database_server_params,
             'return': module_labels.server.server,
         },
     )
     utils.define_maker(
         make_publisher,
         {
+            'params': module_labels.database_server_params,
             'return': module_labels.publisher.publisher,
         },
     )
@@ -69,6 +76,9 @@ def make_server_params(**kwargs):
         'publisher_url',
         'tcp://0.0.0.0:%d' % interfaces.DATABASE_PUBLISHER_PORT,
     )
+    num_readers = kwargs.pop('num_readers', 0)
+    max_group_size = kwargs.pop('max_group_size', servers._MAX_GROUP_SIZE)
+    publish_topics = kwargs.pop('publish_topics', False)
     return parameters.Namespace(
         server=g1.messaging.parts.servers.make_server_params(**kwargs),
         publisher=g1.messaging.parts.publishers.make_publisher_params(
@@ -77,6 +87,29 @@ def make_server_params(**kwargs):
         database=g1.databases.parts.make_create_engine_params(
             dialect='sqlite',
         ),
+        database_server=parameters.Namespace(
+            'configure database server',
+            num_readers=parameters.Parameter(
+                num_readers,
+                'number of reader connections for one-shot reads '
+                '(requires a file database; 0 disables it)',
+                type=int,
+                validate=(0).__le__,
+            ),
+            max_group_size=parameters.Parameter(
+                max_group_size,
+                'max number of one-shot writes committed in one transaction',
+                type=int,
+                validate=(0).__lt__,
+            ),
+            publish_topics=parameters.Parameter(
+                publish_topics,
+                'publish events with their key as topic so that subscribers '
+                'may filter events by key prefix (this changes the wire '
+                'format, and subscribers must be created with key prefixes)',
+                type=bool,
+            ),
+        ),
     )
 
 
@@ -84,11 +117,17 @@ def make_server(
     exit_stack: asyncs.LABELS.exit_stack,
     create_engine,
     publisher,
+    params,
     agent_queue: g1.asyncs.agents.parts.LABELS.agent_queue,
     shutdown_queue: g1.asyncs.agents.parts.LABELS.shutdown_queue,
 ):
     server = exit_stack.enter_context(
-        servers.DatabaseServer(engine=create_engine(), publisher=publisher)
+        servers.DatabaseServer(
+            engine=create_engine(),
+            publisher=publisher,
+            num_readers=params.num_readers.get(),
+            max_group_size=params.max_group_size.get(),
+        )
     )
     agent_queue.spawn(server.serve)
     shutdown_queue.put_nonblocking(server.shutdown)
@@ -109,5 +148,17 @@ def make_server(
     )
 
 
-def make_publisher():
-    return publishers.Publisher(queues.Queue(capacity=32), capnps.WIRE_DATA)
+def make_publisher(params):
+    return publishers.Publisher(
+        queues.Queue(capacity=32),
+        capnps.WIRE_DATA,
+        get_topic=(
+            _get_event_topic if params.publish_topics.get() else None
+        ),
+    )
+
+
+def _get_event_topic(event):
+    if event.current is not None:
+        return event.current.key
+    return event.previous.key
@@ -20,10 +20,10 @@ __all__ = [
     'lease_delete_leases',
     'lease_dissociate',
     'lease_get_key_ids',
+    'lease_get_next_expiration',
     'lease_grant',
     'lease_revoke',
     'lease_scan',
-    'lease_scan_expirations',
     'lease_scan_expired',
     'lease_scan_leases',
     # Maintenance.
@@ -243,8 +243,8 @@ def lease_scan(tables, *, lease_start=0, lease_end=0, limit=0):
     )
 
 
-def lease_scan_expirations(tables):
-    return select([tables.leases.c.expiration])
+def lease_get_next_expiration(tables):
+    return select([func.min(tables.leases.c.expiration)])
 
 
 def lease_grant(tables, *, lease, expiration):
@@ -8,10 +8,14 @@ import logging
 import time
 
 import sqlalchemy
+import sqlalchemy.pool
 
+from g1.asyncs.bases import futures
+from g1.asyncs.bases import locks
 from g1.asyncs.bases import tasks
 from g1.asyncs.bases import timers
 from g1.bases.assertions import ASSERT
+from g1.databases import sqlite
 from g1.operations.databases.bases import interfaces
 
 from . import connections
@@ -27,17 +31,18 @@ LOG = logging.getLogger(__name__)
 
 _TRANSACTION_TIMEOUT = 16  # Unit: seconds.
 
+_MAX_GROUP_SIZE = 256
+
+# Leases are expired at the boundaries of ticks so that expirations
+# that fall into the same tick are coalesced into one transaction.
+_LEASE_EXPIRATION_TICK = 1  # Unit: seconds.
+
 
 def _make_reader(database_func):
 
     @functools.wraps(database_func)
     async def wrapper(self, *, transaction=0, **kwargs):
-        if transaction == 0:
-            conn_ctx = self._manager.reading()
-        else:
-            conn_ctx = self._manager.writing(transaction)
-        async with conn_ctx as conn:
-            return database_func(conn, self._tables, **kwargs)
+        return await self._read(transaction, database_func, **kwargs)
 
     return wrapper
 
@@ -45,22 +50,59 @@ def _make_reader(database_func):
 def _make_writer(database_func, need_tx_revision=False):
 
     @functools.wraps(database_func)
-    async def wrapper(self, *, transaction=0, **kwargs):
+    async def wrapper(self, *, transaction=0, make_events=None, **kwargs):
         if transaction == 0:
-            conn_ctx = self._manager.transacting()
             if need_tx_revision:
                 kwargs['tx_revision'] = None
-        else:
-            conn_ctx = self._manager.writing(transaction)
-            if need_tx_revision:
-                kwargs['tx_revision'] = self._tx_revision
-            self._update_tx_expiration()
-        async with conn_ctx as conn:
-            return database_func(conn, self._tables, **kwargs)
+            return await self._write(database_func, make_events, **kwargs)
+        if need_tx_revision:
+            kwargs['tx_revision'] = self._tx_revision
+        self._update_tx_expiration()
+        async with self._manager.writing(transaction) as conn:
+            result = await conn.call(database_func, self._tables, **kwargs)
+        if make_events is not None:
+            self._pending_events.extend(make_events(result))
+        return result
 
     return wrapper
 
 
+def _set_and_get_revision(conn, tables, *, key, value, tx_revision=None):
+    prior = databases.set_(
+        conn, tables, key=key, value=value, tx_revision=tx_revision
+    )
+    if prior is not None and prior.value == value:
+        return prior, None
+    return prior, databases.get_revision(conn, tables)
+
+
+def _execute_group(conn, tables, group):
+    """Execute a group of one-shot writes in the current transaction.
+
+    Each write is executed in a savepoint so that a failed write does
+    not affect others in the group.
+    """
+    results = []
+    for database_func, kwargs in group:
+        savepoint = conn.begin_nested()
+        try:
+            result = database_func(conn, tables, **kwargs)
+        except Exception as exc:
+            savepoint.rollback()
+            results.append((None, exc))
+        else:
+            savepoint.commit()
+            results.append((result, None))
+    return results
+
+
+def _make_delete_events(prior):
+    return (
+        interfaces.DatabaseEvent(previous=previous, current=None)
+        for previous in prior
+    )
+
+
 async def _sleep(amount, result):
     await timers.sleep(amount)
     return result
@@ -74,11 +116,44 @@ class DatabaseServer(interfaces.DatabaseInterface):
     #
     # pylint: disable=invalid-overridden-method
 
-    def __init__(self, engine, publisher):
+    def __init__(
+        self,
+        engine,
+        publisher,
+        *,
+        num_readers=0,
+        max_group_size=_MAX_GROUP_SIZE,
+    ):
         self._engine = engine
-        self._manager = connections.ConnectionManager(self._engine.connect())
+        # All accesses to the writer connection are made from a database
+        # thread so that they do not block the kernel thread.
+        self._writer = connections.ConnectionExecutor(self._engine)
+        self._manager = connections.ConnectionManager(self._writer)
+        # Optionally, one-shot reads are made from reader connections,
+        # which requires a file database in WAL mode.
+        ASSERT.greater_or_equal(num_readers, 0)
+        if num_readers > 0:
+            ASSERT(
+                sqlite.get_db_path(str(self._engine.url)) is not None and
+                not isinstance(self._engine.pool, sqlalchemy.pool.StaticPool),
+                'expect a file database for readers: {}',
+                self._engine.url,
+            )
+            self._writer.call_blocking(_set_wal_mode)
+        self._readers = tuple(
+            connections.ConnectionExecutor(
+                self._engine,
+                name='database-reader-%02d' % i,
+                init=_set_query_only,
+            ) for i in range(num_readers)
+        )
         self._metadata = sqlalchemy.MetaData()
         self._tables = schemas.make_tables(self._metadata)
+        # For group commit of one-shot writes.
+        self._max_group_size = ASSERT.greater(max_group_size, 0)
+        self._write_queue = collections.deque()
+        self._is_writing = False
+        self._write_gate = locks.Gate()
         self._tx_revision = None
         # A transaction is automatically rolled back if it is inactive
         # after a certain amount of time.  This is a fail-safe mechanism
@@ -88,20 +163,25 @@ class DatabaseServer(interfaces.DatabaseInterface):
         # For publishing database events.
         self._publisher = publisher
         self._pending_events = collections.deque()
+        # The earliest lease expiration known to the lease expirer; it
+        # may be earlier than the actual one due to lease renewals and
+        # revocations, which the lease expirer will find out.
+        self._lease_deadline = None
+        self._lease_deadline_gate = locks.Gate()
 
     async def serve(self):
         await self._check_lease_expiration()
-        await self._run_timer_tasks()
+        async with tasks.joining(
+            tasks.spawn(self._run_lease_expirer()),
+            always_cancel=True,
+        ):
+            await self._run_timer_tasks()
 
     async def _check_lease_expiration(self):
         ASSERT.equal(self._manager.tx_id, 0)
-        async with self._manager.reading() as conn:
-            expirations = databases.lease_scan_expirations(conn, self._tables)
-        now = time.time()
-        for expiration in expirations:
-            self._timer_queue.spawn(
-                _sleep(expiration - now, self._lease_expire)
-            )
+        self._update_lease_deadline(
+            await self._read(0, databases.lease_get_next_expiration)
+        )
 
     async def _run_timer_tasks(self):
         async for timer_task in self._timer_queue:
@@ -114,12 +194,93 @@ class DatabaseServer(interfaces.DatabaseInterface):
 
     def __enter__(self):
         LOG.info('database start')
-        self._metadata.create_all(self._engine)
+        self._writer.call_blocking(self._metadata.create_all)
         return self
 
     def __exit__(self, *args):
         LOG.info('database stop')
         self._manager.close()
+        self._writer.shutdown()
+        for reader in self._readers:
+            reader.close()
+            reader.shutdown()
+
+    #
+    # Database threads.
+    #
+
+    async def _read(self, transaction, database_func, **kwargs):
+        if transaction != 0:
+            conn_ctx = self._manager.writing(transaction)
+        elif self._readers:
+            reader = min(self._readers, key=lambda r: r.num_pending)
+            return await reader.call(database_func, self._tables, **kwargs)
+        else:
+            conn_ctx = self._manager.reading()
+        async with conn_ctx as conn:
+            return await conn.call(database_func, self._tables, **kwargs)
+
+    async def _write(self, database_func, make_events, **kwargs):
+        """Execute a one-shot write with group commit.
+
+        Concurrent one-shot writes are queued, and the first writer in
+        the queue becomes the leader that executes the queued writes in
+        one transaction, while the others wait for the leader.
+
+        ``make_events``, if not None, is called with the result of the
+        write, and returns the database events to be published.  The
+        leader publishes the events of the group in the order of the
+        writes (which is also the revision order), since the waiters
+        may be resumed in any order.
+        """
+        future = futures.Future()
+        self._write_queue.append((database_func, kwargs, make_events, future))
+        while not future.is_completed():
+            if self._is_writing:
+                await self._write_gate.wait()
+                continue
+            self._is_writing = True
+            try:
+                await self._write_group()
+            finally:
+                self._is_writing = False
+                self._write_gate.unblock()
+        return future.get_result_nonblocking()
+
+    async def _write_group(self):
+        group = [
+            self._write_queue.popleft() for _ in
+            range(min(len(self._write_queue), self._max_group_size))
+        ]
+        try:
+            async with self._manager.transacting() as conn:
+                results = await conn.call(
+                    _execute_group,
+                    self._tables,
+                    [(func, kwargs) for func, kwargs, _, _ in group],
+                )
+            await self._writer.sync()
+        except Exception as exc:
+            for _, _, _, future in group:
+                future.set_exception(exc)
+            return
+        except BaseException:
+            for _, _, _, future in group:
+                future.set_exception(interfaces.InternalError())
+            raise
+        if len(group) > 1:
+            LOG.debug('group commit: %d writes', len(group))
+        try:
+            for (_, _, make_events, _), (result, exc) in zip(group, results):
+                if exc is None and make_events is not None:
+                    for event in make_events(result):
+                        self._publisher.publish_nonblocking(event)
+        finally:
+            for (_, _, _, future), (result, exc) in zip(group, results):
+                if exc is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(exc)
 
     #
     # Transactions.
@@ -128,7 +289,9 @@ class DatabaseServer(interfaces.DatabaseInterface):
     async def begin(self, *, transaction):
         conn = await self._manager.begin(transaction)
         try:
-            self._tx_revision = databases.get_revision(conn, self._tables)
+            self._tx_revision = await conn.call(
+                databases.get_revision, self._tables
+            )
             self._update_tx_expiration()
         except BaseException:
             self._rollback(transaction)
@@ -149,12 +312,15 @@ class DatabaseServer(interfaces.DatabaseInterface):
 
     async def commit(self, *, transaction):
         async with self._manager.writing(transaction) as conn:
-            databases.increment_revision(
-                conn, self._tables, revision=self._tx_revision
+            await conn.call(
+                databases.increment_revision,
+                self._tables,
+                revision=self._tx_revision,
             )
         self._manager.commit(transaction)
         self._tx_revision = None
         try:
+            await self._writer.sync()
             for event in self._pending_events:
                 self._publisher.publish_nonblocking(event)
         finally:
@@ -170,8 +336,8 @@ class DatabaseServer(interfaces.DatabaseInterface):
                 _sleep(_TRANSACTION_TIMEOUT, self._check_tx_expiration)
             )
 
-    # Make the signature of this function async to keep it the same with
-    # _lease_expire.
+    # Make the signature of this function async because timer callbacks
+    # are awaited by _run_timer_tasks.
     async def _check_tx_expiration(self):
         if self._manager.tx_id == 0:
             return
@@ -189,50 +355,41 @@ class DatabaseServer(interfaces.DatabaseInterface):
     count = _make_reader(databases.count)
     scan_keys = _make_reader(databases.scan_keys)
     scan = _make_reader(databases.scan)
-    _set = _make_writer(databases.set_, need_tx_revision=True)
+    _set = _make_writer(_set_and_get_revision, need_tx_revision=True)
     _delete = _make_writer(databases.delete, need_tx_revision=True)
 
     async def set(self, *, key, value, transaction=0):
-        prior = await self._set(key=key, value=value, transaction=transaction)
-        if prior is None or prior.value != value:
+
+        def make_events(result):
+            prior, revision = result
+            if revision is None:
+                return ()
             if transaction != 0:
                 revision = ASSERT.not_none(self._tx_revision) + 1
-            else:
-                ASSERT.equal(self._manager.tx_id, 0)
-                async with self._manager.reading() as conn:
-                    revision = databases.get_revision(conn, self._tables)
-            self._maybe_publish_events(
-                transaction,
-                [
-                    interfaces.DatabaseEvent(
-                        previous=prior,
-                        current=interfaces.KeyValue(
-                            revision=revision, key=key, value=value
-                        ),
+            return (
+                interfaces.DatabaseEvent(
+                    previous=prior,
+                    current=interfaces.KeyValue(
+                        revision=revision, key=key, value=value
                     ),
-                ],
+                ),
             )
-        return prior
 
-    async def delete(self, *, key_start=b'', key_end=b'', transaction=0):
-        prior = await self._delete(
-            key_start=key_start, key_end=key_end, transaction=transaction
-        )
-        self._maybe_publish_events(
-            transaction,
-            (
-                interfaces.DatabaseEvent(previous=previous, current=None)
-                for previous in prior
-            ),
+        prior, _ = await self._set(
+            key=key,
+            value=value,
+            transaction=transaction,
+            make_events=make_events,
         )
         return prior
 
-    def _maybe_publish_events(self, transaction, events):
-        if transaction == 0:
-            for event in events:
-                self._publisher.publish_nonblocking(event)
-        else:
-            self._pending_events.extend(events)
+    async def delete(self, *, key_start=b'', key_end=b'', transaction=0):
+        return await self._delete(
+            key_start=key_start,
+            key_end=key_end,
+            transaction=transaction,
+            make_events=_make_delete_events,
+        )
 
     #
     # Leases.
@@ -248,29 +405,63 @@ class DatabaseServer(interfaces.DatabaseInterface):
 
     async def lease_grant(self, **kwargs):  # pylint: disable=arguments-differ
         result = await self._lease_grant(**kwargs)
-        self._timer_queue.spawn(
-            _sleep(kwargs['expiration'] - time.time(), self._lease_expire)
-        )
+        self._update_lease_deadline(kwargs['expiration'])
         return result
 
-    async def _lease_expire(self):
+    def _update_lease_deadline(self, expiration):
+        if expiration is None:
+            return
+        if self._lease_deadline is None or expiration < self._lease_deadline:
+            self._lease_deadline = expiration
+            self._lease_deadline_gate.unblock()
+
+    async def _run_lease_expirer(self):
+        while True:
+            if self._lease_deadline is None:
+                await self._lease_deadline_gate.wait()
+                continue
+            now = time.time()
+            if now <= self._lease_deadline:
+                wake_at = (
+                    self._lease_deadline // _LEASE_EXPIRATION_TICK + 1
+                ) * _LEASE_EXPIRATION_TICK
+                with timers.timeout_ignore(wake_at - now):
+                    await self._lease_deadline_gate.wait()
+                continue
+            # Reset the deadline before reading the actual one so that
+            # lease grants that happen in the meantime are not lost.
+            deadline = self._lease_deadline
+            self._lease_deadline = None
+            try:
+                expiration = await self._read(
+                    0, databases.lease_get_next_expiration
+                )
+                if expiration is not None and expiration < now:
+                    await self._lease_expire(now)
+                    expiration = await self._read(
+                        0, databases.lease_get_next_expiration
+                    )
+            except Exception:
+                # Do not let an error end the lease expirer silently;
+                # retry after a tick instead.
+                LOG.exception('lease expirer error')
+                self._update_lease_deadline(deadline)
+                await timers.sleep(_LEASE_EXPIRATION_TICK)
+                continue
+            self._update_lease_deadline(expiration)
+
+    async def _lease_expire(self, current_time):
         prior = ()
         try:
-            async with self._manager.transacting() as conn:
-                prior = databases.lease_expire(
-                    conn, self._tables, current_time=time.time()
-                )
+            prior = await self._write(
+                databases.lease_expire,
+                _make_delete_events,
+                current_time=current_time,
+            )
         except interfaces.TransactionTimeoutError:
             LOG.warning('lease_expire: timeout on beginning transaction')
         if prior:
             LOG.info('expire %d pairs', len(prior))
-            self._maybe_publish_events(
-                0,
-                (
-                    interfaces.DatabaseEvent(previous=previous, current=None)
-                    for previous in prior
-                ),
-            )
 
     #
     # Maintenance.
@@ -278,4 +469,17 @@ class DatabaseServer(interfaces.DatabaseInterface):
 
     async def compact(self, **kwargs):  # pylint: disable=arguments-differ
         async with self._manager.transacting() as conn:
-            return databases.compact(conn, self._tables, **kwargs)
+            result = await conn.call(databases.compact, self._tables, **kwargs)
+        await self._writer.sync()
+        return result
+
+
+def _set_wal_mode(conn):
+    ASSERT.equal(
+        conn.exec_driver_sql('PRAGMA journal_mode = WAL').scalar(),
+        'wal',
+    )
+
+
+def _set_query_only(conn):
+    conn.exec_driver_sql('PRAGMA query_only = ON').close()
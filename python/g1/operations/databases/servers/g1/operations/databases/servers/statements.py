@@ -0,0 +1,104 @@
+"""Precompiled statements of hot operations.
+
+For point operations like ``get`` and ``set_``, building a SQLAlchemy
+expression tree and compiling it on every call costs more than SQLite
+executing it.  So we build these statements once per tables object with
+bound parameters, and compile them into SQL strings.  When the
+connection is a SQLite connection, we execute the SQL strings directly
+on the underlying ``sqlite3`` connection (which caches prepared
+statements); otherwise, we fall back to executing them via SQLAlchemy.
+"""
+
+__all__ = [
+    'Statement',
+    'execute',
+    'get_statements',
+]
+
+import functools
+
+import sqlalchemy.engine
+from sqlalchemy import (
+    bindparam,
+    func,
+    select,
+)
+from sqlalchemy.dialects import sqlite as sqlite_dialects
+
+from g1.bases import collections as g1_collections
+from g1.databases import sqlite
+
+_DIALECT = sqlite_dialects.dialect()
+
+
+class Statement:
+
+    def __init__(self, query):
+        self.query = query
+        compiled = query.compile(dialect=_DIALECT)
+        self.sql = str(compiled)
+        self._names = tuple(compiled.positiontup)
+        # Values of literal parameters, such as ``values(revision=1)``.
+        self._defaults = compiled.params
+
+    def execute(self, conn, params):
+        sqlite3_conn = _get_sqlite3_conn(conn)
+        if sqlite3_conn is None:
+            return conn.execute(self.query, params)
+        return sqlite3_conn.execute(
+            self.sql,
+            tuple(
+                params[name] if name in params else self._defaults[name]
+                for name in self._names
+            ),
+        )
+
+
+def execute(conn, tables, name, **params):
+    return get_statements(tables)[name].execute(conn, params)
+
+
+def _get_sqlite3_conn(conn):
+    if (
+        not isinstance(conn, sqlalchemy.engine.Connection)
+        or conn.dialect.name != 'sqlite'
+    ):
+        return None
+    return conn.connection.connection
+
+
+@functools.lru_cache(maxsize=8)
+def get_statements(tables):
+    keyspace = tables.keyspace
+    current_revision = tables.current_revision
+    count_keyspace = select([func.count()]).select_from(keyspace)
+    key_start = keyspace.c.key >= bindparam('key_start')
+    key_end = keyspace.c.key < bindparam('key_end')
+    ivs = {
+        'revision': bindparam('revision'),
+        'key': bindparam('key'),
+        'value': bindparam('value'),
+    }
+    return g1_collections.Namespace(
+        get_revision=Statement(select([current_revision.c.revision])),
+        initialize_revision=Statement(
+            sqlite.upsert(current_revision).values(revision=1)
+        ),
+        increment_revision=Statement(
+            current_revision.update()\
+            .where(current_revision.c.revision == bindparam('revision'))
+            .values(revision=bindparam('next_revision'))
+        ),
+        get=Statement(
+            select([keyspace.c.revision, keyspace.c.key, keyspace.c.value])\
+            .where(keyspace.c.key == bindparam('key'))
+        ),
+        count=Statement(count_keyspace),
+        count_from=Statement(count_keyspace.where(key_start)),
+        count_to=Statement(count_keyspace.where(key_end)),
+        count_between=Statement(
+            count_keyspace.where(key_start).where(key_end)
+        ),
+        set_keyspace=Statement(sqlite.upsert(keyspace).values(**ivs)),
+        set_revisions=Statement(tables.revisions.insert().values(**ivs)),
+    )
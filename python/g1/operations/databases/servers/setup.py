@@ -11,6 +11,7 @@ setup(
         'g1.bases',
         'g1.databases',
         'g1.operations.databases.bases',
+        'g1.threads',
     ],
     extras_require={
         'apps': [
@@ -8,6 +8,7 @@ from g1.databases import sqlite
 from g1.operations.databases.bases import interfaces
 from g1.operations.databases.servers import databases
 from g1.operations.databases.servers import schemas
+from g1.operations.databases.servers import statements
 
 K1_NEXT = interfaces.next_key(b'k1')
 
@@ -753,6 +754,16 @@ class DatabasesTest(unittest.TestCase):
             {1001, 1002},
         )
 
+    def test_lease_get_next_expiration(self):
+        self.assertIsNone(
+            databases.lease_get_next_expiration(self.engine, self.tables)
+        )
+        self.make_lease_testdata()
+        self.assertEqual(
+            databases.lease_get_next_expiration(self.engine, self.tables),
+            10001,
+        )
+
     def test_lease_get_key_ids(self):
         self.make_lease_testdata()
         self.assertEqual(
@@ -850,5 +861,28 @@ class ExtractKeyspaceTest(unittest.TestCase):
         )
 
 
+
+class DatabasesConnectionTest(DatabasesTest):
+    """Run the same tests on a connection.
+
+    Unlike an engine, a SQLite connection executes precompiled
+    statements on the underlying sqlite3 connection.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.engine = self.engine.connect()
+
+    def tearDown(self):
+        self.engine.close()
+        super().tearDown()
+
+    def test_statements(self):
+        self.assertIsNotNone(statements._get_sqlite3_conn(self.engine))
+        self.assertIs(
+            statements.get_statements(self.tables),
+            statements.get_statements(self.tables),
+        )
+
 if __name__ == '__main__':
     unittest.main()
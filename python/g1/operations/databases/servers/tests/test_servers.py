@@ -1,7 +1,9 @@
 import unittest
 import unittest.mock
 
+import collections
 import functools
+import tempfile
 
 from g1.asyncs import kernels
 from g1.asyncs.bases import tasks
@@ -35,6 +37,17 @@ def with_kernel(test_method):
     return wrapper
 
 
+def run_until(predicate, num_tries=100):
+    for _ in range(num_tries):
+        if predicate():
+            return
+        try:
+            kernels.run(timeout=0.01)
+        except kernels.KernelTimeout:
+            pass
+    raise AssertionError('expect predicate to become true')
+
+
 def de(p, c):
     return interfaces.DatabaseEvent(previous=p, current=c)
 
@@ -196,14 +209,103 @@ class ServersTest(unittest.TestCase):
             interfaces.Lease(lease=1, expiration=0.01, keys=(b'k1', )),
         )
 
-        server_task = tasks.spawn(self.server._run_timer_tasks)
+        self.assertEqual(len(self.server._timer_queue), 0)
         self.mock_time.return_value = 10
-        with self.assertRaises(kernels.KernelTimeout):
-            kernels.run(timeout=0.02)
+        self.publisher.publish_nonblocking.reset_mock()
+        server_task = tasks.spawn(self.server.serve)
+        run_until(lambda: self.publisher.publish_nonblocking.called)
+        self.assertIsNone(self.server._lease_deadline)
         self.assertEqual(kernels.run(self.server.get_revision()), 2)
         self.assertIsNone(kernels.run(self.server.get(key=b'k1')))
         self.assertIsNone(kernels.run(self.server.lease_get(lease=1)))
-        self.assert_publish([de(None, kv(1, b'k1', b'v1'))])
+        self.assert_publish([de(kv(1, b'k1', b'v1'), None)])
+
+        self.server.shutdown()
+        kernels.run(timeout=0.01)
+        self.assertIsNone(server_task.get_result_nonblocking())
+
+    @with_kernel
+    def test_lease_expired_retry(self):
+        kernels.run(self.server.set(key=b'k1', value=b'v1'))
+        kernels.run(self.server.lease_grant(lease=1, expiration=0.01))
+        kernels.run(self.server.lease_associate(lease=1, key=b'k1'))
+
+        lease_expire = servers.databases.lease_expire
+
+        def fail_once(*args, **kwargs):
+            if mock_lease_expire.call_count == 1:
+                raise Exception('some error')
+            return lease_expire(*args, **kwargs)
+
+        self.mock_time.return_value = 10
+        self.publisher.publish_nonblocking.reset_mock()
+        with unittest.mock.patch.multiple(
+            servers,
+            _LEASE_EXPIRATION_TICK=0.001,
+        ), unittest.mock.patch.object(
+            servers.databases,
+            'lease_expire',
+            side_effect=fail_once,
+        ) as mock_lease_expire:
+            server_task = tasks.spawn(self.server.serve)
+            run_until(lambda: self.publisher.publish_nonblocking.called)
+        self.assertEqual(mock_lease_expire.call_count, 2)
+        self.assertFalse(server_task.is_completed())
+        self.assertIsNone(self.server._lease_deadline)
+        self.assertIsNone(kernels.run(self.server.get(key=b'k1')))
+        self.assertIsNone(kernels.run(self.server.lease_get(lease=1)))
+        self.assert_publish([de(kv(1, b'k1', b'v1'), None)])
+
+        self.server.shutdown()
+        kernels.run(timeout=0.01)
+        self.assertIsNone(server_task.get_result_nonblocking())
+
+    @with_kernel
+    def test_lease_expired_coalesced(self):
+        for i in range(1, 4):
+            kernels.run(self.server.set(key=b'k%d' % i, value=b'v'))
+            kernels.run(self.server.lease_grant(lease=i, expiration=i / 4))
+            kernels.run(self.server.lease_associate(lease=i, key=b'k%d' % i))
+        kernels.run(self.server.lease_grant(lease=4, expiration=100))
+        self.assertEqual(self.server._lease_deadline, 0.25)
+
+        self.mock_time.return_value = 1
+        with unittest.mock.patch.object(
+            servers.databases,
+            'lease_expire',
+            wraps=servers.databases.lease_expire,
+        ) as mock_lease_expire:
+            server_task = tasks.spawn(self.server.serve)
+            run_until(lambda: self.server._lease_deadline == 100)
+        mock_lease_expire.assert_called_once()
+        self.assertEqual(self.server._lease_deadline, 100)
+        self.assertEqual(kernels.run(self.server.count()), 0)
+        self.assertEqual(kernels.run(self.server.lease_count()), 1)
+
+        self.server.shutdown()
+        kernels.run(timeout=0.01)
+        self.assertIsNone(server_task.get_result_nonblocking())
+
+    @with_kernel
+    def test_lease_renewed(self):
+        kernels.run(self.server.lease_grant(lease=1, expiration=0.5))
+        kernels.run(self.server.lease_grant(lease=1, expiration=100))
+        self.assertEqual(self.server._lease_deadline, 0.5)
+        self.assertEqual(len(self.server._timer_queue), 0)
+
+        self.mock_time.return_value = 1
+        with unittest.mock.patch.object(
+            servers.databases,
+            'lease_expire',
+        ) as mock_lease_expire:
+            server_task = tasks.spawn(self.server.serve)
+            run_until(lambda: self.server._lease_deadline == 100)
+        mock_lease_expire.assert_not_called()
+        self.assertEqual(self.server._lease_deadline, 100)
+        self.assertEqual(
+            kernels.run(self.server.lease_get(lease=1)),
+            interfaces.Lease(lease=1, expiration=100, keys=()),
+        )
 
         self.server.shutdown()
         kernels.run(timeout=0.01)
@@ -226,6 +328,97 @@ class ServersTest(unittest.TestCase):
         )
         self.publisher.publish_nonblocking.assert_not_called()
 
+    @synchronous
+    async def test_group_commit(self):
+        await self.server.set(key=b'k0', value=b'v0')
+        self.publisher.publish_nonblocking.reset_mock()
+        ts = [
+            tasks.spawn(self.server.set(key=b'k1', value=b'v1')),
+            tasks.spawn(self.server.lease_associate(lease=1, key=b'k1')),
+            tasks.spawn(self.server.set(key=b'k2', value=b'v2')),
+            tasks.spawn(self.server.delete(key_start=b'k0', key_end=b'k1')),
+        ]
+        for t in ts:
+            await t.join()
+        self.assertIsNone(ts[0].get_result_nonblocking())
+        # A failed write does not affect others in the group.
+        with self.assertRaises(interfaces.LeaseNotFoundError):
+            ts[1].get_result_nonblocking()
+        self.assertIsNone(ts[2].get_result_nonblocking())
+        self.assertEqual(ts[3].get_result_nonblocking(), [kv(1, b'k0', b'v0')])
+        self.assertEqual(await self.server.get_revision(), 4)
+        self.assertEqual(
+            await self.server.scan(),
+            [kv(2, b'k1', b'v1'), kv(3, b'k2', b'v2')],
+        )
+        self.assert_publish([
+            de(None, kv(2, b'k1', b'v1')),
+            de(None, kv(3, b'k2', b'v2')),
+            de(kv(1, b'k0', b'v0'), None),
+        ])
+
+    @synchronous
+    async def test_group_commit_max_group_size(self):
+        self.server._max_group_size = 2
+        ts = [
+            tasks.spawn(self.server.set(key=b'k%d' % i, value=b'v'))
+            for i in range(5)
+        ]
+        for t in ts:
+            await t.join()
+            self.assertIsNone(t.get_result_nonblocking())
+        self.assertEqual(await self.server.get_revision(), 5)
+        self.assertEqual(self.server._write_queue, collections.deque())
+
+
+class ReadersTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = sqlite.create_engine(
+            'sqlite:///%s/db' % self.temp_dir.name
+        )
+        self.publisher = unittest.mock.Mock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_in_memory_database(self):
+        with self.assertRaisesRegex(AssertionError, r'expect a file database'):
+            servers.DatabaseServer(
+                sqlite.create_engine('sqlite://'),
+                self.publisher,
+                num_readers=1,
+            )
+
+    @kernels.with_kernel
+    def test_readers(self):
+        server = servers.DatabaseServer(
+            self.engine, self.publisher, num_readers=2
+        )
+        with server:
+            kernels.run(server.set(key=b'k1', value=b'v1'))
+            kernels.run(server.begin(transaction=1))
+            kernels.run(server.set(key=b'k1', value=b'v2', transaction=1))
+            # One-shot reads are not blocked by the transaction, and
+            # they do not see uncommitted data.
+            self.assertEqual(
+                kernels.run(server.get(key=b'k1')),
+                kv(1, b'k1', b'v1'),
+            )
+            self.assertEqual(
+                kernels.run(server.get(key=b'k1', transaction=1)),
+                kv(2, b'k1', b'v2'),
+            )
+            kernels.run(server.commit(transaction=1))
+            self.assertEqual(
+                kernels.run(server.get(key=b'k1')),
+                kv(2, b'k1', b'v2'),
+            )
+            server.shutdown()
+
 
 if __name__ == '__main__':
     unittest.main()
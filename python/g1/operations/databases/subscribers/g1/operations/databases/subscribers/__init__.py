@@ -12,9 +12,16 @@ from g1.operations.databases.bases import interfaces
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 
-def make_subscriber(queue):
+def make_subscriber(queue, key_prefixes=None):
+    """Make a subscriber of database events.
+
+    If ``key_prefixes`` is provided, it receives only events of keys of
+    the given prefixes, which requires the server to publish events
+    with topics.
+    """
     return subscribers.Subscriber(
         interfaces.DatabaseEvent,
         queue,
         capnps.WIRE_DATA,
+        topics=key_prefixes,
     )
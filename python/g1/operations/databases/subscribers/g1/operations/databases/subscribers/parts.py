@@ -4,8 +4,6 @@ from g1.apps import parameters
 from g1.apps import utils
 from g1.asyncs.bases import queues
 from g1.bases import labels
-# For now these are just aliases.
-from g1.messaging.parts.subscribers import make_subscriber_params
 
 from .. import subscribers  # pylint: disable=relative-beyond-top-level
 
@@ -14,6 +12,7 @@ SUBSCRIBER_LABEL_NAMES = (
     'queue',
     # Private.
     ('subscriber', g1.messaging.parts.subscribers.SUBSCRIBER_LABEL_NAMES),
+    'subscriber_params',
 )
 
 
@@ -31,6 +30,10 @@ def define_subscriber(module_path=None, **kwargs):
 
 
 def setup_subscriber(module_labels, module_params):
+    utils.depend_parameter_for(
+        module_labels.subscriber_params,
+        module_params,
+    )
     utils.define_maker(
         make_queue,
         {
@@ -38,9 +41,10 @@ def setup_subscriber(module_labels, module_params):
         },
     )
     utils.define_maker(
-        subscribers.make_subscriber,
+        make_subscriber,
         {
             'queue': module_labels.queue,
+            'params': module_labels.subscriber_params,
             'return': module_labels.subscriber.subscriber,
         },
     )
@@ -50,6 +54,38 @@ def setup_subscriber(module_labels, module_params):
     )
 
 
+def make_subscriber_params(*, key_prefixes=None, **kwargs):
+    return parameters.Namespace(
+        'configure subscriber',
+        key_prefixes=parameters.Parameter(
+            key_prefixes,
+            'receive only events of keys of these prefixes (requires the '
+            'server to publish events with topics; none receives all events '
+            'published with no topic)',
+            type=(type(None), tuple),
+            convert=_to_key_prefixes,
+        ),
+        **g1.messaging.parts.subscribers.make_subscriber_params(**kwargs)
+        ._asdict(),
+    )
+
+
+def _to_key_prefixes(key_prefixes):
+    if key_prefixes is None:
+        return None
+    return tuple(
+        key_prefix if isinstance(key_prefix, bytes) else
+        key_prefix.encode('utf-8') for key_prefix in key_prefixes
+    )
+
+
+def make_subscriber(queue, params):
+    return subscribers.make_subscriber(
+        queue,
+        key_prefixes=params.key_prefixes.get(),
+    )
+
+
 def make_queue(shutdown_queue: g1.asyncs.agents.parts.LABELS.shutdown_queue):
     queue = queues.Queue(capacity=32)
     shutdown_queue.put_nonblocking(queue.close)
@@ -85,7 +85,6 @@ import datetime
 import enum
 import functools
 import logging
-import operator
 import threading
 
 from g1.bases import assertions
@@ -107,7 +106,12 @@ NoneType = type(None)
 
 
 class DataclassConverter:
-    """Convert a dataclass object to/from a struct builder/reader."""
+    """Convert a dataclass object to/from a struct builder/reader.
+
+    The conversion plan is compiled once per (schema, dataclass) pair,
+    and operates on raw capnp objects, bypassing the dict-like (and
+    slower) interface of the ``dynamics`` wrappers.
+    """
 
     def __init__(self, schema, dataclass):
         self._schema = ASSERT.isinstance(schema, schemas.StructSchema)
@@ -116,23 +120,74 @@ class DataclassConverter:
 
     def from_reader(self, reader):
         ASSERT.is_(reader.schema, self._schema)
-        return self._converter.from_reader(reader)
+        return self._converter.from_raw(reader._raw)
 
     def to_builder(self, dataobject, builder):
         ASSERT.isinstance(dataobject, self._dataclass)
         ASSERT.is_(builder.schema, self._schema)
-        self._converter.to_builder(dataobject, builder)
+        self._converter.to_raw(dataobject, builder._raw)
 
     def from_message(self, message):
-        return self.from_reader(message.get_root(self._schema))
+        return self._converter.from_raw(
+            message._raw.getRoot(self._schema._raw)
+        )
 
     def to_message(self, dataobject, message):
-        self.to_builder(dataobject, message.init_root(self._schema))
+        ASSERT.isinstance(dataobject, self._dataclass)
+        self._converter.to_raw(
+            dataobject, message._raw.initRoot(self._schema._raw)
+        )
 
 
 #
 # Collection-type converters.
 #
+# They convert from/to raw ``DynamicStruct`` and ``DynamicList`` rather
+# than their ``dynamics`` wrappers.
+#
+
+
+class _StructPlan:
+    """Flat plan of field accessors of a struct.
+
+    Accessors are specialized to field types at compile time.  Union
+    members are indexed by their discriminant (the field index returned
+    by ``which``) so that only the active member is read.
+    """
+
+    def __init__(self, schema, fields):
+        self._num_fields = len(fields)
+        self._getters = []
+        self._union_getters = {}
+        self._setters = []
+        for i, (sf, df_type) in enumerate(fields):
+            if sf.proto.name in schema.union_fields:
+                getter, setter = _make_union_member_accessors(sf, df_type)
+                self._union_getters[sf.index] = (i, getter)
+            else:
+                getter, setter = _make_field_accessors(sf, df_type)
+                self._getters.append((i, getter))
+            self._setters.append(setter)
+
+    def get_values(self, raw):
+        values = [None] * self._num_fields
+        for i, getter in self._getters:
+            values[i] = getter(raw)
+        if self._union_getters:
+            # ``which`` returns None when the discriminant is unknown to
+            # us (i.e., set by a newer schema).
+            field = raw.which()
+            if field is not None:
+                entry = self._union_getters.get(field.getIndex())
+                if entry is not None:
+                    i, getter = entry
+                    values[i] = getter(raw)
+        return values
+
+    def set_values(self, raw, values):
+        ASSERT.equal(len(values), self._num_fields)
+        for setter, value in zip(self._setters, values):
+            setter(raw, value)
 
 
 class _StructConverter:
@@ -174,38 +229,36 @@ class _StructConverter:
             )
         dataclass_fields = dataclasses.fields(dataclass)
         TYPE_ASSERT.equal(len(schema.fields), len(dataclass_fields))
-        converters = []
+        fields = []
         for df in dataclass_fields:
             sf = TYPE_ASSERT.getitem(
                 schema.fields, cases.lower_snake_to_lower_camel(df.name)
             )
-            if sf.proto.name in schema.union_fields:
-                make = _make_optional_field_converter
-            else:
-                make = _make_field_converter
-            converters.append((sf.proto.name, df.name) +
-                              make(sf.type, df.type))
-        return converters
+            fields.append((sf, df.type))
+        return (
+            tuple(df.name for df in dataclass_fields),
+            _StructPlan(schema, fields),
+        )
 
     def __init__(self):
         self._dataclass = None
-        self._converters = None
+        self._df_names = None
+        self._plan = None
 
     def _init(self, schema, dataclass):
         self._dataclass = dataclass
-        self._converters = self._compile(schema, dataclass)
+        self._df_names, self._plan = self._compile(schema, dataclass)
 
-    def from_reader(self, reader):
+    def from_raw(self, raw):
         return self._dataclass(
-            **{
-                df_name: getter(reader, sf_name)
-                for sf_name, df_name, getter, _ in self._converters
-            }
+            **dict(zip(self._df_names, self._plan.get_values(raw)))
         )
 
-    def to_builder(self, dataobject, builder):
-        for sf_name, df_name, _, setter in self._converters:
-            setter(builder, sf_name, getattr(dataobject, df_name))
+    def to_raw(self, dataobject, raw):
+        self._plan.set_values(
+            raw,
+            [getattr(dataobject, df_name) for df_name in self._df_names],
+        )
 
 
 class _TupleConverter:
@@ -215,30 +268,19 @@ class _TupleConverter:
     def _compile(schema, element_types):
         LOG.debug('compile tuple converter for: %r, %r', schema, element_types)
         TYPE_ASSERT.equal(len(schema.fields), len(element_types))
-        converters = []
-        for sf, element_type in zip(
-            _fields_by_code_order(schema),
-            element_types,
-        ):
-            if sf.proto.name in schema.union_fields:
-                make = _make_optional_field_converter
-            else:
-                make = _make_field_converter
-            converters.append((sf.proto.name, ) + make(sf.type, element_type))
-        return converters
+        return _StructPlan(
+            schema,
+            list(zip(_fields_by_code_order(schema), element_types)),
+        )
 
     def __init__(self, schema, element_types):
-        self._converters = self._compile(schema, element_types)
+        self._plan = self._compile(schema, element_types)
 
-    def from_reader(self, reader):
-        return tuple(
-            getter(reader, sf_name) for sf_name, getter, _ in self._converters
-        )
+    def from_raw(self, raw):
+        return tuple(self._plan.get_values(raw))
 
-    def to_builder(self, elements, builder):
-        ASSERT.equal(len(elements), len(self._converters))
-        for (sf_name, _, setter), element in zip(self._converters, elements):
-            setter(builder, sf_name, element)
+    def to_raw(self, elements, raw):
+        self._plan.set_values(raw, elements)
 
 
 class _ExceptionConverter:
@@ -291,33 +333,33 @@ class _ExceptionConverter:
         self._converter = _TupleConverter(schema, element_types)
         self._exc_type = exc_type
 
-    def from_reader(self, reader):
-        return self._exc_type(*self._converter.from_reader(reader))
+    def from_raw(self, raw):
+        return self._exc_type(*self._converter.from_raw(raw))
 
-    def to_builder(self, exc, builder):
-        self._converter.to_builder(exc.args, builder)
+    def to_raw(self, exc, raw):
+        self._converter.to_raw(exc.args, raw)
 
 
 class _ListConverter:
     """Converter between typing.List[T] and List(T)."""
 
     def __init__(self, schema, element_type):
-        self._getter, self._setter = _make_field_converter(
-            schema.element_type, element_type
+        self._to_upper, self._put = _make_value_converter(
+            schema.element_type, element_type, is_element=True
         )
 
-    def from_reader(self, reader):
-        ASSERT.isinstance(reader, dynamics.DynamicListReader)
-        return [self._getter(reader, i) for i in range(len(reader))]
+    def from_raw(self, raw):
+        to_upper = self._to_upper
+        return [to_upper(raw[i]) for i in range(len(raw))]
 
-    def to_builder(self, elements, builder):
-        ASSERT.isinstance(builder, dynamics.DynamicListBuilder)
+    def to_raw(self, elements, raw):
+        put = self._put
         for i, element in enumerate(elements):
-            self._setter(builder, i, element)
+            put(raw, i, element)
 
 
 #
-# Field converter constructors.
+# Field accessor constructors.
 #
 
 _INT_TYPES = frozenset((
@@ -352,105 +394,52 @@ _DATETIME_INT_TYPES = frozenset((
 
 _DATETIME_FLOAT_TYPE = _capnp.schema.Type.Which.FLOAT64
 
+_NON_NULL = _capnp.HasMode.NON_NULL
 
-def _make_field_converter(sf_type, df_type):
-
-    if typings.is_recursive_type(df_type):
-
-        if df_type.__origin__ is list:
-            TYPE_ASSERT.equal(len(df_type.__args__), 1)
-            TYPE_ASSERT.true(sf_type.is_list())
-            return _CollectionTypedFieldConverter.make_list_accessors(
-                _ListConverter(sf_type.as_list(), df_type.__args__[0])
-            )
-
-        elif df_type.__origin__ is tuple:
-            TYPE_ASSERT.true(sf_type.is_struct())
-            return _CollectionTypedFieldConverter.make_accessors(
-                _TupleConverter(sf_type.as_struct(), df_type.__args__)
-            )
-
-        else:
-            return TYPE_ASSERT.unreachable(
-                'unsupported generic type: {!r}', df_type
-            )
-
-    elif is_dataclass(df_type):
-        TYPE_ASSERT.true(sf_type.is_struct())
-        return _CollectionTypedFieldConverter.make_accessors(
-            _StructConverter.get(sf_type.as_struct(), df_type)
-        )
-
-    elif issubclass(df_type, Exception):
-        TYPE_ASSERT.true(sf_type.is_struct())
-        return _CollectionTypedFieldConverter.make_accessors(
-            _ExceptionConverter(sf_type.as_struct(), df_type)
-        )
-
-    elif issubclass(df_type, datetime.datetime):
-        if sf_type.which is _DATETIME_FLOAT_TYPE:
-            return _datetime_getter, _datetime_setter_float
-        else:
-            TYPE_ASSERT.in_(sf_type.which, _DATETIME_INT_TYPES)
-            return _datetime_getter, _datetime_setter_int
-
-    elif issubclass(df_type, enum.Enum):
-        TYPE_ASSERT.true(sf_type.is_enum())
-        return functools.partial(_enum_getter, df_type), operator.setitem
-
-    elif issubclass(df_type, NoneType):
-        TYPE_ASSERT.true(sf_type.is_void())
-        return _none_getter, _none_setter
-
-    elif issubclass(df_type, _capnp.VoidType):
-        TYPE_ASSERT.true(sf_type.is_void())
-        return operator.getitem, operator.setitem
-
-    elif issubclass(df_type, bool):
-        TYPE_ASSERT.true(sf_type.is_bool())
-        return operator.getitem, operator.setitem
 
-    elif issubclass(df_type, int):
-        # NOTE: For now we only support sub-types of int.  If there are
-        # use cases of sub-types other types, we will add support to
-        # them as well.
-        TYPE_ASSERT.in_(sf_type.which, _INT_TYPES)
-        if df_type is int:
-            getter = operator.getitem
-        else:
-            getter = functools.partial(_int_subtype_getter, df_type)
-        return getter, operator.setitem
+def _make_field_accessors(sf, df_type):
+    """Make accessors for a non-union field.
 
-    elif issubclass(df_type, float):
-        TYPE_ASSERT.in_(sf_type.which, _FLOAT_TYPES)
-        return operator.getitem, operator.setitem
+    Setting None to a pointer-typed field clears it.
+    """
+    field = sf._raw
+    to_upper, put = _make_value_converter(sf.type, df_type)
+    getter = _make_getter(sf, to_upper)
+    if sf.type.which in _POINTER_TYPES:
+
+        def setter(raw, value):
+            if value is None:
+                raw.clear(field)
+            else:
+                put(raw, field, value)
 
-    elif issubclass(df_type, bytes):
-        TYPE_ASSERT.true(sf_type.is_data())
-        return _bytes_getter, _pointer_setter
+    else:
 
-    elif issubclass(df_type, str):
-        TYPE_ASSERT.true(sf_type.is_text())
-        return operator.getitem, _pointer_setter
+        def setter(raw, value):
+            put(raw, field, value)
 
-    else:
-        return TYPE_ASSERT.unreachable(
-            'unsupported field type: {!r}, {!r}', sf_type, df_type
-        )
+    return getter, setter
 
 
-def _make_optional_field_converter(sf_type, df_type):
-    """Make a converter for a union member.
+def _make_union_member_accessors(sf, df_type):
+    """Make accessors for a union member.
 
-    * ``sf_type`` should be type of a member field of a union.
+    * ``sf`` should be a member field of a union.
     * ``df_type`` should be a typing.Optional annotation.
+
+    The getter is only called when the member is active, and the setter
+    ignores None.
     """
+    field = sf._raw
     if typings.type_is_subclass(df_type, NoneType):
         # Handle typing.Optional[NoneType], which is simply NoneType.
-        return _make_union_member_converter(sf_type, df_type)
+        # To select it, you have to set VOID to it.
+        TYPE_ASSERT.true(sf.type.is_void())
+        to_upper = _none_to_upper
+        put = _make_put(dynamics._make_to_lower(sf.type))
     else:
-        return _make_union_member_converter(
-            sf_type,
+        to_upper, put = _make_value_converter(
+            sf.type,
             TYPE_ASSERT(
                 typings.is_recursive_type(df_type)
                 and typings.is_union_type(df_type)
@@ -459,243 +448,246 @@ def _make_optional_field_converter(sf_type, df_type):
                 df_type,
             ),
         )
+    getter = _make_getter(sf, to_upper)
+
+    def setter(raw, value):
+        if value is not None:
+            put(raw, field, value)
+
+    return getter, setter
 
 
-def _make_union_member_converter(sf_type, df_type):
+def _make_getter(sf, to_upper):
+    field = sf._raw
+    # Return None on null pointers without a default value (note that
+    # ``NON_NULL`` is always true for non-pointer fields).
+    if (
+        sf.proto.is_slot() and sf.type.which in _POINTER_TYPES
+        and not sf.proto.slot.had_explicit_default
+    ):
+
+        def getter(raw):
+            if not raw.has(field, _NON_NULL):
+                return None
+            return to_upper(raw.get(field))
+
+    else:
+
+        def getter(raw):
+            return to_upper(raw.get(field))
+
+    return getter
+
+
+def _make_value_converter(sf_type, df_type, *, is_element=False):
+    """Make converters between raw value and Python value.
+
+    It returns ``(to_upper, put)``, where ``to_upper`` converts a raw
+    ``DynamicValue`` to Python value, and ``put(raw, key, value)`` puts
+    a non-None Python value to a struct field or a list element.
+    """
 
     if typings.is_recursive_type(df_type):
 
         if df_type.__origin__ is list:
             TYPE_ASSERT.equal(len(df_type.__args__), 1)
             TYPE_ASSERT.true(sf_type.is_list())
-            return _CollectionTypedFieldConverter.make_union_list_accessors(
+            return _make_list_value_converter(
                 _ListConverter(sf_type.as_list(), df_type.__args__[0])
             )
 
         elif df_type.__origin__ is tuple:
             TYPE_ASSERT.true(sf_type.is_struct())
-            return _CollectionTypedFieldConverter.make_union_accessors(
-                _TupleConverter(sf_type.as_struct(), df_type.__args__)
+            return _make_struct_value_converter(
+                _TupleConverter(sf_type.as_struct(), df_type.__args__),
+                is_element,
             )
 
         else:
             return TYPE_ASSERT.unreachable(
-                'unsupported generic type for union: {!r}', df_type
+                'unsupported generic type: {!r}', df_type
             )
 
     elif is_dataclass(df_type):
         TYPE_ASSERT.true(sf_type.is_struct())
-        return _CollectionTypedFieldConverter.make_union_accessors(
-            _StructConverter.get(sf_type.as_struct(), df_type)
+        return _make_struct_value_converter(
+            _StructConverter.get(sf_type.as_struct(), df_type),
+            is_element,
         )
 
     elif issubclass(df_type, Exception):
         TYPE_ASSERT.true(sf_type.is_struct())
-        return _CollectionTypedFieldConverter.make_union_accessors(
-            _ExceptionConverter(sf_type.as_struct(), df_type)
+        return _make_struct_value_converter(
+            _ExceptionConverter(sf_type.as_struct(), df_type),
+            is_element,
         )
 
     elif issubclass(df_type, datetime.datetime):
         if sf_type.which is _DATETIME_FLOAT_TYPE:
-            return _union_datetime_getter, _union_datetime_setter_float
+            to_timestamp = _to_float_timestamp
         else:
             TYPE_ASSERT.in_(sf_type.which, _DATETIME_INT_TYPES)
-            return _union_datetime_getter, _union_datetime_setter_int
+            to_timestamp = _to_int_timestamp
+        return (
+            functools.partial(_datetime_to_upper, _get_to_upper(sf_type)),
+            _make_put(
+                functools.partial(
+                    _datetime_to_lower,
+                    dynamics._make_to_lower(sf_type),
+                    to_timestamp,
+                )
+            ),
+        )
 
     elif issubclass(df_type, enum.Enum):
         TYPE_ASSERT.true(sf_type.is_enum())
-        return functools.partial(_union_enum_getter, df_type), _union_setter
+        return (
+            functools.partial(_enum_to_upper, df_type),
+            _make_put(dynamics._make_to_lower(sf_type)),
+        )
 
     elif issubclass(df_type, NoneType):
         TYPE_ASSERT.true(sf_type.is_void())
-        return _union_none_getter, _union_setter
+        return _none_to_upper, _make_put(_none_to_lower)
 
     elif issubclass(df_type, _capnp.VoidType):
         TYPE_ASSERT.true(sf_type.is_void())
-        return operator.getitem, _union_setter
+        return _make_scalar_value_converter(sf_type)
 
     elif issubclass(df_type, bool):
         TYPE_ASSERT.true(sf_type.is_bool())
-        return operator.getitem, _union_setter
+        return _make_scalar_value_converter(sf_type)
 
     elif issubclass(df_type, int):
         # NOTE: For now we only support sub-types of int.  If there are
         # use cases of sub-types other types, we will add support to
         # them as well.
         TYPE_ASSERT.in_(sf_type.which, _INT_TYPES)
-        if df_type is int:
-            getter = operator.getitem
-        else:
-            getter = functools.partial(_union_int_subtype_getter, df_type)
-        return getter, _union_setter
+        to_upper, put = _make_scalar_value_converter(sf_type)
+        if df_type is not int:
+            to_upper = functools.partial(
+                _int_subtype_to_upper, df_type, to_upper
+            )
+        return to_upper, put
 
     elif issubclass(df_type, float):
         TYPE_ASSERT.in_(sf_type.which, _FLOAT_TYPES)
-        return operator.getitem, _union_setter
+        return _make_scalar_value_converter(sf_type)
 
     elif issubclass(df_type, bytes):
         TYPE_ASSERT.true(sf_type.is_data())
-        return _bytes_getter, _union_setter
+        return _make_scalar_value_converter(sf_type)
 
     elif issubclass(df_type, str):
         TYPE_ASSERT.true(sf_type.is_text())
-        return operator.getitem, _union_setter
+        return _make_scalar_value_converter(sf_type)
 
     else:
         return TYPE_ASSERT.unreachable(
-            'unsupported union member type: {!r}, {!r}', sf_type, df_type
+            'unsupported field type: {!r}, {!r}', sf_type, df_type
         )
 
 
 #
-# Field converters.
+# Value converters.
 #
 
 
-class _CollectionTypedFieldConverter:
-    """Collection-typed field converter.
+def _make_list_value_converter(converter):
 
-    Note that collection types are pointer types.
-    """
-
-    @classmethod
-    def make_accessors(cls, converter):
-        converter = cls(converter)
-        return converter.getter, converter.setter
+    def to_upper(value):
+        return converter.from_raw(value.asDynamicList())
 
-    @classmethod
-    def make_list_accessors(cls, converter):
-        converter = cls(converter)
-        return converter.getter, converter.list_setter
-
-    @classmethod
-    def make_union_accessors(cls, converter):
-        converter = cls(converter)
-        return converter.getter, converter.union_setter
+    def put(raw, key, elements):
+        converter.to_raw(
+            elements, raw.init(key, len(elements)).asDynamicList()
+        )
 
-    @classmethod
-    def make_union_list_accessors(cls, converter):
-        converter = cls(converter)
-        return converter.getter, converter.union_list_setter
-
-    def __init__(self, converter):
-        self._converter = converter
-
-    def getter(self, reader, name):
-        pointer = reader[name]
-        if pointer is None:
-            return None
-        return self._converter.from_reader(pointer)
-
-    def setter(self, builder, name, pointer):
-        if pointer is None:
-            del builder[name]
-        else:
-            self._converter.to_builder(pointer, builder.init(name))
+    return to_upper, put
 
-    def list_setter(self, builder, name, pointer):
-        if pointer is None:
-            del builder[name]
-        else:
-            self._converter.to_builder(
-                pointer, builder.init(name, len(pointer))
-            )
 
-    def union_setter(self, builder, name, pointer):
-        if pointer is not None:
-            self._converter.to_builder(pointer, builder.init(name))
+def _make_struct_value_converter(converter, is_element):
 
-    def union_list_setter(self, builder, name, pointer):
-        if pointer is not None:
-            self._converter.to_builder(
-                pointer, builder.init(name, len(pointer))
-            )
+    def to_upper(value):
+        return converter.from_raw(value.asDynamicStruct())
 
+    if is_element:
+        # ``DynamicList::Builder::init`` does not support struct type;
+        # struct elements are initialized along with the list.
+        def put(raw, index, dataobject):
+            converter.to_raw(dataobject, raw[index].asDynamicStruct())
 
-def _bytes_getter(reader, name):
-    view = reader[name]
-    if view is None:
-        return None
     else:
-        return view.tobytes()
 
+        def put(raw, field, dataobject):
+            converter.to_raw(dataobject, raw.init(field).asDynamicStruct())
 
-def _datetime_getter(reader, name):
-    return datetimes.utcfromtimestamp(reader[name])
+    return to_upper, put
 
 
-def _datetime_setter_int(builder, name, datetime_object):
-    builder[name] = int(datetime_object.timestamp())
+def _make_scalar_value_converter(sf_type):
+    return _get_to_upper(sf_type), _make_put(dynamics._make_to_lower(sf_type))
 
 
-def _datetime_setter_float(builder, name, datetime_object):
-    builder[name] = datetime_object.timestamp()
+def _get_to_upper(sf_type):
+    primitive = dynamics._PRIMITIVE_TYPES.get(sf_type.which)
+    if primitive:
+        return primitive[1]
+    elif sf_type.is_text():
+        return _text_to_upper
+    else:
+        ASSERT.true(sf_type.is_data())
+        return _data_to_upper
 
 
-def _enum_getter(enum_type, reader, name):
-    return _to_enum_member(enum_type, reader[name])
+def _make_put(to_lower):
 
+    def put(raw, key, value):
+        raw.set(key, to_lower(value))
 
-def _int_subtype_getter(int_subtype, reader, name):
-    return int_subtype(reader[name])
+    return put
 
 
-def _none_getter(reader, name):  # pylint: disable=useless-return
-    ASSERT.is_(reader[name], _capnp.VOID)
-    return None
+def _data_to_upper(value):
+    return value.asData().tobytes()
 
 
-def _none_setter(builder, name, none):
-    ASSERT.is_(none, None)
-    builder[name] = _capnp.VOID
+def _datetime_to_upper(to_upper, value):
+    return datetimes.utcfromtimestamp(to_upper(value))
 
 
-def _pointer_setter(builder, name, pointer):
-    if pointer is None:
-        del builder[name]
-    else:
-        builder[name] = pointer
+def _datetime_to_lower(to_lower, to_timestamp, datetime_object):
+    return to_lower(to_timestamp(datetime_object))
 
 
-def _union_datetime_getter(reader, name):
-    timestamp = reader[name]
-    if timestamp is None:
-        return None
-    return datetimes.utcfromtimestamp(timestamp)
+def _enum_to_upper(enum_type, value):
+    return _to_enum_member(enum_type, value.asDynamicEnum().getRaw())
 
 
-def _union_datetime_setter_int(builder, name, datetime_object):
-    if datetime_object is not None:
-        builder[name] = int(datetime_object.timestamp())
+def _int_subtype_to_upper(int_subtype, to_upper, value):
+    return int_subtype(to_upper(value))
 
 
-def _union_datetime_setter_float(builder, name, datetime_object):
-    if datetime_object is not None:
-        builder[name] = datetime_object.timestamp()
+def _none_to_upper(value):  # pylint: disable=useless-return
+    ASSERT.is_(value.asVoid(), _capnp.VOID)
+    return None
 
 
-def _union_enum_getter(enum_type, reader, name):
-    enum_value = reader[name]
-    if enum_value is None:
-        return None
-    return _to_enum_member(enum_type, enum_value)
+def _none_to_lower(none):
+    ASSERT.is_(none, None)
+    return _capnp.DynamicValue.Reader.fromVoid(_capnp.VOID)
 
 
-def _union_int_subtype_getter(int_subtype, reader, name):
-    int_value = reader[name]
-    if int_value is None:
-        return None
-    return int_subtype(int_value)
+def _text_to_upper(value):
+    return str(value.asText(), 'utf-8')
 
 
-def _union_none_getter(reader, name):  # pylint: disable=useless-return
-    ASSERT.in_(reader[name], (None, _capnp.VOID))
-    return None
+def _to_float_timestamp(datetime_object):
+    return datetime_object.timestamp()
 
 
-def _union_setter(builder, name, value):
-    if value is not None:
-        builder[name] = value
+def _to_int_timestamp(datetime_object):
+    return int(datetime_object.timestamp())
 
 
 #
@@ -39,6 +39,7 @@ class TestStructNew:
     enum_field: TestEnum
     no_optional_enum_field: type(None)
     optional_enum_field: Optional[TestEnum]
+    new_union_field: Optional[int]
     extra_field: bool
 
 
@@ -96,6 +97,7 @@ class ObjectsCompatibilityTest(unittest.TestCase):
                 enum_field=TestStructNew.TestEnum.old_member,
                 no_optional_enum_field=None,
                 optional_enum_field=TestStructNew.TestEnum.old_member,
+                new_union_field=None,
                 extra_field=False,
             ),
         )
@@ -108,6 +110,7 @@ class ObjectsCompatibilityTest(unittest.TestCase):
                 enum_field=TestStructNew.TestEnum.new_member,
                 no_optional_enum_field=None,
                 optional_enum_field=TestStructNew.TestEnum.new_member,
+                new_union_field=None,
                 extra_field=True,
             ),
             message_new.init_root(self.schema_new),
@@ -127,6 +130,32 @@ class ObjectsCompatibilityTest(unittest.TestCase):
             ),
         )
 
+    def test_forward_compatibility_union(self):
+        # Old converter does not know the new union member.
+        message_new = capnp.MessageBuilder()
+        self.converter_new.to_builder(
+            TestStructNew(
+                enum_field=TestStructNew.TestEnum.old_member,
+                no_optional_enum_field=None,
+                optional_enum_field=None,
+                new_union_field=42,
+                extra_field=False,
+            ),
+            message_new.init_root(self.schema_new),
+        )
+
+        message_old = capnp.MessageReader.from_message_bytes(
+            message_new.to_message_bytes()
+        )
+        self.assertEqual(
+            self.converter_old.from_message(message_old),
+            TestStructOld(
+                enum_field=TestStructOld.TestEnum.old_member,
+                no_optional_enum_field=None,
+                optional_enum_field=None,
+            ),
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,7 @@ __all__ = [
     'Durations',
     'Errors',
     'Message',
+    'MessagePool',
     'NngError',
     'Protocols',
     'Socket',
@@ -21,6 +22,7 @@ from .errors import Errors
 from .errors import NngError
 from .errors import UnknownError
 from .messages import Message
+from .messages import MessagePool
 from .sockets import Context
 from .sockets import Socket
 
@@ -1,11 +1,13 @@
 """Asynchronous nng socket interface."""
 
 __all__ = [
+    'Aio',
     'Context',
     'Socket',
 ]
 
 import ctypes
+import functools
 
 from g1.asyncs import kernels
 from g1.asyncs.bases import locks
@@ -50,6 +52,23 @@ class Socket(bases.SocketBase):
 
 
 class Context(bases.ContextBase):
+    """Asynchronous context.
+
+    A context owns an AIO handle, which is allocated on first use and
+    is reused by subsequent sends and receives (unless they overlap).
+    So it is cheaper to reuse a context than to open a new one.
+    """
+
+    def __init__(self, socket):
+        # In case ``__init__`` raises.
+        self._aio = None
+        super().__init__(socket)
+
+    def close(self):
+        if self._aio is not None:
+            self._aio.close()
+            self._aio = None
+        super().close()
 
     async def send(self, data):
         with messages.Message(ASSERT.isinstance(data, bytes)) as message:
@@ -60,53 +79,120 @@ class Context(bases.ContextBase):
             return message.body.copy()
 
     async def sendmsg(self, message):
-        return await ContextSender(message).run(self._handle)
+        return await ContextSender(message).run(self._handle, self._get_aio())
 
     async def recvmsg(self):
-        return await ContextReceiver().run(self._handle)
+        return await ContextReceiver().run(self._handle, self._get_aio())
 
+    def _get_aio(self):
+        if self._aio is None:
+            self._aio = Aio()
+        # Fall back to a temporary AIO handle when operations overlap.
+        return None if self._aio.is_running() else self._aio
 
-class AsyncTransceiverBase:
 
-    async def run(self, handle):
+class Aio:
+    """Reusable AIO handle.
 
-        event = locks.Event()
+    Allocating an ``nng_aio`` and its ctypes callback is not cheap, and
+    this lets callers that transceive repeatedly reuse them.  An AIO
+    handle may only run one operation at a time.
+    """
 
-        kernel = ASSERT.not_none(kernels.get_kernel())
-        callback = _nng.nng_aio_callback(
-            lambda _: kernel.post_callback(event.set)
-        )
+    def __init__(self):
+
+        # In case ``__init__`` raises.
+        self._aio_p = None
+
+        self._event = locks.Event()
+        self._kernel = None
+        # Stale completion notifications (of a cancelled operation) that
+        # are posted to the kernel are ignored by checking this.
+        self._generation = 0
+        self._is_running = False
+        self._callback = _nng.nng_aio_callback(self._on_completion)
 
         aio_p = _nng.nng_aio_p()
-        errors.check(_nng.F.nng_aio_alloc(ctypes.byref(aio_p), callback, None))
-        try:
+        errors.check(
+            _nng.F.nng_aio_alloc(ctypes.byref(aio_p), self._callback, None)
+        )
+        self._aio_p = aio_p
+
+        # Strangely, the default is not ``NNG_DURATION_DEFAULT`` but
+        # ``NNG_DURATION_INFINITE``; let's make default the default.
+        _nng.F.nng_aio_set_timeout(self._aio_p, _nng.NNG_DURATION_DEFAULT)
+
+    def __enter__(self):
+        return self
 
-            # Strangely, the default is not ``NNG_DURATION_DEFAULT`` but
-            # ``NNG_DURATION_INFINITE``; let's make default the default.
-            _nng.F.nng_aio_set_timeout(aio_p, _nng.NNG_DURATION_DEFAULT)
+    def __exit__(self, *_):
+        self.close()
 
-            self.transceive(handle, aio_p)
+    def __del__(self):
+        # You have to check whether ``__init__`` raises.
+        if self._aio_p is not None:
+            self.close()
+
+    def close(self):
+        if self._aio_p is None:
+            return
+        ASSERT.false(self._is_running)
+        _nng.F.nng_aio_free(self._aio_p)
+        self._aio_p = None
+
+    def is_running(self):
+        return self._is_running
+
+    def _on_completion(self, _):
+        # This is called from an nng thread.
+        self._kernel.post_callback(
+            functools.partial(self._notify, self._generation)
+        )
+
+    def _notify(self, generation):
+        if generation == self._generation:
+            self._event.set()
+
+    async def run(self, transceiver, handle):
+        ASSERT.not_none(self._aio_p)
+        ASSERT.false(self._is_running)
+        self._kernel = ASSERT.not_none(kernels.get_kernel())
+        self._generation += 1
+        self._event.clear()
+        self._is_running = True
+        try:
+
+            transceiver.transceive(handle, self._aio_p)
 
             try:
-                await event.wait()
+                await self._event.wait()
             except BaseException:
-                _nng.F.nng_aio_cancel(aio_p)
+                _nng.F.nng_aio_cancel(self._aio_p)
                 raise
 
-            errors.check(_nng.F.nng_aio_result(aio_p))
+            errors.check(_nng.F.nng_aio_result(self._aio_p))
 
-            return self.make_result(aio_p)
+            return transceiver.make_result(self._aio_p)
 
         finally:
 
             # Call ``nng_aio_wait`` to ensure that AIO is completed and
-            # we may safely read its result or free it (in case we are
+            # we may safely read its result or reuse it (in case we are
             # here due to an exception).
-            _nng.F.nng_aio_wait(aio_p)
+            _nng.F.nng_aio_wait(self._aio_p)
+
+            transceiver.cleanup(self._aio_p)
+
+            self._is_running = False
 
-            self.cleanup(aio_p)
 
-            _nng.F.nng_aio_free(aio_p)
+class AsyncTransceiverBase:
+
+    async def run(self, handle, aio=None):
+        if aio is not None:
+            return await aio.run(self, handle)
+        with Aio() as temp_aio:
+            return await temp_aio.run(self, handle)
 
     def transceive(self, handle, aio_p):
         raise NotImplementedError
@@ -134,6 +220,7 @@ class AioSender(AsyncTransceiverBase):
     def cleanup(self, aio_p):
         if _nng.F.nng_aio_result(aio_p) == 0:
             self.__message.disown()  # Ownership is transferred on success.
+        _nng.F.nng_aio_set_msg(aio_p, None)
 
 
 class AioReceiver(AsyncTransceiverBase):
@@ -164,6 +251,7 @@ class ContextSender(AsyncTransceiverBase):
     def cleanup(self, aio_p):
         if _nng.F.nng_aio_result(aio_p) == 0:
             self.__message.disown()  # Ownership is transferred on success.
+        _nng.F.nng_aio_set_msg(aio_p, None)
 
 
 class ContextReceiver(AsyncTransceiverBase):
@@ -2,8 +2,10 @@
 
 __all__ = [
     'Message',
+    'MessagePool',
 ]
 
+import contextlib
 import ctypes
 
 from g1.bases import classes
@@ -72,6 +74,55 @@ class Message:
         self._reset()
 
 
+class MessagePool:
+    """Pool of messages for reuse in the send path.
+
+    Sending a message transfers its ownership to nng; so a pool cannot
+    get back messages that were sent successfully.  Instead, you return
+    to the pool messages that you are done with, such as received
+    messages and messages that failed to be sent.  Reusing a message
+    keeps its underlying buffer, and saves an allocation when the new
+    data fits in.
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = ASSERT.greater(capacity, 0)
+        self._messages = []
+
+    def __len__(self):
+        return len(self._messages)
+
+    def get(self, data):
+        """Return a message of ``data``, reusing a pooled one if any."""
+        ASSERT.isinstance(data, bytes)
+        if not self._messages:
+            return Message(data)
+        message = self._messages.pop()
+        message.header.clear()
+        message.body.clear()
+        if data:
+            message.body.append(data)
+        return message
+
+    def put(self, message):
+        """Return a message to the pool, or free it if pool is full.
+
+        Messages that are disowned (which is what sending does on
+        success) are ignored.
+        """
+        if message._msg_p is None:
+            return
+        if len(self._messages) < self.capacity:
+            self._messages.append(message)
+        else:
+            message._reset()
+
+    def close(self):
+        messages, self._messages = self._messages, []
+        for message in messages:
+            message._reset()
+
+
 class Chunk:
 
     _chunk_get = classes.abstract_method
@@ -110,6 +161,24 @@ class Chunk:
             PyBUF_WRITE,
         )
 
+    @contextlib.contextmanager
+    def view(self):
+        """Make a memory view that is released on exit.
+
+        This lets you parse the chunk in place without copying it out.
+        Unlike ``memory_view``, the view is released on exit, and
+        accessing it afterward raises ``ValueError`` rather than reading
+        freed memory.  The message must not be freed, disowned, or
+        modified while the view is in use, and you should not keep
+        objects derived from the view (such as slices of it) beyond the
+        context.
+        """
+        view = self.memory_view
+        try:
+            yield view
+        finally:
+            view.release()
+
 
 class Header(Chunk):
 
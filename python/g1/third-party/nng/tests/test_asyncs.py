@@ -153,6 +153,73 @@ class SocketTest(unittest.TestCase):
             with self.subTest(c0):
                 do_test(c0)
 
+    @kernels.with_kernel
+    def test_context_aio_reuse(self):
+        with contextlib.ExitStack() as stack:
+            url = 'inproc://%s' % uuid.uuid4()
+
+            sock1 = stack.enter_context(asyncs.Socket(nng.Protocols.REP0))
+            sock1.listen(url)
+
+            sock0 = stack.enter_context(asyncs.Socket(nng.Protocols.REQ0))
+            sock0.dial(url)
+
+            c0 = stack.enter_context(asyncs.Context(sock0))
+            c1 = stack.enter_context(asyncs.Context(sock1))
+
+            # Cancel an operation and then reuse its AIO handle.
+            t1 = tasks.spawn(c1.recv())
+            with self.assertRaises(kernels.KernelTimeout):
+                kernels.run(timeout=0.01)
+            aio = c1._aio
+            self.assertIsNotNone(aio)
+            t1.cancel()
+            kernels.run(timeout=1)
+            self.assertIsInstance(
+                t1.get_exception_nonblocking(), tasks.Cancelled
+            )
+
+            for i in range(3):
+                data = b'%d' % i
+                t0 = tasks.spawn(c0.send(data))
+                t1 = tasks.spawn(c1.recv())
+                kernels.run(timeout=1)
+                self.assertIsNone(t0.get_result_nonblocking())
+                self.assertEqual(t1.get_result_nonblocking(), data)
+                t1 = tasks.spawn(c1.send(data))
+                t0 = tasks.spawn(c0.recv())
+                kernels.run(timeout=1)
+                self.assertIsNone(t1.get_result_nonblocking())
+                self.assertEqual(t0.get_result_nonblocking(), data)
+                self.assertIs(c1._aio, aio)
+
+            c1.close()
+            self.assertIsNone(c1._aio)
+
+    @kernels.with_kernel
+    def test_aio(self):
+        with contextlib.ExitStack() as stack:
+            url = 'inproc://%s' % uuid.uuid4()
+
+            sock1 = stack.enter_context(asyncs.Socket(nng.Protocols.PUSH0))
+            sock1.listen(url)
+
+            sock0 = stack.enter_context(asyncs.Socket(nng.Protocols.PULL0))
+            sock0.dial(url)
+
+            aio = stack.enter_context(asyncs.Aio())
+            for i in range(3):
+                data = b'%d' % i
+                t0 = tasks.spawn(
+                    asyncs.AioReceiver().run(sock0._handle, aio)
+                )
+                t1 = tasks.spawn(sock1.send(data))
+                kernels.run(timeout=1)
+                self.assertIsNone(t1.get_result_nonblocking())
+                with t0.get_result_nonblocking() as message:
+                    self.assertEqual(message.body.copy(), data)
+                self.assertFalse(aio.is_running())
+
 
 if __name__ == '__main__':
     unittest.main()
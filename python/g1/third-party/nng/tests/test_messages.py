@@ -54,6 +54,48 @@ class MessageTest(unittest.TestCase):
         self.assert_chunk(m2.header, b'')
         self.assert_chunk(m2.body, b'hello world')
 
+    def test_view(self):
+        m = messages.Message(b'hello world')
+        with m.body.view() as view:
+            self.assertEqual(view, b'hello world')
+            self.assertEqual(bytes(view[6:]), b'world')
+        with self.assertRaises(ValueError):
+            bytes(view)
+
+
+class MessagePoolTest(unittest.TestCase):
+
+    def test_pool(self):
+        pool = messages.MessagePool(capacity=1)
+        m1 = pool.get(b'hello world')
+        self.assertEqual(m1.body.copy(), b'hello world')
+
+        m1.header.append(b'spam')
+        pool.put(m1)
+        self.assertEqual(len(pool), 1)
+
+        m2 = pool.get(b'egg')
+        self.assertIs(m2, m1)
+        self.assertEqual(m2.header.copy(), b'')
+        self.assertEqual(m2.body.copy(), b'egg')
+        self.assertEqual(len(pool), 0)
+
+        pool.put(m2)
+        m3 = messages.Message(b'x')
+        pool.put(m3)  # The pool is full.
+        self.assertEqual(len(pool), 1)
+        self.assertIsNone(m3._msg_p)
+
+        m4 = messages.Message(b'x')
+        m5 = messages.Message(msg_p=m4.disown())
+        pool.put(m4)  # Disowned messages are ignored.
+        self.assertEqual(len(pool), 1)
+        m5._reset()
+
+        pool.close()
+        self.assertEqual(len(pool), 0)
+        self.assertIsNone(m2._msg_p)
+
 
 if __name__ == '__main__':
     unittest.main()